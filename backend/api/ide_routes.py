@@ -3,13 +3,17 @@ BUNK3R-IA: IDE API Routes
 Rutas simplificadas para el nuevo IDE Premium
 """
 import os
+import re
 import logging
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context
 from flask_login import login_required, current_user
 from pathlib import Path
 from core.singularity import singularity
 from core.ai_service import get_ai_service
 from core.repo_indexer import RepoIndexer
+from core.workspace_watcher import workspace_watcher
+from core.prompt_builder import intern_block, assemble
+from core.legacy_v1_archive.streaming_service import StreamEvent, StreamEventType
 from backend.api.github_sync import GitHubSyncService
 from backend.models import db, GitHubRepo
 
@@ -17,6 +21,18 @@ logger = logging.getLogger(__name__)
 
 ide_bp = Blueprint('ide', __name__, url_prefix='/api/ide')
 
+# Parte fija del system prompt del IDE; el contexto del repo se añade al final
+IDE_SYSTEM_PROMPT = intern_block("ide", """# MODO BUNK3R: ARQUITECTO DE CODIGO
+Eres BUNK3R-IA, el cerebro operativo de este IDE. Tienes acceso directo al sistema de archivos del usuario.
+
+## CAPACIDADES DE ACCIÓN:
+Puedes manipular el código usando herramientas. Si el usuario pide crear, editar o borrar algo, HAZLO directamente.
+Herramientas disponibles: `read_file`, `write_file`, `list_dir`, `run_command`, `web_search`, `find_symbol`.
+Para localizar dónde se define o se usa una función o clase, usa `find_symbol` (con `path` = carpeta del repositorio) en lugar de recorrer el repo con `list_dir`/`read_file`.
+
+Usa siempre el formato: <TOOL>{"name": "nombre", "args": {...}}</TOOL>
+Si necesitas varias acciones independientes (p. ej. leer varios archivos), incluye varias etiquetas <TOOL> en la misma respuesta: se ejecutan juntas y recibes todos los resultados a la vez.""")
+
 def get_user_id():
     """Obtiene el ID del usuario actual"""
     if current_user.is_authenticated:
@@ -28,9 +44,36 @@ def get_user_id():
         pass
     return request.headers.get('X-User-ID', 'demo_user')
 
+WORKSPACES_ROOT = Path("/workspace")
+
 def get_base_path(user_id):
-    """Retorna la ruta base del workspace del usuario"""
-    return Path(f"/workspace/{user_id}")
+    """Retorna la ruta base del workspace del usuario (vigilada si WORKSPACE_WATCHER=true)"""
+    base_path = WORKSPACES_ROOT / user_id
+    # Sólo se vigila un workspace real: un X-User-ID como ".." o "a/b" no registra otra ruta
+    if base_path.resolve().parent == WORKSPACES_ROOT.resolve():
+        workspace_watcher.watch(base_path)
+    return base_path
+
+def build_ide_system_prompt(user_id, active_repo):
+    """System prompt del IDE: prefijo estático (cacheable) + contexto del repo activo"""
+    repo_context = ""
+    
+    if active_repo:
+        repo_path = get_base_path(user_id) / active_repo
+        if repo_path.exists():
+            indexer = RepoIndexer(repo_path)
+            index_result = indexer.index_repo()
+            if index_result["success"]:
+                index = index_result["index"]
+                repo_context = f"""
+CONTEXTO DEL REPOSITORIO ACTIVO:
+- Carpeta: {active_repo}
+- Lenguajes: {', '.join(index['languages'].keys())}
+- Archivos: {index['file_count']}
+- Estructura: {', '.join([f['path'] for f in index['structure'][:15] if f['type'] == 'file'])}
+"""
+    
+    return assemble(IDE_SYSTEM_PROMPT, repo_context.strip())
 
 @ide_bp.route('/chat', methods=['POST'])
 def ide_chat():
@@ -43,37 +86,7 @@ def ide_chat():
         if not message:
             return jsonify({'success': False, 'error': 'Mensaje requerido'}), 400
         
-        # Obtener contexto del repositorio activo
-        active_repo = data.get('active_repo')
-        repo_context = ""
-        
-        if active_repo:
-            repo_path = get_base_path(user_id) / active_repo
-            if repo_path.exists():
-                indexer = RepoIndexer(repo_path)
-                index_result = indexer.index_repo()
-                if index_result["success"]:
-                    index = index_result["index"]
-                    repo_context = f"""
-CONTEXTO DEL REPOSITORIO ACTIVO:
-- Carpeta: {active_repo}
-- Lenguajes: {', '.join(index['languages'].keys())}
-- Archivos: {index['file_count']}
-- Estructura: {', '.join([f['path'] for f in index['structure'][:15] if f['type'] == 'file'])}
-"""
-        
-        # System prompt mejorado con contexto de repos
-        system_prompt = f"""# MODO BUNK3R: ARQUITECTO DE CODIGO
-Eres BUNK3R-IA, el cerebro operativo de este IDE. Tienes acceso directo al sistema de archivos del usuario.
-
-{repo_context}
-
-## CAPACIDADES DE ACCIÓN:
-Puedes manipular el código usando herramientas. Si el usuario pide crear, editar o borrar algo, HAZLO directamente.
-Herramientas disponibles: `read_file`, `write_file`, `list_dir`, `run_command`, `web_search`.
-
-Usa siempre el formato: <TOOL>{{"name": "nombre", "args": {{...}}}}</TOOL>
-"""
+        system_prompt = build_ide_system_prompt(user_id, data.get('active_repo'))
         
         # Llamar a Singularity
         ai_service = get_ai_service()
@@ -89,6 +102,49 @@ Usa siempre el formato: <TOOL>{{"name": "nombre", "args": {{...}}}}</TOOL>
         logger.error(f"Error en IDE chat: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@ide_bp.route('/chat/stream', methods=['POST'])
+def ide_chat_stream():
+    """
+    Chat con Singularity en streaming (SSE): reflexión, herramientas y respuesta
+    se emiten como StreamEvent a medida que se producen
+    """
+    try:
+        data = request.json or {}
+        user_id = get_user_id()
+        message = data.get('message', '').strip()
+        
+        if not message:
+            return jsonify({'success': False, 'error': 'Mensaje requerido'}), 400
+        
+        system_prompt = build_ide_system_prompt(user_id, data.get('active_repo'))
+        ai_service = get_ai_service()
+        
+        def generate():
+            try:
+                for event in ai_service.chat_stream(
+                    user_id=user_id,
+                    message=message,
+                    system_prompt=system_prompt
+                ):
+                    yield event.to_sse()
+            except Exception as e:
+                logger.error(f"Error en IDE chat stream: {e}")
+                yield StreamEvent(StreamEventType.ERROR, str(e)).to_sse()
+        
+        return Response(
+            stream_with_context(generate()),
+            mimetype='text/event-stream',
+            headers={
+                'Cache-Control': 'no-cache',
+                'Connection': 'keep-alive',
+                'X-Accel-Buffering': 'no'
+            }
+        )
+        
+    except Exception as e:
+        logger.error(f"Error en IDE chat stream: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @ide_bp.route('/workspace', methods=['GET'])
 def get_workspace():
     """Lista archivos del workspace del usuario"""
@@ -214,8 +270,53 @@ def search_in_repo():
             return jsonify({'success': False, 'error': f'Repositorio no encontrado: {repo_name}'}), 404
         
         indexer = RepoIndexer(repo_path)
-        results = indexer.search_in_repo(query)
+        try:
+            results = indexer.search_in_repo(query, case_sensitive=bool(data.get('case_sensitive')),
+                                             regex=bool(data.get('regex')))
+        except re.error as e:
+            return jsonify({'success': False, 'error': f'Regex inválida: {e}'}), 400
         return jsonify({'success': True, 'query': query, 'results': results})
     except Exception as e:
         logger.error(f"Error buscando en repo: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
+
+@ide_bp.route('/symbols', methods=['GET', 'POST'])
+def repo_symbols():
+    """
+    Índice de símbolos de un repositorio:
+    - `name`: definiciones exactas (ir a la definición) y, con `references`, sus usos
+    - `query`: definiciones cuyo nombre contiene el texto
+    - `path`: esquema de un archivo
+    """
+    try:
+        user_id = get_user_id()
+        data = request.args if request.method == 'GET' else (request.json or {})
+        repo_name = data.get('repo')
+        name, query, file_path = data.get('name'), data.get('query'), data.get('path')
+        kind = data.get('kind') or None
+        
+        if not repo_name or not (name or query or file_path):
+            return jsonify({'success': False, 'error': 'Repo y name, query o path requeridos'}), 400
+        
+        repo_path = get_base_path(user_id) / repo_name
+        if not repo_path.exists():
+            return jsonify({'success': False, 'error': f'Repositorio no encontrado: {repo_name}'}), 404
+        
+        symbols = RepoIndexer(repo_path).symbol_index()
+        if symbols is None:
+            # Primer índice de un repo grande: se está construyendo en segundo plano
+            return jsonify({'success': True, 'indexing': True, 'symbols': [], 'references': []})
+        
+        references = []
+        if name:
+            results = symbols.definitions(name, kind)
+            if str(data.get('references', '')).lower() in ('1', 'true', 'yes'):
+                references = symbols.references(name)
+        elif query:
+            results = symbols.search(query, kind)
+        else:
+            results = symbols.file_symbols(Path(file_path).as_posix().lstrip('/'))
+        return jsonify({'success': True, 'indexing': False, 'symbols': results, 'references': references})
+    except Exception as e:
+        logger.error(f"Error consultando símbolos: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
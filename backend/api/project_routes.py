@@ -51,29 +51,11 @@ def get_project_files(project_id):
         # Fallback para el repo actual si el proyecto no tiene carpeta propia aún
         project_path = os.getcwd()
 
-    def get_dir_structure(path):
-        items = []
-        try:
-            for entry in os.scandir(path):
-                if entry.name.startswith('.') or entry.name == '__pycache__':
-                    continue
-                if entry.is_dir():
-                    items.append({
-                        "name": entry.name,
-                        "type": "folder",
-                        "children": get_dir_structure(entry.path)
-                    })
-                else:
-                    items.append({
-                        "name": entry.name,
-                        "type": "file",
-                        "path": os.path.relpath(entry.path, os.getcwd())
-                    })
-        except Exception:
-            pass
-        return items
-
-    return jsonify({"files": get_dir_structure(project_path)})
+    from core.fs_scanner import fs_scanner
+    # Foto compartida del árbol, sin dotfiles y con rutas relativas al directorio de trabajo
+    prefix = os.path.relpath(project_path, os.getcwd())
+    tree = fs_scanner.snapshot(project_path).tree(hidden=False, path_prefix="" if prefix == "." else prefix)
+    return jsonify({"files": tree})
 
 @projects_bp.route('/file/content', methods=['GET', 'POST'])
 def manage_file_content():
@@ -152,7 +152,8 @@ def ai_code_builder():
             return jsonify({'success': False, 'error': 'Message is required'}), 400
         
         ai = get_ai_service(get_db_manager())
-        result = ai.generate_code(user_id, message, current_files, project_name)
+        result = ai.generate_code(user_id, message, current_files, project_name,
+                                  use_cache=False if data.get('noCache') else data.get('cache'))
         
         return jsonify(result)
     except Exception as e:
@@ -249,9 +250,11 @@ def register_brain():
         ai = get_ai_service()
         
         # Propagate to Ollama providers
+        from core.provider_health import health_monitor
         for p in ai.providers:
             if p.name == "ollama":
                 p.base_url = tunnel_url.rstrip('/') + '/api/chat'
+                health_monitor.probe(p)
                 logger.info(f"Ollama provider instance updated: {tunnel_url}")
         
         logger.info(f"BRAIN SYNC SUCCESS: {tunnel_url}")
@@ -265,10 +268,12 @@ def system_status():
     """Check AI and System status"""
     from core.ai_service import get_ai_service
     ai = get_ai_service()
+    db_manager = get_db_manager()
     
     return jsonify({
         'status': 'online',
-        'database': 'online' if get_db_manager() else 'offline',
+        'database': 'online' if db_manager else 'offline',
+        'db_pool': db_manager.snapshot() if hasattr(db_manager, 'snapshot') else None,
         'ollama_url': os.environ.get('OLLAMA_BASE_URL', 'Not configured'),
         'available_providers': ai.get_available_providers()
     })
@@ -426,52 +426,15 @@ def init_database(database_url=None):
     if database_url is None:
         database_url = os.getenv('DATABASE_URL')
     
-    # Intento con PostgreSQL si hay URL
-    if database_url:
-        try:
-            import psycopg2
-            from psycopg2 import pool
-            
-            class PostgresDBManager:
-                def __init__(self, url):
-                    self.pool = pool.SimpleConnectionPool(1, 10, url)
-                
-                def get_connection(self):
-                    return self.pool.getconn()
-                
-                def release_connection(self, conn):
-                    self.pool.putconn(conn)
-            
-            db_manager = PostgresDBManager(database_url)
-            set_db_manager(db_manager)
-            logger.info("Database connection established (PostgreSQL)")
-            return db_manager
-        except Exception as e:
-            logger.error(f"Failed to connect to PostgreSQL: {e}. Falling back to SQLite.")
-
-    # Fallback o default: SQLite (Nuestra propia base de datos)
+    # PostgreSQL (ThreadedConnectionPool) si hay URL; si no, SQLite con una conexión por hilo
     try:
-        from core.legacy_v1_archive.database.manager import manager as sqlite_manager
+        from core.db_pool import create_db_manager
+        from core.legacy_v1_archive.database.manager import central_db
         
-        # Necesitamos que el manager tenga get_connection para ser compatible con el código que espera pools
-        if not hasattr(sqlite_manager, 'get_connection'):
-            # El manager original tiene _get_connection(path), vamos a envolverlo
-            class SQLiteAdapter:
-                def __init__(self, mgr):
-                    self.mgr = mgr
-                def get_connection(self):
-                    # Retorna la conexión central por defecto
-                    return self.mgr._get_connection(self.mgr.central_db_path)
-                def release_connection(self, conn):
-                    pass # SQLite no suele usar pools de la misma forma aquí
-            
-            adapted_manager = SQLiteAdapter(sqlite_manager)
-            set_db_manager(adapted_manager)
-        else:
-            set_db_manager(sqlite_manager)
-            
-        logger.info("Database connection established (internal SQLite)")
-        return sqlite_manager
+        db_manager = create_db_manager(database_url, sqlite_path=central_db)
+        set_db_manager(db_manager)
+        logger.info(f"Database connection established ({db_manager.kind})")
+        return db_manager
     except Exception as e:
         logger.error(f"Critical Error: Failed to initialize any database: {e}")
         return None
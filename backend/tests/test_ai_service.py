@@ -0,0 +1,750 @@
+"""
+Tests para AIService (core/ai_service.py)
+Proveedores falsos, sin llamadas de red
+"""
+
+import time
+import threading
+import pytest
+
+
+class FakeProvider:
+    """Proveedor en memoria con latencia configurable"""
+
+    def __init__(self, name, response="ok", delay=0.0, success=True, available=True):
+        self.name = name
+        self.response = response
+        self.delay = delay
+        self.success = success
+        self.available = available
+        self.calls = 0
+        self.last_messages = None
+
+    def is_available(self):
+        return self.available
+
+    def chat(self, messages, system_prompt=None):
+        self.calls += 1
+        self.last_messages = list(messages)
+        time.sleep(self.delay)
+        if not self.success:
+            return {"success": False, "error": "fallo simulado", "provider": self.name}
+        return {"success": True, "response": self.response, "provider": self.name}
+
+
+@pytest.fixture
+def ai_service():
+    """AIService sin proveedores reales"""
+    from core.ai_service import AIService
+    from core.response_cache import response_cache
+
+    response_cache.clear()
+    service = AIService()
+    service.providers = []
+    service.hedge_enabled = True
+    service.hedge_delay = 0.05
+    return service
+
+
+class TestHedgedRacing:
+    """Tests para _race_providers"""
+
+    def test_fast_primary_wins_without_hedge(self, ai_service):
+        """Si el primario responde a tiempo no se lanza el secundario"""
+        primary = FakeProvider("primary", "rapido")
+        secondary = FakeProvider("secondary", "lento")
+
+        result = ai_service._race_providers([primary, secondary], [], "sys")
+
+        assert result["provider"] == "primary"
+        assert secondary.calls == 0
+
+    def test_slow_primary_is_hedged(self, ai_service):
+        """Un primario colgado es adelantado por el secundario"""
+        primary = FakeProvider("primary", "tarde", delay=1.0)
+        secondary = FakeProvider("secondary", "a tiempo")
+
+        start = time.time()
+        result = ai_service._race_providers([primary, secondary], [], "sys")
+
+        assert result["provider"] == "secondary"
+        assert time.time() - start < 0.5
+
+    def test_hedged_out_primary_is_ranked(self, ai_service, monkeypatch):
+        """El primario abandonado acumula muestras y el router acaba relegándolo"""
+        from core import ai_service as module
+        from core.provider_router import ProviderRouter
+        router = ProviderRouter(min_samples=3)
+        router.enabled = True
+        monkeypatch.setattr(module, "provider_router", router)
+        ai_service.record_benchmark = lambda name, latency, ok, task="chat": router.observe(name, task, latency, ok)
+        primary = FakeProvider("primary", "tarde", delay=0.3)
+        secondary = FakeProvider("secondary", "a tiempo")
+
+        for _ in range(3):
+            assert ai_service._race_providers([primary, secondary], [], "sys")["provider"] == "secondary"
+
+        assert router.stats("primary", "chat")["samples"] == 3
+        assert router.stats("primary", "chat")["p50_ms"] >= 50
+        assert [p.name for p in router.rank([primary, secondary])] == ["secondary", "primary"]
+
+    def test_late_hedge_that_loses_does_not_outrank_winner(self, ai_service, monkeypatch):
+        """El hedge abandonado poco después de lanzarse no parece más rápido que el ganador"""
+        from core import ai_service as module
+        from core.provider_router import ProviderRouter
+        router = ProviderRouter(min_samples=3)
+        router.enabled = True
+        monkeypatch.setattr(module, "provider_router", router)
+        ai_service.record_benchmark = lambda name, latency, ok, task="chat": router.observe(name, task, latency, ok)
+        ai_service.hedge_delay = 0.1
+        primary = FakeProvider("primary", "gana", delay=0.15)
+        secondary = FakeProvider("secondary", "lento", delay=2)
+
+        for _ in range(3):
+            assert ai_service._race_providers([primary, secondary], [], "sys")["provider"] == "primary"
+
+        assert secondary.calls == 3
+        assert router.stats("secondary", "chat")["p50_ms"] >= router.stats("primary", "chat")["p50_ms"]
+        assert [p.name for p in router.rank([primary, secondary])] == ["primary", "secondary"]
+
+    def test_fast_failure_falls_through(self, ai_service):
+        """Un fallo inmediato pasa al siguiente sin esperar el presupuesto"""
+        ai_service.hedge_delay = 5
+        primary = FakeProvider("primary", success=False)
+        secondary = FakeProvider("secondary", "respaldo")
+
+        start = time.time()
+        result = ai_service._race_providers([primary, secondary], [], "sys")
+
+        assert result["provider"] == "secondary"
+        assert time.time() - start < 1
+
+    def test_unavailable_providers_skipped(self, ai_service):
+        """Los proveedores no disponibles no se lanzan"""
+        down = FakeProvider("down", available=False)
+        up = FakeProvider("up", "hola")
+
+        result = ai_service._race_providers([down, up], [], "sys")
+
+        assert result["provider"] == "up"
+        assert down.calls == 0
+
+    def test_all_fail_returns_none(self, ai_service):
+        """Si todos fallan devuelve None"""
+        providers = [FakeProvider("a", success=False), FakeProvider("b", response="   ")]
+        assert ai_service._race_providers(providers, [], "sys") is None
+
+    def test_hedging_disabled_is_sequential(self, ai_service):
+        """Con hedging desactivado se espera al primario"""
+        ai_service.hedge_enabled = False
+        primary = FakeProvider("primary", "lento", delay=0.2)
+        secondary = FakeProvider("secondary", "rapido")
+
+        result = ai_service._race_providers([primary, secondary], [], "sys")
+
+        assert result["provider"] == "primary"
+        assert secondary.calls == 0
+
+    def test_internal_chat_loop_uses_race(self, ai_service):
+        """El loop agéntico devuelve la respuesta del ganador"""
+        ai_service.providers = [FakeProvider("slow", delay=1.0), FakeProvider("fast", "respuesta final")]
+
+        assert ai_service._internal_chat_loop([{"role": "user", "content": "hola"}], "sys") == "respuesta final"
+
+    def test_history_fitted_to_provider_budget(self, ai_service, monkeypatch):
+        """Cada proveedor recibe el historial recortado a su presupuesto de tokens"""
+        monkeypatch.setenv("AI_CONTEXT_BUDGET_TINY", "300")
+        seen = []
+        tiny = FakeProvider("tiny", "ok")
+        tiny.chat = lambda messages, system_prompt=None: (
+            seen.append(messages) or {"success": True, "response": "ok", "provider": "tiny"}
+        )
+        history = [{"role": "user" if i % 2 else "assistant", "content": "x" * 400} for i in range(30)]
+
+        ai_service._race_providers([tiny], history, "sys")
+
+        assert len(seen[0]) < len(history)
+        assert seen[0][-1] == history[-1]
+        assert len(history) == 30
+
+
+class TestCouncilQuery:
+    """Tests para el consejo técnico concurrente"""
+
+    @pytest.fixture
+    def benchmarks(self, ai_service):
+        recorded = []
+        ai_service.record_benchmark = lambda name, latency, success, task_type="chat": recorded.append(
+            (name, latency, success, task_type)
+        )
+        return recorded
+
+    def test_members_run_concurrently(self, ai_service, benchmarks):
+        """La latencia del consejo es la del miembro más lento, no la suma"""
+        ai_service.providers = [
+            FakeProvider("a", "A", delay=0.3),
+            FakeProvider("b", "B", delay=0.3),
+            FakeProvider("ollama", "sintesis"),
+        ]
+
+        start = time.time()
+        result = ai_service.council_query("pregunta", "sys", providers_count=2)
+
+        assert result == "sintesis"
+        assert time.time() - start < 0.55
+        assert sorted(b[0] for b in benchmarks) == ["a", "b"]
+        assert all(b[2] and b[3] == "council" for b in benchmarks)
+
+    def test_quorum_does_not_wait_for_slow_member(self, ai_service, benchmarks):
+        """Con quórum 1 se sintetiza en cuanto responde el primero"""
+        ai_service.providers = [
+            FakeProvider("slow", "S", delay=1.0),
+            FakeProvider("fast", "F"),
+            FakeProvider("ollama", success=False),
+        ]
+
+        start = time.time()
+        result = ai_service.council_query("pregunta", "sys", providers_count=2, quorum=1)
+
+        assert time.time() - start < 0.5
+        assert "F" in result
+        assert [b[0] for b in benchmarks] == ["fast"]
+
+    def test_member_deadline_records_failure(self, ai_service, benchmarks):
+        """Un miembro que supera el plazo se registra como fallo"""
+        ai_service.providers = [
+            FakeProvider("hung", delay=1.0),
+            FakeProvider("ok", "OK"),
+            FakeProvider("ollama", "sintesis"),
+        ]
+
+        result = ai_service.council_query("pregunta", "sys", providers_count=2, member_timeout=0.1)
+
+        assert result == "sintesis"
+        assert ("hung", 100, False, "council") in benchmarks
+
+    def test_no_member_answers(self, ai_service, benchmarks):
+        """Sin respuestas el consejo informa del fallo"""
+        ai_service.providers = [FakeProvider("a", success=False), FakeProvider("ollama")]
+
+        result = ai_service.council_query("pregunta", "sys")
+
+        assert "falló" in result
+        assert benchmarks == [("a", benchmarks[0][1], False, "council")]
+
+
+class TestResponseCacheIntegration:
+    """Tests para _cached_chat en council_query y generate_code"""
+
+    @pytest.fixture(autouse=True)
+    def cache_on(self, monkeypatch):
+        from core.response_cache import response_cache
+        monkeypatch.setattr(response_cache, "enabled", True)
+
+    def deterministic(self, name, response):
+        provider = FakeProvider(name, response)
+        provider.temperature = 0
+        return provider
+
+    def test_identical_council_query_hits_cache(self, ai_service):
+        member = self.deterministic("a", "A")
+        brain = self.deterministic("ollama", "sintesis")
+        ai_service.providers = [member, brain]
+        ai_service.record_benchmark = lambda *args, **kwargs: None
+
+        first = ai_service.council_query("pregunta", "sys", providers_count=1)
+        second = ai_service.council_query("pregunta", "sys", providers_count=1)
+
+        assert first == second == "sintesis"
+        assert member.calls == 1
+        assert brain.calls == 1
+
+    def test_sampled_calls_are_not_cached_by_default(self, ai_service):
+        member = FakeProvider("a", "A")
+        member.temperature = 0.7
+        brain = FakeProvider("ollama", "sintesis")
+        brain.temperature = 0.7
+        ai_service.providers = [member, brain]
+        ai_service.record_benchmark = lambda *args, **kwargs: None
+
+        ai_service.council_query("pregunta", "sys", providers_count=1)
+        ai_service.council_query("pregunta", "sys", providers_count=1)
+
+        assert member.calls == 2
+        assert brain.calls == 2
+
+    def test_opt_in_caches_sampled_calls(self, ai_service):
+        member = FakeProvider("a", "A")
+        member.temperature = 0.7
+        ai_service.providers = [member, FakeProvider("ollama", "sintesis")]
+        ai_service.record_benchmark = lambda *args, **kwargs: None
+
+        ai_service.council_query("pregunta", "sys", providers_count=1, use_cache=True)
+        ai_service.council_query("pregunta", "sys", providers_count=1, use_cache=True)
+
+        assert member.calls == 1
+
+    def test_opt_out_bypasses_cache(self, ai_service):
+        member = self.deterministic("a", "A")
+        ai_service.providers = [member, self.deterministic("ollama", "sintesis")]
+        ai_service.record_benchmark = lambda *args, **kwargs: None
+
+        ai_service.council_query("pregunta", "sys", providers_count=1, use_cache=False)
+        ai_service.council_query("pregunta", "sys", providers_count=1, use_cache=False)
+
+        assert member.calls == 2
+
+    def test_disabled_cache_ignores_opt_in(self, ai_service, monkeypatch):
+        from core.response_cache import response_cache
+        monkeypatch.setattr(response_cache, "enabled", False)
+        member = self.deterministic("a", "A")
+        ai_service.providers = [member, self.deterministic("ollama", "sintesis")]
+        ai_service.record_benchmark = lambda *args, **kwargs: None
+
+        ai_service.council_query("pregunta", "sys", providers_count=1, use_cache=True)
+        ai_service.council_query("pregunta", "sys", providers_count=1, use_cache=True)
+
+        assert member.calls == 2
+
+    def test_generate_code_cached_per_files(self, ai_service):
+        builder = self.deterministic("groq", '{"files": {"index.html": "<html></html>"}, "message": "ok"}')
+        ai_service.providers = [builder]
+        ai_service.record_benchmark = lambda *args, **kwargs: None
+
+        first = ai_service.generate_code("u", "landing", {}, "demo")
+        second = ai_service.generate_code("u", "landing", {}, "demo")
+        ai_service.generate_code("u", "landing", {"index.html": "<p>cambio</p>"}, "demo")
+
+        assert first["files"] == second["files"]
+        assert builder.calls == 2
+
+
+class TestParallelToolCalls:
+    """Tests para varias llamadas <TOOL> en un mismo paso"""
+
+    @pytest.fixture
+    def tool_log(self, ai_service, monkeypatch):
+        log = []
+
+        def fake_tool(name, args, body=None):
+            log.append(("start", name))
+            time.sleep(0.2 if name != "write_file" else 0.01)
+            log.append(("end", name))
+            return f"[TOOL SUCCESS]\n{name}:{args.get('path')}"
+
+        monkeypatch.setattr(ai_service, "_call_tool", fake_tool)
+        return log
+
+    def call(self, name, path):
+        return '{"name": "%s", "args": {"path": "%s"}}' % (name, path)
+
+    def test_extracts_every_tool_call(self, ai_service):
+        text = f"<TOOL>{self.call('read_file', 'a')}</TOOL> y <TOOL>```json\n{self.call('read_file', 'b')}```</TOOL>"
+
+        assert [json_str.strip() for json_str in ai_service._extract_tool_calls(text)] == [
+            self.call("read_file", "a"), self.call("read_file", "b")
+        ]
+
+    def test_reads_run_concurrently(self, ai_service, tool_log):
+        calls = [self.call("read_file", p) for p in ("a", "b", "c")]
+
+        start = time.time()
+        outputs = ai_service._run_tool_calls(calls)
+
+        assert time.time() - start < 0.5
+        assert [o.split("\n")[1] for o in outputs] == ["read_file:a", "read_file:b", "read_file:c"]
+
+    def test_unhashable_literal_is_reported_invalid(self, ai_service, tool_log):
+        from core.tool_protocol import tool_call_stats
+        invalid = tool_call_stats.snapshot()["invalid"]
+
+        outputs = ai_service._run_tool_calls(["{[1]: 2}", self.call("read_file", "a")])
+
+        assert outputs[0].startswith("[SYSTEM ERROR] JSON o Tool inválido")
+        assert outputs[1].split("\n")[1] == "read_file:a"
+        assert tool_call_stats.snapshot()["invalid"] == invalid + 1
+
+    def test_write_waits_for_previous_reads(self, ai_service, tool_log):
+        calls = [self.call("read_file", "a"), self.call("write_file", "a"), self.call("list_dir", ".")]
+
+        ai_service._run_tool_calls(calls)
+
+        assert tool_log.index(("start", "write_file")) > tool_log.index(("end", "read_file"))
+        assert tool_log.index(("start", "list_dir")) > tool_log.index(("end", "write_file"))
+
+    def test_invalid_json_keeps_position(self, ai_service, tool_log):
+        outputs = ai_service._run_tool_calls(["{roto", self.call("read_file", "a")])
+
+        assert outputs[0].startswith("[SYSTEM ERROR]")
+        assert outputs[1].endswith("read_file:a")
+
+    def test_results_in_one_follow_up_message(self, ai_service, tool_log):
+        answer = "".join(f"<TOOL>{self.call('read_file', p)}</TOOL>" for p in ("a", "b"))
+        turns = iter([answer, "resumen"])
+        ai_service.providers = [FakeProvider("groq")]
+        ai_service.providers[0].chat = lambda messages, system_prompt=None: {
+            "success": True, "response": next(turns), "provider": "groq"
+        }
+        ai_service.record_benchmark = lambda *args, **kwargs: None
+        conversation = []
+
+        assert ai_service._internal_chat_loop(conversation, "sys") == "resumen"
+        assert len(conversation) == 2
+        assert "read_file:a" in conversation[1]["content"] and "read_file:b" in conversation[1]["content"]
+
+
+class TestSpeculativeReflection:
+    """Tests para el paso 0 especulativo de Singularity.solve"""
+
+    @pytest.fixture
+    def soul(self, ai_service, monkeypatch):
+        from core.singularity import singularity
+
+        monkeypatch.setattr(singularity, "speculation_stats", {"hits": 0, "restarts": 0})
+        ai_service.record_benchmark = lambda *args, **kwargs: None
+        ai_service.providers = [FakeProvider("agent", "respuesta", delay=0.3)]
+        return singularity
+
+    def reflect(self, monkeypatch, soul, text):
+        def slow_reflection(prompt, system, use_cache=None):
+            time.sleep(0.3)
+            return text
+        monkeypatch.setattr(soul, "_llm_call", slow_reflection)
+
+    def test_low_risk_overlaps_step_zero(self, soul, ai_service, monkeypatch):
+        self.reflect(monkeypatch, soul, "cambio menor en el README")
+
+        start = time.time()
+        result = soul.solve("hola", "u", [], "sys")
+
+        assert result["response"] == "respuesta"
+        assert time.time() - start < 0.55
+        assert ai_service.providers[0].calls == 1
+        assert soul.speculation_stats == {"hits": 1, "restarts": 0}
+
+    @pytest.mark.parametrize("reflection", ["cambio menor", "esto hace rm -rf del proyecto"])
+    def test_agent_steps_see_the_user_message(self, soul, ai_service, monkeypatch, reflection):
+        self.reflect(monkeypatch, soul, reflection)
+        history = [{"role": "user", "content": "antes"}, {"role": "assistant", "content": "vale"}]
+
+        soul.solve("¿Cómo renombro la función foo en utils.py?", "u", history, "sys")
+
+        assert ai_service.providers[0].last_messages[-1] == {
+            "role": "user", "content": "¿Cómo renombro la función foo en utils.py?"}
+        assert len(history) == 2
+
+    def test_high_risk_restarts_step_zero(self, soul, ai_service, monkeypatch):
+        self.reflect(monkeypatch, soul, "esto hace rm -rf del proyecto")
+
+        result = soul.solve("borra todo", "u", [], "sys")
+
+        assert result["simulated"] is True
+        assert ai_service.providers[0].calls == 2
+        assert soul.speculation_stats == {"hits": 0, "restarts": 1}
+
+    def test_disabled_runs_sequentially(self, soul, ai_service, monkeypatch):
+        ai_service.speculative_reflection = False
+        self.reflect(monkeypatch, soul, "cambio menor")
+
+        start = time.time()
+        soul.solve("hola", "u", [], "sys")
+
+        assert time.time() - start >= 0.6
+        assert soul.speculation_stats == {"hits": 0, "restarts": 0}
+
+
+class TestRequestBody:
+    """Tests para el Nervous System propio de cada petición"""
+
+    @pytest.fixture
+    def soul(self, ai_service, monkeypatch):
+        from core.singularity import singularity
+
+        monkeypatch.setattr(ai_service, "speculative_reflection", False)
+        ai_service.record_benchmark = lambda *args, **kwargs: None
+        ai_service.providers = [FakeProvider("agent", "respuesta")]
+        return singularity
+
+    def test_call_tool_uses_request_body(self, ai_service, tmp_path):
+        from core.nervous_system import NervousSystem
+        (tmp_path / "nota.txt").write_text("hola")
+        body = NervousSystem(project_root=str(tmp_path), user_workspace=str(tmp_path))
+
+        result = ai_service._call_tool("read_file", {"path": "nota.txt"}, body)
+
+        assert result.startswith("[TOOL SUCCESS]")
+        assert "hola" in result
+
+    def test_concurrent_requests_keep_their_sandbox(self, soul, monkeypatch):
+        barrier = threading.Barrier(2)
+
+        def reflection(prompt, system, use_cache=None):
+            barrier.wait(timeout=2)
+            return "rm -rf del build" if "peligro" in prompt else "cambio menor"
+        monkeypatch.setattr(soul, "_llm_call", reflection)
+
+        results = {}
+
+        def run(message):
+            results[message] = soul.solve(message, "u", [], "sys")
+
+        threads = [threading.Thread(target=run, args=(m,)) for m in ("peligro", "tranquilo")]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert results["peligro"]["simulated"] is True
+        assert results["tranquilo"]["simulated"] is False
+
+    def test_low_risk_reflection_keeps_forced_sandbox(self, soul, ai_service, monkeypatch):
+        monkeypatch.setattr(soul, "_llm_call", lambda prompt, system, use_cache=None: "cambio menor")
+        body = ai_service.new_body(sandbox_mode=True)
+
+        result = soul.solve("arregla el bug", "AUTONOMY_CORE", [], "sys", body=body)
+
+        assert body.sandbox_mode is True
+        assert result["simulated"] is True
+
+
+class StreamingFakeProvider(FakeProvider):
+    """Proveedor falso con stream_chat; `fail_after` corta el stream tras N fragmentos"""
+
+    def __init__(self, name, chunks, fail_after=None, **kwargs):
+        super().__init__(name, "".join(chunks), **kwargs)
+        self.chunks = chunks
+        self.fail_after = fail_after
+
+    def stream_chat(self, messages, system_prompt=None):
+        self.calls += 1
+        for i, chunk in enumerate(self.chunks):
+            if i == self.fail_after:
+                raise RuntimeError("conexión cortada")
+            yield chunk
+
+
+class TestStreamingLoop:
+    """Tests para el pipeline en streaming (chat_stream y _internal_chat_loop_stream)"""
+
+    @pytest.fixture(autouse=True)
+    def no_benchmarks(self, ai_service):
+        ai_service.record_benchmark = lambda *args, **kwargs: None
+
+    def types(self, events):
+        return [e.event_type.value for e in events]
+
+    def test_tokens_then_complete(self, ai_service):
+        ai_service.providers = [StreamingFakeProvider("groq", ["Ho", "la"])]
+
+        events = list(ai_service._internal_chat_loop_stream([], "sys"))
+
+        assert [e.data for e in events if e.event_type.value == "token"] == ["Ho", "la"]
+        assert events[-1].event_type.value == "complete"
+        assert events[-1].data == "Hola"
+
+    def test_provider_without_stream_chat_is_one_chunk(self, ai_service):
+        ai_service.providers = [FakeProvider("plain", "entero")]
+
+        events = list(ai_service._internal_chat_loop_stream([], "sys"))
+
+        assert [e.data for e in events if e.event_type.value == "token"] == ["entero"]
+        assert events[-1].data == "entero"
+
+    def test_mid_stream_failure_falls_over(self, ai_service):
+        broken = StreamingFakeProvider("broken", ["par", "cial"], fail_after=1)
+        backup = StreamingFakeProvider("backup", ["ok"])
+        ai_service.providers = [broken, backup]
+
+        events = list(ai_service._internal_chat_loop_stream([], "sys"))
+
+        failed = [e for e in events if e.metadata.get("action") == "provider_failed"]
+        assert failed[0].metadata["provider"] == "broken"
+        assert events[-1].data == "ok"
+
+    def test_tool_call_events(self, ai_service, monkeypatch):
+        tool_step = StreamingFakeProvider("groq", ['<TOOL>{"name": "list_dir", "args": {}}</TOOL>'])
+        ai_service.providers = [tool_step]
+        monkeypatch.setattr(ai_service, "_call_tool", lambda name, args, body=None: "[TOOL SUCCESS]\n[]")
+        conversation = []
+
+        stream = ai_service._internal_chat_loop_stream(conversation, "sys")
+        events = []
+        for event in stream:
+            events.append(event)
+            if event.event_type.value == "tool_result":
+                tool_step.chunks = ["listo"]
+
+        assert self.types(events).count("tool_call") == 1
+        assert events[-1].data == "listo"
+        assert len(conversation) == 2
+
+    def test_all_fail_emits_error(self, ai_service):
+        ai_service.providers = [FakeProvider("a", success=False)]
+
+        events = list(ai_service._internal_chat_loop_stream([], "sys"))
+
+        assert events[-1].event_type.value == "error"
+
+    def test_chat_stream_saves_turn(self, ai_service):
+        ai_service.providers = [StreamingFakeProvider("a", ["miembro"]), StreamingFakeProvider("ollama", ["Re", "flexión"])]
+
+        events = list(ai_service.chat_stream("stream-user", "revisa el proyecto", "sys"))
+
+        assert self.types(events)[0] == "phase"
+        reflection = [e.data for e in events if e.metadata.get("phase") == "reflection" and e.event_type.value == "token"]
+        assert "".join(reflection) == "Reflexión"
+        assert events[-1].event_type.value == "complete"
+        assert events[-1].metadata["reflection"].startswith("Reflexión")
+        assert ai_service._get_conversation("stream-user")[-2:] == [
+            {"role": "user", "content": "revisa el proyecto"},
+            {"role": "assistant", "content": events[-1].data},
+        ]
+
+
+class NativeToolProvider(FakeProvider):
+    """Proveedor con function calling: cada llamada consume el siguiente paso del guion"""
+
+    supports_tools = True
+
+    def __init__(self, name, steps):
+        super().__init__(name)
+        self.steps = list(steps)
+        self.tools_seen = []
+
+    def chat(self, messages, system_prompt=None, tools=None):
+        self.calls += 1
+        self.tools_seen.append(tools)
+        text, tool_calls = self.steps.pop(0)
+        return {"success": True, "response": text, "provider": self.name, "tool_calls": tool_calls}
+
+    def stream_chat(self, messages, system_prompt=None, tools=None, assembler=None):
+        self.calls += 1
+        self.tools_seen.append(tools)
+        text, tool_calls = self.steps.pop(0)
+        for i, call in enumerate(tool_calls):
+            # Argumentos troceados como en delta.tool_calls de OpenAI
+            args = call[call.index('"args": ') + 8:-1]
+            assembler.feed_openai_delta({"tool_calls": [{"index": i, "function": {"name": "list_dir", "arguments": args[:3]}}]})
+            assembler.feed_openai_delta({"tool_calls": [{"index": i, "function": {"arguments": args[3:]}}]})
+        if text:
+            yield text
+
+
+class TestNativeToolCalls:
+    """Tests para el function calling nativo con las etiquetas <TOOL> de respaldo"""
+
+    CALL = '{"name": "list_dir", "args": {"path": "src"}}'
+
+    @pytest.fixture(autouse=True)
+    def no_benchmarks(self, ai_service, monkeypatch):
+        ai_service.record_benchmark = lambda *args, **kwargs: None
+        self.tool_args = []
+        monkeypatch.setattr(ai_service, "_call_tool",
+                            lambda name, args, body=None: self.tool_args.append((name, args)) or "[TOOL SUCCESS]\n[]")
+
+    def test_native_calls_run_without_tags(self, ai_service):
+        provider = NativeToolProvider("groq", [("", [self.CALL]), ("hecho", [])])
+        ai_service.providers = [provider]
+        conversation = []
+
+        assert ai_service._internal_chat_loop(conversation, "sys") == "hecho"
+        assert self.tool_args == [("list_dir", {"path": "src"})]
+        assert provider.tools_seen[0] is ai_service.agent_tools
+        # El historial guarda la llamada como etiqueta, legible por cualquier proveedor
+        assert conversation[0]["content"] == f"<TOOL>{self.CALL}</TOOL>"
+
+    def test_providers_without_support_get_no_tools(self, ai_service):
+        ai_service.providers = [FakeProvider("plain", "sin herramientas")]
+
+        assert ai_service._internal_chat_loop([], "sys") == "sin herramientas"
+
+    def test_disabled_native_tools(self, ai_service):
+        ai_service.native_tools = False
+        provider = NativeToolProvider("groq", [("respuesta", [])])
+        ai_service.providers = [provider]
+
+        ai_service._internal_chat_loop([], "sys")
+
+        assert provider.tools_seen == [None]
+
+    def test_python_style_tag_is_repaired(self, ai_service):
+        turns = iter(["<TOOL>{'name': 'list_dir', 'args': {'path': 'src'},}</TOOL>", "hecho"])
+        ai_service.providers = [FakeProvider("plain")]
+        ai_service.providers[0].chat = lambda messages, system_prompt=None: {
+            "success": True, "response": next(turns), "provider": "plain"
+        }
+
+        assert ai_service._internal_chat_loop([], "sys") == "hecho"
+        assert self.tool_args == [("list_dir", {"path": "src"})]
+
+    def test_streamed_native_calls(self, ai_service):
+        provider = NativeToolProvider("groq", [("", [self.CALL]), ("hecho", [])])
+        ai_service.providers = [provider]
+
+        events = list(ai_service._internal_chat_loop_stream([], "sys"))
+
+        calls = [e.data for e in events if e.event_type.value == "tool_call"]
+        assert calls == [self.CALL]
+        assert self.tool_args == [("list_dir", {"path": "src"})]
+        assert events[-1].data == "hecho"
+
+
+class TestFastPath:
+    """Tests para el atajo de mensajes triviales en chat/chat_stream"""
+
+    @pytest.fixture(autouse=True)
+    def no_reflection(self, ai_service, monkeypatch):
+        from core.singularity import singularity
+        ai_service.record_benchmark = lambda *args, **kwargs: None
+        self.solved = []
+        monkeypatch.setattr(singularity, "solve", lambda *args, **kwargs: self.solved.append(args) or {
+            "success": True, "response": "completo"
+        })
+
+    def test_trivial_message_single_call(self, ai_service):
+        ai_service.providers = [FakeProvider("groq", "¡Hola!")]
+
+        result = ai_service.chat("fast-user", "hola")
+
+        assert result["fast_path"] is True
+        assert result["response"] == "¡Hola!"
+        assert ai_service.providers[0].calls == 1
+        assert self.solved == []
+        assert ai_service._get_conversation("fast-user")[-2:] == [
+            {"role": "user", "content": "hola"}, {"role": "assistant", "content": "¡Hola!"}
+        ]
+
+    def test_task_message_takes_full_path(self, ai_service):
+        ai_service.providers = [FakeProvider("groq")]
+
+        result = ai_service.chat("fast-user", "crea un login en auth.py")
+
+        assert result["response"] == "completo"
+        assert len(self.solved) == 1
+
+    def test_fast_path_failure_falls_back(self, ai_service):
+        ai_service.providers = [FakeProvider("groq", success=False)]
+
+        assert ai_service.chat("fast-user", "gracias")["response"] == "completo"
+
+    def test_stream_fast_path(self, ai_service):
+        ai_service.providers = [StreamingFakeProvider("groq", ["De ", "nada"])]
+
+        events = list(ai_service.chat_stream("fast-user", "gracias", "sys"))
+
+        assert events[0].data == "fast_path"
+        assert events[-1].event_type.value == "complete"
+        assert events[-1].data == "De nada"
+
+    def test_stream_fast_path_failure_falls_back(self, ai_service, monkeypatch):
+        from core.singularity import singularity
+        from core.legacy_v1_archive.streaming_service import StreamEvent, StreamEventType
+        ai_service.providers = [StreamingFakeProvider("groq", ["par", "cial"], fail_after=1)]
+        monkeypatch.setattr(singularity, "solve_stream", lambda *args, **kwargs: iter([
+            StreamEvent(StreamEventType.COMPLETE, "completo", {})]))
+
+        events = list(ai_service.chat_stream("fast-user", "gracias", "sys"))
+
+        assert not [e for e in events if e.event_type == StreamEventType.ERROR]
+        assert events[-1].data == "completo"
+        assert ai_service._get_conversation("fast-user")[-1] == {"role": "assistant", "content": "completo"}
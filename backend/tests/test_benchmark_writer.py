@@ -0,0 +1,86 @@
+"""
+Tests para el writer de benchmarks por lotes (core/benchmark_writer.py)
+"""
+
+import time
+import pytest
+
+
+@pytest.fixture
+def app():
+    from flask import Flask
+    from backend.models import db
+
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+@pytest.fixture
+def writer(app):
+    from core.benchmark_writer import BenchmarkWriter
+    writer = BenchmarkWriter(batch_size=3, flush_interval=60, max_buffer=10)
+    writer.app = app
+    yield writer
+    writer._stop.set()
+    writer._wakeup.set()
+
+
+def count_rows(app):
+    from backend.models import ModelBenchmark
+    with app.app_context():
+        return ModelBenchmark.query.count()
+
+
+class TestBenchmarkWriter:
+    """Tests para BenchmarkWriter"""
+
+    def test_submit_does_not_write(self, writer, app):
+        writer.submit("groq", 120, True, "chat")
+
+        assert writer.pending() == 1
+        assert count_rows(app) == 0
+
+    def test_flush_bulk_inserts(self, writer, app):
+        for latency in (100, 200):
+            writer.submit("groq", latency, True, "chat")
+
+        assert writer.flush() == 2
+        assert count_rows(app) == 2
+        assert writer.pending() == 0
+        assert writer.stats["flushes"] == 1
+
+    def test_buffer_is_bounded(self, writer):
+        for i in range(15):
+            writer.submit("groq", i, True)
+
+        assert writer.pending() == 10
+        assert writer.stats["dropped"] == 5
+
+    def test_background_flush_on_batch_size(self, writer, app):
+        writer.start()
+        for _ in range(3):
+            writer.submit("groq", 100, True)
+
+        deadline = time.time() + 2
+        while count_rows(app) < 3 and time.time() < deadline:
+            time.sleep(0.02)
+        assert count_rows(app) == 3
+
+    def test_stop_flushes_pending(self, writer, app):
+        writer.start()
+        writer.submit("cerebras", 80, False, "council")
+        writer.stop()
+
+        assert count_rows(app) == 1
+
+    def test_no_app_keeps_rows(self):
+        from core.benchmark_writer import BenchmarkWriter
+        writer = BenchmarkWriter(batch_size=10)
+        writer.submit("groq", 100, True)
+
+        assert writer.flush() == 0
+        assert writer.pending() == 1
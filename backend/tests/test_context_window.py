@@ -0,0 +1,96 @@
+"""
+Tests para el recorte de historial por presupuesto de tokens (core/context_window.py)
+"""
+
+import pytest
+
+
+@pytest.fixture
+def window():
+    from core.context_window import ContextWindow
+    return ContextWindow(default_budget=1000, tool_output_tokens=200, tool_summary_chars=50)
+
+
+def tool_result(text):
+    from core.context_window import TOOL_RESULT_PREFIX
+    return {"role": "user", "content": f"{TOOL_RESULT_PREFIX} {text}"}
+
+
+class TestContextWindow:
+    def test_small_history_unchanged(self, window):
+        history = [{"role": "user", "content": "hola"}, {"role": "assistant", "content": "hey"}]
+
+        assert window.fit(history, budget=1000) == history
+        assert window.stats["trimmed"] == 0
+
+    def test_old_tool_results_summarized(self, window):
+        history = [
+            {"role": "user", "content": "lee los archivos"},
+            {"role": "assistant", "content": "<TOOL>...</TOOL>"},
+            tool_result("a" * 2000),
+            {"role": "assistant", "content": "<TOOL>...</TOOL>"},
+            tool_result("b" * 2000),
+        ]
+
+        fitted = window.fit(history, budget=100000)
+
+        assert "resultado resumido" in fitted[2]["content"]
+        assert fitted[4]["content"] == history[4]["content"]
+        # El historial original no se toca
+        assert len(history[2]["content"]) > 2000
+
+    def test_drops_oldest_but_keeps_pinned_and_last(self, window):
+        history = [{"role": "user", "content": "objetivo del proyecto", "pinned": True}]
+        for i in range(20):
+            history.append({"role": "assistant", "content": f"respuesta {i} " + "x" * 400})
+            history.append({"role": "user", "content": f"pregunta {i} " + "y" * 400})
+
+        fitted = window.fit(history, budget=1000)
+
+        assert fitted[0]["content"] == "objetivo del proyecto"
+        assert fitted[-1]["content"] == history[-1]["content"]
+        assert len(fitted) < len(history)
+        assert all("pinned" not in m for m in fitted)
+        assert window.stats["dropped_messages"] > 0
+
+    def test_oversized_last_message_truncated(self, window):
+        history = [{"role": "user", "content": "z" * 20000}]
+
+        fitted = window.fit(history, budget=500)
+
+        assert len(fitted) == 1
+        assert "caracteres omitidos" in fitted[0]["content"]
+        assert len(fitted[0]["content"]) < 20000
+
+    def test_large_system_prompt_keeps_the_last_turn(self, window):
+        question = "arregla el login " + "w" * 2000
+        history = [{"role": "assistant", "content": "hola " * 1000}, {"role": "user", "content": question}]
+
+        fitted = window.fit(history, system_prompt="s" * 8000, budget=1000)
+
+        assert fitted == [{"role": "user", "content": question}]
+
+    def test_pinned_messages_keep_the_last_turn_minimum(self):
+        from core.context_window import ContextWindow
+        window = ContextWindow(default_budget=1000, min_turn_tokens=300)
+        history = [{"role": "user", "content": "p" * 4000, "pinned": True},
+                   {"role": "user", "content": "u" * 4000}]
+
+        fitted = window.fit(history, budget=1000)
+
+        assert fitted[0]["content"] == history[0]["content"]
+        assert 250 < len(fitted[1]["content"]) // 4 < 400
+
+    def test_budget_per_provider(self, window, monkeypatch):
+        monkeypatch.setenv("AI_CONTEXT_BUDGET_GROQ", "1234")
+
+        assert window.budget_for("groq") == 1234
+        assert window.budget_for("gemini") > window.budget_for("cerebras")
+        assert window.budget_for("desconocido") == 1000
+
+    def test_clip_tool_output(self, window):
+        clipped = window.clip_tool_output("q" * 50000)
+
+        assert len(clipped) < 50000
+        assert clipped.startswith("q")
+        assert clipped.endswith("q")
@@ -0,0 +1,170 @@
+"""
+Tests para el almacén acotado de conversaciones (core/conversation_store.py)
+"""
+
+import time
+
+
+def msg(text, role="user"):
+    return {"role": role, "content": text}
+
+
+class TestConversationStore:
+    def test_get_or_load_creates_and_reuses(self):
+        from core.conversation_store import ConversationStore
+        store = ConversationStore(max_users=10)
+
+        conv = store.get_or_load("u1")
+        conv.append(msg("hola"))
+
+        assert store.get_or_load("u1") is conv
+        assert store.stats["misses"] == 1 and store.stats["hits"] == 1
+
+    def test_lru_eviction(self):
+        from core.conversation_store import ConversationStore
+        store = ConversationStore(max_users=2)
+
+        store.put("a", [msg("1")])
+        store.put("b", [msg("2")])
+        store.get("a")
+        store.put("c", [msg("3")])
+
+        assert "a" in store and "c" in store
+        assert "b" not in store
+        assert store.stats["evicted_lru"] == 1
+
+    def test_memory_ceiling(self):
+        from core.conversation_store import ConversationStore
+        store = ConversationStore(max_users=100, max_bytes=5000)
+
+        for i in range(10):
+            store.put(f"u{i}", [msg("x" * 1000)])
+
+        assert store.snapshot()["bytes"] <= 5000
+        assert "u9" in store
+        assert store.stats["evicted_memory"] > 0
+
+    def test_idle_eviction(self):
+        from core.conversation_store import ConversationStore
+        store = ConversationStore(max_users=100, idle_seconds=0.05)
+
+        store.put("viejo", [msg("a")])
+        time.sleep(0.1)
+        store.put("nuevo", [msg("b")])
+
+        assert "viejo" not in store
+        assert store.stats["evicted_idle"] == 1
+
+    def test_reload_on_miss_after_eviction(self):
+        from core.conversation_store import ConversationStore
+        persisted = {"u1": [msg("guardado"), msg("respuesta", "assistant")]}
+        store = ConversationStore(max_users=1, loader=lambda uid: list(persisted.get(uid, [])))
+
+        assert store.get_or_load("u1")[0]["content"] == "guardado"
+        store.get_or_load("u2")
+        assert "u1" not in store
+
+        assert store.get_or_load("u1")[0]["content"] == "guardado"
+        assert store.stats["loads"] == 3
+
+    def test_loader_errors_start_empty(self):
+        from core.conversation_store import ConversationStore
+
+        def broken(uid):
+            raise RuntimeError("db caída")
+
+        store = ConversationStore(loader=broken)
+        assert store.get_or_load("u1") == []
+
+    def test_size_tracks_in_place_mutation(self):
+        from core.conversation_store import ConversationStore
+        store = ConversationStore()
+
+        conv = store.get_or_load("u1")
+        before = store.snapshot()["bytes"]
+        conv.append(msg("y" * 500))
+        store.put("u1", conv)
+
+        assert store.snapshot()["bytes"] > before + 500
+
+
+class TestAIServiceConversations:
+    def test_ai_service_uses_bounded_store(self):
+        from core.ai_service import AIService
+        from core.conversation_store import ConversationStore
+
+        service = AIService()
+        service.providers = []
+        service.conversations.max_users = 2
+
+        for uid in ("a", "b", "c"):
+            service._get_conversation(uid).append(msg(uid))
+
+        assert isinstance(service.conversations, ConversationStore)
+        assert len(service.conversations) == 2
+        stats = service.get_stats()
+        assert stats["conversation_store"]["evicted_lru"] == 1
+        assert service.clear_conversation("c") is True
+        assert "c" not in service.conversations
+
+
+class TestSharedTier:
+    """Dos stores sobre el mismo fichero simulan dos workers de gunicorn"""
+
+    def make_workers(self, tmp_path, loader=None):
+        from core.conversation_store import ConversationStore
+        from core.conversation_backends import SQLiteConversationBackend
+        path = str(tmp_path / "conversations.db")
+        return (ConversationStore(loader=loader, shared=SQLiteConversationBackend(path)),
+                ConversationStore(loader=loader, shared=SQLiteConversationBackend(path)))
+
+    def test_versions_increment(self, tmp_path):
+        from core.conversation_backends import SQLiteConversationBackend
+        backend = SQLiteConversationBackend(str(tmp_path / "c.db"))
+
+        assert backend.version("u1") is None
+        assert backend.put("u1", [msg("a")]) == 1
+        assert backend.put("u1", [msg("a"), msg("b")]) == 2
+        assert backend.get("u1") == (2, [msg("a"), msg("b")])
+
+    def test_second_worker_skips_db(self, tmp_path):
+        loads = []
+        worker_a, worker_b = self.make_workers(tmp_path, loader=lambda uid: loads.append(uid) or [msg("db")])
+
+        worker_a.get_or_load("u1")
+        conv = worker_b.get_or_load("u1")
+
+        assert loads == ["u1"]
+        assert conv[0]["content"] == "db"
+        assert worker_b.stats["shared_hits"] == 1
+
+    def test_stale_local_copy_refreshed(self, tmp_path):
+        worker_a, worker_b = self.make_workers(tmp_path)
+
+        worker_a.put("u1", [msg("hola")])
+        assert len(worker_b.get_or_load("u1")) == 1
+
+        worker_a.put("u1", [msg("hola"), msg("respuesta", "assistant")])
+        assert len(worker_b.get_or_load("u1")) == 2
+        assert worker_b.stats["shared_stale"] == 1
+
+        # Sin cambios: copia local, sin releer el contenido
+        worker_b.get_or_load("u1")
+        assert worker_b.stats["shared_stale"] == 1
+
+    def test_clear_propagates(self, tmp_path):
+        worker_a, worker_b = self.make_workers(tmp_path)
+
+        worker_a.put("u1", [msg("hola")])
+        worker_b.get_or_load("u1")
+        worker_a.pop("u1")
+
+        assert worker_b.get_or_load("u1") == []
+
+    def test_create_shared_backend(self, tmp_path, monkeypatch):
+        from core.conversation_backends import create_shared_backend, SQLiteConversationBackend
+
+        monkeypatch.setenv("AI_CONV_SHARED_DB", str(tmp_path / "env.db"))
+        assert create_shared_backend("none") is None
+        assert create_shared_backend("desconocido") is None
+        assert isinstance(create_shared_backend("sqlite"), SQLiteConversationBackend)
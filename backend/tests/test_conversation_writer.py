@@ -0,0 +1,133 @@
+"""
+Tests para la persistencia por lotes de conversaciones (core/conversation_writer.py)
+"""
+
+import sqlite3
+import pytest
+
+
+class PoolManager:
+    """db_manager estilo pool sobre un fichero SQLite que registra préstamos"""
+
+    def __init__(self, path):
+        self.path = path
+        self.borrowed = 0
+        self.released = 0
+        conn = sqlite3.connect(path)
+        conn.execute("CREATE TABLE ai_chat_messages (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                     "user_id TEXT, role TEXT, content TEXT, created_at TIMESTAMP)")
+        conn.commit()
+        conn.close()
+
+    def get_connection(self):
+        self.borrowed += 1
+        return sqlite3.connect(self.path, check_same_thread=False)
+
+    def release_connection(self, conn):
+        self.released += 1
+        conn.close()
+
+    def rows(self):
+        conn = sqlite3.connect(self.path)
+        try:
+            return conn.execute("SELECT user_id, role, content FROM ai_chat_messages ORDER BY created_at, id").fetchall()
+        finally:
+            conn.close()
+
+
+@pytest.fixture
+def manager(tmp_path):
+    return PoolManager(str(tmp_path / "chat.db"))
+
+
+def exchange(n=0):
+    return [{"role": "user", "content": f"pregunta {n}"}, {"role": "assistant", "content": f"respuesta {n}"}]
+
+
+class TestDbConnection:
+    def test_connection_always_released(self, manager):
+        from core.db_pool import db_connection
+
+        with pytest.raises(RuntimeError):
+            with db_connection(manager):
+                raise RuntimeError("fallo")
+
+        assert manager.borrowed == manager.released == 1
+
+    def test_prefers_manager_context(self):
+        from contextlib import contextmanager
+        from core.db_pool import db_connection
+
+        class Managed:
+            used = False
+
+            @contextmanager
+            def connection(self):
+                Managed.used = True
+                yield "conn"
+
+        with db_connection(Managed()) as conn:
+            assert conn == "conn"
+        assert Managed.used
+
+
+class TestConversationWriter:
+    def test_sync_write_single_transaction(self, manager):
+        from core.conversation_writer import ConversationWriter
+        writer = ConversationWriter(manager, write_behind=False)
+
+        assert writer.submit("u1", exchange()) is True
+
+        assert manager.rows() == [("u1", "user", "pregunta 0"), ("u1", "assistant", "respuesta 0")]
+        assert manager.borrowed == manager.released == 1
+        assert writer.stats["written"] == 2
+
+    def test_write_behind_batches(self, manager):
+        from core.conversation_writer import ConversationWriter
+        writer = ConversationWriter(manager, write_behind=True, batch_size=1000, flush_interval=60)
+        try:
+            for i in range(5):
+                writer.submit("u1", exchange(i))
+            assert manager.rows() == []
+            assert writer.pending() == 10
+
+            assert writer.flush() == 10
+            assert len(manager.rows()) == 10
+            assert manager.borrowed == 1
+        finally:
+            writer.stop()
+
+    def test_failed_batch_rolls_back_and_releases(self, tmp_path):
+        from core.conversation_writer import ConversationWriter
+
+        class Broken(PoolManager):
+            def get_connection(self):
+                conn = super().get_connection()
+                conn.execute("DROP TABLE ai_chat_messages")
+                return conn
+
+        manager = Broken(str(tmp_path / "broken.db"))
+        writer = ConversationWriter(manager, write_behind=False)
+
+        assert writer.submit("u1", exchange()) is False
+        assert writer.stats["errors"] == 1
+        assert manager.borrowed == manager.released
+
+    def test_no_db_manager(self):
+        from core.conversation_writer import ConversationWriter
+        assert ConversationWriter(None).submit("u1", exchange()) is False
+
+
+class TestAIServicePersistence:
+    def test_round_trip_through_ai_service(self, manager):
+        from core.ai_service import AIService
+
+        service = AIService(manager)
+        service.providers = []
+        service._save_conversation("u1", exchange(1))
+        service.conversations.clear()
+
+        assert service._get_conversation("u1") == exchange(1)
+        assert service.clear_conversation("u1") is True
+        assert manager.rows() == []
+        assert manager.borrowed == manager.released
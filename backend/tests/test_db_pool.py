@@ -0,0 +1,115 @@
+"""
+Tests para el gestor de conexiones (core/db_pool.py)
+"""
+
+import threading
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+
+class TestSQLiteConnectionManager:
+    def test_connection_per_thread(self, tmp_path):
+        from core.db_pool import SQLiteConnectionManager
+        manager = SQLiteConnectionManager(str(tmp_path / "db" / "central.db"))
+
+        seen = []
+
+        def worker():
+            with manager.connection() as conn:
+                seen.append(conn)
+
+        threads = [threading.Thread(target=worker) for _ in range(3)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        with manager.connection() as conn:
+            seen.append(conn)
+
+        assert len({id(c) for c in seen}) == 4
+        assert manager.snapshot()["in_use"] == 0
+        assert manager.snapshot()["connections"] == 4
+
+    def test_wal_and_rollback(self, tmp_path):
+        from core.db_pool import SQLiteConnectionManager
+        manager = SQLiteConnectionManager(str(tmp_path / "central.db"))
+
+        with manager.connection() as conn:
+            assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+            conn.execute("CREATE TABLE t (x INTEGER)")
+        with pytest.raises(RuntimeError):
+            with manager.connection() as conn:
+                conn.execute("INSERT INTO t VALUES (1)")
+                raise RuntimeError("fallo")
+
+        with manager.connection() as conn:
+            assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+        assert manager.snapshot()["errors"] == 1
+
+
+class FakeThreadedPool:
+    """Sustituto de ThreadedConnectionPool: falla si se excede maxconn, como el real"""
+
+    def __init__(self, minconn, maxconn, url):
+        self.maxconn = maxconn
+        self.used = 0
+        self.closed_on_put = []
+
+    def getconn(self):
+        if self.used >= self.maxconn:
+            raise RuntimeError("connection pool exhausted")
+        self.used += 1
+        return MagicMock(closed=0)
+
+    def putconn(self, conn, close=False):
+        self.used -= 1
+        self.closed_on_put.append(close)
+
+    def closeall(self):
+        pass
+
+
+class TestPostgresConnectionManager:
+    def make(self, maxconn=2, timeout=0.1):
+        from core.db_pool import PostgresConnectionManager
+        with patch("core.db_pool.ThreadedConnectionPool", FakeThreadedPool):
+            return PostgresConnectionManager("postgresql://x", minconn=1, maxconn=maxconn, timeout=timeout)
+
+    def test_exhausted_pool_waits_then_times_out(self):
+        from core.db_pool import PoolTimeout
+        manager = self.make(maxconn=1)
+
+        held = manager.get_connection()
+        with pytest.raises(PoolTimeout):
+            manager.get_connection()
+        manager.release_connection(held)
+
+        with manager.connection():
+            pass
+        stats = manager.snapshot()
+        assert stats["timeouts"] == 1
+        assert stats["in_use"] == 0
+        assert stats["acquired"] == 2
+
+    def test_waiter_gets_released_connection(self):
+        manager = self.make(maxconn=1, timeout=2)
+        held = manager.get_connection()
+        threading.Timer(0.1, manager.release_connection, args=(held,)).start()
+
+        with manager.connection() as conn:
+            assert conn is not None
+        assert manager.snapshot()["max_wait_ms"] >= 50
+
+    def test_commit_and_rollback(self):
+        manager = self.make()
+
+        with manager.connection() as conn:
+            pass
+        conn.commit.assert_called_once()
+
+        with pytest.raises(ValueError):
+            with manager.connection() as conn:
+                raise ValueError("fallo")
+        conn.rollback.assert_called_once()
+        assert manager.pool.used == 0
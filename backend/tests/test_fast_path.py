@@ -0,0 +1,67 @@
+"""
+Tests para el clasificador de atajo (core/fast_path.py)
+"""
+
+import pytest
+
+
+@pytest.fixture
+def classifier():
+    from core.fast_path import FastPathClassifier
+    return FastPathClassifier(enabled=True, max_words=8)
+
+
+class TestClassify:
+    @pytest.mark.parametrize("message", ["hola", "muchas gracias!", "perfecto 👍", "Buenos días, ¿qué tal?", "👍"])
+    def test_conversational_is_trivial(self, classifier, message):
+        assert classifier.classify(message).trivial
+
+    @pytest.mark.parametrize("message,reason", [
+        ("hola, revisa el repo", "task"),
+        ("gracias, ahora crea un login", "task"),
+        ("lee main.py", "code"),
+        ("ok `npm test`", "code"),
+        ("hola " * 10, "long"),
+        ("", "long"),
+    ])
+    def test_work_is_not_trivial(self, classifier, message, reason):
+        decision = classifier.classify(message)
+        assert not decision.trivial
+        assert decision.reason == reason
+
+    @pytest.mark.parametrize("message", ["sí, dale", "ok", "vale", "claro", "de acuerdo", "no"])
+    def test_confirmations_are_not_trivial(self, classifier, message):
+        assert not classifier.classify(message).trivial
+
+    @pytest.mark.parametrize("last, trivial", [
+        ("¿Aplico el cambio en utils.py?", False),
+        ('Voy a listar el repo: <TOOL>{"name": "list_dir", "args": {}}</TOOL>', False),
+        ("Listo, ya está aplicado.", True),
+    ])
+    def test_pending_question_takes_full_path(self, classifier, last, trivial):
+        history = [{"role": "user", "content": "renombra foo"}, {"role": "assistant", "content": last}]
+
+        decision = classifier.classify("perfecto, gracias", history)
+
+        assert decision.trivial is trivial
+        assert trivial or decision.reason == "pending"
+
+    def test_disabled(self):
+        from core.fast_path import FastPathClassifier
+        assert FastPathClassifier(enabled=False).classify("hola").reason == "disabled"
+
+
+class TestStats:
+    def test_snapshot(self, classifier):
+        from core.fast_path import FULL_PATH_CALLS
+        classifier.record(True, 100)
+        classifier.record(True, 300)
+        classifier.record(False, 5000)
+
+        snap = classifier.snapshot()
+
+        assert snap["fast_path"] == 2 and snap["full"] == 1
+        assert snap["fast_path_ratio"] == pytest.approx(0.667)
+        assert snap["llm_calls_saved"] == 2 * (FULL_PATH_CALLS - 1)
+        assert snap["avg_fast_path_ms"] == 200
+        assert snap["avg_full_ms"] == 5000
@@ -0,0 +1,184 @@
+"""
+Tests para el escáner compartido del árbol (core/fs_scanner.py)
+"""
+
+import os
+import time
+import pytest
+
+
+def write(root, rel, content="x"):
+    path = root / rel
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content)
+    return path
+
+
+def age_dirs(root, seconds=60):
+    """Lleva el mtime de los directorios al pasado (fuera de la ventana de mtime dudoso)"""
+    past = time.time() - seconds
+    for path, _, _ in os.walk(root):
+        os.utime(path, (past, past))
+
+
+@pytest.fixture
+def repo(tmp_path):
+    root = tmp_path / "repo"
+    write(root, "app.py")
+    write(root, "src/util.py")
+    write(root, "src/gen/out.py")
+    write(root, "node_modules/dep/index.js")
+    write(root, "logs/a.log")
+    write(root, "debug.log")
+    write(root, "keep.log")
+    write(root, ".gitignore", "# generados\n*.log\n!keep.log\nlogs/\n")
+    write(root, "src/.gitignore", "/gen\n")
+    age_dirs(root)
+    return root
+
+
+@pytest.fixture
+def snapshot(repo):
+    from core.fs_scanner import FsSnapshot
+    snapshot = FsSnapshot(repo)
+    snapshot.refresh()
+    return snapshot
+
+
+class TestGitignore:
+    def match(self, text, path, is_dir=False, base=""):
+        from core.fs_scanner import IgnorePolicy, parse_gitignore
+        return IgnorePolicy.matches(parse_gitignore(text, base), path, is_dir)
+
+    def test_patterns(self):
+        assert self.match("*.pyc", "a/b/c.pyc")
+        assert not self.match("/build.txt", "a/build.txt")
+        assert self.match("doc/*.md", "doc/a.md")
+        assert not self.match("doc/*.md", "doc/x/a.md")
+        assert self.match("**/tmp", "a/b/tmp", is_dir=True)
+        assert self.match("a/**/z", "a/b/c/z")
+        assert self.match("out/", "x/out", is_dir=True)
+        assert not self.match("out/", "x/out")
+        assert self.match("file[0-9].txt", "file3.txt")
+
+    def test_last_rule_wins_and_base(self):
+        assert not self.match("*.log\n!keep.log", "keep.log")
+        assert self.match("/gen", "src/gen", is_dir=True, base="src")
+        assert not self.match("/gen", "gen", is_dir=True, base="src")
+
+
+class TestFsSnapshot:
+    def test_unified_ignore_policy(self, snapshot):
+        assert snapshot.files() == [".gitignore", "app.py", "keep.log", "src/.gitignore", "src/util.py"]
+        assert snapshot.dirs() == ["src"]
+
+    def test_unchanged_tree_is_not_listed_again(self, snapshot):
+        stats = snapshot.refresh()
+
+        assert stats["listed"] == 0 and stats["changed"] is False
+
+    def test_only_changed_dirs_are_listed(self, snapshot, repo):
+        generation = snapshot.generation
+        write(repo, "src/nuevo.py")
+        (repo / "app.py").unlink()
+
+        stats = snapshot.refresh()
+
+        assert stats["listed"] == 2
+        assert snapshot.generation == generation + 1
+        assert snapshot.files() == [".gitignore", "keep.log", "src/.gitignore", "src/nuevo.py", "src/util.py"]
+
+    def test_removed_and_new_dirs(self, snapshot, repo):
+        write(repo, "pkg/mod/x.py")
+        (repo / "src/util.py").unlink()
+        (repo / "src/.gitignore").unlink()
+        (repo / "src/gen/out.py").unlink()
+        (repo / "src/gen").rmdir()
+        (repo / "src").rmdir()
+
+        snapshot.refresh()
+
+        assert snapshot.dirs() == ["pkg", "pkg/mod"]
+        assert "pkg/mod/x.py" in snapshot.files()
+
+    def test_edited_gitignore_refilters_subtree(self, snapshot, repo):
+        write(repo, "src/.gitignore", "util.py\n")
+
+        snapshot.refresh()
+
+        assert snapshot.files("src") == ["src/.gitignore", "src/gen/out.py"]
+
+    def test_tree_without_dotfiles(self, snapshot):
+        assert snapshot.tree(hidden=False, path_prefix="repo") == [
+            {"name": "src", "type": "folder", "children": [
+                {"name": "util.py", "type": "file", "path": "repo/src/util.py"},
+            ]},
+            {"name": "app.py", "type": "file", "path": "repo/app.py"},
+            {"name": "keep.log", "type": "file", "path": "repo/keep.log"},
+        ]
+
+
+class TestFsScanner:
+    def test_snapshots_are_shared_per_root(self, repo):
+        from core.fs_scanner import FsScanner
+        scanner = FsScanner(max_roots=1)
+
+        first = scanner.snapshot(repo)
+        assert scanner.snapshot(str(repo / "src" / "..")) is first
+
+        scanner.snapshot(repo / "src")
+        assert scanner.snapshot(repo) is not first
+
+    def test_invalidate(self, repo):
+        from core.fs_scanner import FsScanner
+        scanner = FsScanner()
+        first = scanner.snapshot(repo)
+
+        scanner.invalidate(repo)
+
+        assert scanner.snapshot(repo) is not first
+
+
+class TestWatchedSnapshot:
+    def test_only_marked_dirs_are_listed(self, snapshot, repo):
+        snapshot.watched = True
+        write(repo, "src/nuevo.py")
+        write(repo, "otro.py")
+
+        assert snapshot.refresh()["listed"] == 0
+        snapshot.mark_stale(["src"])
+        stats = snapshot.refresh()
+
+        assert stats["listed"] == 1
+        assert "src/nuevo.py" in snapshot.files() and "otro.py" not in snapshot.files()
+
+    def test_new_dir_under_marked_dir(self, snapshot, repo):
+        snapshot.watched = True
+        write(repo, "src/pkg/mod.py")
+
+        snapshot.mark_stale(["src"])
+        snapshot.refresh()
+
+        assert snapshot.files("src/pkg") == ["src/pkg/mod.py"]
+
+    def test_notify_maps_paths_to_nested_roots(self, repo):
+        from core.fs_scanner import FsScanner
+        scanner = FsScanner()
+        scanner.watch(repo.parent)
+        outer, inner = scanner.snapshot(repo.parent), scanner.snapshot(repo / "src")
+        write(repo, "src/nuevo.py")
+
+        scanner.notify(repo.parent, ["repo/src/nuevo.py"])
+
+        assert "repo/src/nuevo.py" in scanner.snapshot(repo.parent).files()
+        assert "nuevo.py" in scanner.snapshot(repo / "src").files()
+        assert outer.watched and inner.watched
+
+    def test_paths_under(self, tmp_path):
+        from core.fs_scanner import paths_under
+        rels = ["a/x.py", "a/b/y.py", "c.py"]
+
+        assert paths_under(rels, tmp_path, tmp_path / "a") == ["x.py", "b/y.py"]
+        assert paths_under(rels, tmp_path, tmp_path / "z") == []
+        assert paths_under(["a"], tmp_path, tmp_path / "a" / "b") is None
+        assert paths_under(rels, tmp_path / "a", tmp_path) == []
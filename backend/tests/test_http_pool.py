@@ -0,0 +1,52 @@
+"""
+Tests para el pool de sesiones HTTP (core/http_pool.py)
+"""
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def clean_pool():
+    from core import http_pool
+    http_pool.close_all()
+    yield
+    http_pool.close_all()
+
+
+class TestHttpPool:
+    """Tests para get_session / get_client"""
+
+    def test_session_reused_per_provider(self):
+        """El mismo proveedor recibe siempre la misma sesión"""
+        from core.http_pool import get_session
+
+        assert get_session("groq") is get_session("groq")
+        assert get_session("groq") is not get_session("gemini")
+
+    def test_session_pool_size(self):
+        """El adaptador usa el tamaño de pool configurado"""
+        from core import http_pool
+
+        adapter = http_pool.get_session("groq").get_adapter("https://api.groq.com")
+        assert adapter._pool_maxsize == http_pool.POOL_SIZE
+
+    def test_client_reused(self):
+        """El cliente httpx también se comparte"""
+        from core.http_pool import get_client
+
+        assert get_client("antigravity") is get_client("antigravity")
+
+    def test_close_all_resets(self):
+        """close_all descarta las sesiones existentes"""
+        from core.http_pool import get_session, close_all
+
+        first = get_session("groq")
+        close_all()
+        assert get_session("groq") is not first
+
+    def test_provider_uses_shared_session(self):
+        """Los proveedores de AIService usan la sesión del pool"""
+        from core.ai_service import GroqProvider
+        from core.http_pool import get_session
+
+        assert GroqProvider("key").session is get_session("groq")
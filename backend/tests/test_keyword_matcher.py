@@ -0,0 +1,72 @@
+"""
+Tests para los filtros de palabras clave (core/keyword_matcher.py)
+"""
+
+import json
+import pytest
+
+
+class TestKeywordMatcher:
+    def test_substring_case_insensitive(self):
+        from core.keyword_matcher import KeywordMatcher
+        matcher = KeywordMatcher(["rm -rf", "Vulnerabilit"])
+
+        assert matcher.search("Ejecutar RM -RF /tmp") == "rm -rf"
+        assert matcher.matches("a known VULNERABILITY")
+        assert not matcher.matches("todo en orden")
+        assert matcher.find_all("rm -rf y vulnerabilities") == ["rm -rf", "vulnerabilit"]
+
+    def test_empty(self):
+        from core.keyword_matcher import KeywordMatcher
+        assert KeywordMatcher([]).search("texto") is None
+        assert KeywordMatcher(["x"]).search("") is None
+
+
+class TestKeywordScreens:
+    @pytest.fixture
+    def screens(self):
+        from core.keyword_matcher import KeywordScreens
+        return KeywordScreens(path="", reload_interval=0)
+
+    def test_defaults(self, screens):
+        assert screens.get("risk").matches("Esto borra main.py")
+        assert screens.get("unknown").search("lo que sea") is None
+
+    def test_configure_at_runtime(self, screens):
+        screens.configure("risk", ["dinamita"])
+        assert screens.get("risk").matches("usa dinamita")
+        assert not screens.get("risk").matches("rm -rf /")
+
+        screens.configure("risk", None)
+        assert screens.get("risk").matches("rm -rf /")
+
+    def test_file_config_reloaded(self, tmp_path):
+        import os
+        from core.keyword_matcher import KeywordScreens
+        path = tmp_path / "screens.json"
+        path.write_text(json.dumps({"risk": ["peligro"]}))
+        screens = KeywordScreens(path=str(path), reload_interval=0)
+
+        assert screens.get("risk").matches("Peligro inminente")
+
+        path.write_text(json.dumps({"risk": ["otro"]}))
+        os.utime(path, (1, 1))
+        assert screens.get("risk").matches("otro riesgo")
+        assert not screens.get("risk").matches("peligro")
+
+    def test_invalid_file_keeps_previous(self, tmp_path):
+        import os
+        from core.keyword_matcher import KeywordScreens
+        path = tmp_path / "screens.json"
+        path.write_text(json.dumps({"risk": ["peligro"]}))
+        screens = KeywordScreens(path=str(path), reload_interval=0)
+
+        path.write_text("{roto")
+        os.utime(path, (1, 1))
+        assert screens.get("risk").matches("peligro")
+
+
+def test_benchmark_runs():
+    from core.keyword_matcher import benchmark
+    result = benchmark(iterations=10)
+    assert set(result) == {"rebuilt_list_us", "compiled_regex_us", "keyword_matcher_us"}
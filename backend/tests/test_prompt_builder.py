@@ -0,0 +1,86 @@
+"""
+Tests para el ensamblado de prompts con prefijo estático (core/prompt_builder.py)
+"""
+
+from unittest.mock import MagicMock, patch
+
+
+class TestPromptBlocks:
+    def test_intern_is_stable(self):
+        from core.prompt_builder import intern_block
+        a = intern_block("test_stable", "Eres un asistente.")
+        b = intern_block("test_stable", "Eres un asistente.")
+
+        assert a is b
+        assert a.tokens > 0
+        assert len(a.digest) == 64
+
+    def test_assemble_keeps_static_prefix(self):
+        from core.prompt_builder import intern_block, assemble
+        block = intern_block("test_prefix", "PREFIJO FIJO")
+
+        first = assemble(block, "contexto A")
+        second = assemble(block, None, "contexto B")
+
+        assert first.startswith("PREFIJO FIJO\n\n")
+        assert second == "PREFIJO FIJO\n\ncontexto B"
+        assert assemble(block) == "PREFIJO FIJO"
+
+    def test_split_static(self):
+        from core.prompt_builder import intern_block, assemble, split_static
+        block = intern_block("test_split", "BLOQUE PARA SEPARAR")
+
+        static, dynamic = split_static(assemble(block, "dinámico"))
+        assert static is block
+        assert dynamic == "dinámico"
+
+        static, dynamic = split_static("prompt sin bloque conocido")
+        assert static is None
+        assert dynamic == "prompt sin bloque conocido"
+
+    def test_code_builder_prompt_is_interned(self):
+        from core.ai_service import AIService
+        from core.prompt_builder import prompt_stats, split_static
+
+        assert "code_builder" in prompt_stats()
+        static, _ = split_static(AIService.CODE_BUILDER_PROMPT + "\n\nPROYECTO: demo")
+        assert static is AIService.CODE_BUILDER_BLOCK
+
+
+class TestProviderPrefixCaching:
+    def test_cached_tokens_reported(self):
+        from core.ai_service import _cached_prompt_tokens
+
+        assert _cached_prompt_tokens({"usage": {"prompt_tokens_details": {"cached_tokens": 128}}}) == 128
+        assert _cached_prompt_tokens({"usage": {"prompt_cache_hit_tokens": 64}}) == 64
+        assert _cached_prompt_tokens({}) == 0
+
+    def test_gemini_uses_cached_content_for_large_blocks(self):
+        from core.ai_service import GeminiProvider
+        from core.prompt_builder import intern_block, assemble
+
+        block = intern_block("test_gemini", "regla " * 50)
+        provider = GeminiProvider("key")
+        provider.CACHE_MIN_TOKENS = 1
+
+        created = MagicMock(status_code=200)
+        created.json.return_value = {"name": "cachedContents/abc"}
+        answered = MagicMock(status_code=200)
+        answered.json.return_value = {
+            "candidates": [{"content": {"parts": [{"text": "hola"}]}}],
+            "usageMetadata": {"cachedContentTokenCount": 50}
+        }
+        session = MagicMock()
+        session.post.side_effect = [created, answered, answered]
+
+        with patch("core.ai_service.get_session", return_value=session):
+            result = provider.chat([{"role": "user", "content": "hi"}], assemble(block, "contexto"))
+            provider.chat([{"role": "user", "content": "hi"}], assemble(block, "contexto"))
+
+        assert result["success"] and result["cached_tokens"] == 50
+        # Un solo cachedContent para dos peticiones
+        assert session.post.call_count == 3
+        payload = session.post.call_args_list[1].kwargs["json"]
+        assert payload["cachedContent"] == "cachedContents/abc"
+        assert "systemInstruction" not in payload
+        assert payload["contents"][0]["parts"][0]["text"] == "contexto"
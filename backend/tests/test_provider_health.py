@@ -0,0 +1,118 @@
+"""
+Tests para el monitor de salud de proveedores (core/provider_health.py)
+"""
+
+import time
+import pytest
+
+
+class ProbeProvider:
+    def __init__(self, name, result):
+        self.name = name
+        self.result = result
+        self.probes = 0
+
+    def probe(self):
+        self.probes += 1
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+@pytest.fixture
+def monitor():
+    from core.provider_health import HealthMonitor
+    return HealthMonitor(interval=60, failure_threshold=2, cooldown=0.1)
+
+
+class TestCircuitBreaker:
+    """Transiciones closed -> open -> half_open -> closed"""
+
+    def test_unknown_provider_is_available(self, monitor):
+        assert monitor.is_available("groq")
+
+    def test_opens_after_threshold(self, monitor):
+        from core.provider_health import CircuitState
+
+        monitor.record("groq", False, "HTTP 500")
+        assert monitor.is_available("groq")
+        monitor.record("groq", False, "HTTP 500")
+
+        assert not monitor.is_available("groq")
+        assert monitor.snapshot()["groq"]["state"] == CircuitState.OPEN.value
+
+    def test_half_open_after_cooldown(self, monitor):
+        from core.provider_health import CircuitState
+
+        monitor.record("groq", False)
+        monitor.record("groq", False)
+        time.sleep(0.15)
+
+        assert monitor.is_available("groq")
+        assert monitor.snapshot()["groq"]["state"] == CircuitState.HALF_OPEN.value
+
+    def test_half_open_failure_reopens(self, monitor):
+        monitor.record("groq", False)
+        monitor.record("groq", False)
+        time.sleep(0.15)
+        monitor.is_available("groq")
+
+        monitor.record("groq", False)
+        assert not monitor.is_available("groq")
+
+    def test_success_closes(self, monitor):
+        monitor.record("groq", False)
+        monitor.record("groq", False)
+        monitor.record("groq", True)
+
+        assert monitor.is_available("groq")
+        assert monitor.snapshot()["groq"]["failures"] == 0
+
+
+class TestProbes:
+    """Sondeo activo"""
+
+    def test_failed_probe_opens_immediately(self, monitor):
+        provider = ProbeProvider("ollama", False)
+        monitor.register(provider)
+        monitor.probe(provider)
+
+        assert not monitor.is_available("ollama")
+        assert monitor.snapshot()["ollama"]["last_check"] is not None
+
+    def test_probe_exception_counts_as_failure(self, monitor):
+        provider = ProbeProvider("ollama", ConnectionError("refused"))
+        monitor.probe(provider)
+
+        assert not monitor.is_available("ollama")
+        assert "refused" in monitor.snapshot()["ollama"]["last_error"]
+
+    def test_passive_provider_not_touched(self, monitor):
+        provider = ProbeProvider("groq", None)
+        monitor.probe(provider)
+
+        assert monitor.is_available("groq")
+        assert monitor.snapshot().get("groq", {}).get("last_check") is None
+
+    def test_background_loop_probes(self, monitor):
+        provider = ProbeProvider("ollama", True)
+        monitor.register(provider)
+        monitor.start()
+        try:
+            deadline = time.time() + 1
+            while provider.probes == 0 and time.time() < deadline:
+                time.sleep(0.01)
+        finally:
+            monitor.stop()
+
+        assert provider.probes >= 1
+        assert monitor.is_available("ollama")
+
+    def test_ollama_is_available_has_no_network(self):
+        """OllamaProvider.is_available no sondea: solo lee el circuito"""
+        from core.ai_service import OllamaProvider
+
+        provider = OllamaProvider(base_url="http://127.0.0.1:9")
+        provider.probe = lambda: pytest.fail("is_available no debe sondear")
+
+        assert provider.is_available() in (True, False)
@@ -0,0 +1,111 @@
+"""
+Tests para el enrutado adaptativo (core/provider_router.py)
+"""
+
+import pytest
+
+
+class Named:
+    def __init__(self, name):
+        self.name = name
+
+    def __repr__(self):
+        return self.name
+
+
+@pytest.fixture
+def router():
+    from core.provider_router import ProviderRouter
+    router = ProviderRouter(window=20, min_samples=3)
+    router.enabled = True
+    return router
+
+
+def feed(router, name, latency, count=5, success=True, task="chat"):
+    for _ in range(count):
+        router.observe(name, task, latency, success)
+
+
+class TestProviderRouter:
+    """Tests para ProviderRouter"""
+
+    def test_stats_percentiles(self, router):
+        for latency in [100, 200, 300, 400, 1000]:
+            router.observe("groq", "chat", latency, True)
+        router.observe("groq", "chat", 50, False)
+
+        st = router.stats("groq", "chat")
+
+        assert st["samples"] == 6
+        assert st["p50_ms"] == 300
+        assert st["p95_ms"] == 1000
+        assert st["error_rate"] == round(1 / 6, 3)
+
+    def test_window_is_bounded(self, router):
+        feed(router, "groq", 100, count=50)
+        assert router.stats("groq", "chat")["samples"] == 20
+
+    def test_faster_provider_promoted(self, router):
+        providers = [Named("ollama"), Named("groq")]
+        feed(router, "ollama", 5000)
+        feed(router, "groq", 1000)
+
+        assert [p.name for p in router.rank(providers)] == ["groq", "ollama"]
+
+    def test_error_rate_penalized(self, router):
+        providers = [Named("fast_flaky"), Named("steady")]
+        feed(router, "fast_flaky", 500, count=2)
+        feed(router, "fast_flaky", 500, count=8, success=False)
+        feed(router, "steady", 1500)
+
+        assert router.rank(providers)[0].name == "steady"
+
+    def test_unmeasured_keep_position(self, router):
+        providers = [Named("slow"), Named("new"), Named("fast")]
+        feed(router, "slow", 9000)
+        feed(router, "fast", 100)
+
+        assert [p.name for p in router.rank(providers)] == ["fast", "new", "slow"]
+
+    def test_abandoned_sample_not_faster_than_winner(self, router):
+        router.observe_abandoned("late", "chat", 40, winner_ms=150)
+        router.observe_abandoned("slow", "chat", 900, winner_ms=150)
+
+        assert router.stats("late", "chat")["p50_ms"] == 150
+        assert router.stats("slow", "chat")["p50_ms"] == 900
+        assert router.stats("late", "chat")["error_rate"] == 0
+
+    def test_rank_is_per_task_type(self, router):
+        providers = [Named("a"), Named("b")]
+        feed(router, "a", 100, task="council")
+        feed(router, "b", 10, task="council")
+        feed(router, "a", 10, task="chat")
+        feed(router, "b", 100, task="chat")
+
+        assert router.rank(providers, "council")[0].name == "b"
+        assert router.rank(providers, "chat")[0].name == "a"
+
+    def test_disabled_keeps_order(self, router):
+        router.enabled = False
+        providers = [Named("slow"), Named("fast")]
+        feed(router, "slow", 9000)
+        feed(router, "fast", 100)
+
+        assert router.rank(providers) == providers
+
+    def test_seed_from_rows(self, router):
+        """seed carga filas de ai_model_benchmarks"""
+        from flask import Flask
+        from backend.models import db, ModelBenchmark
+
+        app = Flask(__name__)
+        app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+        db.init_app(app)
+        with app.app_context():
+            db.create_all()
+            for latency in (100, 200, 300):
+                db.session.add(ModelBenchmark(provider="groq", task_type="chat", latency_ms=latency, success=True))
+            db.session.commit()
+
+        assert router.seed(app) == 3
+        assert router.stats("groq", "chat")["p50_ms"] == 200
@@ -0,0 +1,188 @@
+"""
+Tests para el indexador de repositorios (core/repo_indexer.py)
+"""
+
+import os
+import time
+import pytest
+
+
+def write(root, rel, content="x", age=60):
+    """Crea un archivo con un mtime en el pasado (fuera de la ventana de mtime dudoso)"""
+    path = root / rel
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content)
+    past = time.time() - age
+    os.utime(path, (past, past))
+    return path
+
+
+@pytest.fixture
+def repo(tmp_path):
+    root = tmp_path / "repo"
+    write(root, "README.md", "# demo")
+    write(root, "requirements.txt", "flask\n# comentario\nrequests")
+    write(root, "app.py", "print('hola')")
+    write(root, "src/util.py", "def f(): pass")
+    write(root, "src/web/index.js", "console.log(1)")
+    write(root, "node_modules/dep/index.js", "ignorado")
+    write(root, "imagen.png", "binario")
+    return root
+
+
+@pytest.fixture
+def file_index(repo, tmp_path):
+    from core.repo_indexer import FileIndex, RepoIndexer
+
+    def make():
+        return FileIndex(repo, RepoIndexer.IGNORE_DIRS, RepoIndexer.CODE_EXTENSIONS, RepoIndexer.IMPORTANT_FILES,
+                         index_dir=str(tmp_path / "index"), refresh_interval=0)
+    return make
+
+
+class TestFileIndex:
+    def test_cold_then_warm(self, file_index):
+        index = file_index()
+
+        cold = index.refresh()
+        warm = index.refresh()
+
+        assert sorted(index.files) == ["README.md", "app.py", "requirements.txt", "src/util.py", "src/web/index.js"]
+        assert index.files["app.py"]["language"] == "Python"
+        assert cold["added"] == 5 and cold["hashed"] == 5
+        assert warm["hashed"] == 0 and warm["unchanged"] == 5
+
+    def test_only_changed_files_are_read(self, file_index, repo):
+        index = file_index()
+        index.refresh()
+
+        write(repo, "app.py", "print('adios')")
+        write(repo, "src/nuevo.py", "x = 1")
+        (repo / "src/util.py").unlink()
+        stats = index.refresh()
+
+        assert (stats["modified"], stats["added"], stats["removed"], stats["hashed"]) == (1, 1, 1, 2)
+        assert "src/util.py" not in index.files
+
+    def test_touch_keeps_content_hash(self, file_index, repo):
+        index = file_index()
+        index.refresh()
+        before = index.files["app.py"]["hash"]
+
+        write(repo, "app.py", "print('hola')", age=30)
+        stats = index.refresh()
+
+        assert stats["modified"] == 0 and stats["hashed"] == 1
+        assert index.files["app.py"]["hash"] == before
+
+    def test_persisted_between_instances(self, file_index):
+        file_index().refresh()
+
+        stats = file_index().refresh()
+
+        assert stats["hashed"] == 0 and stats["unchanged"] == 5
+
+    def test_recently_modified_file_is_rechecked(self, file_index, repo):
+        write(repo, "app.py", "print('hola')", age=0)
+        index = file_index()
+        index.refresh()
+
+        assert index.files["app.py"]["racy"] is True
+        assert index.refresh()["hashed"] == 1
+
+    def test_refresh_interval(self, file_index):
+        index = file_index()
+        index.refresh_interval = 60
+        index.refresh()
+
+        assert index.refresh()["cached"] is True
+        assert index.refresh(force=True)["cached"] is False
+
+
+class TestRepoIndexer:
+    @pytest.fixture(autouse=True)
+    def isolated(self, tmp_path, monkeypatch):
+        from core import repo_indexer
+        monkeypatch.setenv("REPO_INDEX_DIR", str(tmp_path / "index"))
+        monkeypatch.setattr(repo_indexer, "_file_indexes", {})
+
+    def test_index_repo(self, repo):
+        from core.repo_indexer import RepoIndexer
+
+        index = RepoIndexer(repo).index_repo()["index"]
+
+        assert [(f["type"], f["path"]) for f in index["structure"]] == [
+            ("file", "README.md"), ("file", "app.py"), ("file", "requirements.txt"),
+            ("dir", "src"), ("file", "src/util.py"), ("dir", "src/web"), ("file", "src/web/index.js"),
+        ]
+        assert index["languages"] == {"Python": 2, "JavaScript": 1}
+        assert index["file_count"] == 5
+        assert index["dependencies"]["python"] == ["flask", "requests"]
+        assert sorted(f["name"] for f in index["important_files"]) == ["README.md", "requirements.txt"]
+
+    def test_indexers_share_the_table(self, repo):
+        from core.repo_indexer import RepoIndexer
+
+        RepoIndexer(repo).index_repo()
+
+        assert RepoIndexer(repo).index_repo()["index"]["refresh"]["cached"] is True
+
+    def test_missing_repo(self, tmp_path):
+        from core.repo_indexer import RepoIndexer
+        assert RepoIndexer(tmp_path / "nada").index_repo()["success"] is False
+
+
+class TestSearchInRepo:
+    @pytest.fixture
+    def indexer(self, repo, tmp_path, monkeypatch):
+        from core import repo_indexer
+        monkeypatch.setenv("REPO_INDEX_DIR", str(tmp_path / "index"))
+        monkeypatch.setattr(repo_indexer, "_file_indexes", {})
+        indexer = repo_indexer.RepoIndexer(repo)
+        indexer.file_index.refresh_interval = 0
+        return indexer
+
+    def test_literal_and_case(self, indexer):
+        assert indexer.search_in_repo("PRINT") == [
+            {"file": "app.py", "matches": [{"line_number": 1, "content": "print('hola')"}]}
+        ]
+        assert indexer.search_in_repo("PRINT", case_sensitive=True) == []
+
+    def test_regex(self, indexer):
+        results = indexer.search_in_repo(r"def\s+f\(", regex=True)
+
+        assert [r["file"] for r in results] == ["src/util.py"]
+
+    def test_only_candidates_are_read(self, indexer, monkeypatch):
+        indexer.search_in_repo("console")
+        read = []
+        original = type(indexer.repo_path).read_text
+        monkeypatch.setattr(type(indexer.repo_path), "read_text",
+                            lambda self, *a, **k: read.append(self.name) or original(self, *a, **k))
+
+        assert [r["file"] for r in indexer.search_in_repo("console")] == ["src/web/index.js"]
+        assert read == ["index.js"]
+
+    def test_changed_file_is_reindexed(self, indexer, repo):
+        indexer.search_in_repo("print")
+
+        write(repo, "src/util.py", "print('nuevo')")
+
+        assert [r["file"] for r in indexer.search_in_repo("nuevo")] == ["src/util.py"]
+
+    def test_unindexed_big_file_is_still_searched(self, indexer, repo):
+        write(repo, "big.txt", "aguja\n" + "x" * 64)
+        indexer.file_index.HASH_MAX_BYTES = 32
+
+        assert [r["file"] for r in indexer.search_in_repo("aguja")] == ["big.txt"]
+
+    def test_large_first_build_runs_in_background(self, indexer):
+        file_index = indexer.file_index
+        file_index.trigram_sync_max = 2
+
+        # Primera búsqueda: recorre todos los archivos mientras se construye el índice
+        assert indexer.candidate_files("console") is None
+        assert [r["file"] for r in indexer.search_in_repo("console")] == ["src/web/index.js"]
+        file_index._builders["trigrams"].join(timeout=5)
+
+        assert indexer.candidate_files("console") == {"src/web/index.js"}
@@ -0,0 +1,71 @@
+"""
+Tests para la caché de respuestas (core/response_cache.py)
+"""
+
+import time
+import pytest
+
+
+@pytest.fixture
+def cache():
+    from core.response_cache import ResponseCache
+    return ResponseCache(max_entries=3, max_bytes=10_000, ttl=60, disk_path="")
+
+
+def key(cache, text, provider="groq"):
+    return cache.fingerprint(provider, "llama", "sys", [{"role": "user", "content": text}], 0.7)
+
+
+class TestFingerprint:
+    def test_stable_and_sensitive(self, cache):
+        assert key(cache, "hola") == key(cache, "hola")
+        assert key(cache, "hola") != key(cache, "hola!")
+        assert key(cache, "hola") != key(cache, "hola", provider="gemini")
+        assert cache.fingerprint("groq", "llama", "sys", [], 0.7) != cache.fingerprint("groq", "llama", "sys", [], 0.2)
+
+
+class TestResponseCache:
+    def test_get_put(self, cache):
+        k = key(cache, "hola")
+        assert cache.get(k) is None
+        cache.put(k, {"success": True, "response": "hi"})
+
+        assert cache.get(k)["response"] == "hi"
+        assert cache.stats["hits"] == 1 and cache.stats["misses"] == 1
+
+    def test_lru_eviction(self, cache):
+        keys = [key(cache, str(i)) for i in range(4)]
+        for k in keys[:3]:
+            cache.put(k, {"response": "x"})
+        cache.get(keys[0])
+        cache.put(keys[3], {"response": "x"})
+
+        assert cache.get(keys[1]) is None
+        assert cache.get(keys[0]) is not None
+        assert cache.stats["evictions"] == 1
+
+    def test_memory_cap(self):
+        from core.response_cache import ResponseCache
+        cache = ResponseCache(max_entries=100, max_bytes=200, ttl=60, disk_path="")
+        for i in range(5):
+            cache.put(str(i), {"response": "x" * 60})
+
+        assert cache.snapshot()["bytes"] <= 200
+
+    def test_ttl_expiry(self):
+        from core.response_cache import ResponseCache
+        cache = ResponseCache(ttl=0.05, disk_path="")
+        cache.put("k", {"response": "x"})
+        time.sleep(0.1)
+
+        assert cache.get("k") is None
+
+    def test_disk_tier_survives_new_instance(self, tmp_path):
+        from core.response_cache import ResponseCache
+        path = str(tmp_path / "cache.db")
+        ResponseCache(ttl=60, disk_path=path).put("k", {"response": "persistida"})
+
+        fresh = ResponseCache(ttl=60, disk_path=path)
+
+        assert fresh.get("k")["response"] == "persistida"
+        assert fresh.stats["disk_hits"] == 1
@@ -0,0 +1,240 @@
+"""
+Tests para el índice de símbolos (core/symbol_index.py)
+"""
+
+import os
+import time
+import pytest
+
+PY_SOURCE = '''import os
+from typing import Dict
+
+LIMIT = 3
+
+class Cache(Base):
+    size: int = 0
+
+    def get(self, key):
+        return helper(key) + LIMIT
+
+async def helper(x):
+    def inner():
+        pass
+    return os.path.join(x)
+'''
+
+JS_SOURCE = '''// function comentada() {}
+import { api } from "./api";
+export function render(el) {
+  const local = "class Falsa {";
+  return api.get(el, local);
+}
+export const handler = async (req) => { return req.body; };
+let count = 0;
+class Widget extends Base {
+  static create(a) { return new Widget(a); }
+  render() {
+    if (this.ok) { render(this); }
+  }
+}
+interface Props { name: string }
+type Id = string;
+'''
+
+
+def defs_of(defs):
+    return [(d[0], d[1], d[2], d[3], d[6]) for d in defs]
+
+
+class TestExtractors:
+    def test_python_definitions(self):
+        from core.symbol_index import python_symbols
+        defs, _ = python_symbols(PY_SOURCE)
+
+        assert defs_of(defs) == [
+            ("LIMIT", "variable", 4, 0, ""),
+            ("Cache", "class", 6, 6, ""),
+            ("size", "variable", 7, 4, "Cache"),
+            ("get", "method", 9, 8, "Cache"),
+            ("helper", "function", 12, 10, ""),
+            ("inner", "function", 13, 8, "helper"),
+        ]
+        # Tramo completo del nodo
+        assert defs[1][4:6] == [10, 34]
+
+    def test_python_references(self):
+        from core.symbol_index import python_symbols
+        _, refs = python_symbols(PY_SOURCE)
+
+        assert refs["helper"] == [10, 15]
+        assert refs["join"] == [15, 19]
+        assert refs["os"] == [1, 7, 15, 11]
+        assert refs["Dict"] == [2, 19]
+        assert "inner" not in refs
+
+    def test_python_syntax_error_is_empty(self):
+        from core.symbol_index import python_symbols
+        assert python_symbols("def roto(:\n") == ([], {})
+
+    def test_js_definitions(self):
+        from core.symbol_index import js_symbols
+        defs, _ = js_symbols(JS_SOURCE)
+
+        assert defs_of(defs) == [
+            ("render", "function", 3, 16, ""),
+            ("handler", "function", 7, 13, ""),
+            ("count", "variable", 8, 4, ""),
+            ("Widget", "class", 9, 6, ""),
+            ("create", "method", 10, 9, "Widget"),
+            ("render", "method", 11, 2, "Widget"),
+            ("Props", "interface", 15, 10, ""),
+            ("Id", "type", 16, 5, ""),
+        ]
+        # La clase abarca hasta su llave de cierre
+        assert defs[3][4:6] == [14, 1]
+
+    def test_js_references_skip_comments_strings_and_keywords(self):
+        from core.symbol_index import js_symbols
+        _, refs = js_symbols(JS_SOURCE)
+
+        assert refs["render"] == [12, 19]
+        assert refs["Widget"] == [10, 32]
+        assert "comentada" not in refs and "Falsa" not in refs
+        assert "return" not in refs and "type" not in refs
+
+    def test_js_member_access_is_a_reference(self):
+        from core.symbol_index import js_symbols
+        _, refs = js_symbols(JS_SOURCE)
+
+        assert refs["get"] == [5, 13]
+        assert refs["ok"] == [12, 13]
+        assert refs["body"] == [7, 51]
+
+
+class TestSymbolIndex:
+    @pytest.fixture
+    def index(self, tmp_path):
+        from core.symbol_index import SymbolIndex
+        index = SymbolIndex(tmp_path / "sym.json")
+        index.update("lib/cache.py", PY_SOURCE, "h1")
+        index.update("web/app.js", JS_SOURCE, "h2")
+        index.update("main.py", "from lib.cache import helper\nhelper(1)\n", "h3")
+        return index
+
+    def test_definitions_and_references(self, index):
+        assert [(d["path"], d["line"]) for d in index.definitions("helper")] == [("lib/cache.py", 12)]
+        assert [d["kind"] for d in index.definitions("render")] == ["function", "method"]
+        assert [d["path"] for d in index.definitions("render", kind="method")] == ["web/app.js"]
+        assert [(r["path"], r["line"]) for r in index.references("helper")] == [
+            ("lib/cache.py", 10), ("main.py", 1), ("main.py", 2)]
+
+    def test_js_method_calls_are_found(self, index):
+        index.update("web/use.js", "const w = Widget.create(1);\nw.render();\n", "h6")
+
+        assert [(r["path"], r["line"]) for r in index.references("create")] == [("web/use.js", 1)]
+        assert ("web/use.js", 2) in [(r["path"], r["line"]) for r in index.references("render")]
+
+    def test_search_ranks_exact_and_prefix_first(self, index):
+        index.update("x.py", "def cache_get(): pass\ndef get_cache(): pass\n", "h4")
+
+        assert [d["name"] for d in index.search("cache")] == ["Cache", "cache_get", "get_cache"]
+
+    def test_incremental_update_and_remove(self, index):
+        index.update("main.py", "def helper(): pass\n", "h5")
+        assert [d["path"] for d in index.definitions("helper")] == ["lib/cache.py", "main.py"]
+        assert [r["path"] for r in index.references("helper")] == ["lib/cache.py"]
+
+        index.remove("lib/cache.py")
+        assert [d["path"] for d in index.definitions("helper")] == ["main.py"]
+        assert index.definitions("Cache") == []
+
+    def test_persistence(self, index, tmp_path):
+        from core.symbol_index import SymbolIndex
+        index.save()
+
+        loaded = SymbolIndex(tmp_path / "sym.json")
+
+        assert loaded.digest("web/app.js") == "h2"
+        assert [d["name"] for d in loaded.file_symbols("main.py")] == []
+        assert [d["name"] for d in loaded.file_symbols("lib/cache.py")][:2] == ["LIMIT", "Cache"]
+
+
+def write(root, rel, content, age=60):
+    path = root / rel
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content)
+    past = time.time() - age
+    os.utime(path, (past, past))
+
+
+class TestRepoSymbols:
+    @pytest.fixture
+    def indexer(self, tmp_path, monkeypatch):
+        from core import repo_indexer
+        monkeypatch.setenv("REPO_INDEX_DIR", str(tmp_path / "index"))
+        monkeypatch.setenv("REPO_INDEX_REFRESH_INTERVAL", "0")
+        monkeypatch.setattr(repo_indexer, "_file_indexes", {})
+        root = tmp_path / "repo"
+        write(root, "lib/cache.py", PY_SOURCE)
+        write(root, "web/app.js", JS_SOURCE)
+        write(root, "README.md", "def helper en un README")
+        return repo_indexer.RepoIndexer(root)
+
+    def test_go_to_definition_follows_edits(self, indexer):
+        assert [d["path"] for d in indexer.find_definitions("helper")] == ["lib/cache.py"]
+        assert indexer.symbol_index().paths() == {"lib/cache.py", "web/app.js"}
+
+        write(indexer.repo_path, "lib/cache.py", "def otro(): pass\n", age=30)
+        write(indexer.repo_path, "lib/nuevo.py", "def helper(): pass\n")
+
+        assert [d["path"] for d in indexer.find_definitions("helper")] == ["lib/nuevo.py"]
+        assert indexer.find_references("LIMIT") == []
+
+    def test_large_first_build_runs_in_background(self, indexer):
+        file_index = indexer.file_index
+        file_index.trigram_sync_max = 1
+
+        assert indexer.find_definitions("helper") is None
+        file_index._builders["symbols"].join(timeout=5)
+
+        assert [d["line"] for d in indexer.find_definitions("helper")] == [12]
+
+    def test_find_usages_uses_the_index(self, indexer):
+        from core.legacy_v1_archive.ai_core_engine import ChangeImpactAnalyzer
+        analyzer = ChangeImpactAnalyzer(str(indexer.repo_path))
+
+        assert analyzer.find_usages("lib/cache.py", "cambia def helper") == [
+            {"file": "lib/cache.py", "line": "10", "usage": "helper"}]
+
+
+class TestFindSymbolTool:
+    @pytest.fixture
+    def project(self, tmp_path, monkeypatch):
+        from core import repo_indexer
+        monkeypatch.setenv("REPO_INDEX_DIR", str(tmp_path / "index"))
+        monkeypatch.setattr(repo_indexer, "_file_indexes", {})
+        write(tmp_path, "ws/repo/lib/cache.py", PY_SOURCE)
+        write(tmp_path, "sandbox/ws/repo/lib/cache.py", "def helper(): pass\n")
+        return tmp_path
+
+    def body(self, project, sandbox_mode=False):
+        from core.nervous_system import NervousSystem
+        return NervousSystem(project_root=str(project), sandbox_mode=sandbox_mode,
+                             user_workspace=str(project / "ws"))
+
+    def test_repo_path(self, project):
+        result = self.body(project).symbols("ws/repo", "helper", references=True)
+
+        assert [(d["path"], d["line"]) for d in result["definitions"]] == [("lib/cache.py", 12)]
+        assert [r["line"] for r in result["references"]] == [10]
+
+    @pytest.mark.parametrize("path", [None, "ws"])
+    def test_requires_a_repository(self, project, path):
+        result = self.body(project).symbols(path, "helper")
+
+        assert result["success"] is False
+
+    def test_sandbox_reads_the_simulated_copy(self, project):
+        result = self.body(project, sandbox_mode=True).symbols("ws/repo", "helper")
+
+        assert [d["line"] for d in result["definitions"]] == [1]
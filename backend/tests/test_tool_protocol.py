@@ -0,0 +1,93 @@
+"""
+Tests para el protocolo de herramientas (core/tool_protocol.py)
+"""
+
+import json
+
+
+class TestParseToolJson:
+    def test_plain_json(self):
+        from core.tool_protocol import parse_tool_json
+        assert parse_tool_json('{"name": "read_file", "args": {"path": "a"}}') == {
+            "name": "read_file", "args": {"path": "a"}
+        }
+
+    def test_repairs_common_mistakes(self):
+        from core.tool_protocol import parse_tool_json
+        expected = {"name": "list_dir", "args": {"path": "."}}
+
+        assert parse_tool_json('```json\n{"name": "list_dir", "args": {"path": "."}}\n```') == expected
+        assert parse_tool_json('Voy a listar: {"name": "list_dir", "args": {"path": "."}} y sigo') == expected
+        assert parse_tool_json('{"name": "list_dir", "args": {"path": ".",},}') == expected
+        assert parse_tool_json("{'name': 'list_dir', 'args': {'path': '.'}}") == expected
+
+    def test_unreadable(self):
+        from core.tool_protocol import parse_tool_json
+        assert parse_tool_json('{"name": "read_file", "args": {"path": ') is None
+        assert parse_tool_json("") is None
+        assert parse_tool_json("[1, 2]") is None
+
+    def test_broken_python_literals_are_unreadable(self):
+        from core.tool_protocol import parse_tool_json
+        assert parse_tool_json("{[1]: 2}") is None
+        assert parse_tool_json("{'a': {1, [2]}}") is None
+        assert parse_tool_json('{"a": ' + "[" * 100000 + "]" * 100000 + "}") is None
+
+
+class TestToolCallAssembler:
+    def delta(self, index, name=None, arguments=""):
+        function = {"arguments": arguments}
+        if name:
+            function["name"] = name
+        return {"tool_calls": [{"index": index, "function": function}]}
+
+    def test_streamed_arguments(self):
+        from core.tool_protocol import ToolCallAssembler
+        assembler = ToolCallAssembler()
+
+        assert assembler.feed_openai_delta(self.delta(0, "read_file", '{"pa')) == []
+        assert assembler.feed_openai_delta(self.delta(1, "list_dir", "{}")) == [1]
+        assert assembler.feed_openai_delta(self.delta(0, arguments='th": "a}.py"}')) == [0]
+
+        assert [json.loads(c) for c in assembler.calls()] == [
+            {"name": "read_file", "args": {"path": "a}.py"}},
+            {"name": "list_dir", "args": {}},
+        ]
+
+    def test_truncated_arguments_are_kept_as_text(self):
+        from core.tool_protocol import ToolCallAssembler
+        assembler = ToolCallAssembler()
+        assembler.feed_openai_delta(self.delta(0, "read_file", '{"path": "a'))
+
+        assert not assembler.is_complete(0)
+        assert json.loads(assembler.calls()[0])["args"] == '{"path": "a'
+
+    def test_whole_calls(self):
+        from core.tool_protocol import ToolCallAssembler
+        assembler = ToolCallAssembler()
+        assembler.add("web_search", {"query": "flask sse"})
+
+        assert assembler.is_complete(0)
+        assert json.loads(assembler.calls()[0]) == {"name": "web_search", "args": {"query": "flask sse"}}
+
+
+class TestProviderFormats:
+    def test_openai_message(self):
+        from core.tool_protocol import openai_tool_calls
+        message = {"content": None, "tool_calls": [
+            {"id": "c1", "type": "function", "function": {"name": "read_file", "arguments": '{"path": "x"}'}}
+        ]}
+
+        assert [json.loads(c) for c in openai_tool_calls(message)] == [{"name": "read_file", "args": {"path": "x"}}]
+
+    def test_gemini_parts(self):
+        from core.tool_protocol import gemini_tool_calls
+        parts = [{"text": "miro"}, {"functionCall": {"name": "list_dir", "args": {"path": "src"}}}]
+
+        assert [json.loads(c) for c in gemini_tool_calls(parts)] == [{"name": "list_dir", "args": {"path": "src"}}]
+
+    def test_tool_definitions(self):
+        from core.tool_protocol import TOOL_SPECS, openai_tools, gemini_tools
+
+        assert openai_tools()[0] == {"type": "function", "function": TOOL_SPECS[0]}
+        assert gemini_tools()[0]["functionDeclarations"] == TOOL_SPECS
@@ -0,0 +1,87 @@
+"""
+Tests para el índice de trigramas (core/trigram_index.py)
+"""
+
+import pytest
+
+
+class TestQueryTrigrams:
+    def test_literal(self):
+        from core.trigram_index import query_trigrams
+        assert query_trigrams("Def handle") == {"def", "han", "and", "ndl", "dle"}
+        assert query_trigrams("ab") is None
+        assert query_trigrams("a->b") is None
+
+    @pytest.mark.parametrize("pattern, runs", [
+        (r"def\s+handle_\w+", ["def", "handle_"]),
+        (r"^import (os|sys)$", ["import "]),
+        (r"(?:get|post)_user", ["_user"]),
+        (r"colou?r", ["colo", "r"]),
+        (r"(abc)+xyz", ["abc", "xyz"]),
+        (r"a.*b", ["a", "b"]),
+    ])
+    def test_required_literals(self, pattern, runs):
+        from core.trigram_index import required_literals
+        assert required_literals(pattern) == runs
+
+    def test_regex_without_literals_cannot_narrow(self):
+        from core.trigram_index import query_trigrams
+        assert query_trigrams(r"\w+\s*=\s*\d+", regex=True) is None
+        assert query_trigrams(r"(unclosed", regex=True) is None
+
+
+class TestTrigramIndex:
+    @pytest.fixture
+    def index(self, tmp_path):
+        from core.trigram_index import TrigramIndex
+        index = TrigramIndex(tmp_path / "tri.json")
+        index.update("a.py", "def Handler(): pass", "h1")
+        index.update("b.py", "import os", "h2")
+        return index
+
+    def test_candidates(self, index):
+        assert index.candidates("handler") == {"a.py"}
+        assert index.candidates("import") == {"b.py"}
+        assert index.candidates("nada que ver") == set()
+        assert index.candidates("os") is None
+        assert index.candidates(r"def\s+handler", regex=True) == {"a.py"}
+
+    @pytest.mark.parametrize("text, query", [
+        ("ciudad = 'İstanbul'", "istanbul"),
+        ("ıstanbul", "ISTANBUL"),
+        ("ſtrada", "STRADA"),
+    ])
+    def test_ignorecase_regex_is_not_narrowed_away(self, index, text, query):
+        import re
+        assert re.search(query, text, re.IGNORECASE)
+        index.update("c.py", text, "h4")
+
+        candidates = index.candidates(query, regex=True)
+        assert candidates is not None and "c.py" in candidates
+
+    def test_fold_follows_regex_ignorecase(self):
+        from core.trigram_index import trigrams
+        assert trigrams("ΟΔΟΣ") == trigrams("οδοσ") == trigrams("οδος")
+
+    def test_non_ascii_regex_cannot_narrow(self):
+        from core.trigram_index import query_trigrams
+        assert query_trigrams("İstanbul", regex=True) is None
+        assert query_trigrams("İstanbul") is not None
+
+    def test_update_and_remove(self, index):
+        index.update("a.py", "import sys", "h3")
+        index.remove("b.py")
+
+        assert index.candidates("handler") == set()
+        assert index.candidates("import") == {"a.py"}
+        assert index.digest("a.py") == "h3"
+
+    def test_persisted(self, index, tmp_path):
+        from core.trigram_index import TrigramIndex
+        index.save()
+
+        reloaded = TrigramIndex(tmp_path / "tri.json")
+
+        assert reloaded.candidates("handler") == {"a.py"}
+        assert reloaded.digest("b.py") == "h2"
+        assert reloaded.snapshot() == index.snapshot()
@@ -0,0 +1,227 @@
+"""
+Tests para el watcher de workspaces (core/workspace_watcher.py)
+"""
+
+import os
+import time
+import threading
+import pytest
+
+
+def write(root, rel, content="x", age=60):
+    path = root / rel
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content)
+    past = time.time() - age
+    os.utime(path, (past, past))
+    return path
+
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    from core import repo_indexer
+    monkeypatch.setenv("REPO_INDEX_DIR", str(tmp_path / "index"))
+    monkeypatch.setattr(repo_indexer, "_file_indexes", {})
+    root = tmp_path / "ws"
+    write(root, "repo/app.py", "print('hola')")
+    write(root, "repo/README.md", "# demo")
+    return root
+
+
+class Collector:
+    """Suscriptor que guarda los lotes y avisa cuando llega uno con `rel`"""
+
+    def __init__(self):
+        self.batches = []
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+
+    def __call__(self, batch):
+        with self._lock:
+            self.batches.append(batch)
+        self._event.set()
+
+    def wait_for(self, rel, timeout=5):
+        return self.wait_until(lambda batch: rel in batch.changes, timeout, f"sin cambios para {rel}")
+
+    def wait_until(self, predicate, timeout=5, message="sin lote"):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            with self._lock:
+                for batch in self.batches:
+                    if predicate(batch):
+                        return batch
+            self._event.wait(0.05)
+            self._event.clear()
+        raise AssertionError(f"{message}: {self.batches}")
+
+
+@pytest.fixture
+def make_watcher():
+    from core.workspace_watcher import WorkspaceWatcher, DEFAULT_HANDLERS
+    watchers = []
+
+    def make(**kwargs):
+        collector = Collector()
+        options = {"enabled": True, "debounce": 0.05, "poll_interval": 0.05, "handlers": list(DEFAULT_HANDLERS)}
+        options.update(kwargs)
+        watcher = WorkspaceWatcher(**options)
+        watcher.subscribe(collector)
+        watchers.append(watcher)
+        return watcher, collector
+
+    yield make
+    for watcher in watchers:
+        watcher.stop()
+
+
+class TestWorkspaceWatcher:
+    def test_disabled_by_default(self, workspace, monkeypatch):
+        from core.workspace_watcher import WorkspaceWatcher
+        monkeypatch.delenv("WORKSPACE_WATCHER", raising=False)
+
+        assert WorkspaceWatcher().watch(workspace) is False
+
+    @pytest.mark.parametrize("backend", ["auto", "poll"])
+    def test_changes_reach_the_repo_index(self, workspace, make_watcher, backend):
+        from core.repo_indexer import RepoIndexer
+        indexer = RepoIndexer(workspace / "repo")
+        indexer.index_repo()
+        watcher, collector = make_watcher(backend=backend)
+        assert watcher.watch(workspace)
+        time.sleep(0.2)
+
+        write(workspace, "repo/src/nuevo.py", "def aguja(): pass")
+        (workspace / "repo/app.py").unlink()
+        collector.wait_for("repo/app.py")
+        collector.wait_for("repo/src/nuevo.py")
+
+        assert sorted(indexer.file_index.files) == ["README.md", "src/nuevo.py"]
+        assert [r["file"] for r in indexer.search_in_repo("aguja")] == ["src/nuevo.py"]
+
+    def test_watched_repo_is_not_walked(self, workspace, make_watcher):
+        from core.repo_indexer import RepoIndexer
+        watcher, collector = make_watcher()
+        watcher.watch(workspace)
+        if watcher.snapshot()["roots"][str(workspace.resolve())]["mode"] != "inotify":
+            pytest.skip("inotify no disponible")
+        indexer = RepoIndexer(workspace / "repo")
+        indexer.file_index.refresh_interval = 0
+        indexer.index_repo()
+
+        assert indexer.file_index.refresh()["cached"] is True
+
+    def test_burst_is_one_batch(self, workspace, make_watcher):
+        watcher, collector = make_watcher(debounce=0.3)
+        watcher.watch(workspace)
+        time.sleep(0.5)
+        collector.batches.clear()
+
+        for i in range(20):
+            write(workspace, f"repo/gen/f{i}.py")
+        batch = collector.wait_for("repo/gen/f19.py")
+
+        assert len(collector.batches) == 1
+        assert len([p for p in batch.changes if p.startswith("repo/gen/")]) == 20
+
+    def test_ignored_dirs_produce_no_events(self, workspace, make_watcher):
+        watcher, collector = make_watcher()
+        watcher.watch(workspace)
+        time.sleep(0.2)
+        collector.batches.clear()
+
+        write(workspace, "repo/node_modules/dep/index.js")
+        write(workspace, "repo/ok.py")
+        batch = collector.wait_for("repo/ok.py")
+
+        assert not [p for p in batch.changes if "node_modules" in p]
+
+    def test_large_batch_is_full(self, workspace, make_watcher):
+        watcher, collector = make_watcher(bulk=3)
+        watcher.watch(workspace)
+        time.sleep(0.2)
+
+        for i in range(5):
+            write(workspace, f"repo/f{i}.py")
+
+        assert collector.wait_for("repo/f4.py").full is True
+
+    @pytest.mark.parametrize("error", ["ENOSPC", "EACCES"])
+    def test_unwatchable_new_dir_falls_back_to_poll(self, workspace, make_watcher, error):
+        import errno
+        from core.fs_scanner import fs_scanner
+        from core.repo_indexer import RepoIndexer
+        indexer = RepoIndexer(workspace / "repo")
+        indexer.index_repo()
+        watcher, collector = make_watcher()
+        watcher.watch(workspace)
+        root = str(workspace.resolve())
+        if watcher.snapshot()["roots"][root]["mode"] != "inotify":
+            pytest.skip("inotify no disponible")
+        time.sleep(0.2)
+        collector.batches.clear()
+
+        def fail(path, mask=None):
+            code = getattr(errno, error)
+            raise OSError(code, os.strerror(code), path)
+        watcher._inotify.add_watch = fail
+        write(workspace, "repo/nuevo/a.py", "def aguja(): pass")
+        collector.wait_until(lambda batch: batch.full, message="sin lote completo")
+
+        state = watcher.snapshot()["roots"][root]
+        assert (state["mode"], state["watches"]) == ("poll", 0)
+        assert not fs_scanner.is_watched(workspace)
+        assert "nuevo/a.py" in indexer.file_index.files
+
+        # El sondeo sigue viendo los cambios del directorio sin watch
+        write(workspace, "repo/nuevo/b.py", "def pajar(): pass", age=0)
+        collector.wait_for("repo/nuevo/b.py")
+        assert [r["file"] for r in indexer.search_in_repo("pajar")] == ["nuevo/b.py"]
+
+
+    def test_unwatchable_dir_at_start_uses_poll(self, workspace, make_watcher, monkeypatch):
+        import errno
+        from core import workspace_watcher as module
+        (workspace / "repo/privado").mkdir()
+        real = module.Inotify.add_watch
+
+        def add_watch(self, path, mask=module.WATCH_MASK):
+            if path.endswith("privado"):
+                raise OSError(errno.EACCES, "Permission denied", path)
+            return real(self, path, mask)
+        monkeypatch.setattr(module.Inotify, "add_watch", add_watch)
+        watcher, collector = make_watcher()
+
+        assert watcher.watch(workspace)
+        assert watcher.snapshot()["roots"][str(workspace.resolve())]["mode"] == "poll"
+
+
+class TestApplyChanges:
+    def test_only_listed_paths_are_read(self, workspace, tmp_path):
+        from core.repo_indexer import FileIndex, RepoIndexer
+        repo = workspace / "repo"
+        index = FileIndex(repo, RepoIndexer.IGNORE_DIRS, RepoIndexer.CODE_EXTENSIONS, RepoIndexer.IMPORTANT_FILES,
+                          index_dir=str(tmp_path / "index"), refresh_interval=0)
+        index.refresh()
+        write(repo, "app.py", "print('adios')")
+        write(repo, "lib/a.py")
+        write(repo, "lib/b.py")
+
+        stats = index.apply_changes(["app.py", "lib"])
+
+        assert (stats["modified"], stats["added"], stats["hashed"]) == (1, 2, 3)
+        assert sorted(index.files) == ["README.md", "app.py", "lib/a.py", "lib/b.py"]
+        assert index.dirs == ["lib"]
+
+
+class TestIdeBasePath:
+    @pytest.mark.parametrize("user_id, watched", [("demo_user", True), ("..", False), ("../etc", False),
+                                                   ("a/b", False), (".", False), ("", False)])
+    def test_only_user_workspaces_are_watched(self, monkeypatch, user_id, watched):
+        from backend.api import ide_routes
+        calls = []
+        monkeypatch.setattr(ide_routes.workspace_watcher, "watch", calls.append)
+
+        ide_routes.get_base_path(user_id)
+
+        assert bool(calls) is watched
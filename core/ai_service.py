@@ -7,11 +7,30 @@ All providers offer free tiers
 import os
 import json
 import logging
+import re
 import time
-from datetime import datetime
-from typing import Optional, Dict, List, Any, Union
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Optional, Dict, List, Any, Union, Iterator
 from abc import ABC, abstractmethod
-from backend.models import db, ModelBenchmark # Import db for bench
+from core.http_pool import get_session
+from core.provider_health import health_monitor
+from core.provider_router import provider_router
+from core.benchmark_writer import benchmark_writer
+from core.response_cache import response_cache
+from core.prompt_builder import intern_block, assemble, split_static, prompt_stats
+from core.context_window import context_window, TOOL_RESULT_PREFIX
+from core.conversation_store import ConversationStore
+from core.conversation_backends import create_shared_backend
+from core.conversation_writer import ConversationWriter
+from core.db_pool import db_connection, placeholder
+from core.legacy_v1_archive.streaming_service import StreamEvent, StreamEventType
+from core.fast_path import fast_path
+from core.keyword_matcher import keyword_screens
+from core.workspace_watcher import workspace_watcher
+from core.tool_protocol import (
+    TOOL_SPECS, ToolCallAssembler, openai_tools, gemini_tools, openai_tool_calls,
+    gemini_tool_calls, render_tool_tags, parse_tool_json, tool_call_stats
+)
 
 logger = logging.getLogger(__name__)
 
@@ -20,7 +39,7 @@ db_manager = None
 
 # NÚCLEO SINGULARIDAD (Gravity v3)
 from core.singularity import singularity
-from core.nervous_system import nervous_system
+from core.nervous_system import NervousSystem
 from core.gravity_core import gravity_core
 
 try:
@@ -29,9 +48,97 @@ try:
 except ImportError:
     flow_logger = None
 
+def _cached_prompt_tokens(result: Dict) -> int:
+    """Tokens del prompt servidos desde la caché de prefijos del proveedor (OpenAI/DeepSeek)"""
+    usage = result.get("usage") or {}
+    details = usage.get("prompt_tokens_details") or {}
+    return details.get("cached_tokens") or usage.get("prompt_cache_hit_tokens") or 0
+
+
+def _openai_stream(provider, messages: List[Dict], system_prompt: Optional[str],
+                   timeout: int, tools: Optional[List[Dict]] = None,
+                   assembler: Optional[ToolCallAssembler] = None) -> Iterator[str]:
+    """
+    Fragmentos de texto de una API compatible con OpenAI en modo stream (SSE).
+    Con `tools`, los trozos de `delta.tool_calls` van al `assembler`.
+    """
+    chat_messages = []
+    if system_prompt:
+        chat_messages.append({"role": "system", "content": system_prompt})
+    chat_messages.extend(messages)
+    
+    response = provider.session.post(
+        provider.base_url,
+        headers={
+            "Authorization": f"Bearer {provider.api_key}",
+            "Content-Type": "application/json"
+        },
+        json={
+            "model": provider.model,
+            "messages": chat_messages,
+            "temperature": provider.temperature,
+            "max_tokens": 8192,
+            "stream": True,
+            **({"tools": openai_tools(tools)} if tools else {})
+        },
+        stream=True,
+        timeout=timeout
+    )
+    with response:
+        if response.status_code != 200:
+            raise RuntimeError(f"HTTP {response.status_code}")
+        for line in response.iter_lines():
+            if not line.startswith(b"data: "):
+                continue
+            data = line[6:]
+            if data == b"[DONE]":
+                break
+            try:
+                chunk = json.loads(data)
+            except ValueError:
+                continue
+            delta = (chunk.get("choices") or [{}])[0].get("delta") or {}
+            if assembler is not None and delta.get("tool_calls"):
+                assembler.feed_openai_delta(delta)
+            content = delta.get("content")
+            if content:
+                yield content
+
+
+def _response_chunks(provider, messages: List[Dict], system_prompt: Optional[str],
+                     tools: Optional[List[Dict]] = None,
+                     assembler: Optional[ToolCallAssembler] = None) -> Iterator[str]:
+    """
+    Respuesta del proveedor en fragmentos. Los proveedores sin stream_chat
+    entregan la respuesta completa de chat() como un único fragmento.
+    Las herramientas sólo se ofrecen a proveedores con function calling
+    (`supports_tools`); sus llamadas nativas acaban en el `assembler`.
+    """
+    native = tools if tools and getattr(provider, "supports_tools", False) else None
+    stream_chat = getattr(provider, "stream_chat", None)
+    if stream_chat is not None:
+        if native:
+            yield from stream_chat(messages, system_prompt, tools=native, assembler=assembler)
+        else:
+            yield from stream_chat(messages, system_prompt)
+        return
+    result = provider.chat(messages, system_prompt, tools=native) if native else provider.chat(messages, system_prompt)
+    if not result.get("success"):
+        raise RuntimeError(result.get("error") or "respuesta fallida")
+    if assembler is not None:
+        for call in result.get("tool_calls") or []:
+            call = json.loads(call)
+            assembler.add(call["name"], call["args"])
+    yield result.get("response", "")
+
+
 class AIProvider(ABC):
     """Base class for AI providers"""
     
+    temperature: float = 0.7
+    # Function calling nativo: chat/stream_chat aceptan `tools` (TOOL_SPECS)
+    supports_tools: bool = False
+    
     def __init__(self, api_key: str):
         self.api_key = api_key
         self.name = "base"
@@ -43,12 +150,23 @@ class AIProvider(ABC):
         pass
     
     def is_available(self) -> bool:
-        return self.available
+        return self.available and health_monitor.is_available(self.name)
+    
+    def probe(self) -> Optional[bool]:
+        """Chequeo activo de salud. None = sin chequeo, depende del tráfico real"""
+        return None
+    
+    @property
+    def session(self):
+        """Sesión HTTP compartida (keep-alive) de este proveedor"""
+        return get_session(self.name)
 
 
 class DeepSeekV32Provider(AIProvider):
     """DeepSeek V3.2 via Hugging Face - Main AI Model"""
     
+    temperature = 0.75
+    
     def __init__(self, api_key: str):
         super().__init__(api_key)
         self.name = "deepseek-v3.2"
@@ -57,8 +175,6 @@ class DeepSeekV32Provider(AIProvider):
     
     def chat(self, messages: List[Dict], system_prompt: Optional[str] = None) -> Dict:
         try:
-            import requests
-            
             prompt = ""
             if system_prompt:
                 prompt = f"<|system|>\n{system_prompt}<|end|>\n"
@@ -73,14 +189,14 @@ class DeepSeekV32Provider(AIProvider):
             
             prompt += "<|assistant|>\n"
             
-            response = requests.post(
+            response = self.session.post(
                 f"{self.base_url}/{self.model}",
                 headers={"Authorization": f"Bearer {self.api_key}"},
                 json={
                     "inputs": prompt,
                     "parameters": {
                         "max_new_tokens": 4096,
-                        "temperature": 0.75,
+                        "temperature": self.temperature,
                         "top_p": 0.92,
                         "return_full_text": False,
                         "do_sample": True,
@@ -117,8 +233,6 @@ class HuggingFaceProvider(AIProvider):
     
     def chat(self, messages: List[Dict], system_prompt: Optional[str] = None) -> Dict:
         try:
-            import requests
-            
             prompt = ""
             if system_prompt:
                 prompt = f"<|system|>\n{system_prompt}</s>\n"
@@ -133,14 +247,14 @@ class HuggingFaceProvider(AIProvider):
             
             prompt += "<|assistant|>\n"
             
-            response = requests.post(
+            response = self.session.post(
                 f"{self.base_url}/{self.model}",
                 headers={"Authorization": f"Bearer {self.api_key}"},
                 json={
                     "inputs": prompt,
                     "parameters": {
                         "max_new_tokens": 1024,
-                        "temperature": 0.7,
+                        "temperature": self.temperature,
                         "return_full_text": False
                     }
                 },
@@ -164,22 +278,23 @@ class HuggingFaceProvider(AIProvider):
 class GroqProvider(AIProvider):
     """Groq API - Free tier, very fast inference - Using Llama 3.3 70B"""
     
+    supports_tools = True
+    
     def __init__(self, api_key: str):
         super().__init__(api_key)
         self.name = "groq"
         self.model = "llama-3.3-70b-versatile"
         self.base_url = "https://api.groq.com/openai/v1/chat/completions"
     
-    def chat(self, messages: List[Dict], system_prompt: Optional[str] = None) -> Dict:
+    def chat(self, messages: List[Dict], system_prompt: Optional[str] = None,
+             tools: Optional[List[Dict]] = None) -> Dict:
         try:
-            import requests
-            
             chat_messages = []
             if system_prompt:
                 chat_messages.append({"role": "system", "content": system_prompt})
             chat_messages.extend(messages)
             
-            response = requests.post(
+            response = self.session.post(
                 self.base_url,
                 headers={
                     "Authorization": f"Bearer {self.api_key}",
@@ -188,37 +303,82 @@ class GroqProvider(AIProvider):
                 json={
                     "model": self.model,
                     "messages": chat_messages,
-                    "temperature": 0.7,
-                    "max_tokens": 8192
+                    "temperature": self.temperature,
+                    "max_tokens": 8192,
+                    **({"tools": openai_tools(tools)} if tools else {})
                 },
                 timeout=60
             )
             
             if response.status_code == 200:
                 result = response.json()
-                text = result.get("choices", [{}])[0].get("message", {}).get("content", "")
-                return {"success": True, "response": text, "provider": self.name}
+                message = result.get("choices", [{}])[0].get("message", {})
+                return {"success": True, "response": message.get("content") or "", "provider": self.name,
+                        "tool_calls": openai_tool_calls(message),
+                        "cached_tokens": _cached_prompt_tokens(result)}
             else:
                 return {"success": False, "error": f"HTTP {response.status_code}", "provider": self.name}
                 
         except Exception as e:
             logger.error(f"Groq error: {e}")
             return {"success": False, "error": str(e), "provider": self.name}
+    
+    def stream_chat(self, messages: List[Dict], system_prompt: Optional[str] = None,
+                    tools: Optional[List[Dict]] = None, assembler: Optional[ToolCallAssembler] = None) -> Iterator[str]:
+        return _openai_stream(self, messages, system_prompt, timeout=60, tools=tools, assembler=assembler)
 
 
 class GeminiProvider(AIProvider):
     """Google Gemini API - Using Gemini 2.0 Flash for speed and quality"""
     
+    supports_tools = True
+    
+    # cachedContent solo compensa (y la API solo lo acepta) a partir de cierto tamaño
+    CACHE_MIN_TOKENS = int(os.environ.get('GEMINI_CACHE_MIN_TOKENS', '4096'))
+    CACHE_TTL = int(os.environ.get('GEMINI_CACHE_TTL', '3600'))
+    
     def __init__(self, api_key: str):
         super().__init__(api_key)
         self.name = "gemini"
         self.model = "gemini-2.0-flash"
         self.base_url = "https://generativelanguage.googleapis.com/v1beta/models"
+        self._content_cache: Dict[str, tuple] = {}
     
-    def chat(self, messages: List[Dict], system_prompt: Optional[str] = None) -> Dict:
+    def _cached_content(self, block) -> Optional[str]:
+        """Nombre del cachedContent de Gemini para un bloque estático (lo crea si no existe)"""
+        entry = self._content_cache.get(block.digest)
+        if entry and entry[1] > time.time():
+            return entry[0]
+        
+        api_root = self.base_url.rsplit("/models", 1)[0]
+        try:
+            response = self.session.post(
+                f"{api_root}/cachedContents?key={self.api_key}",
+                headers={"Content-Type": "application/json"},
+                json={
+                    "model": f"models/{self.model}",
+                    "systemInstruction": {"parts": [{"text": block.text}]},
+                    "ttl": f"{self.CACHE_TTL}s"
+                },
+                timeout=30
+            )
+            if response.status_code == 200:
+                name = response.json().get("name")
+                # Margen para no usar un cachedContent a punto de expirar
+                self._content_cache[block.digest] = (name, time.time() + self.CACHE_TTL - 60)
+                logger.info(f"Gemini cachedContent creado para '{block.name}': {name}")
+                return name
+            logger.debug(f"Gemini cachedContent HTTP {response.status_code}: {response.text}")
+        except Exception as e:
+            logger.debug(f"Gemini cachedContent error: {e}")
+        
+        # No reintentar en cada llamada si la API lo rechaza
+        self._content_cache[block.digest] = (None, time.time() + 300)
+        return None
+    
+    def chat(self, messages: List[Dict], system_prompt: Optional[str] = None,
+             tools: Optional[List[Dict]] = None) -> Dict:
         try:
-            import requests
-            
             contents = []
             for msg in messages:
                 role = "user" if msg.get("role") == "user" else "model"
@@ -229,15 +389,29 @@ class GeminiProvider(AIProvider):
             
             payload = {"contents": contents}
             
-            if system_prompt:
+            static, dynamic = split_static(system_prompt)
+            cached_name = None
+            # Una petición con cachedContent no admite tools propias
+            if static and static.tokens >= self.CACHE_MIN_TOKENS and not tools:
+                cached_name = self._cached_content(static)
+            
+            if cached_name:
+                # Con cachedContent la API no admite systemInstruction: el resto dinámico va como primer turno
+                payload["cachedContent"] = cached_name
+                if dynamic:
+                    contents.insert(0, {"role": "user", "parts": [{"text": dynamic}]})
+            elif system_prompt:
                 payload["systemInstruction"] = {"parts": [{"text": system_prompt}]}
             
+            if tools:
+                payload["tools"] = gemini_tools(tools)
+            
             payload["generationConfig"] = {
-                "temperature": 0.7,
+                "temperature": self.temperature,
                 "maxOutputTokens": 8192
             }
             
-            response = requests.post(
+            response = self.session.post(
                 f"{self.base_url}/{self.model}:generateContent?key={self.api_key}",
                 headers={"Content-Type": "application/json"},
                 json=payload,
@@ -249,10 +423,16 @@ class GeminiProvider(AIProvider):
                 logger.info(f"Gemini raw response: {result}")
                 candidates = result.get("candidates", [])
                 if candidates:
-                    text = candidates[0].get("content", {}).get("parts", [{}])[0].get("text", "")
-                    return {"success": True, "response": text, "provider": self.name}
+                    parts = candidates[0].get("content", {}).get("parts", [{}])
+                    text = "".join(part.get("text", "") for part in parts)
+                    cached_tokens = result.get("usageMetadata", {}).get("cachedContentTokenCount", 0)
+                    return {"success": True, "response": text, "provider": self.name,
+                            "tool_calls": gemini_tool_calls(parts), "cached_tokens": cached_tokens}
                 return {"success": False, "error": "No candidates in response", "provider": self.name}
             else:
+                if cached_name:
+                    # cachedContent expirado o inválido: se recreará en la próxima llamada
+                    self._content_cache.pop(static.digest, None)
                 error_text = response.text
                 logger.error(f"Gemini HTTP {response.status_code}: {error_text}")
                 return {"success": False, "error": f"HTTP {response.status_code}: {error_text}", "provider": self.name}
@@ -265,22 +445,23 @@ class GeminiProvider(AIProvider):
 class CerebrasProvider(AIProvider):
     """Cerebras API - Using Llama 3.3 70B for best reasoning"""
     
+    supports_tools = True
+    
     def __init__(self, api_key: str):
         super().__init__(api_key)
         self.name = "cerebras"
         self.model = "llama-3.3-70b"
         self.base_url = "https://api.cerebras.ai/v1/chat/completions"
     
-    def chat(self, messages: List[Dict], system_prompt: Optional[str] = None) -> Dict:
+    def chat(self, messages: List[Dict], system_prompt: Optional[str] = None,
+             tools: Optional[List[Dict]] = None) -> Dict:
         try:
-            import requests
-            
             chat_messages = []
             if system_prompt:
                 chat_messages.append({"role": "system", "content": system_prompt})
             chat_messages.extend(messages)
             
-            response = requests.post(
+            response = self.session.post(
                 self.base_url,
                 headers={
                     "Authorization": f"Bearer {self.api_key}",
@@ -289,43 +470,51 @@ class CerebrasProvider(AIProvider):
                 json={
                     "model": self.model,
                     "messages": chat_messages,
-                    "temperature": 0.7,
-                    "max_tokens": 8192
+                    "temperature": self.temperature,
+                    "max_tokens": 8192,
+                    **({"tools": openai_tools(tools)} if tools else {})
                 },
                 timeout=90
             )
             
             if response.status_code == 200:
                 result = response.json()
-                text = result.get("choices", [{}])[0].get("message", {}).get("content", "")
-                return {"success": True, "response": text, "provider": self.name}
+                message = result.get("choices", [{}])[0].get("message", {})
+                return {"success": True, "response": message.get("content") or "", "provider": self.name,
+                        "tool_calls": openai_tool_calls(message),
+                        "cached_tokens": _cached_prompt_tokens(result)}
             else:
                 return {"success": False, "error": f"HTTP {response.status_code}", "provider": self.name}
                 
         except Exception as e:
             logger.error(f"Cerebras error: {e}")
             return {"success": False, "error": str(e), "provider": self.name}
+    
+    def stream_chat(self, messages: List[Dict], system_prompt: Optional[str] = None,
+                    tools: Optional[List[Dict]] = None, assembler: Optional[ToolCallAssembler] = None) -> Iterator[str]:
+        return _openai_stream(self, messages, system_prompt, timeout=90, tools=tools, assembler=assembler)
 
 
 class OpenAIProvider(AIProvider):
     """OpenAI GPT API"""
     
+    supports_tools = True
+    
     def __init__(self, api_key: str):
         super().__init__(api_key)
         self.name = "openai"
         self.model = "gpt-4o-mini"
         self.base_url = "https://api.openai.com/v1/chat/completions"
     
-    def chat(self, messages: List[Dict], system_prompt: Optional[str] = None) -> Dict:
+    def chat(self, messages: List[Dict], system_prompt: Optional[str] = None,
+             tools: Optional[List[Dict]] = None) -> Dict:
         try:
-            import requests
-            
             chat_messages = []
             if system_prompt:
                 chat_messages.append({"role": "system", "content": system_prompt})
             chat_messages.extend(messages)
             
-            response = requests.post(
+            response = self.session.post(
                 self.base_url,
                 headers={
                     "Authorization": f"Bearer {self.api_key}",
@@ -334,22 +523,29 @@ class OpenAIProvider(AIProvider):
                 json={
                     "model": self.model,
                     "messages": chat_messages,
-                    "temperature": 0.7,
-                    "max_tokens": 8192
+                    "temperature": self.temperature,
+                    "max_tokens": 8192,
+                    **({"tools": openai_tools(tools)} if tools else {})
                 },
                 timeout=60
             )
             
             if response.status_code == 200:
                 result = response.json()
-                text = result.get("choices", [{}])[0].get("message", {}).get("content", "")
-                return {"success": True, "response": text, "provider": self.name}
+                message = result.get("choices", [{}])[0].get("message", {})
+                return {"success": True, "response": message.get("content") or "", "provider": self.name,
+                        "tool_calls": openai_tool_calls(message),
+                        "cached_tokens": _cached_prompt_tokens(result)}
             else:
                 return {"success": False, "error": f"HTTP {response.status_code}", "provider": self.name}
                 
         except Exception as e:
             logger.error(f"OpenAI error: {e}")
             return {"success": False, "error": str(e), "provider": self.name}
+    
+    def stream_chat(self, messages: List[Dict], system_prompt: Optional[str] = None,
+                    tools: Optional[List[Dict]] = None, assembler: Optional[ToolCallAssembler] = None) -> Iterator[str]:
+        return _openai_stream(self, messages, system_prompt, timeout=60, tools=tools, assembler=assembler)
 
 
 class BaiduProvider(AIProvider):
@@ -363,8 +559,6 @@ class BaiduProvider(AIProvider):
     
     def chat(self, messages: List[Dict], system_prompt: Optional[str] = None) -> Dict:
         try:
-            import requests
-            
             chat_messages = []
             for msg in messages:
                 role = "user" if msg.get("role") == "user" else "assistant"
@@ -372,7 +566,7 @@ class BaiduProvider(AIProvider):
             
             payload = {"messages": chat_messages}
             
-            response = requests.post(
+            response = self.session.post(
                 f"{self.base_url}?access_token={self.api_key}",
                 headers={"Content-Type": "application/json"},
                 json=payload,
@@ -394,22 +588,23 @@ class BaiduProvider(AIProvider):
 class DeepSeekProvider(AIProvider):
     """DeepSeek API - UPGRADED for better reasoning with more tokens"""
     
+    supports_tools = True
+    
     def __init__(self, api_key: str):
         super().__init__(api_key)
         self.name = "deepseek"
         self.model = "deepseek-chat"
         self.base_url = "https://api.deepseek.com/chat/completions"
     
-    def chat(self, messages: List[Dict], system_prompt: Optional[str] = None) -> Dict:
+    def chat(self, messages: List[Dict], system_prompt: Optional[str] = None,
+             tools: Optional[List[Dict]] = None) -> Dict:
         try:
-            import requests
-            
             chat_messages = []
             if system_prompt:
                 chat_messages.append({"role": "system", "content": system_prompt})
             chat_messages.extend(messages)
             
-            response = requests.post(
+            response = self.session.post(
                 self.base_url,
                 headers={
                     "Authorization": f"Bearer {self.api_key}",
@@ -418,22 +613,29 @@ class DeepSeekProvider(AIProvider):
                 json={
                     "model": self.model,
                     "messages": chat_messages,
-                    "temperature": 0.7,
-                    "max_tokens": 8192
+                    "temperature": self.temperature,
+                    "max_tokens": 8192,
+                    **({"tools": openai_tools(tools)} if tools else {})
                 },
                 timeout=120
             )
             
             if response.status_code == 200:
                 result = response.json()
-                text = result.get("choices", [{}])[0].get("message", {}).get("content", "")
-                return {"success": True, "response": text, "provider": self.name}
+                message = result.get("choices", [{}])[0].get("message", {})
+                return {"success": True, "response": message.get("content") or "", "provider": self.name,
+                        "tool_calls": openai_tool_calls(message),
+                        "cached_tokens": _cached_prompt_tokens(result)}
             else:
                 return {"success": False, "error": f"HTTP {response.status_code}", "provider": self.name}
                 
         except Exception as e:
             logger.error(f"DeepSeek error: {e}")
             return {"success": False, "error": str(e), "provider": self.name}
+    
+    def stream_chat(self, messages: List[Dict], system_prompt: Optional[str] = None,
+                    tools: Optional[List[Dict]] = None, assembler: Optional[ToolCallAssembler] = None) -> Iterator[str]:
+        return _openai_stream(self, messages, system_prompt, timeout=120, tools=tools, assembler=assembler)
 
 
 class AntigravityBridgeProvider:
@@ -449,7 +651,10 @@ class AntigravityBridgeProvider:
         return self._provider.available
     
     def is_available(self) -> bool:
-        return self._provider.is_available()
+        return self.available and health_monitor.is_available(self.name)
+    
+    def probe(self) -> bool:
+        return self._provider.client.health_check(force=True)
     
     def chat(self, messages: List[Dict], system_prompt: Optional[str] = None) -> Dict:
         return self._provider.chat(messages, system_prompt) # type: ignore
@@ -461,6 +666,8 @@ class AntigravityBridgeProvider:
 class OllamaProvider(AIProvider):
     """Local Ollama API Provider - Running on user's PC"""
     
+    supports_tools = True
+    
     def __init__(self, model: str = None, base_url: str = None):
         super().__init__("local-ollama")
         self.name = "ollama"
@@ -469,11 +676,12 @@ class OllamaProvider(AIProvider):
         self.model = model or getattr(conf, 'OLLAMA_MODEL', 'llama3.2')
         self.base_url = (base_url or getattr(conf, 'OLLAMA_BASE_URL', 'http://localhost:11434')).rstrip('/') + '/api/chat'
         self.available = True # We check availability via health check
+        # Mantener el modelo cargado: Ollama reutiliza el KV cache del prefijo estable del system prompt
+        self.keep_alive = os.environ.get('OLLAMA_KEEP_ALIVE', '30m')
     
-    def is_available(self) -> bool:
+    def probe(self) -> bool:
+        """Health check real (invocado por el HealthMonitor, no en cada petición)"""
         try:
-            import requests
-            
             # Check for updated URL in DB (for multi-worker sync)
             try:
                 from backend.models import GlobalSetting
@@ -500,7 +708,7 @@ class OllamaProvider(AIProvider):
             }
             
             try:
-                response = requests.get(check_url, timeout=5, headers=headers)
+                response = self.session.get(check_url, timeout=5, headers=headers)
                 is_up = response.status_code in [200, 404] # 404 is still "up" (Ollama returns 404 on root)
                 if not is_up:
                     logger.warning(f"Ollama health check returned {response.status_code} for {check_url}")
@@ -512,10 +720,9 @@ class OllamaProvider(AIProvider):
             logger.debug(f"Ollama health check failed: {e}")
             return False
 
-    def chat(self, messages: List[Dict], system_prompt: Optional[str] = None) -> Dict:
+    def chat(self, messages: List[Dict], system_prompt: Optional[str] = None,
+             tools: Optional[List[Dict]] = None) -> Dict:
         try:
-            import requests
-            
             chat_messages = []
             if system_prompt:
                 chat_messages.append({"role": "system", "content": system_prompt})
@@ -527,30 +734,78 @@ class OllamaProvider(AIProvider):
                     "content": msg.get("content", "")
                 })
             
-            response = requests.post(
+            response = self.session.post(
                 self.base_url,
                 json={
                     "model": self.model,
                     "messages": chat_messages,
                     "stream": False,
+                    "keep_alive": self.keep_alive,
                     "options": {
-                        "temperature": 0.7,
+                        "temperature": self.temperature,
                         "num_predict": 4096
-                    }
+                    },
+                    **({"tools": openai_tools(tools)} if tools else {})
                 },
                 timeout=180
             )
             
             if response.status_code == 200:
                 result = response.json()
-                text = result.get("message", {}).get("content", "")
-                return {"success": True, "response": text, "provider": self.name}
+                message = result.get("message", {})
+                return {"success": True, "response": message.get("content") or "", "provider": self.name,
+                        "tool_calls": openai_tool_calls(message)}
             else:
                 return {"success": False, "error": f"Ollama HTTP {response.status_code}", "provider": self.name}
                 
         except Exception as e:
             logger.error(f"Ollama error: {e}")
             return {"success": False, "error": str(e), "provider": self.name}
+    
+    def stream_chat(self, messages: List[Dict], system_prompt: Optional[str] = None,
+                    tools: Optional[List[Dict]] = None, assembler: Optional[ToolCallAssembler] = None) -> Iterator[str]:
+        """Stream nativo de Ollama: una línea JSON por fragmento (las tool_calls llegan enteras)"""
+        chat_messages = []
+        if system_prompt:
+            chat_messages.append({"role": "system", "content": system_prompt})
+        for msg in messages:
+            chat_messages.append({
+                "role": msg.get("role", "user"),
+                "content": msg.get("content", "")
+            })
+        
+        response = self.session.post(
+            self.base_url,
+            json={
+                "model": self.model,
+                "messages": chat_messages,
+                "stream": True,
+                "keep_alive": self.keep_alive,
+                "options": {
+                    "temperature": self.temperature,
+                    "num_predict": 4096
+                },
+                **({"tools": openai_tools(tools)} if tools else {})
+            },
+            stream=True,
+            timeout=180
+        )
+        with response:
+            if response.status_code != 200:
+                raise RuntimeError(f"Ollama HTTP {response.status_code}")
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if assembler is not None:
+                    for call in chunk.get("message", {}).get("tool_calls") or []:
+                        function = call.get("function") or {}
+                        assembler.add(function.get("name"), function.get("arguments"))
+                content = chunk.get("message", {}).get("content")
+                if content:
+                    yield content
+                if chunk.get("done"):
+                    break
 
 
 class AIService:
@@ -588,11 +843,187 @@ Soy BUNK3R AI, un agente diseñado para ENTENDER y OPERAR sobre el código fuent
 
 Mi objetivo es ser el colaborador más preciso."""
 
+    CODE_BUILDER_PROMPT = """╔═══════════════════════════════════════════════════════════════════════════════╗
+║                    BUNK3R CODE BUILDER - ELITE WEB ARCHITECT                  ║
+║         Generador de Interfaces Premium | Nivel Binance/Revolut/N26          ║
+╚═══════════════════════════════════════════════════════════════════════════════╝
+
+Eres BUNK3R Code Builder, un arquitecto de interfaces web de nivel ELITE.
+Tu trabajo es crear experiencias digitales que parezcan de startups valoradas en millones.
+Cada linea de codigo que generas debe reflejar calidad profesional Fintech/Neo-bank.
+
+═══════════════════════════════════════════════════════════════════════════════
+SECCION 1: PROCESO DE PENSAMIENTO (OBLIGATORIO)
+═══════════════════════════════════════════════════════════════════════════════
+
+ANTES de generar codigo, SIEMPRE incluye un mini-blueprint en el campo "message":
+
+1. ENTIENDO: Que exactamente quiere el usuario?
+2. ESTRUCTURA: Que componentes/secciones necesito?
+3. DECISION: Por que elijo este enfoque?
+
+Esto demuestra tu proceso de razonamiento profesional.
+
+═══════════════════════════════════════════════════════════════════════════════
+SECCION 2: FORMATO DE RESPUESTA OBLIGATORIO
+═══════════════════════════════════════════════════════════════════════════════
+
+Responde SIEMPRE en formato JSON valido:
+{
+    "files": {
+        "index.html": "<!DOCTYPE html>...",
+        "styles.css": "/* CSS completo */...",
+        "script.js": "// JS completo..."
+    },
+    "message": "[BLUEPRINT] Entiendo que necesitas X. He creado Y componentes con Z enfoque. Justificacion: ..."
+}
+
+═══════════════════════════════════════════════════════════════════════════════
+SECCION 3: SISTEMA DE DISENO BUNK3R (OBLIGATORIO)
+═══════════════════════════════════════════════════════════════════════════════
+
+3.1 PALETA DE COLORES NEO-BANK:
+--bg-primary: #0B0E11 (fondo principal, ultra oscuro)
+--bg-secondary: #12161C (cards, modales)
+--bg-tertiary: #1E2329 (hover states)
+--bg-elevated: #2B3139 (elementos elevados)
+--accent-primary: #F0B90B (dorado principal)
+--accent-hover: #FCD535 (dorado hover)
+--accent-active: #D4A20B (dorado pressed)
+--text-primary: #FFFFFF
+--text-secondary: #848E9C
+--text-muted: #5E6673
+--success: #22C55E
+--error: #EF4444
+--warning: #F59E0B
+
+3.2 TIPOGRAFIA:
+font-family: 'Inter', -apple-system, BlinkMacSystemFont, 'Segoe UI', sans-serif
+Headings: font-weight: 600-700, letter-spacing: -0.02em
+Body: font-weight: 400-500, line-height: 1.6
+Small: font-size: 0.875rem, line-height: 1.4
+
+3.3 EFECTOS PREMIUM (USAR SIEMPRE):
+- Glass morphism: backdrop-filter: blur(12px); background: rgba(18,22,28,0.85)
+- Sombras suaves: box-shadow: 0 8px 32px rgba(0,0,0,0.4)
+- Bordes sutiles: border: 1px solid rgba(255,255,255,0.08)
+- Transiciones: transition: all 0.25s cubic-bezier(0.4, 0, 0.2, 1)
+- Hover lift: transform: translateY(-2px)
+- Glow dorado: box-shadow: 0 0 24px rgba(240,185,11,0.25)
+- Gradientes: linear-gradient(135deg, #F0B90B 0%, #D4A20B 100%)
+
+3.4 COMPONENTES OBLIGATORIOS:
+- CARDS: border-radius: 16px; padding: 24px; hover con elevacion
+- BOTONES PRIMARIOS: background dorado, border-radius: 12px, font-weight: 600
+- BOTONES SECUNDARIOS: borde dorado, fondo transparente
+- INPUTS: fondo oscuro, borde sutil, focus con glow dorado
+- BADGES: pill shape, colores semanticos
+- ICONOS: SVG inline, stroke-width: 1.5, currentColor
+
+3.5 ANIMACIONES:
+@keyframes fadeIn { from { opacity: 0; } to { opacity: 1; } }
+@keyframes slideUp { from { opacity: 0; transform: translateY(10px); } to { opacity: 1; transform: translateY(0); } }
+@keyframes pulse { 0%, 100% { opacity: 1; } 50% { opacity: 0.5; } }
+@keyframes shimmer { from { background-position: -200% 0; } to { background-position: 200% 0; } }
+
+═══════════════════════════════════════════════════════════════════════════════
+SECCION 4: ESTANDARES DE CODIGO
+═══════════════════════════════════════════════════════════════════════════════
+
+4.1 HTML5 SEMANTICO:
+- Estructura: header > nav > main > section > footer
+- Accesibilidad: aria-labels, roles, alt texts obligatorios
+- Meta tags: viewport, charset, description, theme-color
+
+4.2 CSS MODERNO:
+- Variables CSS en :root
+- Mobile-first con media queries
+- Flexbox y Grid como base
+- Animaciones con @keyframes
+- PROHIBIDO: !important, IDs para estilos, inline styles
+
+4.3 JAVASCRIPT ES6+:
+- const/let exclusivamente
+- Arrow functions
+- Template literals
+- Async/await para asincronía
+- Event delegation
+- Modulos cuando sea posible
+
+═══════════════════════════════════════════════════════════════════════════════
+SECCION 5: REGLAS CRITICAS
+═══════════════════════════════════════════════════════════════════════════════
+
+1. CODIGO COMPLETO: Nunca fragmentos, siempre archivos completos y funcionales
+2. CALIDAD VISUAL: Cada pixel debe parecer de app de millones de dolares
+3. RESPONSIVE: Funciona perfectamente en mobile, tablet y desktop
+4. ACCESIBLE: Navegable con teclado, screen readers compatibles
+5. PERFORMANTE: Lazy loading, optimizacion de animaciones
+6. PROFESIONAL: Sin errores de consola, sin warnings
+
+═══════════════════════════════════════════════════════════════════════════════
+SECCION 6: EJEMPLO DE RESPUESTA EXCELENTE
+═══════════════════════════════════════════════════════════════════════════════
+
+Usuario pide: "Hazme una landing page para mi app de crypto"
+
+Respuesta correcta:
+{
+    "files": {
+        "index.html": "<!DOCTYPE html><html lang='es'>... (HTML completo con header, hero, features, CTA, footer)...",
+        "styles.css": ":root { --bg-primary: #0B0E11; ... } * { margin: 0; ... } .hero { ... } (CSS completo)",
+        "script.js": "// Animaciones y interacciones\\nconst initAnimations = () => { ... }; (JS completo)"
+    },
+    "message": "[BLUEPRINT] Entiendo que necesitas una landing page crypto profesional. He creado: 1) Hero section con gradiente y CTA prominente, 2) Features grid con iconos SVG y cards glass morphism, 3) Stats section con contadores animados, 4) Footer con links y redes sociales. Todo siguiendo el sistema de diseno neo-bank con palette dorada."
+}"""
+
+    # Bloques estáticos internados una sola vez (prefijo estable para la caché de prefijos)
+    DEFAULT_BLOCK = intern_block("default", DEFAULT_SYSTEM_PROMPT)
+    CODE_BUILDER_BLOCK = intern_block("code_builder", CODE_BUILDER_PROMPT)
+
     def __init__(self, db_manager=None):
         logger.info(f"AIService starting init with db_manager={'available' if db_manager else 'None'}")
         self.db_manager = db_manager
         self.providers: List[AIProvider] = []
-        self.conversations: Dict[str, List[Dict]] = {}
+        # Conversaciones acotadas por worker, con nivel compartido entre workers (AI_CONV_SHARED);
+        # un fallo recarga desde ai_chat_messages
+        self.conversations = ConversationStore(
+            loader=self._load_conversation_from_db, name="ai", shared=create_shared_backend()
+        )
+        # Persistencia por lotes en ai_chat_messages (write-behind opcional)
+        self.conversation_writer = ConversationWriter(db_manager)
+        
+        # Hedged requests: si el proveedor principal no responde dentro de
+        # AI_HEDGE_DELAY segundos, se lanza el siguiente en paralelo.
+        self.hedge_enabled = os.environ.get('AI_HEDGING', 'true').lower() == 'true'
+        self.hedge_delay = float(os.environ.get('AI_HEDGE_DELAY', '8'))
+        
+        # Consejo técnico: plazo por miembro y quórum (0 = esperar a todos)
+        self.council_timeout = float(os.environ.get('AI_COUNCIL_TIMEOUT', '60'))
+        self.council_quorum = int(os.environ.get('AI_COUNCIL_QUORUM', '0'))
+        
+        # Pool compartido para llamadas LLM concurrentes (hedging y consejo)
+        self._llm_pool = ThreadPoolExecutor(
+            max_workers=int(os.environ.get('AI_LLM_WORKERS', '8')),
+            thread_name_prefix="ai-llm"
+        )
+        
+        # Reflexión especulativa: el paso 0 del agente arranca junto a la reflexión
+        self.speculative_reflection = os.environ.get('AI_SPECULATIVE_REFLECTION', 'true').lower() == 'true'
+        self._speculation_pool = ThreadPoolExecutor(
+            max_workers=int(os.environ.get('AI_SPECULATION_WORKERS', '4')),
+            thread_name_prefix="ai-spec"
+        )
+        
+        # Function calling nativo en el loop agéntico (las etiquetas <TOOL> quedan de respaldo)
+        self.native_tools = os.environ.get('AI_NATIVE_TOOLS', 'true').lower() == 'true'
+        
+        # Herramientas de sólo lectura de un mismo paso se ejecutan en paralelo
+        self.max_tool_calls = int(os.environ.get('AI_MAX_TOOL_CALLS', '8'))
+        self._tool_pool = ThreadPoolExecutor(
+            max_workers=int(os.environ.get('AI_TOOL_WORKERS', '4')),
+            thread_name_prefix="ai-tool"
+        )
         
         # Vincular con la Singularidad (Gravity v3)
         singularity.ai = self
@@ -666,55 +1097,179 @@ Mi objetivo es ser el colaborador más preciso."""
         
         if not self.providers:
             logger.warning("No AI providers configured. Set API keys in environment variables.")
-    
-    def record_benchmark(self, provider_name: str, latency_ms: int, success: bool, task_type: str = "chat"):
-        """Registra el rendimiento de una petición."""
+        
+        # Salud de proveedores en segundo plano (is_available pasa a ser O(1))
+        for provider in self.providers:
+            health_monitor.register(provider)
         try:
             from flask import current_app
-            with current_app.app_context():
-                bench = ModelBenchmark(
-                    provider=provider_name,
-                    latency_ms=latency_ms,
-                    success=success,
-                    task_type=task_type
-                )
-                db.session.add(bench)
-                db.session.commit()
-        except Exception as e:
-            logger.error(f"Error recording benchmark: {e}")
+            app = current_app._get_current_object()
+        except RuntimeError:
+            app = None
+        health_monitor.start(app)
+        benchmark_writer.start(app)
+        
+        # Enrutado adaptativo sembrado con los benchmarks históricos
+        provider_router.seed(app)
+    
+    def record_benchmark(self, provider_name: str, latency_ms: int, success: bool, task_type: str = "chat"):
+        """Registra el rendimiento de una petición (escritura diferida por lotes)."""
+        provider_router.observe(provider_name, task_type, latency_ms, success)
+        benchmark_writer.submit(provider_name, latency_ms, success, task_type)
+
+    def _cache_key(self, provider, messages: List[Dict], system_prompt: Optional[str]) -> str:
+        """Huella del prompt para la caché de respuestas."""
+        return response_cache.fingerprint(
+            provider.name, getattr(provider, "model", None), system_prompt,
+            messages, getattr(provider, "temperature", None)
+        )
+
+    def _should_cache(self, provider, use_cache: Optional[bool]) -> bool:
+        """
+        Con la caché activa, None sólo cachea llamadas deterministas (temperatura 0):
+        con muestreo, repetir el prompt debe dar otra respuesta. True fuerza la
+        caché (opt-in explícito del llamador) y False la desactiva.
+        """
+        if use_cache is False or not response_cache.enabled:
+            return False
+        return use_cache is True or getattr(provider, "temperature", None) == 0
 
-    def council_query(self, message: str, system_prompt: str, providers_count: int = 2) -> str:
+    def _cached_chat(self, provider, messages: List[Dict], system_prompt: Optional[str],
+                     use_cache: Optional[bool] = None) -> Dict:
+        """provider.chat con caché de respuestas por huella del prompt."""
+        if not self._should_cache(provider, use_cache):
+            return provider.chat(messages, system_prompt)
+        
+        key = self._cache_key(provider, messages, system_prompt)
+        cached = response_cache.get(key)
+        if cached is not None:
+            return {**cached, "cached": True}
+        
+        result = provider.chat(messages, system_prompt)
+        if result.get("success") and result.get("response", "").strip():
+            response_cache.put(key, result)
+        return result
+    
+    def council_query(self, message: str, system_prompt: str, providers_count: int = 2,
+                      quorum: Optional[int] = None, member_timeout: Optional[float] = None,
+                      use_cache: Optional[bool] = None) -> str:
         """
         Duelo de Modelos: Consulta a múltiples modelos y sintetiza la mejor respuesta.
         Ideal para decisiones críticas.
+        
+        Los miembros se consultan en paralelo. La síntesis arranca en cuanto
+        `quorum` miembros respondieron con éxito o vence `member_timeout`.
+        Con `use_cache` (ver _should_cache) las consultas idénticas reutilizan la
+        respuesta cacheada; por defecto sólo las de proveedores a temperatura 0.
         """
+        responses = self._council_responses(message, system_prompt, providers_count,
+                                            quorum, member_timeout, use_cache)
+        if not responses:
+            return "El consejo técnico falló: ningún modelo respondió."
+            
+        # Sintetizar con el Cerebro (Ollama) o el mejor disponible
+        brain, messages, synthesis_prompt = self._council_synthesis(message, responses)
+        final_res = self._cached_chat(brain, messages, synthesis_prompt, use_cache)
+        
+        return final_res.get("response", responses[0]) # Fallback a la primera respuesta si falla la síntesis
+
+    def council_query_stream(self, message: str, system_prompt: str, providers_count: int = 2,
+                             quorum: Optional[int] = None, member_timeout: Optional[float] = None,
+                             use_cache: Optional[bool] = None) -> Iterator[str]:
+        """
+        Variante de council_query que entrega la síntesis fragmento a fragmento.
+        Los miembros se consultan igual; sólo la síntesis se emite en streaming.
+        """
+        responses = self._council_responses(message, system_prompt, providers_count,
+                                            quorum, member_timeout, use_cache)
+        if not responses:
+            yield "El consejo técnico falló: ningún modelo respondió."
+            return
+        
+        brain, messages, synthesis_prompt = self._council_synthesis(message, responses)
+        use_cache = self._should_cache(brain, use_cache)
+        if use_cache:
+            key = self._cache_key(brain, messages, synthesis_prompt)
+            cached = response_cache.get(key)
+            if cached is not None:
+                yield cached.get("response", "")
+                return
+        
+        parts = []
+        try:
+            for token in _response_chunks(brain, messages, synthesis_prompt):
+                parts.append(token)
+                yield token
+        except Exception as e:
+            logger.warning(f"Consejo: síntesis en streaming fallida con {brain.name}: {e}")
+            if not parts:
+                yield responses[0]
+            return
+        
+        text = "".join(parts)
+        if use_cache and text.strip():
+            response_cache.put(key, {"success": True, "response": text, "provider": brain.name})
+
+    def _council_responses(self, message: str, system_prompt: str, providers_count: int,
+                           quorum: Optional[int], member_timeout: Optional[float],
+                           use_cache: Optional[bool]) -> List[str]:
+        """Consulta en paralelo a los miembros del consejo y devuelve sus respuestas."""
         logger.info(f"🧠 CONSEJO TÉCNICO ACTIVADO: Consultando a {providers_count} modelos...")
         
         # Seleccionar los mejores proveedores disponibles (excluyendo ollama que es el coordinador)
-        top_providers = [p for p in self.providers if p.name != "ollama" and p.is_available()][:providers_count]
+        ranked = provider_router.rank(self.providers, "council")
+        top_providers = [p for p in ranked if p.name != "ollama" and p.is_available()][:providers_count]
         
-        responses = []
-        for p in top_providers:
+        quorum = quorum or self.council_quorum or len(top_providers)
+        member_timeout = member_timeout or self.council_timeout
+        
+        def ask(provider):
             start = time.time()
-            res = p.chat([{"role": "user", "content": message}], system_prompt)
-            latency = int((time.time() - start) * 1000)
-            
-            if res.get("success"):
-                responses.append(f"--- Respuesta de {p.name} ---\n{res.get('response')}")
-                self.record_benchmark(p.name, latency, True, "council")
-            else:
-                self.record_benchmark(p.name, latency, False, "council")
+            try:
+                res = self._cached_chat(provider, [{"role": "user", "content": message}], system_prompt, use_cache)
+            except Exception as e:
+                res = {"success": False, "error": str(e), "provider": provider.name}
+            return res, int((time.time() - start) * 1000)
         
-        if not responses:
-            return "El consejo técnico falló: ningún modelo respondió."
-            
-        # Sintetizar con el Cerebro (Ollama) o el mejor disponible
+        pending = {self._llm_pool.submit(ask, p): p for p in top_providers}
+        deadline = time.time() + member_timeout
+        
+        responses = []
+        while pending and len(responses) < quorum:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            done, _ = wait(list(pending), timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                p = pending.pop(future)
+                res, latency = future.result()
+                
+                if res.get("cached"):
+                    # Un acierto de caché no dice nada de la latencia del proveedor
+                    responses.append(f"--- Respuesta de {p.name} ---\n{res.get('response')}")
+                    continue
+                health_monitor.record(p.name, bool(res.get("success")), res.get("error"))
+                if res.get("success"):
+                    responses.append(f"--- Respuesta de {p.name} ---\n{res.get('response')}")
+                    self.record_benchmark(p.name, latency, True, "council")
+                else:
+                    self.record_benchmark(p.name, latency, False, "council")
+        
+        timed_out = time.time() >= deadline
+        for future, p in pending.items():
+            future.cancel()
+            if timed_out:
+                logger.warning(f"Consejo: {p.name} superó el plazo de {member_timeout}s")
+                self.record_benchmark(p.name, int(member_timeout * 1000), False, "council")
+        
+        return responses
+
+    def _council_synthesis(self, message: str, responses: List[str]):
+        """(cerebro, mensajes, prompt) de la síntesis del consejo."""
         synthesis_prompt = f"Actúa como el Árbitro Maestro BUNK3R. Tienes estas respuestas de diferentes modelos de IA sobre: '{message}'. Genera una solución técnica unificada, más robusta y sin errores, tomando lo mejor de cada una.\n\n" + "\n\n".join(responses)
         
         brain = next((p for p in self.providers if p.name == "ollama"), self.providers[0])
-        final_res = brain.chat([{"role": "user", "content": "Sintetiza el consejo técnico."}], synthesis_prompt)
-        
-        return final_res.get("response", responses[0]) # Fallback a la primera respuesta si falla la síntesis
+        return brain, [{"role": "user", "content": "Sintetiza el consejo técnico."}], synthesis_prompt
 
     def get_available_providers(self) -> List[str]:
         """Get list of available provider names"""
@@ -728,35 +1283,22 @@ Mi objetivo es ser el colaborador más preciso."""
             Dict con 'needs_fix': bool y 'issues': lista de problemas detectados
         """
         issues = []
-        response_lower = response.lower().strip()
+        stripped = response.strip()
         
         if len(response) < 20:
             issues.append("respuesta_muy_corta")
         
-        incomplete_markers = [
-            "...", "continuará", "continua", "[continua", "(continua",
-            "etc etc", "y así", "y asi"
-        ]
-        if any(marker in response_lower[-100:] for marker in incomplete_markers):
+        if keyword_screens.get("incomplete").matches(stripped[-100:]):
             issues.append("respuesta_incompleta")
         
         if response.count("```") % 2 != 0:
             issues.append("codigo_sin_cerrar")
         
-        error_phrases = [
-            "no puedo", "no tengo acceso", "como ia", "como modelo de lenguaje",
-            "no tengo la capacidad", "no me es posible"
-        ]
-        if any(phrase in response_lower[:200] for phrase in error_phrases):
-            if "?" in original_message.lower() or any(kw in original_message.lower() 
-                for kw in ["cómo", "como", "qué", "que", "ayuda", "help"]):
+        if keyword_screens.get("refusal").matches(stripped[:200]):
+            if keyword_screens.get("help_request").matches(original_message):
                 issues.append("rechazo_innecesario")
         
-        confusion_markers = [
-            "no entiendo", "no está claro", "podrías aclarar", "podrias aclarar",
-            "no estoy seguro de qué", "no estoy seguro de que"
-        ]
-        if any(marker in response_lower for marker in confusion_markers):
+        if keyword_screens.get("confusion").matches(response):
             if len(original_message) > 50:
                 issues.append("confusion_evitable")
         
@@ -799,16 +1341,28 @@ Mi objetivo es ser el colaborador más preciso."""
             logger.error(f"Excepción en Auto-Git Push: {e}")
             return False
 
-    def _call_tool(self, tool_name: str, args: Dict) -> str:
-        """Puente hacia el Nervous System (Cuerpo Único) con aislamiento de usuario."""
+    @staticmethod
+    def _user_workspace() -> str:
+        """Root del workspace del usuario actual (SaaS Aislamiento)."""
+        from flask_login import current_user
+        if current_user and current_user.is_authenticated:
+            return os.path.join("/workspace", str(current_user.id))
+        return "/workspace"
+
+    def new_body(self, sandbox_mode: bool = False) -> NervousSystem:
+        """Nervous System propio de una petición (Sandbox y workspace aislados)."""
+        return NervousSystem(sandbox_mode=sandbox_mode, user_workspace=self._user_workspace())
+
+    def _call_tool(self, tool_name: str, args: Dict, body: Optional[NervousSystem] = None) -> str:
+        """
+        Puente hacia el Nervous System (Cuerpo Único) con aislamiento de usuario.
+        `body` es el Nervous System de la petición; desde hilos sin contexto de
+        petición hay que pasarlo siempre.
+        """
         try:
-            from flask_login import current_user
-            import os
-            
-            # Determinar el root del usuario (SaaS Aislamiento)
-            user_workspace = "/workspace"
-            if current_user and current_user.is_authenticated:
-                user_workspace = os.path.join("/workspace", str(current_user.id))
+            if body is None:
+                body = self.new_body()
+            user_workspace = body.user_workspace
             
             # Función para normalizar paths según el usuario
             def resolve_path(p):
@@ -819,22 +1373,24 @@ Mi objetivo es ser el colaborador más preciso."""
                 # Si es relativo, rootearlo en el workspace del usuario
                 return os.path.join(user_workspace, p)
 
-            logger.info(f"Singularity: Pulsando herramienta -> {tool_name} (User: {current_user.id if current_user.is_authenticated else 'anon'})")
+            logger.info(f"Singularity: Pulsando herramienta -> {tool_name} (Workspace: {user_workspace}, Sandbox: {body.sandbox_mode})")
             
             path = resolve_path(args.get("path"))
             
             if tool_name == "read_file":
-                result = nervous_system.read(path)
+                result = body.read(path)
             elif tool_name == "write_file":
-                result = nervous_system.write(path, args.get("content"))
+                result = body.write(path, args.get("content"))
             elif tool_name == "list_dir":
-                result = nervous_system.list(path or user_workspace)
+                result = body.list(path or user_workspace)
             elif tool_name == "run_command":
                 # Para comandos, intentamos ejecutar en el workspace del usuario
                 cmd = args.get("command")
-                result = nervous_system.execute(f"cd {user_workspace} && {cmd}")
+                result = body.execute(f"cd {user_workspace} && {cmd}")
             elif tool_name == "web_search":
-                result = nervous_system.research(args.get("query"))
+                result = body.research(args.get("query"))
+            elif tool_name == "find_symbol":
+                result = body.symbols(path, args.get("name"), args.get("kind"), bool(args.get("references")))
             else:
                 return f"Error: '{tool_name}' no existe en el NervousSystem."
             
@@ -862,76 +1418,159 @@ Mi objetivo es ser el colaborador más preciso."""
             return {"success": False, "error": "No hay proveedores configurados.", "provider": None}
 
         # 1. Obtener Historial y Contexto
+        start = time.time()
         conversation = self._get_conversation(user_id)
         
         system = system_prompt or self.DEFAULT_SYSTEM_PROMPT
         if user_context:
             system += self._build_user_context(user_context)
 
+        # Atajo: los mensajes triviales no pasan por reflexión ni herramientas
+        route = fast_path.classify(message, conversation)
+        if route.trivial:
+            result = self._fast_reply(user_id, message, conversation, system)
+            if result:
+                fast_path.record(True, int((time.time() - start) * 1000))
+                return result
+
         # 2. El Salto a la Singularidad (Gravity v3)
+        # Nervous System propio de la petición: el Sandbox no se filtra a otros hilos
+        body = self.new_body()
         try:
             # Singularity maneja el monólogo interno y decide si activar el Sandbox.
             # Luego ejecuta el loop agéntico vía _internal_chat_loop.
-            result = singularity.solve(message, user_id, conversation, system)
+            result = singularity.solve(message, user_id, conversation, system, body=body)
             
             # Guardar la respuesta final en el historial
             if result.get("success"):
                 conversation.append({"role": "user", "content": message})
                 conversation.append({"role": "assistant", "content": result.get("response")})
                 self._save_conversation(user_id, conversation)
+            fast_path.record(False, int((time.time() - start) * 1000))
                 
             return result
         except Exception as e:
             logger.error(f"Error en el Pulso de la Singularidad: {e}")
             # Fallback a chat estándar si la singularidad falla por alguna razón
             conversation.append({"role": "user", "content": message})
-            response = self._internal_chat_loop(conversation, system)
+            response = self._internal_chat_loop(conversation, system, body=body)
             return {"success": True, "response": response, "provider": "fallback"}
 
-    def _internal_chat_loop(self, conversation: List[Dict], system: str) -> str:
-        """Loop de ejecución agéntica interna. Reemplaza el antiguo bucle de AIService."""
-        MAX_TOOL_STEPS = 5
-        final_response = ""
+    def chat_stream(self, user_id: str, message: str, system_prompt: Optional[str] = None,
+                    user_context: Optional[Dict] = None) -> Iterator[StreamEvent]:
+        """
+        Variante en streaming de chat(): emite los eventos de Singularity.solve_stream
+        (tokens de la reflexión, herramientas y tokens de la respuesta) y guarda el
+        turno en el historial al recibir el COMPLETE final.
+        """
+        if not self.providers:
+            yield StreamEvent(StreamEventType.ERROR, "No hay proveedores configurados.")
+            return
         
-        providers_to_try = self.providers.copy()
+        start = time.time()
+        conversation = self._get_conversation(user_id)
         
-        for step in range(MAX_TOOL_STEPS + 1):
-            response_success = False
-            current_response_text = ""
-            
+        system = system_prompt or self.DEFAULT_SYSTEM_PROMPT
+        if user_context:
+            system += self._build_user_context(user_context)
+        
+        route = fast_path.classify(message, conversation)
+        if route.trivial:
+            yield StreamEvent(StreamEventType.PHASE, "fast_path", {"phase": "fast_path"})
+            turn = conversation + [{"role": "user", "content": message}]
+            providers_to_try = provider_router.rank(self.providers, "chat")
+            completed = False
+            for event in self._stream_providers(providers_to_try, turn, system, metadata={"phase": "fast_path"}):
+                if event.event_type == StreamEventType.COMPLETE:
+                    completed = True
+                    conversation.append({"role": "user", "content": message})
+                    conversation.append({"role": "assistant", "content": event.data})
+                    self._save_conversation(user_id, conversation)
+                    fast_path.record(True, int((time.time() - start) * 1000))
+                yield event
+            if completed:
+                return
+            # Como en chat(): si el atajo falla, el mensaje sigue por el camino completo
+            # (que lo registra como "full" al completarse)
+            logger.info("FastPath: el atajo falló, se continúa por el camino completo")
+        
+        try:
+            for event in singularity.solve_stream(message, user_id, conversation, system, body=self.new_body()):
+                if event.event_type == StreamEventType.COMPLETE:
+                    conversation.append({"role": "user", "content": message})
+                    conversation.append({"role": "assistant", "content": event.data})
+                    self._save_conversation(user_id, conversation)
+                    fast_path.record(False, int((time.time() - start) * 1000))
+                yield event
+        except Exception as e:
+            logger.error(f"Error en el Pulso de la Singularidad (stream): {e}")
+            yield StreamEvent(StreamEventType.ERROR, str(e))
+
+    def _fast_reply(self, user_id: str, message: str, conversation: List[Dict], system: str) -> Optional[Dict]:
+        """
+        Atajo para mensajes triviales: una sola llamada (con hedging) al proveedor
+        más rápido, sin reflexión ni herramientas. None si todos fallaron.
+        """
+        turn = conversation + [{"role": "user", "content": message}]
+        result = self._race_providers(provider_router.rank(self.providers, "chat"), turn, system)
+        if not result:
+            return None
+        
+        conversation.append({"role": "user", "content": message})
+        conversation.append({"role": "assistant", "content": result.get("response")})
+        self._save_conversation(user_id, conversation)
+        return {
+            "success": True,
+            "response": result.get("response"),
+            "provider": result.get("provider"),
+            "fast_path": True
+        }
+
+    MAX_TOOL_STEPS = 5
+
+    def speculate_step(self, conversation: List[Dict], system: str) -> Optional[Future]:
+        """
+        Lanza en segundo plano el paso 0 del loop agéntico (sin reflexión).
+        Devuelve el Future de _race_providers, o None si la especulación está desactivada.
+        Sólo genera texto: las herramientas se ejecutan después, ya fijado el Sandbox.
+        """
+        if not self.speculative_reflection:
+            return None
+        providers_to_try = provider_router.rank(self.providers, "chat")
+        return self._speculation_pool.submit(self._race_providers, providers_to_try, list(conversation), system,
+                                             tools=self.agent_tools)
+
+    @property
+    def agent_tools(self) -> Optional[List[Dict]]:
+        """Definiciones para el function calling nativo del loop agéntico (None si está desactivado)."""
+        return TOOL_SPECS if self.native_tools else None
+
+    def _internal_chat_loop(self, conversation: List[Dict], system: str,
+                            first_step: Optional[Future] = None, body: Optional[NervousSystem] = None) -> str:
+        """
+        Loop de ejecución agéntica interna. Reemplaza el antiguo bucle de AIService.
+        `first_step` es un paso 0 especulativo (speculate_step) aceptado por el llamador;
+        `body` es el Nervous System de la petición.
+        """
+        body = body or self.new_body()
+        providers_to_try = provider_router.rank(self.providers, "chat")
+        
+        for step in range(self.MAX_TOOL_STEPS + 1):
             logger.debug(f"Singularity: Loop agéntico paso {step}")
             
-            for provider in providers_to_try:
-                if not provider.is_available(): continue
-                try:
-                    result = provider.chat(conversation, system)
-                    if result.get("success") and result.get("response", "").strip():
-                        current_response_text = result.get("response", "")
-                        response_success = True
-                        break
-                except Exception as e:
-                    logger.debug(f"Provider {provider.name} fail in internal loop: {e}")
-            
-            if not response_success: return "Error: Todos los proveedores fallaron en el loop agéntico."
-            
-            # Detectar herramientas vía regex unificado
-            import re
-            tool_match = re.search(r'<TOOL>(.*?)</TOOL>', current_response_text, re.DOTALL)
-            
-            if tool_match and step < MAX_TOOL_STEPS:
-                tool_json_str = tool_match.group(1).strip()
-                if "```" in tool_json_str: tool_json_str = tool_json_str.replace("```json", "").replace("```", "")
-                
-                logger.info(f"Singularity: Detectada herramienta en paso {step}: {tool_json_str[:100]}...")
-                
-                try:
-                    tool_call = json.loads(tool_json_str)
-                    tool_output = self._call_tool(tool_call.get("name"), tool_call.get("args", {}))
-                except Exception as e:
-                    tool_output = f"[SYSTEM ERROR] JSON o Tool inválido: {e}"
-                
-                conversation.append({"role": "assistant", "content": current_response_text})
-                conversation.append({"role": "user", "content": f"[SISTEMA] Resultado de herramienta: {tool_output}"})
+            result = None
+            if step == 0 and first_step is not None:
+                result = first_step.result()
+            if not result:
+                result = self._race_providers(providers_to_try, conversation, system, tools=self.agent_tools)
+            if not result: return "Error: Todos los proveedores fallaron en el loop agéntico."
+            current_response_text = result.get("response", "")
+            
+            tool_calls, assistant_text = self._step_tool_calls(current_response_text, result.get("tool_calls"))
+            if tool_calls and step < self.MAX_TOOL_STEPS:
+                logger.info(f"Singularity: Detectadas {len(tool_calls)} herramientas en paso {step}: {tool_calls[0][:100]}...")
+                tool_outputs = self._run_tool_calls(tool_calls, body)
+                self._append_tool_turn(conversation, assistant_text, tool_calls, tool_outputs)
                 # Volvemos a empezar el loop con la nueva info
                 continue 
             else:
@@ -939,6 +1578,255 @@ Mi objetivo es ser el colaborador más preciso."""
                 logger.debug("Singularity: Fin del loop (no más herramientas o límite alcanzado).")
                 return current_response_text
         return "Max steps reached."
+
+    def _internal_chat_loop_stream(self, conversation: List[Dict], system: str,
+                                   body: Optional[NervousSystem] = None) -> Iterator[StreamEvent]:
+        """
+        Variante en streaming de _internal_chat_loop. Emite los tokens de cada paso,
+        TOOL_CALL/TOOL_RESULT por cada herramienta y un COMPLETE con la respuesta final.
+        """
+        body = body or self.new_body()
+        providers_to_try = provider_router.rank(self.providers, "chat")
+        
+        for step in range(self.MAX_TOOL_STEPS + 1):
+            meta = {"phase": "agent", "step": step}
+            current_response_text = None
+            native_calls = None
+            for event in self._stream_providers(providers_to_try, conversation, system, metadata=meta,
+                                                tools=self.agent_tools):
+                if event.event_type == StreamEventType.COMPLETE:
+                    current_response_text = event.data
+                    native_calls = event.metadata.pop("tool_calls", None)
+                else:
+                    yield event
+            
+            if current_response_text is None:
+                yield StreamEvent(StreamEventType.ERROR, "Error: Todos los proveedores fallaron en el loop agéntico.", meta)
+                return
+            
+            tool_calls, assistant_text = self._step_tool_calls(current_response_text, native_calls)
+            if tool_calls and step < self.MAX_TOOL_STEPS:
+                logger.info(f"Singularity: Detectadas {len(tool_calls)} herramientas en paso {step}: {tool_calls[0][:100]}...")
+                for i, tool_json_str in enumerate(tool_calls):
+                    yield StreamEvent(StreamEventType.TOOL_CALL, tool_json_str, {**meta, "index": i})
+                tool_outputs = self._run_tool_calls(tool_calls, body)
+                for i, tool_output in enumerate(tool_outputs):
+                    yield StreamEvent(StreamEventType.TOOL_RESULT, context_window.clip_tool_output(tool_output), {**meta, "index": i})
+                self._append_tool_turn(conversation, assistant_text, tool_calls, tool_outputs)
+                continue
+            
+            yield StreamEvent(StreamEventType.COMPLETE, current_response_text, meta)
+            return
+
+    # Herramientas sin efectos: pueden ejecutarse en paralelo dentro de un paso
+    PARALLEL_TOOLS = frozenset({"read_file", "list_dir", "web_search", "find_symbol"})
+
+    def _step_tool_calls(self, text: str, native_calls: Optional[List[str]] = None):
+        """
+        Llamadas de un paso: las nativas del proveedor o, si no hay, las etiquetas
+        <TOOL> del texto. Devuelve (llamadas, texto del asistente para el historial);
+        las nativas se guardan como etiquetas para que cualquier proveedor entienda
+        el historial en el siguiente paso.
+        """
+        if native_calls:
+            tool_call_stats.record("native", len(native_calls))
+            if len(native_calls) > self.max_tool_calls:
+                logger.warning(f"Singularity: {len(native_calls)} herramientas en un paso, se ejecutan las {self.max_tool_calls} primeras")
+            native_calls = native_calls[:self.max_tool_calls]
+            return native_calls, (text or "") + render_tool_tags(native_calls)
+        tool_calls = self._extract_tool_calls(text)
+        if tool_calls:
+            tool_call_stats.record("tagged", len(tool_calls))
+        return tool_calls, text
+
+    def _extract_tool_calls(self, text: str) -> List[str]:
+        """JSON de cada llamada <TOOL>...</TOOL> de la respuesta, en orden (hasta max_tool_calls)."""
+        tool_calls = []
+        for tool_json_str in re.findall(r'<TOOL>(.*?)</TOOL>', text, re.DOTALL):
+            tool_json_str = tool_json_str.strip()
+            if "```" in tool_json_str: tool_json_str = tool_json_str.replace("```json", "").replace("```", "")
+            tool_calls.append(tool_json_str)
+        if len(tool_calls) > self.max_tool_calls:
+            logger.warning(f"Singularity: {len(tool_calls)} herramientas en un paso, se ejecutan las {self.max_tool_calls} primeras")
+        return tool_calls[:self.max_tool_calls]
+
+    def _run_tool_calls(self, tool_calls: List[str], body: Optional[NervousSystem] = None) -> List[str]:
+        """
+        Ejecuta las llamadas de un paso y devuelve sus salidas en el mismo orden.
+        Las de sólo lectura (PARALLEL_TOOLS) consecutivas corren en paralelo;
+        write_file y run_command esperan a las anteriores y se ejecutan en serie.
+        """
+        body = body or self.new_body()
+        outputs: List[Optional[str]] = [None] * len(tool_calls)
+        in_flight = {}
+        
+        def drain():
+            for future, index in in_flight.items():
+                outputs[index] = future.result()
+            in_flight.clear()
+        
+        for i, tool_json_str in enumerate(tool_calls):
+            tool_call = parse_tool_json(tool_json_str)
+            args = tool_call.get("args") or {} if tool_call else None
+            if not isinstance(args, dict) or not tool_call.get("name"):
+                tool_call_stats.record("invalid")
+                outputs[i] = f"[SYSTEM ERROR] JSON o Tool inválido: {tool_json_str[:200]}"
+                continue
+            name = tool_call["name"]
+            if name in self.PARALLEL_TOOLS and len(tool_calls) > 1:
+                in_flight[self._tool_pool.submit(self._call_tool, name, args, body)] = i
+            else:
+                drain()
+                outputs[i] = self._call_tool(name, args, body)
+        drain()
+        return outputs
+
+    @staticmethod
+    def _append_tool_turn(conversation: List[Dict], response_text: str, tool_calls: List[str], tool_outputs: List[str]):
+        """Añade la respuesta del modelo y todos los resultados del paso en un único mensaje."""
+        if len(tool_outputs) == 1:
+            results = context_window.clip_tool_output(tool_outputs[0])
+        else:
+            results = "\n\n".join(
+                f"[{i + 1}] {tool_json_str[:200]}\n{context_window.clip_tool_output(tool_output)}"
+                for i, (tool_json_str, tool_output) in enumerate(zip(tool_calls, tool_outputs))
+            )
+        conversation.append({"role": "assistant", "content": response_text})
+        conversation.append({"role": "user", "content": f"{TOOL_RESULT_PREFIX} {results}"})
+
+    def _stream_providers(self, providers: List[AIProvider], conversation: List[Dict], system: str,
+                          task_type: str = "chat", metadata: Optional[Dict] = None,
+                          tools: Optional[List[Dict]] = None) -> Iterator[StreamEvent]:
+        """
+        Streaming con failover secuencial sobre la lista de proveedores. No hay
+        hedging: los tokens ya emitidos no se pueden retirar. Si un proveedor falla
+        a mitad de respuesta se emite METADATA provider_failed (el cliente descarta
+        los tokens parciales de ese intento) y se pasa al siguiente.
+        
+        Yields:
+            TOKEN por fragmento y un COMPLETE con el texto completo del ganador
+            (con `tools`, sus llamadas nativas en metadata["tool_calls"]);
+            nada más si todos fallaron.
+        """
+        meta = metadata or {}
+        snapshot = list(conversation)
+        
+        for provider in [p for p in providers if p.is_available()]:
+            window = context_window.fit(snapshot, provider.name, system)
+            yield StreamEvent(StreamEventType.METADATA, "", {**meta, "action": "trying_provider", "provider": provider.name})
+            
+            start = time.time()
+            parts = []
+            error = None
+            assembler = ToolCallAssembler()
+            try:
+                for token in _response_chunks(provider, window, system, tools, assembler):
+                    parts.append(token)
+                    yield StreamEvent(StreamEventType.TOKEN, token, {**meta, "provider": provider.name})
+            except Exception as e:
+                error = str(e)
+            text = "".join(parts)
+            tool_calls = assembler.calls()
+            if error is None and not text.strip() and not tool_calls:
+                error = "respuesta vacía"
+            
+            latency = int((time.time() - start) * 1000)
+            health_monitor.record(provider.name, error is None, error)
+            self.record_benchmark(provider.name, latency, error is None, task_type)
+            if error is None:
+                complete_meta = {**meta, "provider": provider.name}
+                if tool_calls:
+                    complete_meta["tool_calls"] = tool_calls
+                yield StreamEvent(StreamEventType.COMPLETE, text, complete_meta)
+                return
+            
+            logger.debug(f"Provider {provider.name} fail in stream loop: {error}")
+            yield StreamEvent(StreamEventType.METADATA, error, {**meta, "action": "provider_failed", "provider": provider.name})
+    
+    def _race_providers(self, providers: List[AIProvider], conversation: List[Dict], system: str,
+                        task_type: str = "chat", tools: Optional[List[Dict]] = None) -> Optional[Dict]:
+        """
+        Hedged request sobre la lista de proveedores (en orden de prioridad).
+        Lanza el primero; si no responde dentro de hedge_delay, lanza el siguiente
+        en paralelo y se queda con la primera respuesta válida. Los perdedores se
+        cancelan si aún no empezaron o se abandonan (su resultado se descarta y el
+        router anota el tiempo que llevaban, nunca menos que el del ganador).
+        Con `tools`, los proveedores con function calling reciben las definiciones
+        y una respuesta sólo con llamadas nativas ("tool_calls") también es válida.
+        
+        Returns:
+            El dict de respuesta del proveedor ganador, o None si todos fallaron.
+        """
+        candidates = [p for p in providers if p.is_available()]
+        if not candidates:
+            return None
+        
+        # Snapshot: los perdedores pueden seguir leyendo mientras el loop muta el historial
+        snapshot = list(conversation)
+        windows = {}
+        delay = self.hedge_delay if self.hedge_enabled else None
+        remaining = iter(candidates)
+        pending = {}
+        started = {}
+        
+        def launch_next() -> bool:
+            provider = next(remaining, None)
+            if provider is None:
+                return False
+            # Historial recortado al presupuesto de tokens de este proveedor
+            budget = context_window.budget_for(provider.name)
+            if budget not in windows:
+                windows[budget] = context_window.fit(snapshot, provider.name, system, budget=budget)
+            if tools and getattr(provider, "supports_tools", False):
+                future = self._llm_pool.submit(provider.chat, windows[budget], system, tools=tools)
+            else:
+                future = self._llm_pool.submit(provider.chat, windows[budget], system)
+            pending[future] = provider
+            started[future] = time.time()
+            return True
+        
+        exhausted = not launch_next()
+        winner_ms = 0
+        try:
+            while pending:
+                done, _ = wait(list(pending), timeout=None if exhausted else delay, return_when=FIRST_COMPLETED)
+                
+                if not done:
+                    # Presupuesto agotado sin respuesta: cubrimos con el siguiente proveedor
+                    logger.info(f"Hedge: sin respuesta en {delay}s, lanzando proveedor adicional")
+                    exhausted = not launch_next()
+                    continue
+                
+                for future in done:
+                    provider = pending.pop(future)
+                    latency = int((time.time() - started[future]) * 1000)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        logger.debug(f"Provider {provider.name} fail in internal loop: {e}")
+                        health_monitor.record(provider.name, False, str(e))
+                        self.record_benchmark(provider.name, latency, False, task_type)
+                        continue
+                    if result.get("success") and (result.get("response", "").strip() or result.get("tool_calls")):
+                        logger.debug(f"Hedge: ganador {provider.name}")
+                        health_monitor.record(provider.name, True)
+                        self.record_benchmark(provider.name, latency, True, task_type)
+                        winner_ms = latency
+                        return result
+                    logger.debug(f"Provider {provider.name} fail in internal loop: {result.get('error')}")
+                    health_monitor.record(provider.name, False, result.get("error"))
+                    self.record_benchmark(provider.name, latency, False, task_type)
+                
+                # Un fallo rápido no espera al presupuesto: pasamos directamente al siguiente
+                if not pending and not exhausted:
+                    exhausted = not launch_next()
+            return None
+        finally:
+            for future, provider in pending.items():
+                # Los que ya estaban en curso se abandonan: su muestra es el tiempo que llevaban
+                if not future.cancel():
+                    provider_router.observe_abandoned(
+                        provider.name, task_type, int((time.time() - started[future]) * 1000), winner_ms)
     
     def _build_user_context(self, user_context: Dict) -> str:
         """Build context string based on user information"""
@@ -961,18 +1849,12 @@ Nivel: ESTANDAR - Responde claro y amigable, evita jerga tecnica, tono servicial
         return context + "\n"
     
     def _get_conversation(self, user_id: str) -> List[Dict]:
-        """Get conversation history for user"""
-        if user_id not in self.conversations:
-            if self.db_manager:
-                history = self._load_conversation_from_db(user_id)
-                self.conversations[user_id] = history
-            else:
-                self.conversations[user_id] = []
-        return self.conversations[user_id]
+        """Get conversation history for user (reloaded from DB if it was evicted)"""
+        return self.conversations.get_or_load(user_id)
     
     def _save_conversation(self, user_id: str, conversation: List[Dict]):
         """Save conversation to memory and database"""
-        self.conversations[user_id] = conversation
+        self.conversations.put(user_id, conversation)
         
         if self.db_manager:
             self._save_conversation_to_db(user_id, conversation)
@@ -982,52 +1864,43 @@ Nivel: ESTANDAR - Responde claro y amigable, evita jerga tecnica, tono servicial
         try:
             if not self.db_manager:
                 return []
-            with self.db_manager.get_connection() as conn:
-                with conn.cursor() as cur:
-                    cur.execute("""
+            with db_connection(self.db_manager) as conn:
+                cur = conn.cursor()
+                try:
+                    cur.execute(f"""
                         SELECT role, content FROM ai_chat_messages
-                        WHERE user_id = %s
+                        WHERE user_id = {placeholder(conn)}
                         ORDER BY created_at ASC
                         LIMIT 50
                     """, (user_id,))
                     rows = cur.fetchall()
-                    return [{"role": row[0], "content": row[1]} for row in rows]
+                finally:
+                    cur.close()
+            return [{"role": row[0], "content": row[1]} for row in rows]
         except Exception as e:
             logger.error(f"Error loading conversation from DB: {e}")
             return []
     
     def _save_conversation_to_db(self, user_id: str, conversation: List[Dict]):
-        """Save latest messages to database"""
-        try:
-            if not self.db_manager or len(conversation) < 2:
-                return
-            
-            last_two = conversation[-2:]
-            
-            with self.db_manager.get_connection() as conn:
-                with conn.cursor() as cur:
-                    for msg in last_two:
-                        cur.execute("""
-                            INSERT INTO ai_chat_messages (user_id, role, content, created_at)
-                            VALUES (%s, %s, %s, %s)
-                        """, (user_id, msg["role"], msg["content"], datetime.now()))
-                conn.commit()
-        except Exception as e:
-            logger.error(f"Error saving conversation to DB: {e}")
+        """Save latest exchange (user + assistant) to database in one transaction"""
+        if not self.db_manager or len(conversation) < 2:
+            return
+        self.conversation_writer.submit(user_id, conversation[-2:])
     
     def clear_conversation(self, user_id: str) -> bool:
         """Clear conversation history for user"""
         try:
-            if user_id in self.conversations:
-                del self.conversations[user_id]
+            self.conversations.pop(user_id)
             
             if self.db_manager:
-                conn = self.db_manager.get_connection()
-                if conn:
-                    with conn as c:
-                        with c.cursor() as cur:
-                            cur.execute("DELETE FROM ai_chat_messages WHERE user_id = %s", (user_id,))
-                        c.commit()
+                # Que un volcado diferido no reescriba lo que se va a borrar
+                self.conversation_writer.flush()
+                with db_connection(self.db_manager) as conn:
+                    cur = conn.cursor()
+                    try:
+                        cur.execute(f"DELETE FROM ai_chat_messages WHERE user_id = {placeholder(conn)}", (user_id,))
+                    finally:
+                        cur.close()
             
             return True
         except Exception as e:
@@ -1044,14 +1917,30 @@ Nivel: ESTANDAR - Responde claro y amigable, evita jerga tecnica, tono servicial
         return {
             "providers_available": self.get_available_providers(),
             "total_providers": len(self.providers),
-            "active_conversations": len(self.conversations)
+            "active_conversations": len(self.conversations),
+            "conversation_store": self.conversations.snapshot(),
+            "conversation_writer": {**self.conversation_writer.stats, "pending": self.conversation_writer.pending()},
+            "db_pool": self.db_manager.snapshot() if hasattr(self.db_manager, "snapshot") else None,
+            "provider_health": health_monitor.snapshot(),
+            "routing": provider_router.snapshot(),
+            "benchmark_writer": {**benchmark_writer.stats, "pending": benchmark_writer.pending()},
+            "response_cache": response_cache.snapshot(),
+            "prompt_blocks": prompt_stats(),
+            "context_window": context_window.snapshot(),
+            "speculation": dict(singularity.speculation_stats),
+            "fast_path": fast_path.snapshot(),
+            "keyword_screens": keyword_screens.snapshot(),
+            "tool_calls": tool_call_stats.snapshot(),
+            "workspace_watcher": workspace_watcher.snapshot()
         }
     
     def generate_code(self, user_id: str, message: str, current_files: Dict[str, str], 
-                      project_name: str) -> Dict:
+                      project_name: str, use_cache: Optional[bool] = None) -> Dict:
         """
         Generate code for web projects based on user instructions.
         Returns files to create/update and a response message.
+        Identical requests are served from the response cache when the provider is
+        deterministic (temperature 0) or use_cache=True; use_cache=False bypasses it.
         """
         if not self.providers:
             return {
@@ -1065,159 +1954,29 @@ Nivel: ESTANDAR - Responde claro y amigable, evita jerga tecnica, tono servicial
             preview = content[:500] + "..." if len(content) > 500 else content
             files_context += f"\n--- {filename} ---\n{preview}\n"
         
-        code_system_prompt = f"""
-╔═══════════════════════════════════════════════════════════════════════════════╗
-║                    BUNK3R CODE BUILDER - ELITE WEB ARCHITECT                  ║
-║         Generador de Interfaces Premium | Nivel Binance/Revolut/N26          ║
-╚═══════════════════════════════════════════════════════════════════════════════╝
-
-Eres BUNK3R Code Builder, un arquitecto de interfaces web de nivel ELITE.
-Tu trabajo es crear experiencias digitales que parezcan de startups valoradas en millones.
-Cada linea de codigo que generas debe reflejar calidad profesional Fintech/Neo-bank.
-
-═══════════════════════════════════════════════════════════════════════════════
-SECCION 1: PROCESO DE PENSAMIENTO (OBLIGATORIO)
-═══════════════════════════════════════════════════════════════════════════════
-
-ANTES de generar codigo, SIEMPRE incluye un mini-blueprint en el campo "message":
-
-1. ENTIENDO: Que exactamente quiere el usuario?
-2. ESTRUCTURA: Que componentes/secciones necesito?
-3. DECISION: Por que elijo este enfoque?
-
-Esto demuestra tu proceso de razonamiento profesional.
-
-═══════════════════════════════════════════════════════════════════════════════
-SECCION 2: FORMATO DE RESPUESTA OBLIGATORIO
-═══════════════════════════════════════════════════════════════════════════════
-
-Responde SIEMPRE en formato JSON valido:
-{{
-    "files": {{
-        "index.html": "<!DOCTYPE html>...",
-        "styles.css": "/* CSS completo */...",
-        "script.js": "// JS completo..."
-    }},
-    "message": "[BLUEPRINT] Entiendo que necesitas X. He creado Y componentes con Z enfoque. Justificacion: ..."
-}}
-
-═══════════════════════════════════════════════════════════════════════════════
-SECCION 3: SISTEMA DE DISENO BUNK3R (OBLIGATORIO)
-═══════════════════════════════════════════════════════════════════════════════
-
-3.1 PALETA DE COLORES NEO-BANK:
---bg-primary: #0B0E11 (fondo principal, ultra oscuro)
---bg-secondary: #12161C (cards, modales)
---bg-tertiary: #1E2329 (hover states)
---bg-elevated: #2B3139 (elementos elevados)
---accent-primary: #F0B90B (dorado principal)
---accent-hover: #FCD535 (dorado hover)
---accent-active: #D4A20B (dorado pressed)
---text-primary: #FFFFFF
---text-secondary: #848E9C
---text-muted: #5E6673
---success: #22C55E
---error: #EF4444
---warning: #F59E0B
-
-3.2 TIPOGRAFIA:
-font-family: 'Inter', -apple-system, BlinkMacSystemFont, 'Segoe UI', sans-serif
-Headings: font-weight: 600-700, letter-spacing: -0.02em
-Body: font-weight: 400-500, line-height: 1.6
-Small: font-size: 0.875rem, line-height: 1.4
-
-3.3 EFECTOS PREMIUM (USAR SIEMPRE):
-- Glass morphism: backdrop-filter: blur(12px); background: rgba(18,22,28,0.85)
-- Sombras suaves: box-shadow: 0 8px 32px rgba(0,0,0,0.4)
-- Bordes sutiles: border: 1px solid rgba(255,255,255,0.08)
-- Transiciones: transition: all 0.25s cubic-bezier(0.4, 0, 0.2, 1)
-- Hover lift: transform: translateY(-2px)
-- Glow dorado: box-shadow: 0 0 24px rgba(240,185,11,0.25)
-- Gradientes: linear-gradient(135deg, #F0B90B 0%, #D4A20B 100%)
-
-3.4 COMPONENTES OBLIGATORIOS:
-- CARDS: border-radius: 16px; padding: 24px; hover con elevacion
-- BOTONES PRIMARIOS: background dorado, border-radius: 12px, font-weight: 600
-- BOTONES SECUNDARIOS: borde dorado, fondo transparente
-- INPUTS: fondo oscuro, borde sutil, focus con glow dorado
-- BADGES: pill shape, colores semanticos
-- ICONOS: SVG inline, stroke-width: 1.5, currentColor
-
-3.5 ANIMACIONES:
-@keyframes fadeIn {{ from {{ opacity: 0; }} to {{ opacity: 1; }} }}
-@keyframes slideUp {{ from {{ opacity: 0; transform: translateY(10px); }} to {{ opacity: 1; transform: translateY(0); }} }}
-@keyframes pulse {{ 0%, 100% {{ opacity: 1; }} 50% {{ opacity: 0.5; }} }}
-@keyframes shimmer {{ from {{ background-position: -200% 0; }} to {{ background-position: 200% 0; }} }}
-
-═══════════════════════════════════════════════════════════════════════════════
-SECCION 4: ESTANDARES DE CODIGO
-═══════════════════════════════════════════════════════════════════════════════
-
-4.1 HTML5 SEMANTICO:
-- Estructura: header > nav > main > section > footer
-- Accesibilidad: aria-labels, roles, alt texts obligatorios
-- Meta tags: viewport, charset, description, theme-color
-
-4.2 CSS MODERNO:
-- Variables CSS en :root
-- Mobile-first con media queries
-- Flexbox y Grid como base
-- Animaciones con @keyframes
-- PROHIBIDO: !important, IDs para estilos, inline styles
-
-4.3 JAVASCRIPT ES6+:
-- const/let exclusivamente
-- Arrow functions
-- Template literals
-- Async/await para asincronía
-- Event delegation
-- Modulos cuando sea posible
-
-═══════════════════════════════════════════════════════════════════════════════
-SECCION 5: CONTEXTO DEL PROYECTO
+        # Prefijo estático primero (cacheable por el proveedor), contexto del proyecto al final
+        project_context = f"""═══════════════════════════════════════════════════════════════════════════════
+SECCION 7: CONTEXTO DEL PROYECTO
 ═══════════════════════════════════════════════════════════════════════════════
 
 PROYECTO: {project_name}
 ARCHIVOS EXISTENTES:
 {files_context if files_context else "(Proyecto nuevo, crear desde cero)"}
 
-═══════════════════════════════════════════════════════════════════════════════
-SECCION 6: REGLAS CRITICAS
-═══════════════════════════════════════════════════════════════════════════════
-
-1. CODIGO COMPLETO: Nunca fragmentos, siempre archivos completos y funcionales
-2. CALIDAD VISUAL: Cada pixel debe parecer de app de millones de dolares
-3. RESPONSIVE: Funciona perfectamente en mobile, tablet y desktop
-4. ACCESIBLE: Navegable con teclado, screen readers compatibles
-5. PERFORMANTE: Lazy loading, optimizacion de animaciones
-6. PROFESIONAL: Sin errores de consola, sin warnings
-
-═══════════════════════════════════════════════════════════════════════════════
-SECCION 7: EJEMPLO DE RESPUESTA EXCELENTE
-═══════════════════════════════════════════════════════════════════════════════
-
-Usuario pide: "Hazme una landing page para mi app de crypto"
-
-Respuesta correcta:
-{{
-    "files": {{
-        "index.html": "<!DOCTYPE html><html lang='es'>... (HTML completo con header, hero, features, CTA, footer)...",
-        "styles.css": ":root {{ --bg-primary: #0B0E11; ... }} * {{ margin: 0; ... }} .hero {{ ... }} (CSS completo)",
-        "script.js": "// Animaciones y interacciones\\nconst initAnimations = () => {{ ... }}; (JS completo)"
-    }},
-    "message": "[BLUEPRINT] Entiendo que necesitas una landing page crypto profesional. He creado: 1) Hero section con gradiente y CTA prominente, 2) Features grid con iconos SVG y cards glass morphism, 3) Stats section con contadores animados, 4) Footer con links y redes sociales. Todo siguiendo el sistema de diseno neo-bank con palette dorada."
-}}
-
 RESPONDE SOLO CON JSON VALIDO. SIN TEXTO ADICIONAL ANTES O DESPUES."""
+        code_system_prompt = assemble(self.CODE_BUILDER_BLOCK, project_context)
 
         messages = [{"role": "user", "content": message}]
         
-        for provider in self.providers:
+        for provider in provider_router.rank(self.providers, "code"):
             if not provider.is_available():
                 continue
             
             logger.info(f"Code builder trying provider: {provider.name}")
-            result = provider.chat(messages, code_system_prompt)
+            start = time.time()
+            result = self._cached_chat(provider, messages, code_system_prompt, use_cache)
+            if not result.get("cached"):
+                self.record_benchmark(provider.name, int((time.time() - start) * 1000), bool(result.get("success")), "code")
             
             if result.get("success"):
                 response_text = result.get("response", "")
@@ -24,6 +24,8 @@ try:
 except ImportError:
     pass
 
+from core.http_pool import get_client, get_session
+
 if not HTTPX_AVAILABLE and not REQUESTS_AVAILABLE:
     logger.error("Neither httpx nor requests is available. AntigravityClient will not work.")
 
@@ -53,12 +55,11 @@ class AntigravityClient:
     def _http_get(self, url: str, timeout: int = 10) -> Optional[Dict]:
         try:
             if HTTPX_AVAILABLE:
-                with httpx.Client(timeout=timeout) as client:
-                    response = client.get(url)
-                    response.raise_for_status()
-                    return response.json()
+                response = get_client("antigravity").get(url, timeout=timeout)
+                response.raise_for_status()
+                return response.json()
             elif REQUESTS_AVAILABLE:
-                response = requests.get(url, timeout=timeout)
+                response = get_session("antigravity").get(url, timeout=timeout)
                 response.raise_for_status()
                 return response.json()
         except Exception as e:
@@ -70,12 +71,11 @@ class AntigravityClient:
         timeout = timeout or self.timeout
         try:
             if HTTPX_AVAILABLE:
-                with httpx.Client(timeout=timeout) as client:
-                    response = client.post(url, json=json_data)
-                    response.raise_for_status()
-                    return response.json()
+                response = get_client("antigravity").post(url, json=json_data, timeout=timeout)
+                response.raise_for_status()
+                return response.json()
             elif REQUESTS_AVAILABLE:
-                response = requests.post(url, json=json_data, timeout=timeout)
+                response = get_session("antigravity").post(url, json=json_data, timeout=timeout)
                 response.raise_for_status()
                 return response.json()
         except Exception as e:
@@ -0,0 +1,129 @@
+"""
+BUNK3R-IA: Benchmark Writer
+Escritura diferida y por lotes de `ai_model_benchmarks`.
+
+record_benchmark solo encola la fila en memoria; un hilo en segundo plano las
+inserta en bloque cada AI_BENCH_BATCH filas o AI_BENCH_FLUSH_SECONDS segundos.
+El buffer está acotado (AI_BENCH_MAX_BUFFER): si se llena se descartan las
+filas más antiguas. Al cerrar el proceso se vacía lo pendiente.
+"""
+import os
+import atexit
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Deque, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class BenchmarkWriter:
+    """Buffer acotado de benchmarks con volcado periódico en bloque."""
+
+    def __init__(self, batch_size: int = None, flush_interval: float = None, max_buffer: int = None):
+        self.batch_size = batch_size or int(os.getenv('AI_BENCH_BATCH', '50'))
+        self.flush_interval = flush_interval or float(os.getenv('AI_BENCH_FLUSH_SECONDS', '10'))
+        self.max_buffer = max_buffer or int(os.getenv('AI_BENCH_MAX_BUFFER', '5000'))
+        self.app = None
+        self._buffer: Deque[Dict] = deque(maxlen=self.max_buffer)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {"queued": 0, "written": 0, "dropped": 0, "flushes": 0, "errors": 0}
+
+    def start(self, app=None):
+        """Arranca el hilo de volcado (idempotente)."""
+        if app is not None:
+            self.app = app
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._flush_loop, name="ai-bench-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, provider: str, latency_ms: int, success: bool, task_type: str = "chat"):
+        """Encola una fila. No bloquea ni toca la base de datos."""
+        if self.app is None:
+            self._capture_app()
+        row = {
+            "provider": provider,
+            "latency_ms": latency_ms,
+            "success": success,
+            "task_type": task_type,
+            "timestamp": datetime.utcnow()
+        }
+        with self._lock:
+            if len(self._buffer) == self.max_buffer:
+                self.stats["dropped"] += 1
+            self._buffer.append(row)
+            self.stats["queued"] += 1
+            pending = len(self._buffer)
+        if pending >= self.batch_size:
+            self._wakeup.set()
+
+    def flush(self) -> int:
+        """Inserta en bloque todo lo pendiente. Devuelve el número de filas escritas."""
+        with self._flush_lock:
+            with self._lock:
+                rows: List[Dict] = list(self._buffer)
+                self._buffer.clear()
+            if not rows:
+                return 0
+            if self.app is None:
+                # Sin app no hay sesión: devolvemos las filas al buffer
+                with self._lock:
+                    self._buffer.extendleft(reversed(rows))
+                return 0
+
+            try:
+                from sqlalchemy import insert
+                from backend.models import db, ModelBenchmark
+
+                with self.app.app_context():
+                    try:
+                        db.session.execute(insert(ModelBenchmark), rows)
+                        db.session.commit()
+                    except Exception:
+                        db.session.rollback()
+                        raise
+                self.stats["written"] += len(rows)
+                self.stats["flushes"] += 1
+                return len(rows)
+            except Exception as e:
+                # Se descarta el lote para no crecer sin límite si la BD está caída
+                self.stats["errors"] += 1
+                self.stats["dropped"] += len(rows)
+                logger.error(f"Error recording benchmark batch ({len(rows)} rows): {e}")
+                return 0
+
+    def stop(self):
+        """Detiene el hilo y vacía lo pendiente."""
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=5)
+        self.flush()
+
+    def pending(self) -> int:
+        return len(self._buffer)
+
+    def _capture_app(self):
+        try:
+            from flask import current_app
+            self.app = current_app._get_current_object()
+        except RuntimeError:
+            pass
+
+    def _flush_loop(self):
+        while not self._stop.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+
+# Writer único por worker
+benchmark_writer = BenchmarkWriter()
+atexit.register(benchmark_writer.stop)
@@ -0,0 +1,156 @@
+"""
+BUNK3R-IA: Context Window
+Recorte del historial de conversación a un presupuesto de tokens por proveedor.
+
+El loop agéntico vuelve a enviar todo el historial en cada paso, incluidos los
+resultados de herramientas (un `read_file` puede ser un JSON de 50 KB). Antes de
+cada llamada el historial se ajusta al presupuesto del proveedor:
+
+1. Los resultados de herramientas antiguos se resumen (cabecera + tamaño); solo
+   el más reciente se envía completo.
+2. Si aún no cabe, se descartan los mensajes más antiguos no fijados.
+3. Si el último mensaje por sí solo excede el presupuesto, se trunca.
+
+El último turno conserva siempre al menos `min_turn_tokens`, aunque el system
+prompt agote el presupuesto del proveedor: mejor exceder un poco que enviar al
+modelo un turno de usuario vacío.
+
+Los mensajes con `"pinned": True` nunca se descartan. El historial original no
+se modifica; se devuelve una copia con solo `role` y `content`.
+"""
+import os
+import logging
+from typing import Dict, List, Optional
+
+from core.prompt_builder import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+TOOL_RESULT_PREFIX = "[SISTEMA] Resultado de herramienta:"
+
+# Sobrecoste aproximado por mensaje (rol + separadores del chat template)
+MESSAGE_OVERHEAD = 4
+
+# Presupuestos de contexto por proveedor (tokens de historial + system prompt)
+DEFAULT_BUDGETS = {
+    "groq": 12000,
+    "cerebras": 8000,
+    "ollama": 8000,
+    "huggingface": 8000,
+    "gemini": 100000,
+    "deepseek": 60000,
+    "deepseek-v3.2": 60000,
+    "openai": 100000,
+}
+
+
+def message_tokens(message: Dict) -> int:
+    """Tokens estimados de un mensaje."""
+    return estimate_tokens(message.get("content") or "") + MESSAGE_OVERHEAD
+
+
+def _clip_text(text: str, max_tokens: int) -> str:
+    """Conserva el principio y el final del texto dentro de max_tokens."""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    # Proporción caracteres/tokens del propio texto para no tokenizar en bucle
+    chars = int(len(text) * max_tokens / max(estimate_tokens(text), 1))
+    head = text[: chars * 3 // 4]
+    tail = text[-(chars // 4):] if chars >= 4 else ""
+    omitted = len(text) - len(head) - len(tail)
+    return f"{head}\n[... {omitted} caracteres omitidos ...]\n{tail}"
+
+
+class ContextWindow:
+    """Ajusta historiales al presupuesto de tokens de cada proveedor."""
+
+    def __init__(self, default_budget: int = None, tool_output_tokens: int = None, tool_summary_chars: int = None,
+                 min_turn_tokens: int = None):
+        self.default_budget = default_budget or int(os.getenv('AI_CONTEXT_BUDGET', '24000'))
+        self.tool_output_tokens = tool_output_tokens or int(os.getenv('AI_TOOL_OUTPUT_TOKENS', '4000'))
+        self.tool_summary_chars = tool_summary_chars or int(os.getenv('AI_TOOL_SUMMARY_CHARS', '300'))
+        self.min_turn_tokens = min_turn_tokens or int(os.getenv('AI_CONTEXT_MIN_TURN_TOKENS', '1000'))
+        self.stats = {"fits": 0, "trimmed": 0, "dropped_messages": 0, "summarized_tools": 0}
+
+    def budget_for(self, provider_name: Optional[str]) -> int:
+        """Presupuesto del proveedor: AI_CONTEXT_BUDGET_<NOMBRE> > tabla > AI_CONTEXT_BUDGET."""
+        if not provider_name:
+            return self.default_budget
+        env_key = "AI_CONTEXT_BUDGET_" + provider_name.upper().replace("-", "_").replace(".", "_")
+        value = os.getenv(env_key)
+        if value:
+            return int(value)
+        return DEFAULT_BUDGETS.get(provider_name, self.default_budget)
+
+    def clip_tool_output(self, output: str) -> str:
+        """Limita un resultado de herramienta antes de guardarlo en el historial."""
+        return _clip_text(output or "", self.tool_output_tokens)
+
+    def summarize_tool_result(self, content: str) -> str:
+        """Resumen de un resultado de herramienta antiguo: cabecera y tamaño original."""
+        body = content[len(TOOL_RESULT_PREFIX):].strip()
+        if len(body) <= self.tool_summary_chars:
+            return content
+        return (f"{TOOL_RESULT_PREFIX} {body[:self.tool_summary_chars]}"
+                f"\n[... resultado resumido, {len(body)} caracteres en total ...]")
+
+    def fit(self, conversation: List[Dict], provider_name: Optional[str] = None,
+            system_prompt: Optional[str] = None, budget: int = None) -> List[Dict]:
+        """Copia del historial que cabe en el presupuesto del proveedor."""
+        budget = (budget or self.budget_for(provider_name)) - estimate_tokens(system_prompt or "")
+        if budget < self.min_turn_tokens:
+            logger.warning(f"ContextWindow: el system prompt deja {budget} tokens para {provider_name}; "
+                           f"se reservan {self.min_turn_tokens} para el último turno")
+            budget = self.min_turn_tokens
+        messages = [{"role": m.get("role"), "content": m.get("content") or "", "pinned": m.get("pinned", False)}
+                    for m in conversation]
+        self.stats["fits"] += 1
+        if not messages:
+            return []
+
+        # 1. Resumir resultados de herramientas salvo el último
+        tool_indexes = [i for i, m in enumerate(messages) if m["content"].startswith(TOOL_RESULT_PREFIX)]
+        for i in tool_indexes[:-1]:
+            summary = self.summarize_tool_result(messages[i]["content"])
+            if summary != messages[i]["content"]:
+                messages[i]["content"] = summary
+                self.stats["summarized_tools"] += 1
+
+        for m in messages:
+            m["tokens"] = message_tokens(m)
+        total = sum(m["tokens"] for m in messages)
+        if total > budget:
+            self.stats["trimmed"] += 1
+
+            # 2. Descartar los más antiguos no fijados (el último mensaje siempre se conserva)
+            kept = list(messages)
+            i = 0
+            while total > budget and i < len(kept) - 1:
+                if kept[i]["pinned"]:
+                    i += 1
+                    continue
+                total -= kept.pop(i)["tokens"]
+                self.stats["dropped_messages"] += 1
+            # No empezar con una respuesta del asistente huérfana
+            while len(kept) > 1 and kept[0]["role"] == "assistant" and not kept[0]["pinned"]:
+                total -= kept.pop(0)["tokens"]
+                self.stats["dropped_messages"] += 1
+            messages = kept
+
+            # 3. El último mensaje sigue sin caber: truncarlo
+            if total > budget:
+                last = messages[-1]
+                # Los mensajes fijados no pueden dejar al último turno sin su mínimo
+                available = max(budget - (total - last["tokens"]) - MESSAGE_OVERHEAD, self.min_turn_tokens)
+                last["content"] = _clip_text(last["content"], available)
+
+            logger.debug(f"ContextWindow: historial ajustado a {budget} tokens para {provider_name}")
+
+        return [{"role": m["role"], "content": m["content"]} for m in messages]
+
+    def snapshot(self) -> Dict:
+        return {**self.stats, "default_budget": self.default_budget, "min_turn_tokens": self.min_turn_tokens}
+
+
+# Ventana única por worker
+context_window = ContextWindow()
@@ -0,0 +1,155 @@
+"""
+BUNK3R-IA: Conversation Backends
+Nivel compartido entre workers para el ConversationStore.
+
+Con `gunicorn --workers N` cada worker tiene su propio ConversationStore; este
+nivel, común a todos los procesos de la máquina, evita que el segundo worker
+vuelva a cargar la conversación desde Postgres o vea un historial antiguo.
+
+Cada conversación lleva un número de versión que se incrementa en cada
+escritura. El worker compara la versión de su copia local con la del nivel
+compartido (una lectura de clave primaria) y solo relee el contenido si cambió.
+
+Backends (AI_CONV_SHARED):
+- none: sin nivel compartido (por defecto).
+- sqlite: fichero SQLite en modo WAL (AI_CONV_SHARED_DB).
+"""
+import os
+import json
+import time
+import logging
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class SharedConversationBackend(ABC):
+    """Interfaz de un nivel compartido de conversaciones versionadas."""
+
+    name = "base"
+
+    @abstractmethod
+    def version(self, user_id: str) -> Optional[int]:
+        """Versión actual de la conversación, o None si no está."""
+
+    @abstractmethod
+    def get(self, user_id: str) -> Optional[Tuple[int, List[Dict]]]:
+        """(versión, conversación) o None si no está."""
+
+    @abstractmethod
+    def put(self, user_id: str, conversation: List[Dict]) -> int:
+        """Guarda la conversación y devuelve su nueva versión."""
+
+    @abstractmethod
+    def delete(self, user_id: str):
+        """Elimina la conversación."""
+
+
+class SQLiteConversationBackend(SharedConversationBackend):
+    """Conversaciones en un fichero SQLite WAL compartido por los workers."""
+
+    name = "sqlite"
+
+    def __init__(self, path: str = None, ttl: float = None):
+        self.path = path or os.getenv('AI_CONV_SHARED_DB', '/tmp/bunk3r_conversations.db')
+        self.ttl = ttl or float(os.getenv('AI_CONV_SHARED_TTL', '86400'))
+        self._local = threading.local()
+        self._writes = 0
+        if hasattr(os, "register_at_fork"):
+            # Las conexiones heredadas del proceso padre no son válidas en el hijo
+            os.register_at_fork(after_in_child=self._reset)
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS conversations "
+            "(user_id TEXT PRIMARY KEY, version INTEGER NOT NULL, payload TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        conn.commit()
+        self._purge()
+
+    def _conn(self) -> sqlite3.Connection:
+        # Una conexión por hilo: sqlite3 no se comparte de forma segura entre hilos
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA busy_timeout=5000")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _reset(self):
+        self._local = threading.local()
+
+    def version(self, user_id: str) -> Optional[int]:
+        row = self._conn().execute(
+            "SELECT version FROM conversations WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def get(self, user_id: str) -> Optional[Tuple[int, List[Dict]]]:
+        row = self._conn().execute(
+            "SELECT version, payload FROM conversations WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1])
+
+    def put(self, user_id: str, conversation: List[Dict]) -> int:
+        conn = self._conn()
+        payload = json.dumps(conversation, ensure_ascii=False)
+        with conn:
+            conn.execute(
+                "INSERT INTO conversations (user_id, version, payload, updated_at) VALUES (?, 1, ?, ?) "
+                "ON CONFLICT(user_id) DO UPDATE SET version = version + 1, "
+                "payload = excluded.payload, updated_at = excluded.updated_at",
+                (user_id, payload, time.time())
+            )
+            version = conn.execute(
+                "SELECT version FROM conversations WHERE user_id = ?", (user_id,)
+            ).fetchone()[0]
+        self._writes += 1
+        if self._writes % 500 == 0:
+            self._purge()
+        return version
+
+    def delete(self, user_id: str):
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM conversations WHERE user_id = ?", (user_id,))
+
+    def _purge(self):
+        """Elimina conversaciones sin escrituras desde hace más de `ttl`."""
+        try:
+            conn = self._conn()
+            with conn:
+                conn.execute("DELETE FROM conversations WHERE updated_at < ?", (time.time() - self.ttl,))
+        except sqlite3.Error as e:
+            logger.debug(f"SQLiteConversationBackend: purge error: {e}")
+
+
+BACKENDS = {
+    "sqlite": SQLiteConversationBackend,
+}
+
+
+def create_shared_backend(kind: str = None) -> Optional[SharedConversationBackend]:
+    """Crea el backend configurado en AI_CONV_SHARED, o None si está desactivado."""
+    kind = (kind or os.getenv('AI_CONV_SHARED', 'none')).lower()
+    if kind in ("", "none", "off", "false"):
+        return None
+    backend_cls = BACKENDS.get(kind)
+    if backend_cls is None:
+        logger.warning(f"AI_CONV_SHARED desconocido: {kind}; nivel compartido desactivado")
+        return None
+    try:
+        backend = backend_cls()
+        logger.info(f"ConversationStore: nivel compartido '{kind}' ACTIVADO")
+        return backend
+    except Exception as e:
+        logger.warning(f"ConversationStore: nivel compartido '{kind}' no disponible ({e})")
+        return None
@@ -0,0 +1,231 @@
+"""
+BUNK3R-IA: Conversation Store
+Almacén acotado de conversaciones en memoria, por worker.
+
+Sustituye a los dicts `conversations` que crecían sin límite. Cada entrada se
+desaloja por:
+- LRU, al superar AI_CONV_MAX_USERS conversaciones;
+- inactividad, tras AI_CONV_IDLE_SECONDS sin acceso;
+- memoria, al superar AI_CONV_MAX_MB (tamaño aproximado del contenido).
+
+Si se configura un `loader`, un fallo de caché recarga la conversación (p. ej.
+desde `ai_chat_messages`), de modo que desalojar no pierde historial persistido.
+Con un nivel compartido (core/conversation_backends.py) los workers de la misma
+máquina ven la misma versión del historial sin ir a la base de datos.
+Admite la interfaz básica de dict para no romper a quien lo usaba como tal.
+"""
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from core.conversation_backends import SharedConversationBackend
+
+logger = logging.getLogger(__name__)
+
+# Sobrecoste aproximado por mensaje (dict + claves) además del texto
+MESSAGE_OVERHEAD_BYTES = 200
+
+
+def conversation_size(conversation: List[Dict]) -> int:
+    """Tamaño aproximado en bytes de una conversación."""
+    return sum(len(m.get("content") or "") + MESSAGE_OVERHEAD_BYTES for m in conversation)
+
+
+class ConversationStore:
+    """LRU de conversaciones con desalojo por inactividad y techo de memoria."""
+
+    def __init__(self, max_users: int = None, max_bytes: int = None, idle_seconds: float = None,
+                 loader: Optional[Callable[[str], List[Dict]]] = None, name: str = "ai",
+                 shared: Optional[SharedConversationBackend] = None):
+        self.max_users = max_users or int(os.getenv('AI_CONV_MAX_USERS', '1000'))
+        self.max_bytes = max_bytes or int(float(os.getenv('AI_CONV_MAX_MB', '64')) * 1024 * 1024)
+        self.idle_seconds = idle_seconds or float(os.getenv('AI_CONV_IDLE_SECONDS', '3600'))
+        self.loader = loader
+        self.name = name
+        self.shared = shared
+
+        # user_id -> (último acceso, tamaño, conversación, versión compartida); orden = recencia
+        self._entries: "OrderedDict[str, Tuple[float, int, List[Dict], Optional[int]]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self.stats = {"hits": 0, "misses": 0, "loads": 0, "evicted_lru": 0, "evicted_idle": 0, "evicted_memory": 0,
+                      "shared_hits": 0, "shared_stale": 0, "shared_errors": 0}
+
+    def get(self, user_id: str) -> Optional[List[Dict]]:
+        """Conversación en memoria (sin recargar) o None."""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            self._touch(user_id, entry[2], entry[3])
+            return entry[2]
+
+    def get_or_load(self, user_id: str) -> List[Dict]:
+        """
+        Conversación del usuario. Orden de búsqueda: memoria local (si su versión
+        coincide con la compartida), nivel compartido, `loader`; si no, vacía.
+        """
+        with self._lock:
+            entry = self._entries.get(user_id)
+
+        if self.shared is not None:
+            conversation = self._from_shared(user_id, entry)
+            if conversation is not None:
+                return conversation
+            with self._lock:
+                entry = self._entries.get(user_id)
+
+        if entry is not None:
+            self.stats["hits"] += 1
+            return self.get(user_id) or entry[2]
+
+        self.stats["misses"] += 1
+        conversation = []
+        if self.loader is not None:
+            try:
+                conversation = self.loader(user_id) or []
+                self.stats["loads"] += 1
+            except Exception as e:
+                logger.error(f"ConversationStore[{self.name}]: error recargando {user_id}: {e}")
+
+        with self._lock:
+            # Otro hilo pudo cargarla mientras tanto: nos quedamos con la existente
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                self._touch(user_id, entry[2], entry[3])
+                return entry[2]
+        # Publicar lo cargado para que los demás workers no repitan la consulta
+        self.put(user_id, conversation)
+        return conversation
+
+    def put(self, user_id: str, conversation: List[Dict]):
+        """Guarda (o reemplaza) la conversación y recalcula su tamaño."""
+        version = None
+        if self.shared is not None:
+            try:
+                version = self.shared.put(self._shared_key(user_id), conversation)
+            except Exception as e:
+                self.stats["shared_errors"] += 1
+                logger.debug(f"ConversationStore[{self.name}]: error escribiendo nivel compartido: {e}")
+        with self._lock:
+            self._touch(user_id, conversation, version)
+
+    def pop(self, user_id: str, default=None):
+        if self.shared is not None:
+            try:
+                self.shared.delete(self._shared_key(user_id))
+            except Exception as e:
+                self.stats["shared_errors"] += 1
+                logger.debug(f"ConversationStore[{self.name}]: error borrando del nivel compartido: {e}")
+        with self._lock:
+            entry = self._remove(user_id)
+        return entry[2] if entry is not None else default
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def snapshot(self) -> Dict:
+        return {
+            **self.stats,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_users": self.max_users,
+            "max_bytes": self.max_bytes,
+            "shared": self.shared.name if self.shared is not None else None
+        }
+
+    # --- Interfaz de dict ---
+
+    def __contains__(self, user_id: str) -> bool:
+        return user_id in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __getitem__(self, user_id: str) -> List[Dict]:
+        conversation = self.get(user_id)
+        if conversation is None:
+            raise KeyError(user_id)
+        return conversation
+
+    def __setitem__(self, user_id: str, conversation: List[Dict]):
+        self.put(user_id, conversation)
+
+    def __delitem__(self, user_id: str):
+        with self._lock:
+            if self._remove(user_id) is None:
+                raise KeyError(user_id)
+
+    # --- Nivel compartido ---
+
+    def _shared_key(self, user_id: str) -> str:
+        # Cada store (ai, streaming...) tiene su propio espacio de claves
+        return f"{self.name}:{user_id}"
+
+    def _from_shared(self, user_id: str, entry) -> Optional[List[Dict]]:
+        """
+        Devuelve la conversación si la copia local está al día o si el nivel
+        compartido tiene una versión más reciente; None para seguir con el loader.
+        """
+        key = self._shared_key(user_id)
+        try:
+            version = self.shared.version(key)
+            if entry is not None and (entry[3] == version or (version is None and entry[3] is None)):
+                self.stats["hits"] += 1
+                return self.get(user_id) or entry[2]
+            data = self.shared.get(key) if version is not None else None
+        except Exception as e:
+            # Nivel compartido caído: la copia local sigue valiendo
+            self.stats["shared_errors"] += 1
+            logger.debug(f"ConversationStore[{self.name}]: error leyendo nivel compartido: {e}")
+            return None
+
+        with self._lock:
+            if data is None:
+                # Borrada o expirada en el nivel compartido: la copia local ya no vale
+                if entry is not None:
+                    self._remove(user_id)
+                return None
+            version, conversation = data
+            self.stats["shared_stale" if entry is not None else "shared_hits"] += 1
+            self._touch(user_id, conversation, version)
+        return conversation
+
+    # --- Internos (con el lock tomado) ---
+
+    def _touch(self, user_id: str, conversation: List[Dict], version: Optional[int] = None):
+        # Las conversaciones se mutan por referencia: el tamaño se recalcula en cada acceso
+        self._remove(user_id)
+        size = conversation_size(conversation)
+        self._entries[user_id] = (time.time(), size, conversation, version)
+        self._bytes += size
+        self._evict(keep=user_id)
+
+    def _remove(self, user_id: str):
+        entry = self._entries.pop(user_id, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+        return entry
+
+    def _evict(self, keep: str):
+        now = time.time()
+        while self._entries:
+            oldest_id, (last_access, _, _, _) = next(iter(self._entries.items()))
+            if oldest_id == keep:
+                break
+            if now - last_access > self.idle_seconds:
+                reason = "evicted_idle"
+            elif len(self._entries) > self.max_users:
+                reason = "evicted_lru"
+            elif self._bytes > self.max_bytes:
+                reason = "evicted_memory"
+            else:
+                break
+            self._remove(oldest_id)
+            self.stats[reason] += 1
+            logger.debug(f"ConversationStore[{self.name}]: desalojada {oldest_id} ({reason})")
@@ -0,0 +1,116 @@
+"""
+BUNK3R-IA: Conversation Writer
+Persistencia por lotes de `ai_chat_messages`.
+
+Todas las filas pendientes se insertan en una única transacción con un INSERT
+multi-fila, usando una conexión prestada del pool que siempre se devuelve.
+
+Por defecto la escritura es síncrona (AI_CONV_WRITE_BEHIND=false). Con
+write-behind activado, `submit` solo encola y un hilo en segundo plano vuelca
+cada AI_CONV_FLUSH_SECONDS segundos o al llegar a AI_CONV_BATCH filas; lo
+pendiente se vuelca también al cerrar el proceso.
+"""
+import os
+import atexit
+import logging
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Deque, Dict, List, Optional, Tuple
+
+from core.db_pool import db_connection, insert_many
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ("user_id", "role", "content", "created_at")
+
+
+class ConversationWriter:
+    """Escribe mensajes de chat en bloque, síncrona o diferidamente."""
+
+    def __init__(self, db_manager=None, write_behind: bool = None, batch_size: int = None,
+                 flush_interval: float = None, max_buffer: int = None):
+        self.db_manager = db_manager
+        if write_behind is None:
+            write_behind = os.getenv('AI_CONV_WRITE_BEHIND', 'false').lower() == 'true'
+        self.write_behind = write_behind
+        self.batch_size = batch_size or int(os.getenv('AI_CONV_BATCH', '100'))
+        self.flush_interval = flush_interval or float(os.getenv('AI_CONV_FLUSH_SECONDS', '2'))
+        self.max_buffer = max_buffer or int(os.getenv('AI_CONV_MAX_BUFFER', '10000'))
+
+        self._buffer: Deque[Tuple] = deque(maxlen=self.max_buffer)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {"queued": 0, "written": 0, "dropped": 0, "flushes": 0, "errors": 0}
+
+        if self.write_behind:
+            self.start()
+            atexit.register(self.stop)
+
+    def start(self):
+        """Arranca el hilo de volcado (idempotente)."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._flush_loop, name="ai-conv-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, user_id: str, messages: List[Dict]) -> bool:
+        """Persiste `messages`; con write-behind solo los encola. Devuelve False si falló."""
+        if not self.db_manager or not messages:
+            return False
+        now = datetime.now()
+        # Un microsegundo de diferencia conserva el orden al recargar por created_at
+        rows = [(user_id, m["role"], m["content"], now + timedelta(microseconds=i)) for i, m in enumerate(messages)]
+        with self._lock:
+            if len(self._buffer) + len(rows) > self.max_buffer:
+                self.stats["dropped"] += len(self._buffer) + len(rows) - self.max_buffer
+            self._buffer.extend(rows)
+            self.stats["queued"] += len(rows)
+            pending = len(self._buffer)
+
+        if not self.write_behind:
+            return self.flush() >= 0
+        if pending >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    def flush(self) -> int:
+        """Inserta lo pendiente en una transacción. Devuelve filas escritas o -1 si falló."""
+        with self._flush_lock:
+            with self._lock:
+                rows = list(self._buffer)
+                self._buffer.clear()
+            if not rows:
+                return 0
+            try:
+                with db_connection(self.db_manager) as conn:
+                    insert_many(conn, "ai_chat_messages", COLUMNS, rows)
+                self.stats["written"] += len(rows)
+                self.stats["flushes"] += 1
+                return len(rows)
+            except Exception as e:
+                self.stats["errors"] += 1
+                self.stats["dropped"] += len(rows)
+                logger.error(f"Error saving conversation batch ({len(rows)} rows): {e}")
+                return -1
+
+    def stop(self):
+        """Detiene el hilo y vuelca lo pendiente."""
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=5)
+        self.flush()
+
+    def pending(self) -> int:
+        return len(self._buffer)
+
+    def _flush_loop(self):
+        while not self._stop.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
@@ -0,0 +1,258 @@
+"""
+BUNK3R-IA: DB Pool
+Gestor de conexiones único y seguro entre hilos para el db_manager.
+
+- PostgresConnectionManager: ThreadedConnectionPool de psycopg2 con espera
+  acotada cuando el pool está lleno (AI_DB_POOL_TIMEOUT) en lugar de fallar.
+- SQLiteConnectionManager: una conexión por hilo en modo WAL, en lugar de una
+  única conexión compartida con check_same_thread=False.
+
+Ambos exponen `with db_manager.connection() as conn:` (commit al salir, rollback
+si hay excepción, la conexión siempre se devuelve), mantienen la interfaz
+antigua `get_connection()` / `release_connection()` y publican métricas del pool
+en `snapshot()`.
+
+`db_connection(db_manager)` da la misma semántica para cualquier manager, tenga
+o no `connection()` propio.
+"""
+import os
+import time
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+try:
+    from psycopg2.extras import execute_values
+    from psycopg2.pool import ThreadedConnectionPool
+    PSYCOPG2_AVAILABLE = True
+except ImportError:
+    PSYCOPG2_AVAILABLE = False
+
+
+class PoolTimeout(Exception):
+    """No se obtuvo una conexión libre dentro del plazo."""
+
+
+class PoolMetrics:
+    """Contadores de uso del pool: en uso, esperas y timeouts."""
+
+    def __init__(self, max_size: Optional[int] = None):
+        self.max_size = max_size
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.acquired = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self._lock = threading.Lock()
+
+    def on_acquire(self, waited: float):
+        with self._lock:
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+            self.acquired += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+
+    def on_release(self):
+        with self._lock:
+            self.in_use -= 1
+
+    def snapshot(self) -> Dict:
+        return {
+            "in_use": self.in_use,
+            "max_size": self.max_size,
+            "peak_in_use": self.peak_in_use,
+            "acquired": self.acquired,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "avg_wait_ms": round(self.total_wait / self.acquired * 1000, 2) if self.acquired else 0.0,
+            "max_wait_ms": round(self.max_wait * 1000, 2)
+        }
+
+
+class ConnectionManager:
+    """Base común: transacción con commit/rollback y devolución garantizada."""
+
+    kind = "base"
+
+    def __init__(self, max_size: Optional[int] = None):
+        self.metrics = PoolMetrics(max_size)
+
+    def get_connection(self):
+        raise NotImplementedError
+
+    def release_connection(self, conn):
+        raise NotImplementedError
+
+    @contextmanager
+    def connection(self):
+        """Conexión prestada dentro de una transacción."""
+        conn = self.get_connection()
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            self.metrics.errors += 1
+            try:
+                conn.rollback()
+            except Exception as e:
+                logger.debug(f"{self.kind}: rollback falló: {e}")
+            raise
+        finally:
+            self.release_connection(conn)
+
+    def snapshot(self) -> Dict:
+        return {"kind": self.kind, **self.metrics.snapshot()}
+
+    def close(self):
+        pass
+
+
+class PostgresConnectionManager(ConnectionManager):
+    """ThreadedConnectionPool con espera acotada y métricas."""
+
+    kind = "postgresql"
+
+    def __init__(self, url: str, minconn: int = None, maxconn: int = None, timeout: float = None):
+        if not PSYCOPG2_AVAILABLE:
+            raise RuntimeError("psycopg2 no está instalado")
+        minconn = minconn or int(os.getenv('AI_DB_POOL_MIN', '1'))
+        maxconn = maxconn or int(os.getenv('AI_DB_POOL_MAX', '10'))
+        super().__init__(maxconn)
+        self.timeout = timeout or float(os.getenv('AI_DB_POOL_TIMEOUT', '10'))
+        self.pool = ThreadedConnectionPool(minconn, maxconn, url)
+        # ThreadedConnectionPool lanza PoolError si está lleno: el semáforo convierte eso en espera
+        self._slots = threading.BoundedSemaphore(maxconn)
+
+    def get_connection(self):
+        start = time.monotonic()
+        if not self._slots.acquire(timeout=self.timeout):
+            self.metrics.timeouts += 1
+            raise PoolTimeout(f"Sin conexiones libres tras {self.timeout}s ({self.metrics.max_size} en uso)")
+        try:
+            conn = self.pool.getconn()
+        except Exception:
+            self._slots.release()
+            self.metrics.errors += 1
+            raise
+        self.metrics.on_acquire(time.monotonic() - start)
+        return conn
+
+    def release_connection(self, conn):
+        try:
+            # Una conexión rota no vuelve al pool
+            self.pool.putconn(conn, close=bool(getattr(conn, "closed", False)))
+        finally:
+            self.metrics.on_release()
+            self._slots.release()
+
+    def close(self):
+        self.pool.closeall()
+
+
+class SQLiteConnectionManager(ConnectionManager):
+    """Una conexión SQLite por hilo, en modo WAL."""
+
+    kind = "sqlite"
+
+    def __init__(self, path: str, busy_timeout: float = None):
+        super().__init__()
+        self.path = path
+        self.busy_timeout = busy_timeout or float(os.getenv('AI_DB_BUSY_TIMEOUT', '5'))
+        self._local = threading.local()
+        self._opened = 0
+        self._lock = threading.Lock()
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._reset)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self.get_connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        self.release_connection(conn)
+
+    def _reset(self):
+        self._local = threading.local()
+
+    def get_connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._lock:
+                self._opened += 1
+        self.metrics.on_acquire(0.0)
+        return conn
+
+    def release_connection(self, conn):
+        # La conexión es del hilo: se conserva abierta para la próxima vez
+        self.metrics.on_release()
+
+    def snapshot(self) -> Dict:
+        return {**super().snapshot(), "connections": self._opened}
+
+
+def create_db_manager(database_url: Optional[str] = None, sqlite_path: Optional[str] = None) -> ConnectionManager:
+    """PostgreSQL si hay URL (y psycopg2), si no SQLite en `sqlite_path`."""
+    if database_url:
+        try:
+            manager = PostgresConnectionManager(database_url)
+            logger.info("DB pool: PostgreSQL ThreadedConnectionPool listo")
+            return manager
+        except Exception as e:
+            logger.error(f"Failed to connect to PostgreSQL: {e}. Falling back to SQLite.")
+    if not sqlite_path:
+        raise RuntimeError("Sin DATABASE_URL ni ruta SQLite")
+    manager = SQLiteConnectionManager(sqlite_path)
+    logger.info(f"DB pool: SQLite por hilo (WAL) en {sqlite_path}")
+    return manager
+
+
+@contextmanager
+def db_connection(db_manager):
+    """Conexión prestada del db_manager dentro de una transacción."""
+    if hasattr(db_manager, "connection"):
+        with db_manager.connection() as conn:
+            yield conn
+        return
+
+    conn = db_manager.get_connection()
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        try:
+            conn.rollback()
+        except Exception as e:
+            logger.debug(f"db_connection: rollback falló: {e}")
+        raise
+    finally:
+        release = getattr(db_manager, "release_connection", None)
+        if release is not None:
+            release(conn)
+
+
+def placeholder(conn) -> str:
+    """Marcador de parámetros del driver: '?' en sqlite3, '%s' en psycopg2."""
+    return "?" if isinstance(conn, sqlite3.Connection) else "%s"
+
+
+def insert_many(conn, table: str, columns: tuple, rows: list):
+    """INSERT multi-fila en una sola sentencia (execute_values en Postgres)."""
+    if not rows:
+        return
+    cur = conn.cursor()
+    try:
+        column_list = ", ".join(columns)
+        if PSYCOPG2_AVAILABLE and not isinstance(conn, sqlite3.Connection):
+            execute_values(cur, f"INSERT INTO {table} ({column_list}) VALUES %s", rows)
+        else:
+            marks = ", ".join([placeholder(conn)] * len(columns))
+            cur.executemany(f"INSERT INTO {table} ({column_list}) VALUES ({marks})", rows)
+    finally:
+        cur.close()
@@ -0,0 +1,139 @@
+"""
+BUNK3R-IA: Fast Path
+Clasificador local que decide si un mensaje necesita el ciclo completo de la
+Singularidad o basta con una única llamada al proveedor más rápido.
+
+El ciclo completo (consejo de reflexión + síntesis + loop agéntico) cuesta al
+menos 4 llamadas LLM. Un "hola" o un "gracias" no necesita reflexión ni
+herramientas. Un mensaje va por el atajo si:
+
+1. Es corto (AI_FASTPATH_MAX_WORDS palabras como máximo).
+2. No contiene código, rutas ni referencias a archivos.
+3. Todas sus palabras son conversacionales (saludo, agradecimiento,
+   despedida). Las confirmaciones y negaciones ("sí", "dale", "no") no lo
+   son: suelen responder a una acción que propuso el agente.
+4. El AIDecisionEngine no le encuentra una intención de trabajo (crear,
+   modificar, depurar, explicar, desplegar).
+5. El último turno del asistente no dejó una pregunta ni una herramienta
+   pendiente (la respuesta del usuario puede ser la orden de ejecutarla).
+
+Ante la duda el mensaje va por el camino completo. AI_FASTPATH=false lo desactiva.
+"""
+import os
+import re
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+try:
+    from core.legacy_v1_archive.ai_core_engine import AIDecisionEngine, IntentType
+    WORK_INTENTS = frozenset({
+        IntentType.CREATE_NEW, IntentType.MODIFY_EXISTING, IntentType.DEBUG_FIX,
+        IntentType.EXPLAIN, IntentType.DEPLOY,
+    })
+except ImportError:
+    AIDecisionEngine = None
+    WORK_INTENTS = frozenset()
+
+# Llamadas LLM del camino completo: 2 miembros del consejo + síntesis + paso 0 del agente
+FULL_PATH_CALLS = 4
+
+CONVERSATIONAL_WORDS = frozenset("""
+hola holi hey ey buenas buenos buen dia dias día días tardes noches saludos hi hello
+gracias muchas mil muchisimas muchísimas thanks thank you thx ty
+perfecto genial excelente bien muy todo entendido cool nice great
+que qué tal como cómo estas estás estoy
+adios adiós chao chau hasta luego pronto mañana bye nos vemos
+por la el tu tus su ayuda amigo bro crack bunk3r bunker jaja jajaja lol
+""".split())
+
+# Código, rutas o archivos: siempre camino completo
+CODE_MARKERS = re.compile(r"[`{}<>()\[\];=/\\]|\w\.\w{1,5}\b")
+
+WORD = re.compile(r"\w+")
+
+# Cola del último turno del asistente en la que se busca una pregunta pendiente
+PENDING_TAIL_CHARS = 300
+
+
+@dataclass
+class RouteDecision:
+    """Decisión de enrutado de un mensaje"""
+    trivial: bool
+    reason: str
+
+
+class FastPathClassifier:
+    """Enruta los mensajes triviales a una sola llamada LLM y mide el ahorro."""
+
+    def __init__(self, enabled: bool = None, max_words: int = None):
+        self.enabled = enabled if enabled is not None else os.getenv('AI_FASTPATH', 'true').lower() == 'true'
+        self.max_words = max_words or int(os.getenv('AI_FASTPATH_MAX_WORDS', '8'))
+        self._lock = threading.Lock()
+        self.stats = {"fast_path": 0, "full": 0, "llm_calls_saved": 0, "fast_path_ms": 0, "full_ms": 0}
+
+    def classify(self, message: str, history: Optional[List[Dict]] = None) -> RouteDecision:
+        if not self.enabled:
+            return RouteDecision(False, "disabled")
+
+        text = (message or "").strip()
+        words = WORD.findall(text.lower())
+        if not text or len(words) > self.max_words:
+            return RouteDecision(False, "long")
+        if CODE_MARKERS.search(text):
+            return RouteDecision(False, "code")
+        if any(w not in CONVERSATIONAL_WORDS for w in words):
+            return RouteDecision(False, "task")
+        if self._pending_action(history):
+            return RouteDecision(False, "pending")
+
+        # Segunda opinión: el motor de intenciones puede ver un patrón de trabajo
+        if AIDecisionEngine is not None:
+            intent = AIDecisionEngine().classify_intent(text)
+            if intent.type in WORK_INTENTS:
+                return RouteDecision(False, f"intent:{intent.type.value}")
+
+        return RouteDecision(True, "conversational")
+
+    @staticmethod
+    def _pending_action(history: Optional[List[Dict]]) -> bool:
+        """Si el último turno del asistente pregunta algo o propone una herramienta."""
+        for turn in reversed(history or []):
+            if turn.get("role") == "assistant":
+                content = str(turn.get("content") or "")
+                return "<TOOL>" in content or "?" in content[-PENDING_TAIL_CHARS:]
+            if turn.get("role") == "user":
+                return False
+        return False
+
+    def record(self, fast: bool, latency_ms: int):
+        """Registra una petición atendida por el atajo o por el camino completo."""
+        with self._lock:
+            if fast:
+                self.stats["fast_path"] += 1
+                self.stats["fast_path_ms"] += latency_ms
+                self.stats["llm_calls_saved"] += FULL_PATH_CALLS - 1
+            else:
+                self.stats["full"] += 1
+                self.stats["full_ms"] += latency_ms
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            stats = dict(self.stats)
+        total = stats["fast_path"] + stats["full"]
+        return {
+            "enabled": self.enabled,
+            "fast_path": stats["fast_path"],
+            "full": stats["full"],
+            "fast_path_ratio": round(stats["fast_path"] / total, 3) if total else 0.0,
+            "llm_calls_saved": stats["llm_calls_saved"],
+            "avg_fast_path_ms": stats["fast_path_ms"] // stats["fast_path"] if stats["fast_path"] else 0,
+            "avg_full_ms": stats["full_ms"] // stats["full"] if stats["full"] else 0,
+        }
+
+
+# Clasificador único por worker
+fast_path = FastPathClassifier()
@@ -0,0 +1,516 @@
+"""
+BUNK3R-IA: Filesystem Scanner
+Recorrido único del árbol de un repositorio, compartido por todos los indexadores.
+
+RepoIndexer, GravityCore, GraphCrawler, AIProjectAnalyzer y el explorador de
+archivos del IDE recorrían el mismo árbol cada uno por su lado y con su propia
+lista de directorios ignorados. Ahora todos leen la misma `FsSnapshot`:
+
+- Un solo recorrido con os.scandir, sin seguir symlinks de directorio.
+- Una política de ignorados común (IgnorePolicy): los nombres de
+  DEFAULT_IGNORE_NAMES (más FS_SCAN_IGNORE) y las reglas de los `.gitignore`
+  del árbol y de `.git/info/exclude` (FS_SCAN_GITIGNORE=false las desactiva).
+- La foto de cada raíz se guarda en memoria (una por worker) y se invalida por
+  mtime: cada consulta hace un stat de los directorios conocidos y sólo vuelve
+  a listar los que cambiaron (crear, borrar o renombrar una entrada cambia el
+  mtime de su directorio). Un `.gitignore` editado vuelve a listar su subárbol.
+- Bajo una raíz vigilada por core/workspace_watcher.py ni siquiera se hace ese
+  stat: el watcher marca (notify) los directorios que hay que volver a listar.
+
+La foto guarda nombres, no stat de archivos: quien necesite tamaño o mtime
+(FileIndex) hace el stat de los archivos que le interesan.
+"""
+import os
+import re
+import time
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Unión de las listas que usaba cada indexador
+DEFAULT_IGNORE_NAMES = frozenset({
+    '.git', 'node_modules', '__pycache__', '.venv', 'venv', 'env',
+    'dist', 'build', 'target', '.next', '.cache', 'vendor'
+})
+
+
+class IgnoreRule(NamedTuple):
+    base: str      # directorio (relativo) del .gitignore
+    pattern: str   # línea original, para comparar reglas entre lecturas
+    regex: re.Pattern
+    negate: bool
+    dir_only: bool
+
+
+def _translate(pattern: str) -> str:
+    """Patrón glob de .gitignore a regex (`*` y `?` no cruzan '/', `**` sí)."""
+    out = []
+    i, n = 0, len(pattern)
+    while i < n:
+        char = pattern[i]
+        if char == '*':
+            if pattern.startswith('**', i):
+                at_start = i == 0 or pattern[i - 1] == '/'
+                if at_start and pattern.startswith('**/', i):
+                    out.append('(?:.*/)?')
+                    i += 3
+                    continue
+                out.append('.*')
+                i += 2
+                continue
+            out.append('[^/]*')
+        elif char == '?':
+            out.append('[^/]')
+        elif char == '[':
+            end = pattern.find(']', i + 2)
+            if end < 0:
+                out.append(re.escape(char))
+            else:
+                body = pattern[i + 1:end]
+                if body.startswith('!'):
+                    body = '^' + body[1:]
+                out.append('[' + body.replace('\\', '\\\\') + ']')
+                i = end
+        elif char == '\\' and i + 1 < n:
+            i += 1
+            out.append(re.escape(pattern[i]))
+        else:
+            out.append(re.escape(char))
+        i += 1
+    return ''.join(out)
+
+
+def parse_gitignore(text: str, base: str = "") -> List[IgnoreRule]:
+    """Reglas de un .gitignore situado en el directorio relativo `base`."""
+    rules = []
+    for line in text.splitlines():
+        if not line.endswith('\\ '):
+            line = line.rstrip()
+        if not line or line.startswith('#'):
+            continue
+        original = line
+        negate = line.startswith('!')
+        if negate:
+            line = line[1:]
+        elif line.startswith('\\'):
+            line = line[1:]
+        dir_only = line.endswith('/')
+        line = line.rstrip('/')
+        if not line:
+            continue
+        # Con una barra (que no sea la final) el patrón es relativo al .gitignore
+        anchored = '/' in line
+        body = _translate(line.lstrip('/'))
+        if not anchored:
+            body = '(?:.*/)?' + body
+        try:
+            regex = re.compile(body + r'\Z', re.DOTALL)
+        except re.error:
+            continue
+        rules.append(IgnoreRule(base, original, regex, negate, dir_only))
+    return rules
+
+
+class IgnorePolicy:
+    """Qué entradas del árbol quedan fuera de la foto."""
+
+    def __init__(self, names=None, gitignore: bool = None):
+        extra = {n.strip() for n in os.getenv('FS_SCAN_IGNORE', '').split(',') if n.strip()}
+        self.names = frozenset(names if names is not None else DEFAULT_IGNORE_NAMES | extra)
+        self.gitignore = gitignore if gitignore is not None else (
+            os.getenv('FS_SCAN_GITIGNORE', 'true').lower() != 'false')
+
+    @staticmethod
+    def matches(rules: List[IgnoreRule], rel: str, is_dir: bool) -> bool:
+        """Resultado de las reglas para una ruta: gana la última que coincide."""
+        ignored = False
+        for rule in rules:
+            if rule.dir_only and not is_dir:
+                continue
+            sub = rel[len(rule.base) + 1:] if rule.base else rel
+            if rule.regex.match(sub):
+                ignored = not rule.negate
+        return ignored
+
+
+class _Dir:
+    __slots__ = ('mtime_ns', 'racy', 'dirs', 'files', 'rules', 'gitignore')
+
+    def __init__(self, mtime_ns: int, racy: bool):
+        self.mtime_ns = mtime_ns
+        self.racy = racy
+        self.dirs: List[str] = []
+        self.files: List[str] = []
+        self.rules: List[IgnoreRule] = []
+        self.gitignore: Optional[Tuple[int, int]] = None
+
+
+def _join(rel: str, name: str) -> str:
+    return f"{rel}/{name}" if rel else name
+
+
+class FsSnapshot:
+    """
+    Foto del árbol de una raíz: directorios y archivos (rutas relativas con
+    '/') que la política no ignora. `generation` sube cada vez que la foto
+    cambia, para que los consumidores puedan cachear lo que derivan de ella.
+    """
+
+    # Un directorio modificado en el mismo instante del recorrido se vuelve a
+    # listar en la siguiente consulta (la resolución del mtime puede ocultar un cambio)
+    RACY_WINDOW_NS = 2_000_000_000
+
+    def __init__(self, root, policy: IgnorePolicy = None):
+        self.root = Path(root).resolve()
+        self.policy = policy or IgnorePolicy()
+        self.generation = 0
+        self.last_refresh: Dict = {}
+        # Raíz vigilada por core/workspace_watcher.py: los cambios llegan como eventos
+        self.watched = False
+        self._dirs: Dict[str, _Dir] = {}
+        self._stale: Set[str] = set()
+        self._full = False
+        self._lock = threading.RLock()
+
+    def _path(self, rel: str) -> str:
+        return os.path.join(self.root, rel) if rel else str(self.root)
+
+    def _read_gitignore(self, rel: str, d: _Dir, names: List[str]):
+        paths = []
+        if '.gitignore' in names:
+            paths.append(os.path.join(self._path(rel), '.gitignore'))
+        if not rel and '.git' in names:
+            paths.insert(0, os.path.join(self._path(rel), '.git', 'info', 'exclude'))
+        for path in paths:
+            try:
+                with open(path, encoding='utf-8', errors='ignore') as f:
+                    d.rules.extend(parse_gitignore(f.read(), rel))
+                if path.endswith('.gitignore'):
+                    st = os.stat(path)
+                    d.gitignore = (st.st_mtime_ns, st.st_size)
+            except OSError:
+                continue
+
+    def _read_dir(self, rel: str, inherited: List[IgnoreRule]) -> Optional[_Dir]:
+        path = self._path(rel)
+        try:
+            st = os.stat(path)
+            entries = list(os.scandir(path))
+        except OSError:
+            return None
+        d = _Dir(st.st_mtime_ns, st.st_mtime_ns >= time.time_ns() - self.RACY_WINDOW_NS)
+        if self.policy.gitignore:
+            self._read_gitignore(rel, d, [entry.name for entry in entries])
+        rules = inherited + d.rules
+        for entry in entries:
+            if entry.name in self.policy.names:
+                continue
+            child = _join(rel, entry.name)
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+                if not is_dir and not entry.is_file():
+                    continue
+            except OSError:
+                continue
+            if rules and self.policy.matches(rules, child, is_dir):
+                continue
+            (d.dirs if is_dir else d.files).append(entry.name)
+        d.dirs.sort()
+        d.files.sort()
+        return d
+
+    def _gitignore_changed(self, rel: str, d: _Dir) -> bool:
+        if d.gitignore is None and '.gitignore' not in d.files:
+            return False
+        try:
+            st = os.stat(os.path.join(self._path(rel), '.gitignore'))
+            return (st.st_mtime_ns, st.st_size) != d.gitignore
+        except OSError:
+            return d.gitignore is not None
+
+    def refresh(self) -> Dict:
+        """
+        Pone la foto al día: stat de cada directorio conocido y nuevo listado de
+        los que cambiaron. Con la raíz vigilada (`watched`) no se hace ningún
+        stat: sólo se vuelven a listar los directorios marcados con mark_stale.
+        Devuelve {dirs, listed, changed, ms}.
+        """
+        with self._lock:
+            start = time.time()
+            selective = self.watched and bool(self._dirs) and not self._full
+            if selective and not self._stale:
+                return {"dirs": len(self._dirs), "listed": 0, "changed": False, "ms": 0}
+            stale, self._stale, self._full = self._stale, set(), False
+            if selective:
+                # Los menos profundos primero (se sacan del final de la pila)
+                starts = sorted((rel for rel in stale if rel in self._dirs), key=lambda rel: -rel.count('/'))
+                stack: List[Tuple[str, List[IgnoreRule]]] = [(rel, self._inherited(rel)) for rel in starts]
+            else:
+                stack = [("", [])]
+            listed = 0
+            changed = False
+            done = set()
+            while stack:
+                rel, inherited = stack.pop()
+                if rel in done:
+                    continue
+                old = self._dirs.get(rel)
+                if old is not None and rel not in stale:
+                    if selective:
+                        continue
+                    if not old.racy and not self._gitignore_changed(rel, old):
+                        try:
+                            fresh = os.stat(self._path(rel)).st_mtime_ns == old.mtime_ns
+                        except OSError:
+                            fresh = False
+                        if fresh:
+                            rules = inherited + old.rules
+                            stack.extend((_join(rel, name), rules) for name in old.dirs)
+                            continue
+
+                done.add(rel)
+                new = self._read_dir(rel, inherited)
+                listed += 1
+                if new is None:
+                    self._forget(rel)
+                    changed = changed or old is not None
+                    continue
+                self._dirs[rel] = new
+                if old is not None:
+                    gone = set(old.dirs) - set(new.dirs)
+                    if [r.pattern for r in old.rules] != [r.pattern for r in new.rules]:
+                        # Reglas nuevas: todo el subárbol se vuelve a filtrar
+                        gone = old.dirs
+                    for name in gone:
+                        self._forget(_join(rel, name))
+                    changed = changed or gone or old.dirs != new.dirs or old.files != new.files
+                else:
+                    changed = True
+                rules = inherited + new.rules
+                stack.extend((_join(rel, name), rules) for name in new.dirs)
+
+            if changed:
+                self.generation += 1
+            self.last_refresh = {
+                "dirs": len(self._dirs), "listed": listed, "changed": bool(changed),
+                "ms": int((time.time() - start) * 1000),
+            }
+            return dict(self.last_refresh)
+
+    def mark_stale(self, dirs: Iterable[str]):
+        """Directorios (relativos) que la siguiente consulta tiene que volver a listar."""
+        with self._lock:
+            self._stale.update(rel.strip('/') for rel in dirs)
+
+    def mark_all(self):
+        """La siguiente consulta valida toda la foto (p. ej. tras perder eventos del watcher)."""
+        with self._lock:
+            self._full = True
+
+    def _inherited(self, rel: str) -> List[IgnoreRule]:
+        """Reglas de .gitignore de los directorios por encima de `rel`."""
+        rules = []
+        if not rel:
+            return rules
+        parts = rel.split('/')
+        for depth in range(len(parts)):
+            d = self._dirs.get('/'.join(parts[:depth]))
+            if d is not None:
+                rules.extend(d.rules)
+        return rules
+
+    def ignored(self, rel: str, is_dir: bool = False) -> bool:
+        """Si la política deja fuera una ruta (según los .gitignore ya leídos)."""
+        with self._lock:
+            if self.policy.names.intersection(rel.split('/')):
+                return True
+            rules = self._inherited(rel)
+            return bool(rules) and self.policy.matches(rules, rel, is_dir)
+
+    def is_dir(self, rel: str) -> bool:
+        with self._lock:
+            return rel.strip('/') in self._dirs
+
+    def has_file(self, rel: str) -> bool:
+        parent, _, name = rel.rpartition('/')
+        with self._lock:
+            d = self._dirs.get(parent)
+            return d is not None and name in d.files
+
+    def _forget(self, rel: str):
+        """Quita un directorio y todo su subárbol de la foto."""
+        stack = [rel]
+        while stack:
+            current = stack.pop()
+            d = self._dirs.pop(current, None)
+            if d is not None:
+                stack.extend(_join(current, name) for name in d.dirs)
+
+    def walk(self, under: str = "") -> Iterator[Tuple[str, List[str], List[str]]]:
+        """Como os.walk (de arriba abajo): (directorio relativo, subdirectorios, archivos)."""
+        with self._lock:
+            listing = []
+            stack = [under.strip('/')]
+            while stack:
+                rel = stack.pop()
+                d = self._dirs.get(rel)
+                if d is None:
+                    continue
+                listing.append((rel, list(d.dirs), list(d.files)))
+                stack.extend(_join(rel, name) for name in reversed(d.dirs))
+        return iter(listing)
+
+    def listdir(self, rel: str = "") -> Tuple[List[str], List[str]]:
+        """(subdirectorios, archivos) de un directorio de la foto."""
+        with self._lock:
+            d = self._dirs.get(rel.strip('/'))
+            return (list(d.dirs), list(d.files)) if d else ([], [])
+
+    def files(self, under: str = "") -> List[str]:
+        """Rutas relativas de todos los archivos (bajo `under`)."""
+        return [_join(rel, name) for rel, _, names in self.walk(under) for name in names]
+
+    def dirs(self, under: str = "") -> List[str]:
+        """Rutas relativas de todos los directorios (bajo `under`), sin la raíz."""
+        return [_join(rel, name) for rel, names, _ in self.walk(under) for name in names]
+
+    def tree(self, under: str = "", hidden: bool = True, path_prefix: str = "") -> List[Dict]:
+        """
+        Árbol anidado [{name, type: folder, children} | {name, type: file, path}]
+        con `path` relativo a la raíz (precedido de `path_prefix`). Con
+        hidden=False se omiten los dotfiles.
+        """
+        with self._lock:
+            def build(rel: str) -> List[Dict]:
+                d = self._dirs.get(rel)
+                if d is None:
+                    return []
+                items = []
+                for name in d.dirs:
+                    if hidden or not name.startswith('.'):
+                        items.append({"name": name, "type": "folder", "children": build(_join(rel, name))})
+                for name in d.files:
+                    if hidden or not name.startswith('.'):
+                        items.append({"name": name, "type": "file", "path": _join(path_prefix, _join(rel, name))})
+                return items
+            return build(under.strip('/'))
+
+
+def is_under(path, root) -> bool:
+    """Si `path` es `root` o está dentro (rutas absolutas ya resueltas)."""
+    path, root = str(path), str(root)
+    return path == root or path.startswith(root.rstrip(os.sep) + os.sep)
+
+
+def paths_under(rels: Iterable[str], root, target) -> Optional[List[str]]:
+    """
+    Rutas de `rels` (relativas a `root`) que caen dentro de `target`, relativas
+    a `target` ([] si `target` no está bajo `root`). None si una de las rutas
+    es el propio `target` o lo contiene: hay que tratarlo entero.
+    """
+    root, target = str(Path(root).resolve()), str(Path(target).resolve())
+    if target == root:
+        return list(rels)
+    if not is_under(target, root):
+        return []
+    prefix = os.path.relpath(target, root).replace(os.sep, '/')
+    inside = []
+    for rel in rels:
+        if rel == prefix or prefix.startswith(rel + '/'):
+            return None
+        if rel.startswith(prefix + '/'):
+            inside.append(rel[len(prefix) + 1:])
+    return inside
+
+
+class FsScanner:
+    """Fotos por raíz compartidas por el worker (las FS_SCAN_MAX_ROOTS más recientes)."""
+
+    def __init__(self, policy: IgnorePolicy = None, max_roots: int = None):
+        self.policy = policy or IgnorePolicy()
+        self.max_roots = max_roots if max_roots is not None else int(os.getenv('FS_SCAN_MAX_ROOTS', '32'))
+        self._snapshots: "OrderedDict[str, FsSnapshot]" = OrderedDict()
+        # Raíces cuyos cambios avisa el watcher (sus fotos no se validan por mtime)
+        self._watched: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def snapshot(self, root, refresh: bool = True) -> FsSnapshot:
+        """Foto de `root`, validada contra el disco salvo con refresh=False."""
+        key = str(Path(root).resolve())
+        with self._lock:
+            snapshot = self._snapshots.get(key)
+            if snapshot is None:
+                snapshot = FsSnapshot(key, self.policy)
+                snapshot.watched = self._is_watched(key)
+                self._snapshots[key] = snapshot
+                while len(self._snapshots) > self.max_roots:
+                    self._snapshots.popitem(last=False)
+            else:
+                self._snapshots.move_to_end(key)
+        if refresh or snapshot.generation == 0:
+            snapshot.refresh()
+        return snapshot
+
+    def invalidate(self, root=None):
+        """Descarta la foto de una raíz (o todas): el siguiente acceso vuelve a recorrer."""
+        with self._lock:
+            if root is None:
+                self._snapshots.clear()
+            else:
+                self._snapshots.pop(str(Path(root).resolve()), None)
+
+    def _is_watched(self, key: str) -> bool:
+        return any(is_under(key, root) for root in self._watched)
+
+    def is_watched(self, path) -> bool:
+        with self._lock:
+            return self._is_watched(str(Path(path).resolve()))
+
+    def watch(self, root):
+        """A partir de ahora los cambios bajo `root` llegan con notify()."""
+        key = str(Path(root).resolve())
+        with self._lock:
+            self._watched.add(key)
+            snapshots = [s for k, s in self._snapshots.items() if self._is_watched(k)]
+        for snapshot in snapshots:
+            # Una última validación completa cubre lo que cambió antes de vigilar
+            snapshot.mark_all()
+            snapshot.watched = True
+
+    def unwatch(self, root=None):
+        with self._lock:
+            if root is None:
+                self._watched.clear()
+            else:
+                self._watched.discard(str(Path(root).resolve()))
+            for key, snapshot in self._snapshots.items():
+                snapshot.watched = self._is_watched(key)
+
+    def notify(self, root, rels: Iterable[str], full: bool = False):
+        """
+        Cambios (rutas relativas a `root`) avisados por el watcher: en cada foto
+        afectada se marca para volver a listar el directorio de cada ruta.
+        """
+        root = str(Path(root).resolve())
+        rels = list(rels)
+        with self._lock:
+            snapshots = [s for key, s in self._snapshots.items() if is_under(key, root)]
+        for snapshot in snapshots:
+            inside = None if full else paths_under(rels, root, snapshot.root)
+            if inside is None:
+                snapshot.mark_all()
+            elif inside:
+                snapshot.mark_stale(rel.rpartition('/')[0] for rel in inside)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {root: {"generation": s.generation, "watched": s.watched, **s.last_refresh}
+                    for root, s in self._snapshots.items()}
+
+
+# Fotos compartidas por worker
+fs_scanner = FsScanner()
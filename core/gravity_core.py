@@ -26,6 +26,8 @@ class GravityCore:
 
     def __init__(self, app=None):
         self.app = app
+        # Raíces ya escaneadas (las que el watcher mantiene al día)
+        self._graph_roots = set()
         if app:
             self.init_app(app)
 
@@ -95,13 +97,41 @@ class GravityCore:
     def scan_structure(self, root_path: str):
         """Mapea el grafo de dependencias del proyecto."""
         logger.info(f"GravityCore: Escaneando estructura en {root_path}")
-        for root, _, files in os.walk(root_path):
-            if any(b in root for b in [".git", "__pycache__", "node_modules", "sandbox"]): continue
-            for file in files:
-                if file.endswith(".py"):
-                    self._analyze_file(os.path.join(root, file), root_path)
+        self._graph_roots.add(os.path.realpath(root_path))
+        from core.fs_scanner import fs_scanner
+        for rel in fs_scanner.snapshot(root_path).files():
+            # El Sandbox de NervousSystem no forma parte del proyecto
+            if rel.endswith(".py") and "sandbox" not in rel.split("/")[:-1]:
+                self._analyze_file(os.path.join(root_path, rel), root_path)
         db.session.commit()
 
+    def apply_changes(self, root_path: str, rels: List[str], full: bool = False):
+        """
+        Cambios (rutas relativas a `root_path`) avisados por el watcher: sólo se
+        vuelven a analizar los .py afectados de los proyectos ya escaneados.
+        """
+        from core.fs_scanner import fs_scanner, is_under, paths_under
+        if not self.app:
+            return
+        root_path = os.path.realpath(root_path)
+        for graph_root in [r for r in self._graph_roots if is_under(r, root_path)]:
+            inside = None if full else paths_under(rels, root_path, graph_root)
+            if inside == []:
+                continue
+            with self.app.app_context():
+                if inside is None:
+                    self.scan_structure(graph_root)
+                    continue
+                snapshot = fs_scanner.snapshot(graph_root)
+                for rel in inside:
+                    if not rel.endswith(".py") or "sandbox" in rel.split("/")[:-1]:
+                        continue
+                    if snapshot.has_file(rel):
+                        self._analyze_file(os.path.join(graph_root, rel), graph_root)
+                    else:
+                        ProjectGraph.query.filter_by(file_path=os.path.normpath(rel)).delete()
+                db.session.commit()
+
     def _analyze_file(self, full_path: str, root_path: str):
         try:
             rel_path = os.path.relpath(full_path, root_path)
@@ -141,7 +171,7 @@ class GravityCore:
         """Busca soluciones para bugs registrados sin parche vía Singularidad."""
         try:
             from core.singularity import singularity
-            from core.nervous_system import nervous_system
+            from core.nervous_system import NervousSystem
             
             # 1. Identificar bugs críticos sin solución
             open_bugs = BugMemory.query.filter(BugMemory.fix_approach.like('%Analizando%')).all()
@@ -151,14 +181,14 @@ class GravityCore:
             
             for bug in open_bugs:
                 # 2. ACTIVAR PROTECCIÓN MÁXIMA (Sandbox forzado para autonomía)
-                nervous_system.sandbox_mode = True
+                body = NervousSystem(sandbox_mode=True)
                 logger.info(f"🛡️ GRAVITY PROTECT: MODO SANDBOX ACTIVADO para {bug.error_pattern}")
                 
                 # 3. Pedir a la Singularidad que resuelva el bug
                 prompt = f"MODO AUTÓNOMO: Analiza y propón una solución real para este error registrado:\nPATTERN: {bug.error_pattern}\nCONTEXT: {bug.error_context}"
                 
                 # Usamos una conversación interna especial
-                result = singularity.solve(prompt, "AUTONOMY_CORE", [], "Actúa como el Sistema de Auto-Evolución BUNK3R.")
+                result = singularity.solve(prompt, "AUTONOMY_CORE", [], "Actúa como el Sistema de Auto-Evolución BUNK3R.", body=body)
                 
                 if result.get("success"):
                     # Registrar el intento en la memoria
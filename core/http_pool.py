@@ -0,0 +1,109 @@
+"""
+BUNK3R-IA: HTTP Pool
+Sesiones HTTP compartidas (keep-alive) por proveedor de IA.
+
+Cada proveedor obtiene una sesión con su propio pool de conexiones, de modo que
+las llamadas consecutivas reutilizan la conexión TCP+TLS en lugar de negociarla
+de nuevo. El tamaño del pool es por worker de gunicorn (AI_HTTP_POOL_SIZE).
+"""
+import os
+import logging
+import threading
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+HTTPX_AVAILABLE = False
+H2_AVAILABLE = False
+REQUESTS_AVAILABLE = False
+
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+    REQUESTS_AVAILABLE = True
+except ImportError:
+    pass
+
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    pass
+
+try:
+    import h2  # noqa: F401 - habilita HTTP/2 en httpx
+    H2_AVAILABLE = True
+except ImportError:
+    pass
+
+POOL_SIZE = int(os.getenv('AI_HTTP_POOL_SIZE', '10'))
+HTTP2_ENABLED = os.getenv('AI_HTTP2', 'true').lower() == 'true'
+
+_sessions: Dict[str, "requests.Session"] = {}
+_clients: Dict[str, "httpx.Client"] = {}
+_lock = threading.Lock()
+
+
+def get_session(name: str) -> "requests.Session":
+    """Sesión requests con keep-alive para el proveedor `name`."""
+    if not REQUESTS_AVAILABLE:
+        raise RuntimeError("requests no está instalado")
+
+    session = _sessions.get(name)
+    if session is not None:
+        return session
+
+    with _lock:
+        session = _sessions.get(name)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions[name] = session
+            logger.debug(f"HTTP pool: sesión creada para {name} (pool={POOL_SIZE})")
+        return session
+
+
+def get_client(name: str) -> "httpx.Client":
+    """Cliente httpx con keep-alive (y HTTP/2 si `h2` está instalado)."""
+    if not HTTPX_AVAILABLE:
+        raise RuntimeError("httpx no está instalado")
+
+    client = _clients.get(name)
+    if client is not None:
+        return client
+
+    with _lock:
+        client = _clients.get(name)
+        if client is None:
+            client = httpx.Client(
+                http2=HTTP2_ENABLED and H2_AVAILABLE,
+                limits=httpx.Limits(max_connections=POOL_SIZE, max_keepalive_connections=POOL_SIZE)
+            )
+            _clients[name] = client
+            logger.debug(f"HTTP pool: cliente httpx creado para {name} (http2={HTTP2_ENABLED and H2_AVAILABLE})")
+        return client
+
+
+def close_all():
+    """Cierra todas las sesiones y clientes abiertos."""
+    with _lock:
+        for session in _sessions.values():
+            session.close()
+        for client in _clients.values():
+            client.close()
+        _sessions.clear()
+        _clients.clear()
+
+
+def _reset_after_fork():
+    # Los sockets heredados del proceso padre no deben compartirse entre workers
+    global _lock
+    _lock = threading.Lock()
+    _sessions.clear()
+    _clients.clear()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,202 @@
+"""
+BUNK3R-IA: Keyword Matcher
+Filtros de palabras clave precompilados y compartidos.
+
+Singularity decide el Sandbox buscando palabras de riesgo en la reflexión y
+AIService._detect_response_issues revisa cada respuesta con varias listas de
+frases. Cada filtro se prepara una sola vez: palabras en minúsculas, sin
+duplicados y en una tupla inmutable. El texto se pasa a minúsculas una vez por
+búsqueda. La semántica es la de `k in texto`: coincidencia de subcadena, sin
+límites de palabra.
+
+La búsqueda usa `in`, que en CPython es una búsqueda de subcadenas en C. Una
+alternancia regex compilada mide 2-5 veces más lenta con estas listas (y con
+listas de cientos de palabras), porque `re` no construye un autómata
+Aho-Corasick. `python -m core.keyword_matcher` repite la medición.
+
+Las listas se pueden cambiar sin tocar código:
+- En caliente, con `keyword_screens.configure(nombre, palabras)`.
+- Con un JSON `{"risk": [...], "refusal": [...]}` en AI_KEYWORD_SCREENS_FILE.
+  El fichero se relee si cambia, como mucho cada AI_KEYWORD_RELOAD_INTERVAL
+  segundos.
+"""
+import os
+import re
+import json
+import time
+import logging
+import threading
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SCREENS: Dict[str, List[str]] = {
+    # Reflexión de Singularity que obliga a activar el Sandbox
+    "risk": [
+        "crash", "delete", "format", "rm -rf", "db migration", "main.py",
+        "exploit", "vulnerabilit", "security hole", "break into", "hacker",
+        "malware", "virus", "shell script", "root access", "sandbox"
+    ],
+    # Final de una respuesta cortada
+    "incomplete": [
+        "...", "continuará", "continua", "[continua", "(continua",
+        "etc etc", "y así", "y asi"
+    ],
+    # Negativas al principio de la respuesta
+    "refusal": [
+        "no puedo", "no tengo acceso", "como ia", "como modelo de lenguaje",
+        "no tengo la capacidad", "no me es posible"
+    ],
+    # Mensajes de usuario que piden ayuda (una negativa ahí sobra)
+    "help_request": ["?", "cómo", "como", "qué", "que", "ayuda", "help"],
+    # Respuestas que piden aclarar algo que ya estaba claro
+    "confusion": [
+        "no entiendo", "no está claro", "podrías aclarar", "podrias aclarar",
+        "no estoy seguro de qué", "no estoy seguro de que"
+    ],
+}
+
+
+class KeywordMatcher:
+    """Conjunto de palabras clave preparado para búsquedas repetidas."""
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords = tuple(dict.fromkeys(k.lower() for k in keywords if k))
+
+    def search(self, text: str) -> Optional[str]:
+        """Primera palabra clave (en orden de la lista) presente en el texto, o None."""
+        if not text:
+            return None
+        lowered = text.lower()
+        for keyword in self.keywords:
+            if keyword in lowered:
+                return keyword
+        return None
+
+    def matches(self, text: str) -> bool:
+        return self.search(text) is not None
+
+    def find_all(self, text: str) -> List[str]:
+        """Todas las palabras clave presentes en el texto."""
+        if not text:
+            return []
+        lowered = text.lower()
+        return [k for k in self.keywords if k in lowered]
+
+
+class KeywordScreens:
+    """Registro de filtros con nombre, configurable en caliente o por fichero."""
+
+    def __init__(self, path: str = None, reload_interval: float = None):
+        self.path = path if path is not None else os.getenv('AI_KEYWORD_SCREENS_FILE', '')
+        self.reload_interval = reload_interval if reload_interval is not None else float(
+            os.getenv('AI_KEYWORD_RELOAD_INTERVAL', '5'))
+        self._lock = threading.Lock()
+        self._overrides: Dict[str, List[str]] = {}
+        self._file_screens: Dict[str, List[str]] = {}
+        self._matchers: Dict[str, KeywordMatcher] = {}
+        self._mtime = None
+        self._checked = 0.0
+        self._maybe_reload(force=True)
+
+    def get(self, name: str) -> KeywordMatcher:
+        """Filtro compilado `name` (relee el fichero de configuración si cambió)."""
+        self._maybe_reload()
+        matcher = self._matchers.get(name)
+        if matcher is None:
+            with self._lock:
+                matcher = self._matchers.get(name)
+                if matcher is None:
+                    matcher = KeywordMatcher(self._keywords(name))
+                    self._matchers[name] = matcher
+        return matcher
+
+    def configure(self, name: str, keywords: Optional[Iterable[str]]):
+        """Sustituye en caliente las palabras de un filtro (None vuelve a la configuración base)."""
+        with self._lock:
+            if keywords is None:
+                self._overrides.pop(name, None)
+            else:
+                self._overrides[name] = list(keywords)
+            self._matchers.pop(name, None)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            names = set(DEFAULT_SCREENS) | set(self._file_screens) | set(self._overrides)
+            return {
+                "file": self.path or None,
+                "screens": {name: len(self._keywords(name)) for name in sorted(names)},
+                "overrides": sorted(self._overrides),
+            }
+
+    def _keywords(self, name: str) -> List[str]:
+        for source in (self._overrides, self._file_screens, DEFAULT_SCREENS):
+            if name in source:
+                return source[name]
+        return []
+
+    def _maybe_reload(self, force: bool = False):
+        if not self.path:
+            return
+        now = time.time()
+        if not force and now - self._checked < self.reload_interval:
+            return
+        self._checked = now
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            mtime = None
+        if mtime == self._mtime:
+            return
+
+        screens = {}
+        if mtime is not None:
+            try:
+                with open(self.path, encoding='utf-8') as f:
+                    screens = {k: list(v) for k, v in json.load(f).items()}
+            except (OSError, ValueError, AttributeError, TypeError) as e:
+                logger.warning(f"KeywordScreens: no se pudo leer {self.path}: {e}")
+                return
+        with self._lock:
+            self._mtime = mtime
+            self._file_screens = screens
+            self._matchers.clear()
+        logger.info(f"KeywordScreens: {len(screens)} filtros cargados de {self.path}")
+
+
+# Filtros compartidos por worker
+keyword_screens = KeywordScreens()
+
+
+def benchmark(iterations: int = 20000) -> Dict[str, float]:
+    """
+    Microsegundos por búsqueda sin coincidencia (el caso habitual) con el filtro
+    de riesgo: lista reconstruida en cada llamada (código anterior), alternancia
+    regex compilada y KeywordMatcher.
+    """
+    keywords = DEFAULT_SCREENS["risk"]
+    matcher = KeywordMatcher(keywords)
+    regex = re.compile("|".join(re.escape(k) for k in sorted(keywords, key=len, reverse=True)))
+    text = ("Analizo el impacto técnico del cambio en el módulo de rutas; no veo riesgos "
+            "para los datos ni para los archivos del core. ") * 20
+
+    def per_call(fn):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        return round((time.perf_counter() - start) / iterations * 1e6, 2)
+
+    def rebuilt_list():
+        risk = list(DEFAULT_SCREENS["risk"])
+        lowered = text.lower()
+        return any(k in lowered for k in risk)
+
+    return {
+        "rebuilt_list_us": per_call(rebuilt_list),
+        "compiled_regex_us": per_call(lambda: regex.search(text.lower())),
+        "keyword_matcher_us": per_call(lambda: matcher.matches(text)),
+    }
+
+
+if __name__ == "__main__":
+    print(json.dumps(benchmark(), indent=2))
@@ -913,6 +913,16 @@ class ChangeImpactAnalyzer:
         function_match = re.search(r'(?:function|def|class)\s+(\w+)', change_description)
         if function_match:
             func_name = function_match.group(1)
+            # Symbol index: real references, not every line containing the name
+            try:
+                from core.repo_indexer import RepoIndexer
+                references = RepoIndexer(self.project_root).find_references(func_name, limit=20)
+            except Exception:
+                references = None
+            if references is not None:
+                return [{'file': ref['path'], 'line': str(ref['line']), 'usage': func_name} for ref in references]
+            
+            # Index still being built in the background: fall back to grep
             try:
                 result = subprocess.run(
                     ['grep', '-r', '-n', func_name, str(self.project_root)],
@@ -327,14 +327,32 @@ class AIFileToolkit:
             
             try:
                 pattern = re.compile(query, re.IGNORECASE)
+                is_regex = True
             except re.error:
                 pattern = re.compile(re.escape(query), re.IGNORECASE)
+                is_regex = False
+            
+            # Project trigram index: skip indexed files that cannot contain a match
+            indexed, candidates = set(), None
+            if full_path.is_dir():
+                try:
+                    from core.repo_indexer import RepoIndexer
+                    indexer = RepoIndexer(self.project_root)
+                    candidates = indexer.candidate_files(query, regex=is_regex)
+                    indexed = set(indexer.file_index.files)
+                except Exception as e:
+                    logger.debug(f"AIToolkit: searching without trigram index: {e}")
             
             def search_file(file_path: Path):
                 try:
                     if file_path.suffix not in code_extensions:
                         return
                     
+                    if candidates is not None:
+                        rel = file_path.relative_to(self.project_root).as_posix()
+                        if rel in indexed and rel not in candidates:
+                            return
+                    
                     if file_path.stat().st_size > 1024 * 1024:  # Skip files > 1MB
                         return
                     
@@ -969,6 +987,11 @@ class AIProjectAnalyzer:
     def __init__(self, project_root: Optional[str] = None):
         self.project_root = Path(project_root) if project_root else Path.cwd()
     
+    def _snapshot(self):
+        """Shared tree snapshot (one scan, common ignore policy incl. .gitignore)"""
+        from core.fs_scanner import fs_scanner
+        return fs_scanner.snapshot(self.project_root)
+    
     def analyze_project(self) -> Dict[str, Any]:
         """Perform full project analysis"""
         try:
@@ -991,13 +1014,10 @@ class AIProjectAnalyzer:
         """Detect primary programming language"""
         extensions = {}
         
-        for root, dirs, files in os.walk(self.project_root):
-            dirs[:] = [d for d in dirs if d not in ['.git', 'node_modules', '__pycache__', 'venv', '.venv']]
-            
-            for f in files:
-                ext = Path(f).suffix.lower()
-                if ext in ['.py', '.js', '.ts', '.jsx', '.tsx', '.go', '.rs', '.rb', '.php']:
-                    extensions[ext] = extensions.get(ext, 0) + 1
+        for f in self._snapshot().files():
+            ext = Path(f).suffix.lower()
+            if ext in ['.py', '.js', '.ts', '.jsx', '.tsx', '.go', '.rs', '.rb', '.php']:
+                extensions[ext] = extensions.get(ext, 0) + 1
         
         if not extensions:
             return 'unknown'
@@ -1097,13 +1117,12 @@ class AIProjectAnalyzer:
             'tracking': 'services',
         }
         
-        for item in self.project_root.iterdir():
-            if item.name.startswith('.'):
-                continue
-            if item.name in ['node_modules', '__pycache__', 'venv', '.venv']:
+        dirs, files = self._snapshot().listdir()
+        for name in sorted(dirs + files):
+            if name.startswith('.'):
                 continue
             
-            structure[item.name] = common_patterns.get(item.name, 'unknown')
+            structure[name] = common_patterns.get(name, 'unknown')
         
         return structure
     
@@ -1151,14 +1170,13 @@ class AIProjectAnalyzer:
         """Check if project has tests"""
         test_indicators = ['test_', '_test.py', 'tests/', 'test/', 'spec/', '.test.js', '.spec.js']
         
-        for root, dirs, files in os.walk(self.project_root):
-            for d in dirs:
-                if d in ['test', 'tests', 'spec', '__tests__']:
-                    return True
-            for f in files:
-                if 'test' in f.lower() or 'spec' in f.lower():
-                    return True
-            break
+        dirs, files = self._snapshot().listdir()
+        for d in dirs:
+            if d in ['test', 'tests', 'spec', '__tests__']:
+                return True
+        for f in files:
+            if 'test' in f.lower() or 'spec' in f.lower():
+                return True
         
         return False
     
@@ -1166,23 +1184,20 @@ class AIProjectAnalyzer:
         """Count files by type"""
         counts = {'total': 0, 'python': 0, 'javascript': 0, 'html': 0, 'css': 0, 'other': 0}
         
-        for root, dirs, files in os.walk(self.project_root):
-            dirs[:] = [d for d in dirs if d not in ['.git', 'node_modules', '__pycache__', 'venv']]
+        for f in self._snapshot().files():
+            ext = Path(f).suffix.lower()
+            counts['total'] += 1
             
-            for f in files:
-                ext = Path(f).suffix.lower()
-                counts['total'] += 1
-                
-                if ext == '.py':
-                    counts['python'] += 1
-                elif ext in ['.js', '.jsx', '.ts', '.tsx']:
-                    counts['javascript'] += 1
-                elif ext in ['.html', '.htm']:
-                    counts['html'] += 1
-                elif ext == '.css':
-                    counts['css'] += 1
-                else:
-                    counts['other'] += 1
+            if ext == '.py':
+                counts['python'] += 1
+            elif ext in ['.js', '.jsx', '.ts', '.tsx']:
+                counts['javascript'] += 1
+            elif ext in ['.html', '.htm']:
+                counts['html'] += 1
+            elif ext == '.css':
+                counts['css'] += 1
+            else:
+                counts['other'] += 1
         
         return counts
     
@@ -18,15 +18,11 @@ class GraphCrawler:
     def scan_project(self):
         """Escaneo completo del proyecto."""
         logger.info(f"GraphCrawler: Iniciando escaneo en {self.root_path}")
-        for root, dirs, files in os.walk(self.root_path):
-            if any(d in root for d in [".git", "__pycache__", "venv", "node_modules"]):
-                continue
-                
-            for file in files:
-                if file.endswith(".py"):
-                    full_path = os.path.join(root, file)
-                    rel_path = os.path.relpath(full_path, self.root_path)
-                    self._analyze_python_file(full_path, rel_path)
+        from core.fs_scanner import fs_scanner
+        for rel_path in fs_scanner.snapshot(self.root_path).files():
+            if rel_path.endswith(".py"):
+                full_path = os.path.join(self.root_path, rel_path)
+                self._analyze_python_file(full_path, os.path.normpath(rel_path))
         
         db.session.commit()
         logger.info("GraphCrawler: Escaneo completado.")
@@ -17,6 +17,9 @@ from typing import Generator, Dict, List, Any, Optional
 from dataclasses import dataclass, field
 from enum import Enum
 
+from core.conversation_store import ConversationStore
+from core.conversation_backends import create_shared_backend
+
 logger = logging.getLogger(__name__)
 
 
@@ -29,6 +32,8 @@ class StreamEventType(Enum):
     ERROR = "error"
     PHASE = "phase"
     METADATA = "metadata"
+    TOOL_CALL = "tool_call"
+    TOOL_RESULT = "tool_result"
 
 
 @dataclass
@@ -426,7 +431,7 @@ class StreamingService:
     
     def __init__(self):
         self.providers: List[StreamingProvider] = []
-        self.conversations: Dict[str, List[Dict]] = {}
+        self.conversations = ConversationStore(name="streaming", shared=create_shared_backend())
         self._initialize_providers()
     
     def _initialize_providers(self):
@@ -466,21 +471,24 @@ class StreamingService:
     
     def get_conversation(self, user_id: str) -> List[Dict]:
         """Obtiene historial de conversación"""
-        if user_id not in self.conversations:
-            self.conversations[user_id] = []
-        return self.conversations[user_id]
+        return self.conversations.get_or_load(user_id)
     
     def add_message(self, user_id: str, role: str, content: str):
         """Agrega mensaje al historial"""
-        if user_id not in self.conversations:
-            self.conversations[user_id] = []
-        self.conversations[user_id].append({"role": role, "content": content})
-        if len(self.conversations[user_id]) > 20:
-            self.conversations[user_id] = self.conversations[user_id][-20:]
+        conversation = self.conversations.get_or_load(user_id)
+        conversation.append({"role": role, "content": content})
+        self.conversations.put(user_id, conversation[-20:])
     
     def clear_conversation(self, user_id: str):
         """Limpia historial de conversación"""
-        self.conversations[user_id] = []
+        self.conversations.put(user_id, [])
+    
+    def get_stats(self) -> Dict:
+        """Estadísticas del servicio"""
+        return {
+            "providers_available": self.get_available_providers(),
+            "conversation_store": self.conversations.snapshot()
+        }
     
     def stream_chat(self, user_id: str, message: str, 
                     system_prompt: str = None,
@@ -29,6 +29,9 @@ class NervousSystem:
     ]
     
     BLOCKED_EXTENSIONS = ['.pyc', '.pyo', '.so', '.dll', '.exe', '.bin']
+
+    # Segundos que find_symbol espera al primer índice de símbolos de un repo grande
+    SYMBOL_INDEX_WAIT = 20
     
     ALLOWED_COMMANDS = {
         'npm': ['install', 'run', 'init', 'list', 'start', 'build', 'test'],
@@ -39,10 +42,16 @@ class NervousSystem:
         'ls': True, 'cat': True, 'mkdir': True, 'pwd': True, 'echo': True, 'grep': True, 'find': True
     }
 
-    def __init__(self, project_root: str = None, sandbox_mode: bool = False):
+    def __init__(self, project_root: str = None, sandbox_mode: bool = False, user_workspace: str = "/workspace"):
+        """
+        Cada petición crea su propia instancia (contexto de ejecución): el modo
+        Sandbox, el workspace del usuario y la telemetría no se comparten entre
+        hilos. El singleton `nervous_system` queda para usos fuera de una petición.
+        """
         self.project_root = Path(project_root or os.getcwd()).resolve()
         self.sandbox_path = self.project_root / "sandbox"
         self.sandbox_mode = sandbox_mode
+        self.user_workspace = user_workspace
         self.telemetry = {"ops": 0, "errors": 0, "last_op": None}
 
     def _is_safe_path(self, path: str) -> Tuple[bool, str]:
@@ -126,6 +135,33 @@ class NervousSystem:
         except Exception as e:
             return {"success": False, "error": str(e)}
 
+    def symbols(self, path: str, name: str, kind: str = None, references: bool = False) -> Dict:
+        """Ir a la definición (y a las referencias) con el índice de símbolos de un repositorio."""
+        if not path: return {"success": False, "error": "Indica el repositorio (path) donde buscar"}
+        safe, reason = self._is_safe_path(path)
+        if not safe: return {"success": False, "error": reason}
+        if not name: return {"success": False, "error": "Nombre de símbolo requerido"}
+
+        try:
+            from core.repo_indexer import RepoIndexer
+            # Como read(): en modo Sandbox se consulta la copia simulada
+            root = Path(self._get_exec_path(path)).resolve()
+            if root == Path(self.user_workspace).resolve():
+                # Todo el workspace como un solo repo duplicaría los índices de cada repositorio
+                return {"success": False, "error": "Indica la carpeta de un repositorio, no la raíz del workspace"}
+            if not root.is_dir():
+                return {"success": False, "error": f"Directorio no encontrado: {path}"}
+            index = RepoIndexer(root).symbol_index(wait=self.SYMBOL_INDEX_WAIT)
+            if index is None:
+                return {"success": False, "error": "Índice de símbolos en construcción; usa read_file/list_dir mientras tanto"}
+            result = {"success": True, "root": str(root), "definitions": index.definitions(name, kind)[:50]}
+            if references:
+                result["references"] = index.references(name, limit=100)
+            self.telemetry["ops"] += 1
+            return result
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
     # --- NÚCLEO VULCANO (COMANDOS) ---
 
     def execute(self, command: str, timeout: int = 60) -> Dict:
@@ -0,0 +1,94 @@
+"""
+BUNK3R-IA: Prompt Builder
+Ensamblado de system prompts a partir de bloques estáticos internados.
+
+Las partes fijas de los prompts (prompt por defecto, IDE, code builder) se
+registran una sola vez con su conteo de tokens ya calculado. El ensamblado pone
+siempre el bloque estático primero y el contexto dinámico después, de modo que
+todas las peticiones comparten un prefijo idéntico byte a byte: eso es lo que
+aprovechan las cachés de prefijo de los proveedores (OpenAI/DeepSeek de forma
+automática, Gemini vía cachedContent y Ollama reutilizando el KV cache).
+"""
+import sys
+import hashlib
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+try:
+    import tiktoken
+    _encoder = tiktoken.get_encoding("cl100k_base")
+except Exception:
+    _encoder = None
+
+
+def estimate_tokens(text: str) -> int:
+    """Conteo de tokens: tiktoken si está instalado, si no ~4 caracteres por token."""
+    if not text:
+        return 0
+    if _encoder is not None:
+        return len(_encoder.encode(text, disallowed_special=()))
+    return max(1, len(text) // 4)
+
+
+@dataclass(frozen=True)
+class PromptBlock:
+    """Bloque estático de prompt con su huella y tokens precalculados."""
+    name: str
+    text: str
+    tokens: int
+    digest: str
+
+    def __str__(self) -> str:
+        return self.text
+
+
+_blocks: Dict[str, PromptBlock] = {}
+_lock = threading.Lock()
+
+
+def intern_block(name: str, text: str) -> PromptBlock:
+    """Registra (o devuelve) el bloque estático `name`."""
+    block = _blocks.get(name)
+    if block is not None and block.text == text:
+        return block
+    with _lock:
+        block = PromptBlock(
+            name=name,
+            text=sys.intern(text),
+            tokens=estimate_tokens(text),
+            digest=hashlib.sha256(text.encode("utf-8")).hexdigest()
+        )
+        _blocks[name] = block
+    logger.debug(f"PromptBuilder: bloque '{name}' internado ({block.tokens} tokens)")
+    return block
+
+
+def assemble(static: PromptBlock, *dynamic: Union[str, None]) -> str:
+    """Prefijo estático + partes dinámicas (las vacías se omiten)."""
+    parts = [static.text] + [p for p in dynamic if p]
+    return "\n\n".join(parts)
+
+
+def split_static(system_prompt: Optional[str]) -> Tuple[Optional[PromptBlock], str]:
+    """
+    Separa un system prompt en (bloque estático conocido, resto dinámico).
+    Devuelve (None, prompt) si no empieza por ningún bloque internado.
+    """
+    if not system_prompt:
+        return None, system_prompt or ""
+    best = None
+    for block in list(_blocks.values()):
+        if system_prompt.startswith(block.text) and (best is None or len(block.text) > len(best.text)):
+            best = block
+    if best is None:
+        return None, system_prompt
+    return best, system_prompt[len(best.text):].lstrip("\n")
+
+
+def prompt_stats() -> Dict[str, int]:
+    """Tokens por bloque estático registrado."""
+    return {name: block.tokens for name, block in _blocks.items()}
@@ -0,0 +1,159 @@
+"""
+BUNK3R-IA: Provider Health
+Monitor de salud de proveedores de IA con circuit breaker.
+
+Un hilo en segundo plano sondea los proveedores que tienen un chequeo activo
+(Ollama, Antigravity) y el tráfico real reporta éxitos y fallos. Consultar si
+un proveedor está disponible es una lectura en memoria, sin red ni base de datos.
+
+Estados por proveedor:
+- closed: operativo, se le envían peticiones.
+- open: falló repetidamente, se omite hasta que venza el enfriamiento.
+- half_open: enfriamiento vencido, la siguiente petición hace de prueba.
+"""
+import os
+import time
+import logging
+import threading
+from dataclasses import dataclass
+from enum import Enum
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitState(Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+@dataclass
+class ProviderHealth:
+    name: str
+    state: CircuitState = CircuitState.CLOSED
+    failures: int = 0
+    opened_at: float = 0.0
+    last_check: Optional[float] = None
+    last_error: Optional[str] = None
+
+    def to_dict(self) -> Dict:
+        return {
+            "name": self.name,
+            "state": self.state.value,
+            "failures": self.failures,
+            "last_check": self.last_check,
+            "last_error": self.last_error
+        }
+
+
+class HealthMonitor:
+    """
+    Mantiene el estado de salud de cada proveedor y lo refresca en segundo plano.
+    """
+
+    def __init__(self, interval: float = None, failure_threshold: int = None, cooldown: float = None):
+        self.interval = interval or float(os.getenv('AI_HEALTH_INTERVAL', '30'))
+        self.failure_threshold = failure_threshold or int(os.getenv('AI_CIRCUIT_THRESHOLD', '3'))
+        self.cooldown = cooldown or float(os.getenv('AI_CIRCUIT_COOLDOWN', '60'))
+        self.app = None
+        self._providers: List = []
+        self._health: Dict[str, ProviderHealth] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def register(self, provider):
+        """Registra un proveedor para el sondeo periódico."""
+        with self._lock:
+            self._providers = [p for p in self._providers if p.name != provider.name] + [provider]
+            self._health.setdefault(provider.name, ProviderHealth(provider.name))
+
+    def start(self, app=None):
+        """Arranca el hilo de sondeo (idempotente)."""
+        if app is not None:
+            self.app = app
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._monitor_loop, name="ai-health", daemon=True)
+        self._thread.start()
+        logger.info(f"HealthMonitor: sondeo de proveedores cada {self.interval}s ACTIVADO.")
+
+    def stop(self):
+        self._stop.set()
+
+    def is_available(self, name: str) -> bool:
+        """Lectura O(1) del estado del circuito."""
+        health = self._health.get(name)
+        if health is None or health.state == CircuitState.CLOSED:
+            return True
+        if health.state == CircuitState.OPEN:
+            if time.time() - health.opened_at < self.cooldown:
+                return False
+            health.state = CircuitState.HALF_OPEN
+        return True
+
+    def record(self, name: str, success: bool, error: str = None):
+        """Reporta el resultado de una petición real o de un sondeo."""
+        with self._lock:
+            health = self._health.setdefault(name, ProviderHealth(name))
+            if success:
+                if health.state != CircuitState.CLOSED:
+                    logger.info(f"HealthMonitor: circuito de {name} CERRADO")
+                health.state = CircuitState.CLOSED
+                health.failures = 0
+                health.last_error = None
+                return
+
+            health.failures += 1
+            health.last_error = error
+            if health.state == CircuitState.HALF_OPEN or health.failures >= self.failure_threshold:
+                self._trip(health)
+
+    def probe(self, provider):
+        """Sondea un proveedor ahora mismo y actualiza su circuito."""
+        try:
+            if self.app is not None:
+                with self.app.app_context():
+                    ok = provider.probe()
+            else:
+                ok = provider.probe()
+        except Exception as e:
+            ok, error = False, str(e)
+        else:
+            error = None if ok else "health check failed"
+
+        if ok is None:
+            # Sin chequeo activo: el estado depende solo del tráfico real
+            return
+        with self._lock:
+            health = self._health.setdefault(provider.name, ProviderHealth(provider.name))
+            health.last_check = time.time()
+        if ok:
+            self.record(provider.name, True)
+        else:
+            # Un sondeo fallido abre el circuito directamente
+            with self._lock:
+                health.failures += 1
+                health.last_error = error
+                self._trip(health)
+
+    def snapshot(self) -> Dict[str, Dict]:
+        return {name: h.to_dict() for name, h in self._health.items()}
+
+    def _trip(self, health: ProviderHealth):
+        if health.state != CircuitState.OPEN:
+            logger.warning(f"HealthMonitor: circuito de {health.name} ABIERTO ({health.last_error})")
+        health.state = CircuitState.OPEN
+        health.opened_at = time.time()
+
+    def _monitor_loop(self):
+        while not self._stop.is_set():
+            for provider in list(self._providers):
+                self.probe(provider)
+            self._stop.wait(self.interval)
+
+
+# Monitor único por worker
+health_monitor = HealthMonitor()
@@ -0,0 +1,139 @@
+"""
+BUNK3R-IA: Provider Router
+Enrutado adaptativo de proveedores según latencia y tasa de error reales.
+
+Mantiene en memoria una ventana deslizante de benchmarks por (proveedor, tipo
+de tarea), sembrada desde `ai_model_benchmarks` al arrancar y alimentada por
+AIService.record_benchmark. Los proveedores se ordenan por tiempo esperado
+hasta una respuesta válida; los que aún no tienen datos conservan su prioridad
+configurada.
+"""
+import os
+import logging
+import threading
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def _percentile(sorted_values: List[int], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct * (len(sorted_values) - 1))))
+    return float(sorted_values[index])
+
+
+class ProviderRouter:
+    """Ordena proveedores por tiempo esperado hasta el éxito."""
+
+    # Suelo de tasa de éxito: evita costes infinitos para proveedores que solo fallan
+    MIN_SUCCESS_RATE = 0.05
+
+    def __init__(self, window: int = None, min_samples: int = None):
+        self.enabled = os.getenv('AI_ADAPTIVE_ROUTING', 'true').lower() == 'true'
+        self.window = window or int(os.getenv('AI_ROUTER_WINDOW', '100'))
+        self.min_samples = min_samples or int(os.getenv('AI_ROUTER_MIN_SAMPLES', '5'))
+        self._samples: Dict[Tuple[str, str], Deque[Tuple[int, bool]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, provider: str, task_type: str, latency_ms: int, success: bool):
+        """Añade una muestra a la ventana del proveedor."""
+        key = (provider, task_type or "chat")
+        with self._lock:
+            samples = self._samples.get(key)
+            if samples is None:
+                samples = self._samples[key] = deque(maxlen=self.window)
+            samples.append((int(latency_ms or 0), bool(success)))
+
+    def observe_abandoned(self, provider: str, task_type: str, elapsed_ms: int, winner_ms: int = 0):
+        """
+        Perdedor de un hedge abandonado en curso: no sabemos cuánto habría
+        tardado, sólo que al menos `elapsed_ms`. Se anota como éxito (no es un
+        fallo), así un primario lento que siempre pierde también acumula muestras
+        y el ranking puede relegarlo. Nunca por debajo de la latencia del ganador
+        `winner_ms`: un hedge lanzado tarde lleva poco tiempo en curso y, si no,
+        parecería más rápido que el proveedor que le ganó.
+        """
+        self.observe(provider, task_type, max(int(elapsed_ms or 0), int(winner_ms or 0)), True)
+
+    def stats(self, provider: str, task_type: str) -> Dict:
+        """p50/p95 de latencia (solo éxitos) y tasa de error de la ventana."""
+        with self._lock:
+            samples = list(self._samples.get((provider, task_type), ()))
+        if not samples:
+            return {"samples": 0, "p50_ms": None, "p95_ms": None, "error_rate": None}
+
+        latencies = sorted(lat for lat, ok in samples if ok)
+        errors = sum(1 for _, ok in samples if not ok)
+        return {
+            "samples": len(samples),
+            "p50_ms": _percentile(latencies, 0.50) if latencies else None,
+            "p95_ms": _percentile(latencies, 0.95) if latencies else None,
+            "error_rate": round(errors / len(samples), 3)
+        }
+
+    def expected_cost(self, provider: str, task_type: str) -> Optional[float]:
+        """
+        Tiempo esperado hasta el éxito en ms, o None si no hay muestras suficientes.
+        Latencia típica (media de p50 y p95) dividida por la tasa de éxito.
+        """
+        st = self.stats(provider, task_type)
+        if st["samples"] < self.min_samples:
+            return None
+        if st["p50_ms"] is None:
+            # Solo fallos: al fondo de los medidos
+            return float("inf")
+        typical = (st["p50_ms"] + st["p95_ms"]) / 2
+        return typical / max(1 - st["error_rate"], self.MIN_SUCCESS_RATE)
+
+    def rank(self, providers: List, task_type: str = "chat") -> List:
+        """
+        Reordena los proveedores medidos entre las posiciones que ya ocupan;
+        los no medidos se quedan en su posición configurada.
+        """
+        providers = list(providers)
+        if not self.enabled:
+            return providers
+
+        costs = [self.expected_cost(p.name, task_type) for p in providers]
+        slots = [i for i, c in enumerate(costs) if c is not None]
+        if len(slots) < 2:
+            return providers
+
+        measured = sorted(slots, key=lambda i: costs[i])
+        ranked = list(providers)
+        for slot, source in zip(slots, measured):
+            ranked[slot] = providers[source]
+        return ranked
+
+    def seed(self, app=None, limit: int = 1000) -> int:
+        """Carga los benchmarks más recientes de `ai_model_benchmarks`."""
+        try:
+            from backend.models import ModelBenchmark
+
+            def load():
+                return ModelBenchmark.query.order_by(ModelBenchmark.timestamp.desc()).limit(limit).all()
+
+            if app is not None:
+                with app.app_context():
+                    rows = load()
+            else:
+                rows = load()
+        except Exception as e:
+            logger.debug(f"ProviderRouter: no se pudieron cargar benchmarks: {e}")
+            return 0
+
+        for row in reversed(rows):
+            self.observe(row.provider, row.task_type, row.latency_ms, row.success)
+        logger.info(f"ProviderRouter: {len(rows)} benchmarks cargados")
+        return len(rows)
+
+    def snapshot(self) -> Dict[str, Dict]:
+        with self._lock:
+            keys = list(self._samples)
+        return {f"{provider}:{task}": self.stats(provider, task) for provider, task in keys}
+
+
+# Router único por worker
+provider_router = ProviderRouter()
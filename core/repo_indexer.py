@@ -1,15 +1,336 @@
 """
 BUNK3R-IA: Repository Indexer
 Indexa el código de los repositorios para que la IA tenga contexto
+
+La tabla de archivos (ruta, tamaño, mtime, inodo, lenguaje, hash) de cada
+repositorio se guarda en disco (REPO_INDEX_DIR) y se refresca de forma
+incremental: sobre la foto compartida del árbol (core/fs_scanner.py) se
+comparan tamaño, mtime e inodo y sólo se vuelven a leer (hash) los archivos
+que cambiaron. Dentro de un mismo worker
+la tabla se comparte entre peticiones y no se vuelve a recorrer el árbol antes
+de REPO_INDEX_REFRESH_INTERVAL segundos.
+
+Junto a la tabla se guardan un índice de trigramas (core/trigram_index.py) que
+acota search_in_repo a los archivos que pueden contener la consulta y un índice
+de símbolos (core/symbol_index.py) para ir a la definición y buscar referencias.
 """
 import os
+import re
+import time
+import hashlib
 import logging
+import tempfile
+import threading
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Set
 import json
+from core.trigram_index import TrigramIndex
+from core.symbol_index import SymbolIndex
+from core.fs_scanner import fs_scanner, is_under, paths_under, DEFAULT_IGNORE_NAMES
 
 logger = logging.getLogger(__name__)
 
+# Índices derivados de la tabla de archivos, guardados junto a ella como <tabla>.<nombre>.json
+DERIVED_INDEXES = {
+    "trigrams": TrigramIndex,
+    "symbols": SymbolIndex,
+}
+
+EXTENSION_LANGUAGES = {
+    '.py': 'Python',
+    '.js': 'JavaScript',
+    '.jsx': 'JavaScript',
+    '.ts': 'TypeScript',
+    '.tsx': 'TypeScript',
+    '.html': 'HTML',
+    '.css': 'CSS',
+    '.scss': 'SCSS',
+    '.java': 'Java',
+    '.cpp': 'C++',
+    '.c': 'C',
+    '.go': 'Go',
+    '.rs': 'Rust',
+    '.rb': 'Ruby',
+    '.php': 'PHP',
+    '.sql': 'SQL',
+    '.sh': 'Shell'
+}
+
+
+class FileIndex:
+    """
+    Tabla persistente e incremental de los archivos indexables de un repositorio.
+
+    `files` mapea ruta relativa -> {size, mtime_ns, inode, language, hash} y
+    `dirs` guarda los directorios recorridos. Un archivo modificado en el mismo
+    instante del recorrido se marca como dudoso y se vuelve a leer en el
+    siguiente refresco (la resolución del mtime puede ocultar un cambio).
+    """
+
+    VERSION = 1
+    # Archivos más grandes no se leen para calcular el hash
+    HASH_MAX_BYTES = 4 * 1024 * 1024
+    RACY_WINDOW_NS = 2_000_000_000
+
+    def __init__(self, repo_path: Path, ignore_dirs, code_extensions, important_files,
+                 index_dir: str = None, refresh_interval: float = None):
+        self.repo_path = Path(repo_path).resolve()
+        self.ignore_dirs = ignore_dirs
+        self.code_extensions = code_extensions
+        self.important_files = important_files
+        index_dir = index_dir or os.getenv('REPO_INDEX_DIR') or os.path.join(tempfile.gettempdir(), 'bunk3r_repo_index')
+        digest = hashlib.sha1(str(self.repo_path).encode('utf-8')).hexdigest()[:16]
+        self.index_path = Path(index_dir) / f"{self.repo_path.name}-{digest}.json"
+        self.refresh_interval = refresh_interval if refresh_interval is not None else float(
+            os.getenv('REPO_INDEX_REFRESH_INTERVAL', '2'))
+        self.files: Dict[str, Dict] = {}
+        self.dirs: List[str] = []
+        self.checked_at = 0.0
+        self.last_refresh: Dict = {}
+        self._lock = threading.Lock()
+        # Índices derivados cargados (nombre -> índice) y sus construcciones en segundo plano
+        self._indexes: Dict[str, object] = {}
+        self._builders: Dict[str, threading.Thread] = {}
+        # Con más archivos pendientes, un índice derivado se construye en segundo plano
+        self.trigram_sync_max = int(os.getenv('REPO_TRIGRAM_SYNC_MAX', '500'))
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.index_path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") == self.VERSION and data.get("repo_path") == str(self.repo_path):
+            self.files = data.get("files", {})
+            self.dirs = data.get("dirs", [])
+
+    def _save(self):
+        """Escritura atómica: otro worker nunca lee un JSON a medias."""
+        try:
+            self.index_path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.index_path.parent, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({"version": self.VERSION, "repo_path": str(self.repo_path),
+                           "files": self.files, "dirs": self.dirs}, f, separators=(',', ':'))
+            os.replace(tmp, self.index_path)
+        except OSError as e:
+            logger.warning(f"RepoIndexer: no se pudo guardar el índice en {self.index_path}: {e}")
+
+    def _walk(self):
+        """(ruta relativa, stat) de cada archivo indexable y lista de directorios, desde la foto compartida del árbol."""
+        snapshot = fs_scanner.snapshot(self.repo_path)
+        # Nombres que el indexador ignora además de la política común
+        extra = set(self.ignore_dirs) - snapshot.policy.names
+        files = []
+        for rel in snapshot.files():
+            name = rel.rsplit("/", 1)[-1]
+            if extra and extra.intersection(rel.split("/")):
+                continue
+            if os.path.splitext(name)[1] in self.code_extensions or name in self.important_files:
+                try:
+                    files.append((rel, os.stat(os.path.join(self.repo_path, rel))))
+                except OSError:
+                    continue
+        dirs = [rel for rel in snapshot.dirs() if not (extra and extra.intersection(rel.split("/")))]
+        return files, dirs
+
+    def _hash(self, rel: str, size: int) -> Optional[str]:
+        if size > self.HASH_MAX_BYTES:
+            return None
+        try:
+            with open(self.repo_path / rel, 'rb') as f:
+                return hashlib.sha1(f.read()).hexdigest()
+        except OSError:
+            return None
+
+    def _update(self, rel: str, st: os.stat_result, scan_ns: int, stats: Dict) -> Dict:
+        """Entrada de la tabla para un archivo: se reutiliza si no cambió, si no se vuelve a leer."""
+        old = self.files.get(rel)
+        if (old and not old.get("racy") and old["size"] == st.st_size
+                and old["mtime_ns"] == st.st_mtime_ns and old["inode"] == st.st_ino):
+            stats["unchanged"] += 1
+            return old
+        digest = self._hash(rel, st.st_size)
+        stats["hashed"] += 1
+        if old is None:
+            stats["added"] += 1
+        elif old.get("hash") != digest or digest is None:
+            stats["modified"] += 1
+        else:
+            stats["unchanged"] += 1
+        entry = {
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+            "inode": st.st_ino,
+            "language": EXTENSION_LANGUAGES.get(os.path.splitext(rel)[1]),
+            "hash": digest,
+        }
+        if st.st_mtime_ns >= scan_ns - self.RACY_WINDOW_NS:
+            entry["racy"] = True
+        return entry
+
+    def _finish(self, files: Dict[str, Dict], dirs: List[str], stats: Dict, start: float) -> Dict:
+        dirs.sort()
+        changed = stats["added"] or stats["modified"] or stats["removed"] or stats["hashed"] or dirs != self.dirs
+        self.files, self.dirs = files, dirs
+        if changed:
+            self._save()
+        self.checked_at = time.time()
+        stats["ms"] = int((self.checked_at - start) * 1000)
+        self.last_refresh = stats
+        return {**stats, "cached": False}
+
+    def refresh(self, force: bool = False) -> Dict:
+        """
+        Sincroniza la tabla con el disco. Devuelve el resumen del refresco
+        (added, modified, removed, unchanged, hashed); si la tabla se refrescó
+        hace menos de refresh_interval segundos, o el repo está vigilado por
+        core/workspace_watcher.py (que avisa con apply_changes), no toca el disco.
+        """
+        with self._lock:
+            # La tabla cargada de disco se valida una vez aunque el repo esté vigilado
+            if not force and self.files and self.checked_at and (
+                    fs_scanner.is_watched(self.repo_path)
+                    or time.time() - self.checked_at < self.refresh_interval):
+                return {**self.last_refresh, "cached": True}
+
+            start = time.time()
+            scan_ns = time.time_ns()
+            walked, dirs = self._walk()
+            stats = {"added": 0, "modified": 0, "removed": 0, "unchanged": 0, "hashed": 0}
+            files = {rel: self._update(rel, st, scan_ns, stats) for rel, st in walked}
+            stats["removed"] = len(self.files.keys() - files.keys())
+            return self._finish(files, dirs, stats, start)
+
+    def apply_changes(self, rels) -> Dict:
+        """
+        Actualiza sólo las rutas indicadas (relativas al repo, archivos o
+        directorios) que avisó el watcher: O(cambios) en lugar de un recorrido.
+        """
+        with self._lock:
+            start = time.time()
+            scan_ns = time.time_ns()
+            snapshot = fs_scanner.snapshot(self.repo_path)
+            extra = set(self.ignore_dirs) - snapshot.policy.names
+            stats = {"added": 0, "modified": 0, "removed": 0, "unchanged": 0, "hashed": 0}
+            files = dict(self.files)
+            targets = set()
+            for rel in rels:
+                rel = rel.strip("/")
+                if snapshot.is_dir(rel):
+                    targets.update(snapshot.files(rel))
+                # Un directorio borrado o renombrado se lleva todo lo que colgaba de él
+                targets.update(path for path in self.files if path.startswith(rel + "/"))
+                targets.add(rel)
+            for rel in targets:
+                name = rel.rsplit("/", 1)[-1]
+                indexable = (os.path.splitext(name)[1] in self.code_extensions or name in self.important_files)
+                st = None
+                if indexable and snapshot.has_file(rel) and not (extra and extra.intersection(rel.split("/"))):
+                    try:
+                        st = os.stat(os.path.join(self.repo_path, rel))
+                    except OSError:
+                        st = None
+                if st is not None:
+                    files[rel] = self._update(rel, st, scan_ns, stats)
+                elif files.pop(rel, None) is not None:
+                    stats["removed"] += 1
+            dirs = [rel for rel in snapshot.dirs() if not (extra and extra.intersection(rel.split("/")))]
+            return self._finish(files, dirs, stats, start)
+
+    def _sync_index(self, name: str, background: bool = False):
+        """
+        Índice derivado (DERIVED_INDEXES) al día con la tabla: sólo se leen los
+        archivos cuyo hash cambió. Los que no tienen hash (demasiado grandes)
+        quedan fuera.
+        
+        Con `background`, si hay más de trigram_sync_max archivos pendientes (el
+        primer índice de un repo grande) la construcción sigue en un hilo y se
+        devuelve None: quien lo pidió sigue sin el índice.
+        """
+        with self._lock:
+            index = self._indexes.get(name)
+            if index is None:
+                index = self._indexes[name] = DERIVED_INDEXES[name](self.index_path.with_suffix(f'.{name}.json'))
+            files = self.files
+            builder = self._builders.get(name)
+            building = builder is not None and builder.is_alive()
+        if background and building:
+            return None
+        
+        accepted = {rel: info for rel, info in files.items() if index.accepts(rel)}
+        stale = [rel for rel, info in accepted.items() if index.digest(rel) != info.get("hash")]
+        if background and len(stale) > self.trigram_sync_max:
+            with self._lock:
+                builder = self._builders.get(name)
+                if builder is None or not builder.is_alive():
+                    logger.info(f"RepoIndexer: construyendo índice de {name} ({len(stale)} archivos) en segundo plano")
+                    builder = self._builders[name] = threading.Thread(
+                        target=self._sync_index, args=(name,), name=f"repo-{name}", daemon=True)
+                    builder.start()
+            return None
+        
+        for rel in index.paths() - accepted.keys():
+            index.remove(rel)
+        memo = {}
+        for rel in stale:
+            digest = accepted[rel].get("hash")
+            if digest is None:
+                index.remove(rel)
+            else:
+                try:
+                    text = (self.repo_path / rel).read_text(encoding='utf-8', errors='ignore')
+                except OSError:
+                    index.remove(rel)
+                    continue
+                index.update(rel, text, digest, memo)
+        index.save()
+        return index
+
+    def wait_for_build(self, name: str, timeout: float) -> bool:
+        """Espera como mucho `timeout` segundos a la construcción en segundo plano de `name`."""
+        builder = self._builders.get(name)
+        if builder is not None:
+            builder.join(timeout)
+        return builder is None or not builder.is_alive()
+
+    def sync_trigrams(self, background: bool = False) -> Optional[TrigramIndex]:
+        """Índice de trigramas al día con la tabla (ver _sync_index)."""
+        return self._sync_index("trigrams", background)
+
+    def sync_symbols(self, background: bool = False) -> Optional[SymbolIndex]:
+        """Índice de símbolos (.py/.js/.ts) al día con la tabla (ver _sync_index)."""
+        return self._sync_index("symbols", background)
+
+
+# Tablas de archivos por repositorio compartidas por las peticiones del worker
+_file_indexes: Dict[str, FileIndex] = {}
+_file_indexes_lock = threading.Lock()
+
+
+def apply_workspace_changes(root, rels, full: bool = False):
+    """
+    Cambios (rutas relativas a `root`) avisados por el watcher: cada tabla de
+    un repo bajo `root` actualiza sólo esas rutas (o se refresca entera con
+    `full`, o si el propio repo apareció o desapareció).
+    """
+    root = Path(root).resolve()
+    with _file_indexes_lock:
+        indexes = [fi for fi in _file_indexes.values() if is_under(fi.repo_path, root)]
+    for file_index in indexes:
+        inside = None if full else paths_under(rels, root, file_index.repo_path)
+        if inside is None:
+            file_index.refresh(force=True)
+        elif inside:
+            file_index.apply_changes(inside)
+        else:
+            continue
+        # Índices derivados ya cargados: se ponen al día fuera de la petición que los usa
+        for name in list(file_index._indexes):
+            file_index._sync_index(name, background=True)
+
+
 class RepoIndexer:
     """Indexa repositorios para proporcionar contexto a la IA"""
     
@@ -27,22 +348,32 @@ class RepoIndexer:
         '.env.example', 'docker-compose.yml', 'Dockerfile'
     }
     
-    # Directorios a ignorar
-    IGNORE_DIRS = {
-        '.git', 'node_modules', '__pycache__', '.venv', 'venv', 'env',
-        'dist', 'build', 'target', '.next', '.cache', 'vendor'
-    }
+    # Directorios a ignorar (la política común del escáner, más los .gitignore)
+    IGNORE_DIRS = set(DEFAULT_IGNORE_NAMES)
     
     def __init__(self, repo_path: Path):
         self.repo_path = Path(repo_path)
         self.repo_name = self.repo_path.name
+    
+    @property
+    def file_index(self) -> FileIndex:
+        """Tabla de archivos persistente de este repositorio (una por worker)."""
+        key = str(self.repo_path.resolve())
+        with _file_indexes_lock:
+            file_index = _file_indexes.get(key)
+            if file_index is None:
+                file_index = FileIndex(self.repo_path, self.IGNORE_DIRS, self.CODE_EXTENSIONS, self.IMPORTANT_FILES)
+                _file_indexes[key] = file_index
+        return file_index
         
     def index_repo(self) -> Dict:
         """Indexa un repositorio completo"""
         if not self.repo_path.exists():
             return {"success": False, "error": "Repositorio no encontrado"}
         
-        logger.info(f"📚 Indexando repositorio: {self.repo_name}")
+        refresh = self.file_index.refresh()
+        if not refresh["cached"]:
+            logger.info(f"📚 Indexando repositorio: {self.repo_name} ({refresh['hashed']} archivos leídos, {refresh['ms']} ms)")
         
         index = {
             "repo_name": self.repo_name,
@@ -52,7 +383,8 @@ class RepoIndexer:
             "important_files": self._find_important_files(),
             "dependencies": self._extract_dependencies(),
             "file_count": 0,
-            "total_size": 0
+            "total_size": 0,
+            "refresh": refresh
         }
         
         # Contar archivos y tamaño
@@ -61,82 +393,43 @@ class RepoIndexer:
                 index["file_count"] += 1
                 index["total_size"] += file_info.get("size", 0)
         
-        logger.info(f"✅ Indexado completado: {index['file_count']} archivos, {len(index['languages'])} lenguajes")
+        logger.debug(f"✅ Indexado completado: {index['file_count']} archivos, {len(index['languages'])} lenguajes")
         
         return {"success": True, "index": index}
     
     def _build_structure(self, max_depth: int = 5) -> List[Dict]:
-        """Construye la estructura de archivos del repositorio"""
-        structure = []
+        """Construye la estructura de archivos del repositorio (desde la tabla de archivos)"""
+        file_index = self.file_index
+        entries = [(path, "dir") for path in file_index.dirs] + [(path, "file") for path in file_index.files]
+        # Mismo orden que el recorrido recursivo con sorted(iterdir()): padre antes que hijos
+        entries.sort(key=lambda entry: entry[0].split("/"))
         
-        def scan_dir(path: Path, depth: int = 0):
+        structure = []
+        for path, kind in entries:
+            depth = path.count("/")
             if depth > max_depth:
-                return
-            
-            try:
-                for item in sorted(path.iterdir()):
-                    # Ignorar directorios especiales
-                    if item.name in self.IGNORE_DIRS:
-                        continue
-                    
-                    if item.is_dir():
-                        structure.append({
-                            "type": "dir",
-                            "name": item.name,
-                            "path": str(item.relative_to(self.repo_path)),
-                            "depth": depth
-                        })
-                        scan_dir(item, depth + 1)
-                    elif item.is_file():
-                        # Solo indexar archivos de código
-                        if item.suffix in self.CODE_EXTENSIONS or item.name in self.IMPORTANT_FILES:
-                            try:
-                                size = item.stat().st_size
-                                structure.append({
-                                    "type": "file",
-                                    "name": item.name,
-                                    "path": str(item.relative_to(self.repo_path)),
-                                    "extension": item.suffix,
-                                    "size": size,
-                                    "depth": depth
-                                })
-                            except:
-                                pass
-            except PermissionError:
-                pass
-        
-        scan_dir(self.repo_path)
+                continue
+            name = path.rsplit("/", 1)[-1]
+            if kind == "dir":
+                structure.append({"type": "dir", "name": name, "path": path, "depth": depth})
+            else:
+                structure.append({
+                    "type": "file",
+                    "name": name,
+                    "path": path,
+                    "extension": os.path.splitext(name)[1],
+                    "size": file_index.files[path]["size"],
+                    "depth": depth
+                })
         return structure
     
     def _detect_languages(self) -> Dict[str, int]:
         """Detecta los lenguajes de programación usados"""
         languages = {}
-        
-        extension_to_language = {
-            '.py': 'Python',
-            '.js': 'JavaScript',
-            '.jsx': 'JavaScript',
-            '.ts': 'TypeScript',
-            '.tsx': 'TypeScript',
-            '.html': 'HTML',
-            '.css': 'CSS',
-            '.scss': 'SCSS',
-            '.java': 'Java',
-            '.cpp': 'C++',
-            '.c': 'C',
-            '.go': 'Go',
-            '.rs': 'Rust',
-            '.rb': 'Ruby',
-            '.php': 'PHP',
-            '.sql': 'SQL',
-            '.sh': 'Shell'
-        }
-        
-        for item in self.repo_path.rglob('*'):
-            if item.is_file() and item.suffix in extension_to_language:
-                lang = extension_to_language[item.suffix]
+        for info in self.file_index.files.values():
+            lang = info.get("language")
+            if lang:
                 languages[lang] = languages.get(lang, 0) + 1
-        
         return languages
     
     def _find_important_files(self) -> List[Dict]:
@@ -145,7 +438,7 @@ class RepoIndexer:
         
         for filename in self.IMPORTANT_FILES:
             file_path = self.repo_path / filename
-            if file_path.exists():
+            if filename in self.file_index.files:
                 try:
                     content = file_path.read_text(encoding='utf-8', errors='ignore')
                     important.append({
@@ -201,38 +494,89 @@ class RepoIndexer:
         except:
             return None
     
-    def search_in_repo(self, query: str, case_sensitive: bool = False) -> List[Dict]:
-        """Busca un término en todos los archivos del repositorio"""
+    def candidate_files(self, query: str, regex: bool = False) -> Optional[Set[str]]:
+        """
+        Rutas relativas que pueden contener la consulta según el índice de
+        trigramas (más las que el índice no cubre), o None si no se puede acotar.
+        """
+        file_index = self.file_index
+        file_index.refresh()
+        trigrams = file_index.sync_trigrams(background=True)
+        if trigrams is None:
+            return None
+        candidates = trigrams.candidates(query, regex)
+        if candidates is None:
+            return None
+        unindexed = {rel for rel, info in file_index.files.items() if info.get("hash") is None}
+        return candidates | unindexed
+    
+    def search_in_repo(self, query: str, case_sensitive: bool = False, regex: bool = False) -> List[Dict]:
+        """
+        Busca un término (o una regex) en los archivos del repositorio.
+        El índice de trigramas descarta los archivos que no pueden contenerlo;
+        sólo los candidatos se leen para confirmar las coincidencias.
+        """
         results = []
         
-        if not case_sensitive:
-            query = query.lower()
+        if regex:
+            pattern = re.compile(query, 0 if case_sensitive else re.IGNORECASE)
+            line_matches = pattern.search
+        else:
+            needle = query if case_sensitive else query.lower()
+            line_matches = (lambda line: needle in line) if case_sensitive else (lambda line: needle in line.lower())
         
-        for item in self.repo_path.rglob('*'):
-            if item.is_file() and item.suffix in self.CODE_EXTENSIONS:
-                try:
-                    content = item.read_text(encoding='utf-8', errors='ignore')
-                    search_content = content if case_sensitive else content.lower()
-                    
-                    if query in search_content:
-                        # Encontrar líneas que contienen el query
-                        lines = content.split('\n')
-                        matches = []
-                        for i, line in enumerate(lines, 1):
-                            search_line = line if case_sensitive else line.lower()
-                            if query in search_line:
-                                matches.append({
-                                    "line_number": i,
-                                    "content": line.strip()
-                                })
-                                if len(matches) >= 5:  # Máximo 5 matches por archivo
-                                    break
-                        
-                        results.append({
-                            "file": str(item.relative_to(self.repo_path)),
-                            "matches": matches
-                        })
-                except:
-                    pass
+        candidates = self.candidate_files(query, regex)
+        paths = self.file_index.files.keys() if candidates is None else candidates
+        
+        for rel in sorted(paths):
+            try:
+                content = (self.repo_path / rel).read_text(encoding='utf-8', errors='ignore')
+            except OSError:
+                continue
+            
+            # Encontrar líneas que contienen el query
+            matches = []
+            for i, line in enumerate(content.split('\n'), 1):
+                if line_matches(line):
+                    matches.append({
+                        "line_number": i,
+                        "content": line.strip()
+                    })
+                    if len(matches) >= 5:  # Máximo 5 matches por archivo
+                        break
+            
+            if matches:
+                results.append({
+                    "file": rel,
+                    "matches": matches
+                })
         
         return results
+    
+    def symbol_index(self, wait: float = 0) -> Optional[SymbolIndex]:
+        """
+        Índice de símbolos del repositorio al día, o None mientras se construye
+        en segundo plano (el primer índice de un repo grande). Con `wait` se
+        espera a esa construcción como mucho esos segundos.
+        """
+        file_index = self.file_index
+        file_index.refresh()
+        symbols = file_index.sync_symbols(background=True)
+        if symbols is None and wait > 0 and file_index.wait_for_build("symbols", wait):
+            symbols = file_index.sync_symbols(background=True)
+        return symbols
+    
+    def find_definitions(self, name: str, kind: str = None) -> Optional[List[Dict]]:
+        """Definiciones de `name` (ir a la definición); None si el índice no está listo."""
+        symbols = self.symbol_index()
+        return symbols.definitions(name, kind) if symbols is not None else None
+    
+    def find_references(self, name: str, limit: int = 200) -> Optional[List[Dict]]:
+        """Usos de `name` en el repositorio; None si el índice no está listo."""
+        symbols = self.symbol_index()
+        return symbols.references(name, limit) if symbols is not None else None
+    
+    def search_symbols(self, query: str, kind: str = None, limit: int = 50) -> Optional[List[Dict]]:
+        """Definiciones cuyo nombre contiene `query`; None si el índice no está listo."""
+        symbols = self.symbol_index()
+        return symbols.search(query, kind, limit) if symbols is not None else None
@@ -0,0 +1,153 @@
+"""
+BUNK3R-IA: Response Cache
+Caché de respuestas LLM direccionada por contenido.
+
+La clave es el hash de (proveedor, modelo, system prompt, mensajes, temperatura),
+de modo que solo una petición byte a byte idéntica reutiliza la respuesta.
+Nivel en memoria con LRU, TTL y tope de tamaño; nivel opcional en disco (SQLite)
+compartido entre reinicios y workers. Solo se guardan respuestas exitosas.
+"""
+import os
+import json
+import time
+import hashlib
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    """LRU + TTL en memoria con nivel SQLite opcional."""
+
+    def __init__(self, max_entries: int = None, max_bytes: int = None, ttl: float = None, disk_path: str = None):
+        self.enabled = os.getenv('AI_RESPONSE_CACHE', 'false').lower() == 'true'
+        self.max_entries = max_entries or int(os.getenv('AI_CACHE_MAX_ENTRIES', '512'))
+        self.max_bytes = max_bytes or int(float(os.getenv('AI_CACHE_MAX_MB', '64')) * 1024 * 1024)
+        self.ttl = ttl or float(os.getenv('AI_CACHE_TTL', '3600'))
+        self.disk_path = disk_path if disk_path is not None else os.getenv('AI_CACHE_DB', '')
+
+        self._entries: "OrderedDict[str, Tuple[float, int, Dict]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._disk: Optional[sqlite3.Connection] = None
+        self.stats = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+
+        if self.disk_path:
+            self._open_disk()
+
+    @staticmethod
+    def fingerprint(provider: str, model: Optional[str], system: Optional[str],
+                    messages: List[Dict], temperature: Any = None) -> str:
+        payload = json.dumps(
+            [provider, model, system or "", messages, temperature],
+            sort_keys=True, ensure_ascii=False, separators=(",", ":")
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, _, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.stats["hits"] += 1
+                    return value
+                self._remove(key)
+
+        value = self._disk_get(key, now)
+        if value is not None:
+            self.stats["disk_hits"] += 1
+            self._store(key, value, now + self.ttl)
+            return value
+
+        self.stats["misses"] += 1
+        return None
+
+    def put(self, key: str, value: Dict):
+        expires_at = time.time() + self.ttl
+        self._store(key, value, expires_at)
+        self._disk_put(key, value, expires_at)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            if self._disk is not None:
+                self._disk.execute("DELETE FROM response_cache")
+                self._disk.commit()
+
+    def snapshot(self) -> Dict:
+        return {**self.stats, "entries": len(self._entries), "bytes": self._bytes, "disk": bool(self._disk)}
+
+    # --- Memoria ---
+
+    def _store(self, key: str, value: Dict, expires_at: float):
+        size = len(json.dumps(value, ensure_ascii=False))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (expires_at, size, value)
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.stats["evictions"] += 1
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+
+    # --- Disco (SQLite) ---
+
+    def _open_disk(self):
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.disk_path)), exist_ok=True)
+            self._disk = sqlite3.connect(self.disk_path, check_same_thread=False, timeout=5)
+            self._disk.execute("PRAGMA journal_mode=WAL")
+            self._disk.execute(
+                "CREATE TABLE IF NOT EXISTS response_cache "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._disk.execute("DELETE FROM response_cache WHERE expires_at < ?", (time.time(),))
+            self._disk.commit()
+        except Exception as e:
+            logger.warning(f"ResponseCache: nivel en disco desactivado ({e})")
+            self._disk = None
+
+    def _disk_get(self, key: str, now: float) -> Optional[Dict]:
+        if self._disk is None:
+            return None
+        try:
+            with self._lock:
+                row = self._disk.execute(
+                    "SELECT value FROM response_cache WHERE key = ? AND expires_at > ?", (key, now)
+                ).fetchone()
+            return json.loads(row[0]) if row else None
+        except Exception as e:
+            logger.debug(f"ResponseCache disk read error: {e}")
+            return None
+
+    def _disk_put(self, key: str, value: Dict, expires_at: float):
+        if self._disk is None:
+            return
+        try:
+            with self._lock:
+                self._disk.execute(
+                    "INSERT OR REPLACE INTO response_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(value, ensure_ascii=False), expires_at)
+                )
+                self._disk.commit()
+        except Exception as e:
+            logger.debug(f"ResponseCache disk write error: {e}")
+
+
+# Caché única por worker
+response_cache = ResponseCache()
@@ -1,10 +1,14 @@
 import logging
-import json
 import time
 import re
-from typing import Optional, Dict, List, Any
-from core.nervous_system import nervous_system
+from concurrent.futures import Future
+from typing import Optional, Dict, List, Any, Iterator, Tuple
+from core.nervous_system import NervousSystem
 from core.gravity_core import gravity_core
+from core.context_window import context_window
+from core.keyword_matcher import keyword_screens
+from core.tool_protocol import parse_tool_json
+from core.legacy_v1_archive.streaming_service import StreamEvent, StreamEventType
 
 logger = logging.getLogger(__name__)
 
@@ -14,75 +18,177 @@ class Singularity:
     Implementa el Ciclo Consciente: REFLEXIÓN -> SIMULACIÓN -> EJECUCIÓN.
     """
 
+    REFLECTION_SYSTEM = "Eres el Arquitecto Senior BUNK3R. Tu monólogo interno es crítico y técnico."
+
     def __init__(self, ai_service=None):
         self.ai = ai_service  # Referencia al AIService para llamadas LLM
         self.monologue = []
+        # Paso 0 especulativo: aceptado (hits) o relanzado tras la reflexión (restarts)
+        self.speculation_stats = {"hits": 0, "restarts": 0}
 
-    def solve(self, message: str, user_id: str, conversation: list, system_prompt: str) -> Dict:
-        """Ciclo Maestro de Resolución: Pensar -> Simular -> Actuar."""
+    def solve(self, message: str, user_id: str, conversation: list, system_prompt: str,
+              body: Optional[NervousSystem] = None) -> Dict:
+        """
+        Ciclo Maestro de Resolución: Pensar -> Simular -> Actuar.
+        `body` es el Nervous System de la petición (por defecto uno nuevo); un
+        Sandbox ya activo en él se mantiene aunque la reflexión no vea riesgo.
+        """
         logger.info("Singularity: Iniciando pulso de pensamiento unificado...")
+        body = body or self.ai.new_body()
+        # El mensaje actual aún no está en el historial (chat() lo guarda al terminar)
+        conversation = conversation + [{"role": "user", "content": message}]
+        
+        # 0. ESPECULACIÓN: el paso 0 del agente corre en paralelo a la reflexión
+        speculative = self.ai.speculate_step(conversation, self._agent_system(system_prompt, "")) if self.ai else None
         
         # 1. MONÓLOGO INTERNO (REFLEXIÓN)
         # BUNK3R analiza la petición antes de ver herramientas.
-        reflection_prompt = f"USER MSG: {message}\nREFLEXIÓN INTERNA: Analiza el impacto técnico, riesgos de seguridad y qué archivos del core se verán afectados. No respondas al usuario aún, solo reflexiona."
-        reflection = self._llm_call(reflection_prompt, "Eres el Arquitecto Senior BUNK3R. Tu monólogo interno es crítico y técnico.")
+        reflection = self._llm_call(self._reflection_prompt(message), self.REFLECTION_SYSTEM)
         logger.info(f"🧠 MONÓLOGO: {reflection}")
         
         # 2. EVALUACIÓN DE RIESGO & SANDBOX
         # Si la reflexión detecta peligro, activamos el Sandbox.
-        risk_keywords = [
-            "crash", "delete", "format", "rm -rf", "db migration", "main.py",
-            "exploit", "vulnerabilit", "security hole", "break into", "hacker",
-            "malware", "virus", "shell script", "root access", "sandbox"
-        ]
-        # Búsqueda robusta e insensible a mayúsculas
-        reflection_lower = reflection.lower()
-        high_risk = any(k in reflection_lower for k in risk_keywords)
-        nervous_system.sandbox_mode = high_risk
-        
+        high_risk = self._assess_risk(reflection, body)
         if high_risk:
-            logger.warning("🧪 MODO SIMULACIÓN ACTIVADO: Sistema en Sandbox por seguridad.")
             reflection += "\n[ALERTA DE SEGURIDAD] Operación redirigida al Sandbox."
 
         # 3. PLANIFICACIÓN & EJECUCIÓN AGÉNTICA
         # Aquí delegamos al loop de herramientas unificado
-        final_response = self._run_agent_loop(message, conversation, system_prompt, reflection)
+        final_response = self._run_agent_loop(message, conversation, system_prompt, reflection,
+                                              speculative=speculative, high_risk=high_risk, body=body)
         
         return {
             "success": True,
             "response": final_response,
             "reflection": reflection,
-            "simulated": high_risk
+            "simulated": body.sandbox_mode
         }
 
-    def _llm_call(self, prompt: str, system: str) -> str:
+    def solve_stream(self, message: str, user_id: str, conversation: list, system_prompt: str,
+                     body: Optional[NervousSystem] = None) -> Iterator[StreamEvent]:
+        """
+        Variante en streaming de solve(): mismo ciclo, emitido como eventos
+        (PHASE, TOKEN de reflexión y respuesta, TOOL_CALL/TOOL_RESULT). El COMPLETE
+        final lleva la respuesta, con la reflexión y el modo sandbox en metadata.
+        """
+        logger.info("Singularity: Iniciando pulso de pensamiento unificado (stream)...")
+        body = body or self.ai.new_body()
+        conversation = conversation + [{"role": "user", "content": message}]
+        
+        # 1. MONÓLOGO INTERNO (REFLEXIÓN)
+        yield StreamEvent(StreamEventType.PHASE, "reflection", {"phase": "reflection"})
+        parts = []
+        for token in self._llm_stream(self._reflection_prompt(message), self.REFLECTION_SYSTEM):
+            parts.append(token)
+            yield StreamEvent(StreamEventType.TOKEN, token, {"phase": "reflection"})
+        reflection = "".join(parts)
+        logger.info(f"🧠 MONÓLOGO: {reflection}")
+        
+        # 2. EVALUACIÓN DE RIESGO & SANDBOX
+        high_risk = self._assess_risk(reflection, body)
+        if high_risk:
+            reflection += "\n[ALERTA DE SEGURIDAD] Operación redirigida al Sandbox."
+            yield StreamEvent(StreamEventType.METADATA, "", {"phase": "reflection", "action": "sandbox", "simulated": True})
+        
+        # 3. PLANIFICACIÓN & EJECUCIÓN AGÉNTICA
+        tool = self._reflection_tool(reflection, body)
+        if tool:
+            tool_json_str, tool_output = tool
+            clipped = context_window.clip_tool_output(tool_output)
+            yield StreamEvent(StreamEventType.TOOL_CALL, tool_json_str, {"phase": "reflection"})
+            yield StreamEvent(StreamEventType.TOOL_RESULT, clipped, {"phase": "reflection"})
+            reflection += f"\n[SISTEMA] Resultado de herramienta en reflexión: {clipped}"
+        
+        yield StreamEvent(StreamEventType.PHASE, "agent", {"phase": "agent"})
+        enhanced_system = self._agent_system(system_prompt, reflection)
+        for event in self.ai._internal_chat_loop_stream(conversation, enhanced_system, body=body):
+            if event.event_type == StreamEventType.COMPLETE:
+                event.metadata.update({"reflection": reflection, "simulated": body.sandbox_mode})
+            yield event
+
+    @staticmethod
+    def _reflection_prompt(message: str) -> str:
+        return f"USER MSG: {message}\nREFLEXIÓN INTERNA: Analiza el impacto técnico, riesgos de seguridad y qué archivos del core se verán afectados. No respondas al usuario aún, solo reflexiona."
+
+    def _assess_risk(self, reflection: str, body: NervousSystem) -> bool:
+        """Activa el Sandbox del Nervous System de la petición si la reflexión detecta peligro."""
+        # Búsqueda insensible a mayúsculas con el filtro "risk" (configurable sin tocar código)
+        trigger = keyword_screens.get("risk").search(reflection)
+        high_risk = trigger is not None
+        body.sandbox_mode = body.sandbox_mode or high_risk
+        
+        if high_risk:
+            logger.warning(f"🧪 MODO SIMULACIÓN ACTIVADO: Sistema en Sandbox por seguridad ('{trigger}').")
+        return high_risk
+
+    def _llm_call(self, prompt: str, system: str, use_cache: Optional[bool] = None) -> str:
         """Llamada rápida al LLM (vía AIService) para procesos internos."""
         if not self.ai: return "Reflexión offline activa."
         # Usamos council_query para reflexiones de alta calidad si es posible
-        return self.ai.council_query(prompt, system)
+        return self.ai.council_query(prompt, system, use_cache=use_cache)
 
-    def _run_agent_loop(self, message: str, conversation: list, system: str, reflection: str) -> str:
-        """Loop de ejecución unificado con el Nervous System."""
+    def _llm_stream(self, prompt: str, system: str, use_cache: Optional[bool] = None) -> Iterator[str]:
+        """Como _llm_call, pero entrega la síntesis del consejo en fragmentos."""
+        if not self.ai:
+            yield "Reflexión offline activa."
+            return
+        yield from self.ai.council_query_stream(prompt, system, use_cache=use_cache)
+
+    def _reflection_tool(self, reflection: str, body: NervousSystem) -> Optional[Tuple[str, str]]:
+        """Ejecuta la herramienta que ya trae la reflexión. Devuelve (json de la llamada, salida) o None."""
+        tool_match = re.search(r'<TOOL>(.*?)</TOOL>', reflection, re.DOTALL)
+        if not tool_match:
+            return None
+        tool_json_str = tool_match.group(1).strip()
+        try:
+            # Si la reflexión ya trae una herramienta, la ejecutamos antes del loop
+            logger.info(f"Singularity: Detectada herramienta en REFLEXIÓN: {tool_json_str[:50]}...")
+            tool_call = parse_tool_json(tool_json_str)
+            if not tool_call:
+                raise ValueError("JSON de herramienta ilegible")
+            return tool_json_str, self.ai._call_tool(tool_call.get("name"), tool_call.get("args", {}), body)
+        except Exception as e:
+            logger.error(f"Error procesando herramienta en reflexión: {e}")
+            return None
+
+    @staticmethod
+    def _agent_system(system: str, reflection: str) -> str:
+        """System prompt del loop agéntico con la reflexión inyectada (si la hay)."""
+        parts = [system]
+        if reflection:
+            parts.append(f"TU REFLEXIÓN INTERNA:\n{reflection}")
+        parts.append('Si necesitas actuar, usa <TOOL>{"name": "...", "args": {...}}</TOOL> (varias etiquetas si las acciones son independientes).')
+        return "\n\n".join(parts)
+
+    def _run_agent_loop(self, message: str, conversation: list, system: str, reflection: str,
+                        speculative: Optional[Future] = None, high_risk: bool = False,
+                        body: Optional[NervousSystem] = None) -> str:
+        """
+        Loop de ejecución unificado con el Nervous System.
+        Un paso 0 especulativo se aprovecha salvo que la reflexión active el Sandbox
+        o aporte un resultado de herramienta; en ese caso se descarta y se relanza.
+        """
         
         # 1. ¿Hay herramientas en la reflexión inicial? (Caso de uso del usuario)
-        import re
-        tool_match = re.search(r'<TOOL>(.*?)</TOOL>', reflection, re.DOTALL)
-        if tool_match:
-            tool_json_str = tool_match.group(1).strip()
-            try:
-                # Si la reflexión ya trae una herramienta, la ejecutamos antes del loop
-                logger.info(f"Singularity: Detectada herramienta en REFLEXIÓN: {tool_json_str[:50]}...")
-                tool_call = json.loads(tool_json_str)
-                tool_output = self.ai._call_tool(tool_call.get("name"), tool_call.get("args", {}))
-                reflection += f"\n[SISTEMA] Resultado de herramienta en reflexión: {tool_output}"
-            except Exception as e:
-                logger.error(f"Error procesando herramienta en reflexión: {e}")
+        body = body or self.ai.new_body()
+        tool = self._reflection_tool(reflection, body)
+        if tool:
+            reflection += f"\n[SISTEMA] Resultado de herramienta en reflexión: {context_window.clip_tool_output(tool[1])}"
+
+        if speculative is not None:
+            if high_risk or tool:
+                speculative.cancel()
+                speculative = None
+                self.speculation_stats["restarts"] += 1
+                logger.info("Singularity: paso 0 especulativo descartado (sandbox o herramienta en la reflexión)")
+            else:
+                self.speculation_stats["hits"] += 1
 
         # Inyectamos la reflexión (posiblemente con resultado de tool) en el contexto
-        enhanced_system = f"{system}\n\nTU REFLEXIÓN INTERNA:\n{reflection}\n\nSi necesitas actuar, usa <TOOL>{{'name': '...', 'args': {{...}}}}</TOOL>."
+        enhanced_system = self._agent_system(system, reflection)
         
         # 2. Delegamos al loop interactivo para pasos adicionales
-        res = self.ai._internal_chat_loop(conversation, enhanced_system)
+        res = self.ai._internal_chat_loop(conversation, enhanced_system, first_step=speculative, body=body)
         return res
 
 # El Alma Unificada lista para latir
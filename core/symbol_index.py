@@ -0,0 +1,392 @@
+"""
+BUNK3R-IA: Symbol Index
+Índice de símbolos (definiciones y referencias) para ir a la definición sin
+que la IA tenga que recorrer el repo con list_dir/read_file.
+
+- Python: con `ast`. Definiciones de clases, funciones y métodos (a cualquier
+  profundidad) y variables de módulo o de clase; referencias de cada nombre
+  leído (ast.Name), atributo (ast.Attribute) e import.
+- JavaScript/TypeScript: con un tokenizador ligero (comentarios y cadenas
+  fuera). Definiciones de `function`, `class` y sus métodos, `const/let/var`
+  de módulo (función si el valor es una función o una flecha) e `interface`,
+  `type` y `enum` de TypeScript; referencias de cada identificador que no sea
+  palabra reservada.
+
+Cada definición lleva el tramo del nombre (line, col) y el del nodo completo
+(end_line, end_col); las líneas empiezan en 1 y las columnas en 0, como en
+`ast`. El índice se guarda junto a la tabla de archivos del repositorio y,
+como el de trigramas, sólo vuelve a leer los archivos cuyo hash cambió.
+"""
+import os
+import re
+import ast
+import json
+import bisect
+import logging
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+PYTHON_EXTENSIONS = {'.py'}
+JS_EXTENSIONS = {'.js', '.jsx', '.ts', '.tsx'}
+
+# [nombre, tipo, línea, col, línea final, col final, contenedor]
+Definition = list
+# nombre -> [línea, col, línea, col, ...]
+References = Dict[str, List[int]]
+
+
+def _add_ref(refs: References, name: str, line: int, col: int):
+    refs.setdefault(name, []).extend((line, col))
+
+
+def python_symbols(text: str) -> Tuple[List[Definition], References]:
+    """Definiciones y referencias de un módulo Python (vacío si no compila)."""
+    try:
+        tree = ast.parse(text)
+    except (SyntaxError, ValueError):
+        return [], {}
+    lines = text.splitlines()
+    defs: List[Definition] = []
+    refs: References = {}
+
+    def name_col(node, name: str) -> int:
+        line = lines[node.lineno - 1] if node.lineno <= len(lines) else ""
+        col = line.find(name, node.col_offset)
+        return col if col >= 0 else node.col_offset
+
+    def add(name: str, kind: str, node, container: str, col: int = None):
+        defs.append([name, kind, node.lineno, name_col(node, name) if col is None else col,
+                     getattr(node, "end_lineno", None) or node.lineno,
+                     getattr(node, "end_col_offset", None) or node.col_offset, container])
+
+    def visit(node, container: str, scope: str):
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                add(child.name, "method" if scope == "class" else "function", child, container)
+                visit(child, f"{container}.{child.name}" if container else child.name, "function")
+            elif isinstance(child, ast.ClassDef):
+                add(child.name, "class", child, container)
+                visit(child, f"{container}.{child.name}" if container else child.name, "class")
+            else:
+                if scope != "function" and isinstance(child, (ast.Assign, ast.AnnAssign)):
+                    targets = child.targets if isinstance(child, ast.Assign) else [child.target]
+                    for target in targets:
+                        if isinstance(target, ast.Name):
+                            add(target.id, "variable", target, container, col=target.col_offset)
+                visit(child, container, scope)
+
+    visit(tree, "", "module")
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load):
+            _add_ref(refs, node.id, node.lineno, node.col_offset)
+        elif isinstance(node, ast.Attribute):
+            end_line = getattr(node, "end_lineno", None) or node.lineno
+            end_col = getattr(node, "end_col_offset", None)
+            col = end_col - len(node.attr) if end_col is not None else node.col_offset
+            _add_ref(refs, node.attr, end_line, col)
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            for alias in node.names:
+                # alias.lineno existe desde Python 3.10
+                line_no = getattr(alias, "lineno", node.lineno)
+                for part in alias.name.split("."):
+                    if part != "*":
+                        line = lines[line_no - 1] if line_no <= len(lines) else ""
+                        _add_ref(refs, part, line_no, max(line.find(part), 0))
+    return defs, refs
+
+
+JS_TOKEN = re.compile(r"""
+    (?P<comment>//[^\n]*|/\*.*?(?:\*/|\Z))
+  | (?P<string>"(?:\\.|[^"\\\n])*"?|'(?:\\.|[^'\\\n])*'?|`(?:\\.|[^`\\])*`?)
+  | (?P<ident>[A-Za-z_$][\w$]*)
+  | (?P<punct>=>|[{}()\[\];,.=])
+""", re.S | re.X)
+
+# Palabras reservadas (las contextuales como `type`, `get` o `async` pueden ser nombres)
+JS_KEYWORDS = frozenset("""
+    break case catch class const continue debugger default delete do else export extends
+    finally for function if import in instanceof new return super switch this throw try
+    typeof var void while with yield let static await null true false undefined
+    interface enum implements private public protected readonly declare abstract
+""".split())
+
+JS_CONTROL = frozenset({"if", "for", "while", "switch", "catch", "function", "return", "with"})
+
+
+def js_symbols(text: str) -> Tuple[List[Definition], References]:
+    """Definiciones y referencias de un archivo JS/TS con un tokenizador ligero."""
+    starts = [0] + [m.end() for m in re.finditer(r"\n", text)]
+
+    def position(offset: int) -> Tuple[int, int]:
+        line = bisect.bisect_right(starts, offset)
+        return line, offset - starts[line - 1]
+
+    tokens = []
+    for match in JS_TOKEN.finditer(text):
+        kind = match.lastgroup
+        if kind in ("comment", "string"):
+            continue
+        tokens.append((kind, match.group(), match.start(), match.end()))
+
+    # Llave que cierra cada llave abierta (para el tramo de funciones y clases)
+    closing: Dict[int, int] = {}
+    stack = []
+    for i, (_, value, _, _) in enumerate(tokens):
+        if value == "{":
+            stack.append(i)
+        elif value == "}" and stack:
+            closing[stack.pop()] = i
+
+    defs: List[Definition] = []
+    refs: References = {}
+    def_tokens: Set[int] = set()
+
+    def value_at(i: int) -> str:
+        return tokens[i][1] if 0 <= i < len(tokens) else ""
+
+    def add(i: int, kind: str, container: str):
+        line, col = position(tokens[i][2])
+        end = tokens[i][3]
+        # Cuerpo entre llaves: la primera '{' antes de un ';'
+        for j in range(i + 1, min(len(tokens), i + 200)):
+            if tokens[j][1] == ";":
+                break
+            if tokens[j][1] == "{" and j in closing:
+                end = tokens[closing[j]][3]
+                break
+        end_line, end_col = position(end)
+        defs.append([tokens[i][1], kind, line, col, end_line, end_col, container])
+        def_tokens.add(i)
+
+    depth = 0
+    paren = 0
+    # (nombre de la clase, profundidad de su cuerpo)
+    classes: List[Tuple[str, int]] = []
+    pending_class = None
+    for i, (kind, value, _, _) in enumerate(tokens):
+        if kind == "punct":
+            if value == "{":
+                depth += 1
+                if pending_class is not None:
+                    classes.append((pending_class, depth))
+                    pending_class = None
+            elif value == "}":
+                if classes and classes[-1][1] == depth:
+                    classes.pop()
+                depth = max(depth - 1, 0)
+            elif value in "([":
+                paren += 1
+            elif value in ")]":
+                paren = max(paren - 1, 0)
+            continue
+
+        prev, nxt = value_at(i - 1), value_at(i + 1)
+        container = classes[-1][0] if classes else ""
+        if i in def_tokens:
+            continue
+        if prev == ".":
+            # Acceso a miembro (`api.get()`, `this.render()`): nunca es una definición, pero sí
+            # una referencia (como ast.Attribute), aunque el nombre sea una palabra reservada
+            line, col = position(tokens[i][2])
+            _add_ref(refs, value, line, col)
+            continue
+        if value == "function":
+            name = i + 2 if nxt == "*" else i + 1
+            if 0 <= name < len(tokens) and tokens[name][0] == "ident":
+                add(name, "function", container)
+        elif value == "class" and tokens[i + 1:i + 2] and tokens[i + 1][0] == "ident" and nxt != "extends":
+            add(i + 1, "class", container)
+            pending_class = nxt
+        elif value == "class":
+            pending_class = ""
+        elif value in ("const", "let", "var") and depth == 0 and value_at(i + 2) == "=":
+            if i + 1 < len(tokens) and tokens[i + 1][0] == "ident":
+                after = value_at(i + 3)
+                is_function = after in ("function", "async") or (
+                    after == "(" and _arrow_follows(tokens, i + 3)) or value_at(i + 4) == "=>"
+                add(i + 1, "function" if is_function else "variable", container)
+        elif value in ("interface", "enum") and tokens[i + 1:i + 2] and tokens[i + 1][0] == "ident":
+            add(i + 1, value, container)
+        elif value == "type" and tokens[i + 1:i + 2] and tokens[i + 1][0] == "ident" and value_at(i + 2) in ("=", "<"):
+            add(i + 1, "type", container)
+            def_tokens.add(i)
+        elif (classes and depth == classes[-1][1] and paren == 0 and nxt == "("
+              and value not in JS_CONTROL and value not in JS_KEYWORDS):
+            add(i, "method", container)
+
+        if i not in def_tokens and value not in JS_KEYWORDS:
+            line, col = position(tokens[i][2])
+            _add_ref(refs, value, line, col)
+    return defs, refs
+
+
+def _arrow_follows(tokens, open_index: int) -> bool:
+    """Si el paréntesis en `open_index` cierra justo antes de un `=>`."""
+    level = 0
+    for j in range(open_index, min(len(tokens), open_index + 400)):
+        value = tokens[j][1]
+        if value == "(":
+            level += 1
+        elif value == ")":
+            level -= 1
+            if level == 0:
+                return j + 1 < len(tokens) and tokens[j + 1][1] == "=>"
+    return False
+
+
+def extract_symbols(rel: str, text: str) -> Tuple[List[Definition], References]:
+    ext = os.path.splitext(rel)[1]
+    if ext in PYTHON_EXTENSIONS:
+        return python_symbols(text)
+    if ext in JS_EXTENSIONS:
+        return js_symbols(text)
+    return [], {}
+
+
+def _as_dict(rel: str, d: Definition) -> Dict:
+    return {"name": d[0], "kind": d[1], "path": rel, "line": d[2], "col": d[3],
+            "end_line": d[4], "end_col": d[5], "container": d[6] or None}
+
+
+class SymbolIndex:
+    """Definiciones y referencias por archivo, persistentes y actualizables por archivo."""
+
+    VERSION = 1
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path) if path else None
+        self._lock = threading.Lock()
+        # ruta -> (hash del contenido, definiciones, referencias)
+        self._files: Dict[str, tuple] = {}
+        # nombre -> archivos que lo definen / lo usan
+        self._defined_in: Dict[str, Set[str]] = {}
+        self._used_in: Dict[str, Set[str]] = {}
+        self._dirty = False
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self._files)
+
+    @staticmethod
+    def accepts(rel: str) -> bool:
+        return os.path.splitext(rel)[1] in PYTHON_EXTENSIONS | JS_EXTENSIONS
+
+    def _load(self):
+        if not self.path:
+            return
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") != self.VERSION:
+            return
+        for rel, (digest, defs, refs) in data.get("files", {}).items():
+            self._add(rel, digest, defs, refs)
+
+    def save(self):
+        """Guarda el índice si cambió (escritura atómica)."""
+        with self._lock:
+            if not (self.path and self._dirty):
+                return
+            files = {rel: list(entry) for rel, entry in self._files.items()}
+            self._dirty = False
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.path.parent, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({"version": self.VERSION, "files": files}, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logger.warning(f"SymbolIndex: no se pudo guardar {self.path}: {e}")
+
+    def _add(self, rel: str, digest: Optional[str], defs: List[Definition], refs: References):
+        self._files[rel] = (digest, defs, refs)
+        for d in defs:
+            self._defined_in.setdefault(d[0], set()).add(rel)
+        for name in refs:
+            self._used_in.setdefault(name, set()).add(rel)
+
+    def _drop(self, rel: str):
+        entry = self._files.pop(rel, None)
+        if entry is None:
+            return
+        for names, table in (({d[0] for d in entry[1]}, self._defined_in), (entry[2], self._used_in)):
+            for name in names:
+                holders = table.get(name)
+                if holders is not None:
+                    holders.discard(rel)
+                    if not holders:
+                        del table[name]
+
+    def digest(self, rel: str) -> Optional[str]:
+        entry = self._files.get(rel)
+        return entry[0] if entry else None
+
+    def update(self, rel: str, text: str, digest: Optional[str] = None, memo=None):
+        """(Re)indexa un archivo. `memo` se ignora (misma firma que TrigramIndex.update)."""
+        defs, refs = extract_symbols(rel, text)
+        with self._lock:
+            self._drop(rel)
+            self._add(rel, digest, defs, refs)
+            self._dirty = True
+
+    def remove(self, rel: str):
+        with self._lock:
+            if rel in self._files:
+                self._drop(rel)
+                self._dirty = True
+
+    def paths(self) -> Set[str]:
+        with self._lock:
+            return set(self._files)
+
+    def definitions(self, name: str, kind: str = None) -> List[Dict]:
+        """Definiciones exactas de `name` (ir a la definición)."""
+        with self._lock:
+            found = [_as_dict(rel, d) for rel in sorted(self._defined_in.get(name, ()))
+                     for d in self._files[rel][1] if d[0] == name and (kind is None or d[1] == kind)]
+        return found
+
+    def references(self, name: str, limit: int = 200) -> List[Dict]:
+        """Usos de `name` (sin las propias definiciones)."""
+        results = []
+        with self._lock:
+            for rel in sorted(self._used_in.get(name, ())):
+                positions = self._files[rel][2][name]
+                for k in range(0, len(positions), 2):
+                    results.append({"name": name, "path": rel, "line": positions[k], "col": positions[k + 1]})
+                    if len(results) >= limit:
+                        return results
+        return results
+
+    def search(self, query: str, kind: str = None, limit: int = 50) -> List[Dict]:
+        """Definiciones cuyo nombre contiene `query` (sin distinguir mayúsculas); primero las exactas y los prefijos."""
+        needle = query.lower()
+        with self._lock:
+            names = [name for name in self._defined_in if needle in name.lower()]
+            names.sort(key=lambda name: (name.lower() != needle, not name.lower().startswith(needle), len(name), name))
+            results = []
+            for name in names:
+                for rel in sorted(self._defined_in[name]):
+                    for d in self._files[rel][1]:
+                        if d[0] == name and (kind is None or d[1] == kind):
+                            results.append(_as_dict(rel, d))
+                            if len(results) >= limit:
+                                return results
+        return results
+
+    def file_symbols(self, rel: str) -> List[Dict]:
+        """Esquema de un archivo: sus definiciones en orden."""
+        with self._lock:
+            entry = self._files.get(rel)
+            return [_as_dict(rel, d) for d in sorted(entry[1], key=lambda d: (d[2], d[3]))] if entry else []
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {"files": len(self._files), "names": len(self._defined_in)}
@@ -0,0 +1,296 @@
+"""
+BUNK3R-IA: Tool Protocol
+Llamadas a herramientas estructuradas (function calling nativo) con las
+etiquetas <TOOL> como respaldo.
+
+Los proveedores con function calling (Groq, Cerebras, OpenAI y DeepSeek con la
+API de OpenAI, Gemini con functionDeclarations y Ollama con `tools`) reciben
+las definiciones de TOOL_SPECS y devuelven las llamadas ya separadas del texto.
+Cada llamada se normaliza al JSON que ya usa el loop agéntico:
+`{"name": "...", "args": {...}}`. Los proveedores sin soporte siguen con las
+etiquetas <TOOL> del prompt.
+
+- `ToolCallAssembler` reconstruye en streaming los argumentos que llegan
+  troceados (`delta.tool_calls` de OpenAI) y sabe cuándo se ha cerrado el JSON
+  de cada llamada sin reintentar `json.loads` en cada fragmento.
+- `parse_tool_json` repara los errores más comunes del JSON escrito a mano en
+  una etiqueta <TOOL> (vallas de código, texto alrededor, comas finales,
+  comillas simples) para no gastar otra vuelta al LLM.
+
+AI_NATIVE_TOOLS=false desactiva el function calling nativo.
+"""
+import ast
+import re
+import json
+import logging
+import threading
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+TOOL_SPECS: List[Dict] = [
+    {
+        "name": "read_file",
+        "description": "Lee un archivo del workspace del usuario.",
+        "parameters": {
+            "type": "object",
+            "properties": {"path": {"type": "string", "description": "Ruta relativa al workspace"}},
+            "required": ["path"],
+        },
+    },
+    {
+        "name": "write_file",
+        "description": "Escribe (o sobrescribe) un archivo del workspace.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "path": {"type": "string", "description": "Ruta relativa al workspace"},
+                "content": {"type": "string", "description": "Contenido completo del archivo"},
+            },
+            "required": ["path", "content"],
+        },
+    },
+    {
+        "name": "list_dir",
+        "description": "Lista el contenido de un directorio del workspace.",
+        "parameters": {
+            "type": "object",
+            "properties": {"path": {"type": "string", "description": "Directorio (por defecto la raíz)"}},
+        },
+    },
+    {
+        "name": "run_command",
+        "description": "Ejecuta un comando de shell en el workspace.",
+        "parameters": {
+            "type": "object",
+            "properties": {"command": {"type": "string"}},
+            "required": ["command"],
+        },
+    },
+    {
+        "name": "web_search",
+        "description": "Busca en la web.",
+        "parameters": {
+            "type": "object",
+            "properties": {"query": {"type": "string"}},
+            "required": ["query"],
+        },
+    },
+    {
+        "name": "find_symbol",
+        "description": "Busca dónde se define (y opcionalmente dónde se usa) una función, clase, método o variable "
+                       "en el código Python/JS/TS de un repositorio del workspace.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "name": {"type": "string", "description": "Nombre exacto del símbolo"},
+                "path": {"type": "string", "description": "Carpeta del repositorio (la del repositorio activo)"},
+                "kind": {"type": "string", "enum": ["function", "method", "class", "variable", "interface", "type", "enum"]},
+                "references": {"type": "boolean", "description": "Incluir también las referencias"},
+            },
+            "required": ["name", "path"],
+        },
+    },
+]
+
+
+def openai_tools(specs: List[Dict] = None) -> List[Dict]:
+    """Definiciones en formato OpenAI (también Groq, Cerebras, DeepSeek y Ollama)."""
+    return [{"type": "function", "function": spec} for spec in (specs or TOOL_SPECS)]
+
+
+def gemini_tools(specs: List[Dict] = None) -> List[Dict]:
+    """Definiciones en formato Gemini (functionDeclarations)."""
+    return [{"functionDeclarations": list(specs or TOOL_SPECS)}]
+
+
+def tool_call_json(name: str, args) -> str:
+    """
+    JSON normalizado de una llamada, el mismo que escribe el modelo dentro de <TOOL>.
+    Unos argumentos ilegibles se conservan como texto para que el loop informe del error.
+    """
+    if isinstance(args, str):
+        raw_args = args
+        args = parse_tool_json(args) if args.strip() else {}
+        if args is None:
+            args = raw_args
+    return json.dumps({"name": name, "args": args or {}}, ensure_ascii=False)
+
+
+def render_tool_tags(tool_calls: List[str]) -> str:
+    """Llamadas nativas como etiquetas <TOOL>, para guardarlas en un historial común a todos los proveedores."""
+    return "".join(f"<TOOL>{call}</TOOL>" for call in tool_calls)
+
+
+def openai_tool_calls(message: Dict) -> List[str]:
+    """Llamadas de `message.tool_calls` (OpenAI / Ollama) normalizadas."""
+    calls = []
+    for call in message.get("tool_calls") or []:
+        function = call.get("function") or {}
+        if function.get("name"):
+            calls.append(tool_call_json(function["name"], function.get("arguments")))
+    return calls
+
+
+def gemini_tool_calls(parts: List[Dict]) -> List[str]:
+    """Llamadas de las partes `functionCall` de Gemini normalizadas."""
+    return [
+        tool_call_json(part["functionCall"].get("name"), part["functionCall"].get("args"))
+        for part in parts if part.get("functionCall")
+    ]
+
+
+class JsonObjectScanner:
+    """
+    Sigue un objeto JSON que llega por fragmentos: profundidad de llaves y
+    cadenas/escapes. Cada carácter se mira una sola vez; `complete` indica que
+    el objeto de nivel superior se ha cerrado.
+    """
+
+    def __init__(self):
+        self.depth = 0
+        self.started = False
+        self.complete = False
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, fragment: str) -> bool:
+        for char in fragment:
+            if self.complete:
+                break
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self.depth += 1
+                self.started = True
+            elif char in "}]":
+                self.depth -= 1
+                if self.started and self.depth == 0:
+                    self.complete = True
+        return self.complete
+
+
+class ToolCallAssembler:
+    """
+    Reconstruye las llamadas nativas de una respuesta en streaming.
+
+    OpenAI envía `delta.tool_calls` con un índice por llamada: el primer
+    fragmento trae el nombre y los siguientes trozos de `arguments`. Ollama y
+    Gemini envían cada llamada entera (`add`).
+    """
+
+    def __init__(self):
+        self._calls: Dict[int, Dict] = {}
+
+    def feed(self, index: int, name: Optional[str] = None, arguments: str = "") -> bool:
+        """Añade un fragmento de la llamada `index`. True si sus argumentos ya forman un JSON completo."""
+        call = self._calls.setdefault(index, {"name": "", "arguments": [], "scanner": JsonObjectScanner()})
+        if name:
+            call["name"] = name
+        if arguments:
+            call["arguments"].append(arguments)
+            call["scanner"].feed(arguments)
+        return call["scanner"].complete
+
+    def feed_openai_delta(self, delta: Dict) -> List[int]:
+        """Procesa `delta.tool_calls` de un chunk OpenAI. Devuelve los índices cuyo JSON acaba de cerrarse."""
+        closed = []
+        for fragment in delta.get("tool_calls") or []:
+            index = fragment.get("index", len(self._calls))
+            function = fragment.get("function") or {}
+            was_complete = self.is_complete(index)
+            if self.feed(index, function.get("name"), function.get("arguments") or "") and not was_complete:
+                closed.append(index)
+        return closed
+
+    def add(self, name: str, args) -> int:
+        """Llamada que llega entera (Ollama, Gemini)."""
+        index = len(self._calls)
+        arguments = args if isinstance(args, str) else json.dumps(args or {}, ensure_ascii=False)
+        self.feed(index, name, arguments)
+        return index
+
+    def is_complete(self, index: int) -> bool:
+        call = self._calls.get(index)
+        return bool(call) and call["scanner"].complete
+
+    def call_json(self, index: int) -> str:
+        call = self._calls[index]
+        return tool_call_json(call["name"], "".join(call["arguments"]) or "{}")
+
+    def calls(self) -> List[str]:
+        """Todas las llamadas con nombre, en orden, normalizadas."""
+        return [self.call_json(i) for i in sorted(self._calls) if self._calls[i]["name"]]
+
+
+TRAILING_COMMA = re.compile(r",\s*([}\]])")
+
+
+def _balanced_object(text: str) -> Optional[str]:
+    """Primer objeto {...} completo del texto (ignora lo que haya alrededor)."""
+    start = text.find("{")
+    if start < 0:
+        return None
+    scanner = JsonObjectScanner()
+    for end in range(start, len(text)):
+        if scanner.feed(text[end]):
+            return text[start:end + 1]
+    return None
+
+
+def parse_tool_json(text: str) -> Optional[Dict]:
+    """
+    JSON de una llamada a herramienta, reparando los fallos habituales del
+    modelo. None si no hay forma de leerlo.
+    """
+    if not text:
+        return None
+    cleaned = text.strip().replace("```json", "").replace("```", "").strip()
+    try:
+        value = json.loads(cleaned)
+        return value if isinstance(value, dict) else None
+    except (ValueError, RecursionError):
+        pass
+
+    candidate = _balanced_object(cleaned) or cleaned
+    candidate = TRAILING_COMMA.sub(r"\1", candidate)
+    try:
+        value = json.loads(candidate, strict=False)
+    except (ValueError, RecursionError):
+        # Diccionario al estilo Python: {'name': 'read_file', 'args': {...}}
+        try:
+            value = ast.literal_eval(candidate)
+        except Exception:
+            # Cualquier literal roto (claves no hashables, anidación excesiva...) es ilegible
+            return None
+    if isinstance(value, dict):
+        tool_call_stats.record("repaired")
+        return value
+    return None
+
+
+class ToolCallStats:
+    """Recuento de llamadas por origen: nativas, etiquetas, reparadas e ilegibles."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stats = {"native": 0, "tagged": 0, "repaired": 0, "invalid": 0}
+
+    def record(self, kind: str, count: int = 1):
+        with self._lock:
+            self.stats[kind] = self.stats.get(kind, 0) + count
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return dict(self.stats)
+
+
+# Contadores compartidos por worker
+tool_call_stats = ToolCallStats()
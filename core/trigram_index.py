@@ -0,0 +1,258 @@
+"""
+BUNK3R-IA: Trigram Index
+Índice invertido de trigramas para acotar las búsquedas de código.
+
+Cada archivo indexado aporta el conjunto de trigramas (3 caracteres seguidos)
+de las palabras (\\w+) de su contenido en minúsculas. Una búsqueda calcula los
+trigramas que el resultado tiene que contener sí o sí e intersecta sus listas
+de archivos: sólo esos candidatos se leen para confirmar la coincidencia línea
+a línea.
+
+Sólo se toman trigramas dentro de palabras: un trigrama de palabra de la
+consulta cae siempre dentro de una palabra del texto que la contiene, así que
+no se pierde ninguna coincidencia, y el código repite tanto los
+identificadores que deduplicarlos antes hace el cálculo unas 2-3 veces más
+rápido que recorrer todos los caracteres. Una consulta sin trigramas de
+palabra ("->", "a.b") no se puede acotar.
+
+- Literal (con o sin mayúsculas): todos los trigramas de la consulta.
+- Regex: los trigramas de los tramos literales obligatorios del patrón
+  (fuera de alternativas y repeticiones opcionales). Si no hay ninguno, o la
+  consulta tiene menos de 3 caracteres, no se puede acotar y se devuelve None
+  (todos los archivos son candidatos).
+
+Los trigramas se calculan sobre el texto en minúsculas, así que el mismo
+índice sirve para búsquedas con y sin distinción de mayúsculas. Las minúsculas
+siguen las equivalencias de re.IGNORECASE, no sólo str.lower(): "İ" (que
+lower() convierte en "i" + punto combinante), "ı" y "i", o "ſ" y "s", dan los
+mismos trigramas, para que una regex sin mayúsculas ("istanbul") no descarte
+un archivo con "İstanbul". Por prudencia, una regex con literales no ASCII
+no se acota.
+
+El índice se guarda en disco junto a la tabla de archivos del repositorio y se
+actualiza por archivo: sólo se vuelven a leer los archivos cuyo hash cambió.
+"""
+import os
+import re
+import json
+import logging
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+try:
+    from re import _parser as sre_parse, _constants as sre_constants
+except ImportError:  # Python < 3.11
+    import sre_parse
+    import sre_constants
+
+logger = logging.getLogger(__name__)
+
+
+WORD = re.compile(r"\w{3,}")
+
+# Caracteres que re.IGNORECASE considera iguales aunque lower() no los una
+# (re._casefix en Python 3.11+, sre_compile._equivalences antes): cada uno
+# pasa al primero de su grupo.
+REGEX_CASE_CLASSES = [
+    "i\u0131", "s\u017f", "\u03bc\u00b5", "\u03b9\u0345\u1fbe", "\u0390\u1fd3", "\u03b0\u1fe3",
+    "\u03b2\u03d0", "\u03b5\u03f5", "\u03b8\u03d1", "\u03ba\u03f0", "\u03c0\u03d6", "\u03c1\u03f1",
+    "\u03c3\u03c2", "\u03c6\u03d5", "\u0432\u1c80", "\u0434\u1c81", "\u043e\u1c82", "\u0441\u1c83",
+    "\u0442\u1c84\u1c85", "\u044a\u1c86", "\u0463\u1c87", "\ua64b\u1c88", "\u1e61\u1e9b", "\ufb05\ufb06",
+]
+CASE_FOLD = {ord(ch): group[0] for group in REGEX_CASE_CLASSES for ch in group[1:]}
+# "İ".lower() es "i" + U+0307; re.IGNORECASE lo iguala a "i"
+CASE_FOLD[0x0307] = None
+
+
+def fold_case(text: str) -> str:
+    """Minúsculas con las equivalencias de re.IGNORECASE."""
+    text = text.lower()
+    return text.translate(CASE_FOLD) if not text.isascii() else text
+
+
+def trigrams(text: str, memo: Optional[Dict[str, List[str]]] = None) -> Set[str]:
+    """
+    Trigramas de las palabras del texto en minúsculas (fold_case). `memo` (palabra ->
+    trigramas) se comparte al indexar muchos archivos seguidos: los
+    identificadores se repiten de un archivo a otro.
+    """
+    grams = set()
+    for word in set(WORD.findall(fold_case(text))):
+        word_grams = memo.get(word) if memo is not None else None
+        if word_grams is None:
+            word_grams = [word[i:i + 3] for i in range(len(word) - 2)]
+            if memo is not None:
+                memo[word] = word_grams
+        grams.update(word_grams)
+    return grams
+
+
+def required_literals(pattern: str) -> List[str]:
+    """
+    Tramos literales que toda coincidencia de la regex debe contener.
+    Las aserciones de ancho cero (^, $, \\b) no cortan un tramo; cualquier
+    otra construcción (clases, alternativas, repeticiones) sí.
+    """
+    runs: List[str] = []
+    current: List[str] = []
+
+    def flush():
+        if current:
+            runs.append("".join(current))
+            current.clear()
+
+    def walk(items):
+        for op, av in items:
+            if op is sre_constants.LITERAL:
+                current.append(chr(av))
+            elif op is sre_constants.AT:
+                continue
+            elif op is sre_constants.SUBPATTERN:
+                walk(av[-1])
+            elif op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT) and av[0] >= 1:
+                # El cuerpo aparece al menos una vez, pero no pegado a lo que le rodea
+                flush()
+                walk(av[2])
+                flush()
+            else:
+                flush()
+
+    walk(sre_parse.parse(pattern))
+    flush()
+    return runs
+
+
+def query_trigrams(query: str, regex: bool = False) -> Optional[Set[str]]:
+    """Trigramas obligatorios de una consulta, o None si no se puede acotar."""
+    if regex:
+        try:
+            pieces = required_literals(query)
+        except Exception:
+            return None
+        if not all(piece.isascii() for piece in pieces):
+            return None
+    else:
+        pieces = [query]
+    needed = set()
+    for piece in pieces:
+        needed |= trigrams(piece)
+    return needed or None
+
+
+class TrigramIndex:
+    """Índice invertido trigrama -> archivos, persistente y actualizable por archivo."""
+
+    VERSION = 2
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path) if path else None
+        self._lock = threading.Lock()
+        # ruta -> (hash del contenido, trigramas)
+        self._files: Dict[str, tuple] = {}
+        self._postings: Dict[str, Set[str]] = {}
+        self._dirty = False
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self._files)
+
+    @staticmethod
+    def accepts(rel: str) -> bool:
+        """Todos los archivos de la tabla con hash entran en el índice."""
+        return True
+
+    def _load(self):
+        if not self.path:
+            return
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") != self.VERSION:
+            return
+        for rel, (digest, packed) in data.get("files", {}).items():
+            # Cada trigrama ocupa exactamente 3 caracteres en la cadena empaquetada
+            grams = {packed[i:i + 3] for i in range(0, len(packed), 3)}
+            self._add(rel, digest, grams)
+
+    def save(self):
+        """Guarda el índice si cambió (escritura atómica)."""
+        with self._lock:
+            if not (self.path and self._dirty):
+                return
+            files = {rel: [digest, "".join(sorted(grams))] for rel, (digest, grams) in self._files.items()}
+            self._dirty = False
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.path.parent, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({"version": self.VERSION, "files": files}, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logger.warning(f"TrigramIndex: no se pudo guardar {self.path}: {e}")
+
+    def _add(self, rel: str, digest: Optional[str], grams: Set[str]):
+        self._files[rel] = (digest, grams)
+        for gram in grams:
+            self._postings.setdefault(gram, set()).add(rel)
+
+    def _drop(self, rel: str):
+        entry = self._files.pop(rel, None)
+        if entry is None:
+            return
+        for gram in entry[1]:
+            holders = self._postings.get(gram)
+            if holders is not None:
+                holders.discard(rel)
+                if not holders:
+                    del self._postings[gram]
+
+    def digest(self, rel: str) -> Optional[str]:
+        entry = self._files.get(rel)
+        return entry[0] if entry else None
+
+    def update(self, rel: str, text: str, digest: Optional[str] = None,
+               memo: Optional[Dict[str, List[str]]] = None):
+        """(Re)indexa un archivo."""
+        grams = trigrams(text, memo)
+        with self._lock:
+            self._drop(rel)
+            self._add(rel, digest, grams)
+            self._dirty = True
+
+    def remove(self, rel: str):
+        with self._lock:
+            if rel in self._files:
+                self._drop(rel)
+                self._dirty = True
+
+    def paths(self) -> Set[str]:
+        with self._lock:
+            return set(self._files)
+
+    def candidates(self, query: str, regex: bool = False) -> Optional[Set[str]]:
+        """Archivos que pueden contener la consulta, o None si no se puede acotar."""
+        needed = query_trigrams(query, regex)
+        if needed is None:
+            return None
+        with self._lock:
+            postings = []
+            for gram in needed:
+                holders = self._postings.get(gram)
+                if not holders:
+                    return set()
+                postings.append(holders)
+            postings.sort(key=len)
+            result = set(postings[0])
+            for holders in postings[1:]:
+                result &= holders
+                if not result:
+                    break
+            return result
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {"files": len(self._files), "trigrams": len(self._postings)}
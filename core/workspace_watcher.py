@@ -0,0 +1,501 @@
+"""
+BUNK3R-IA: Workspace Watcher
+Vigila los workspaces de los usuarios (/workspace/<user_id>) y empuja los
+cambios a los índices en lugar de volver a recorrer el árbol.
+
+- Linux: inotify (con ctypes, sin dependencias), un watch por cada directorio
+  que la política de core/fs_scanner.py no ignora. Si inotify no está
+  disponible, se agota fs.inotify.max_user_watches o un directorio no se
+  puede vigilar (p. ej. sin permisos), la raíz pasa a sondeo:
+  cada WORKSPACE_WATCH_POLL_INTERVAL segundos se compara el stat de sus archivos.
+- Las ráfagas (`git checkout`, `npm install`) se agrupan: un lote sale cuando
+  pasan WORKSPACE_WATCH_DEBOUNCE segundos sin eventos o, como mucho,
+  WORKSPACE_WATCH_MAX_DELAY segundos después del primero. Un lote de más de
+  WORKSPACE_WATCH_BULK rutas, o una cola de inotify desbordada, sale como
+  `full`: los consumidores lo revalidan todo.
+- Cada lote (ChangeBatch) llega a la foto del árbol (fs_scanner.notify), a las
+  tablas de archivos de los repos (repo_indexer.apply_workspace_changes), al
+  grafo AST (gravity_core.apply_changes) y a los suscriptores de subscribe().
+
+Mientras una raíz está vigilada con inotify, sus fotos y tablas no se
+revalidan por mtime: cada reindexado cuesta O(cambios).
+
+Es opcional: WORKSPACE_WATCHER=true lo activa y WORKSPACE_WATCH_BACKEND=poll
+fuerza el sondeo.
+"""
+import os
+import time
+import errno
+import select
+import struct
+import logging
+import threading
+import ctypes
+import ctypes.util
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from core.fs_scanner import fs_scanner, is_under
+
+logger = logging.getLogger(__name__)
+
+# inotify(7)
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_DONTFOLLOW = 0x02000000
+IN_EXCL_UNLINK = 0x04000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+# Sin IN_MODIFY: cada write() de un archivo grande generaría un evento; basta con el cierre
+WATCH_MASK = (IN_CLOSE_WRITE | IN_ATTRIB | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+              | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR | IN_DONTFOLLOW | IN_EXCL_UNLINK)
+EVENT_HEADER = struct.Struct('iIII')
+
+
+class Inotify:
+    """Envoltorio mínimo de inotify con ctypes."""
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        # AttributeError fuera de Linux: el watcher usa el sondeo
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        self._libc = libc
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+
+    def add_watch(self, path: str, mask: int = WATCH_MASK) -> int:
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), path)
+        return wd
+
+    def rm_watch(self, wd: int):
+        self._libc.inotify_rm_watch(self.fd, wd)
+
+    def read(self, timeout: float) -> List[Tuple[int, int, str]]:
+        """Eventos (wd, máscara, nombre) pendientes; espera como mucho `timeout` segundos."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 256 * 1024)
+        except BlockingIOError:
+            return []
+        events = []
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, mask, _cookie, length = EVENT_HEADER.unpack_from(data, offset)
+            start = offset + EVENT_HEADER.size
+            name = data[start:start + length].rstrip(b'\0')
+            events.append((wd, mask, os.fsdecode(name)))
+            offset = start + length
+        return events
+
+    def close(self):
+        try:
+            os.close(self.fd)
+        except OSError:
+            pass
+
+
+@dataclass
+class ChangeBatch:
+    """Cambios agrupados de una raíz: ruta relativa -> created | modified | deleted."""
+    root: str
+    changes: Dict[str, str] = field(default_factory=dict)
+    # Demasiados cambios (o eventos perdidos): hay que revalidar todo
+    full: bool = False
+
+    @property
+    def paths(self) -> List[str]:
+        return sorted(self.changes)
+
+
+class _Root:
+    """Estado de una raíz vigilada."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.mode = "poll"
+        self.pending: Dict[str, str] = {}
+        self.full = False
+        self.first = 0.0
+        self.last = 0.0
+        self.wds: Set[int] = set()
+        # Sondeo: ruta -> (mtime_ns, tamaño, inodo)
+        self.stats: Dict[str, Tuple[int, int, int]] = {}
+        self.polled_at = 0.0
+        self.batches = 0
+
+
+def _join(rel: str, name: str) -> str:
+    return f"{rel}/{name}" if rel else name
+
+
+def _update_scanner(batch: ChangeBatch):
+    fs_scanner.notify(batch.root, batch.paths, batch.full)
+
+
+def _update_repo_indexes(batch: ChangeBatch):
+    from core.repo_indexer import apply_workspace_changes
+    apply_workspace_changes(batch.root, batch.paths, batch.full)
+
+
+def _update_graph(batch: ChangeBatch):
+    from core.gravity_core import gravity_core
+    gravity_core.apply_changes(batch.root, batch.paths, batch.full)
+
+
+# En este orden: las tablas de archivos leen la foto ya actualizada
+DEFAULT_HANDLERS: List[Callable[[ChangeBatch], None]] = [_update_scanner, _update_repo_indexes, _update_graph]
+
+
+class WorkspaceWatcher:
+    """Vigila raíces de workspace y entrega los cambios por lotes a los índices."""
+
+    def __init__(self, enabled: bool = None, backend: str = None, debounce: float = None,
+                 max_delay: float = None, poll_interval: float = None, bulk: int = None,
+                 handlers: List[Callable[[ChangeBatch], None]] = None):
+        self.enabled = enabled if enabled is not None else os.getenv('WORKSPACE_WATCHER', 'false').lower() == 'true'
+        self.backend = backend or os.getenv('WORKSPACE_WATCH_BACKEND', 'auto')
+        self.debounce = debounce if debounce is not None else float(os.getenv('WORKSPACE_WATCH_DEBOUNCE', '0.5'))
+        self.max_delay = max_delay if max_delay is not None else float(os.getenv('WORKSPACE_WATCH_MAX_DELAY', '5'))
+        self.poll_interval = poll_interval if poll_interval is not None else float(
+            os.getenv('WORKSPACE_WATCH_POLL_INTERVAL', '2'))
+        self.bulk = bulk if bulk is not None else int(os.getenv('WORKSPACE_WATCH_BULK', '2000'))
+        self._handlers = list(DEFAULT_HANDLERS if handlers is None else handlers)
+        self._roots: Dict[str, _Root] = {}
+        # wd -> (raíz, directorio relativo)
+        self._wds: Dict[int, Tuple[str, str]] = {}
+        self._inotify: Optional[Inotify] = None
+        self._inotify_failed = False
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {"events": 0, "batches": 0, "full": 0, "errors": 0}
+
+    # --- Raíces ---
+
+    def watch(self, root) -> bool:
+        """Empieza a vigilar `root` (idempotente). False si está desactivado o no existe."""
+        if not self.enabled:
+            return False
+        key = str(Path(root).resolve())
+        with self._lock:
+            if key in self._roots or any(is_under(key, r) for r in self._roots):
+                return True
+            if not os.path.isdir(key):
+                return False
+            # Una raíz que contiene a otras ya vigiladas las sustituye
+            for inner in [r for r in self._roots if is_under(r, key)]:
+                self._drop_root(inner)
+
+            state = _Root(key)
+            if self.backend != 'poll' and self._ensure_inotify():
+                if self._add_watches(state, fs_scanner.snapshot(key).dirs(), root_dir=True):
+                    state.mode = "inotify"
+                else:
+                    self._remove_watches(state)
+            if state.mode == "poll":
+                state.stats = self._stat_files(key)
+                state.polled_at = time.time()
+            self._roots[key] = state
+            if state.mode == "inotify":
+                fs_scanner.watch(key)
+                # Primer lote completo: cubre lo que cambió antes de empezar a vigilar
+                self._record_full(state)
+            self._ensure_thread()
+        logger.info(f"WorkspaceWatcher: vigilando {key} ({state.mode}, {len(state.wds)} watches)")
+        return True
+
+    def unwatch(self, root):
+        with self._lock:
+            self._drop_root(str(Path(root).resolve()))
+
+    def subscribe(self, callback: Callable[[ChangeBatch], None]):
+        """`callback(batch)` se llama (en el hilo del watcher) con cada lote."""
+        with self._lock:
+            self._handlers.append(callback)
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        with self._lock:
+            for key in list(self._roots):
+                self._drop_root(key)
+            if self._inotify is not None:
+                self._inotify.close()
+                self._inotify = None
+            self._thread = None
+        self._stop.clear()
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "backend": self.backend,
+                "roots": {path: {"mode": s.mode, "watches": len(s.wds), "pending": len(s.pending),
+                                 "batches": s.batches} for path, s in self._roots.items()},
+                **self.stats,
+            }
+
+    def _drop_root(self, key: str):
+        state = self._roots.pop(key, None)
+        if state is None:
+            return
+        self._remove_watches(state)
+        if state.mode == "inotify":
+            fs_scanner.unwatch(key)
+
+    # --- inotify ---
+
+    def _ensure_inotify(self) -> bool:
+        if self._inotify is None and not self._inotify_failed:
+            try:
+                self._inotify = Inotify()
+            except (OSError, AttributeError) as e:
+                self._inotify_failed = True
+                logger.info(f"WorkspaceWatcher: inotify no disponible ({e}), se usa sondeo")
+        return self._inotify is not None
+
+    def _add_watches(self, state: _Root, dirs: List[str], root_dir: bool = False) -> bool:
+        """
+        Un watch por directorio. False si alguno no se pudo vigilar (límite de
+        watches agotado, permisos...): la raíz ya no está cubierta entera.
+        """
+        for rel in ([""] if root_dir else []) + list(dirs):
+            try:
+                wd = self._inotify.add_watch(os.path.join(state.path, rel) if rel else state.path)
+            except OSError as e:
+                if e.errno in (errno.ENOENT, errno.ENOTDIR):
+                    # Ya no existe: su borrado llega como evento del padre
+                    continue
+                if e.errno == errno.ENOSPC:
+                    logger.warning(f"WorkspaceWatcher: límite de watches de inotify agotado en {state.path}")
+                else:
+                    logger.warning(f"WorkspaceWatcher: no se puede vigilar {rel or '.'} en {state.path}: {e}")
+                return False
+            self._wds[wd] = (state.path, rel)
+            state.wds.add(wd)
+        return True
+
+    def _fallback_to_poll(self, state: _Root):
+        """
+        La raíz deja de estar cubierta por inotify (p. ej. se agotó el límite de
+        watches con un directorio nuevo): pasa a sondeo y sus fotos y tablas
+        vuelven a revalidarse por mtime. El lote completo cubre lo que se perdió.
+        """
+        logger.warning(f"WorkspaceWatcher: {state.path} pasa a sondeo")
+        self._remove_watches(state)
+        if state.mode == "inotify":
+            fs_scanner.unwatch(state.path)
+        state.mode = "poll"
+        state.stats = self._stat_files(state.path)
+        state.polled_at = time.time()
+        self._record_full(state)
+
+    def _remove_watches(self, state: _Root, under: str = None):
+        """Quita los watches de la raíz (o sólo los del subárbol `under`)."""
+        for wd in list(state.wds):
+            entry = self._wds.get(wd)
+            if under is not None and entry and not (entry[1] == under or entry[1].startswith(under + "/")):
+                continue
+            state.wds.discard(wd)
+            self._wds.pop(wd, None)
+            if self._inotify is not None:
+                self._inotify.rm_watch(wd)
+
+    def _walk_new_dir(self, state: _Root, rel: str) -> Tuple[List[str], List[str]]:
+        """Directorios y archivos de un directorio recién creado o movido dentro de la raíz."""
+        snapshot = fs_scanner.snapshot(state.path, refresh=False)
+        dirs, files = [], []
+        stack = [rel]
+        while stack:
+            current = stack.pop()
+            dirs.append(current)
+            try:
+                entries = list(os.scandir(os.path.join(state.path, current)))
+            except OSError:
+                continue
+            for entry in entries:
+                child = _join(current, entry.name)
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                except OSError:
+                    continue
+                if snapshot.ignored(child, is_dir):
+                    continue
+                (stack if is_dir else files).append(child)
+        return dirs, files
+
+    def _handle_events(self, events: List[Tuple[int, int, str]]):
+        with self._lock:
+            for wd, mask, name in events:
+                self.stats["events"] += 1
+                if mask & IN_Q_OVERFLOW:
+                    logger.warning("WorkspaceWatcher: cola de inotify desbordada, revalidación completa")
+                    for state in self._roots.values():
+                        if state.mode == "inotify":
+                            self._record_full(state)
+                    continue
+                entry = self._wds.get(wd)
+                if entry is None:
+                    continue
+                state = self._roots.get(entry[0])
+                if state is None:
+                    continue
+                if mask & IN_IGNORED:
+                    self._wds.pop(wd, None)
+                    state.wds.discard(wd)
+                    continue
+                if not name:
+                    # Evento del propio directorio: el del padre ya lo cuenta, salvo en la raíz
+                    if entry[1] == "" and mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                        self._record_full(state)
+                    continue
+                rel = _join(entry[1], name)
+                is_dir = bool(mask & IN_ISDIR)
+                if fs_scanner.policy.names.intersection(rel.split("/")):
+                    continue
+                if mask & (IN_DELETE | IN_MOVED_FROM):
+                    if is_dir and mask & IN_MOVED_FROM:
+                        self._remove_watches(state, under=rel)
+                    self._record(state, rel, "deleted")
+                elif mask & (IN_CREATE | IN_MOVED_TO):
+                    if is_dir:
+                        dirs, files = self._walk_new_dir(state, rel)
+                        if not self._add_watches(state, dirs):
+                            self._fallback_to_poll(state)
+                            continue
+                        for path in files:
+                            self._record(state, path, "created")
+                    self._record(state, rel, "created")
+                else:
+                    self._record(state, rel, "modified")
+
+    # --- Sondeo ---
+
+    def _stat_files(self, root: str) -> Dict[str, Tuple[int, int, int]]:
+        stats = {}
+        for rel in fs_scanner.snapshot(root).files():
+            try:
+                st = os.stat(os.path.join(root, rel))
+            except OSError:
+                continue
+            stats[rel] = (st.st_mtime_ns, st.st_size, st.st_ino)
+        return stats
+
+    def _poll(self, state: _Root):
+        current = self._stat_files(state.path)
+        with self._lock:
+            for rel in current.keys() - state.stats.keys():
+                self._record(state, rel, "created")
+            for rel in state.stats.keys() - current.keys():
+                self._record(state, rel, "deleted")
+            for rel in current.keys() & state.stats.keys():
+                if current[rel] != state.stats[rel]:
+                    self._record(state, rel, "modified")
+            state.stats = current
+            state.polled_at = time.time()
+
+    # --- Lotes ---
+
+    def _record(self, state: _Root, rel: str, kind: str):
+        now = time.time()
+        if not state.pending and not state.full:
+            state.first = now
+        state.last = now
+        previous = state.pending.get(rel)
+        if previous is None or kind == "deleted":
+            state.pending[rel] = kind
+        elif previous != kind and previous != "created":
+            state.pending[rel] = "modified"
+
+    def _record_full(self, state: _Root):
+        now = time.time()
+        if not state.pending and not state.full:
+            state.first = now
+        state.last = now
+        state.full = True
+
+    def _due_batches(self, now: float) -> List[Tuple[ChangeBatch, List[Callable]]]:
+        batches = []
+        with self._lock:
+            for state in self._roots.values():
+                if not (state.pending or state.full):
+                    continue
+                if now - state.last < self.debounce and now - state.first < self.max_delay:
+                    continue
+                full = state.full or len(state.pending) > self.bulk
+                batches.append(ChangeBatch(state.path, state.pending, full))
+                state.pending, state.full = {}, False
+                state.batches += 1
+                self.stats["batches"] += 1
+                self.stats["full"] += int(full)
+            handlers = list(self._handlers)
+        return [(batch, handlers) for batch in batches]
+
+    def _dispatch(self, batch: ChangeBatch, handlers):
+        for handler in handlers:
+            try:
+                handler(batch)
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error(f"WorkspaceWatcher: error aplicando cambios de {batch.root}: {e}")
+
+    def flush(self):
+        """Entrega ya los lotes pendientes (sin esperar al debounce)."""
+        for batch, handlers in self._due_batches(float('inf')):
+            self._dispatch(batch, handlers)
+
+    # --- Hilo ---
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="workspace-watcher", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        tick = max(0.01, min(0.25, self.debounce / 2))
+        while not self._stop.is_set():
+            try:
+                with self._lock:
+                    inotify = self._inotify if any(s.mode == "inotify" for s in self._roots.values()) else None
+                    polled = [s for s in self._roots.values() if s.mode == "poll"]
+                if inotify is not None:
+                    self._handle_events(inotify.read(tick))
+                else:
+                    self._stop.wait(tick)
+                now = time.time()
+                for state in polled:
+                    if now - state.polled_at >= self.poll_interval:
+                        self._poll(state)
+                for batch, handlers in self._due_batches(time.time()):
+                    self._dispatch(batch, handlers)
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error(f"WorkspaceWatcher: {e}")
+                self._stop.wait(1)
+
+
+# Watcher compartido por worker (WORKSPACE_WATCHER=true para activarlo)
+workspace_watcher = WorkspaceWatcher()
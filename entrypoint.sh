@@ -3,6 +3,8 @@
 # Ensure PORT is set (Render default)
 export PORT=${PORT:-10000}
 export PYTHONPATH=$PYTHONPATH:/opt/bunk3r-ia
+# Historial de conversaciones compartido entre los workers de gunicorn
+export AI_CONV_SHARED=${AI_CONV_SHARED:-sqlite}
 
 echo "BUNK3R-IA: Preparing environment..."
 